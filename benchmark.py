@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+"""
+Linux本地推理基准测试
+在本机编译 C / C++ 推理程序（纯NumPy引擎直接以Python脚本运行），绑定到指定CPU重复运行每个配置，
+汇总延迟分位数与吞吐量，并给出跨重复运行的95%置信区间（不依赖adb或Apple工具链）
+同时记录每次运行的进程资源占用：峰值RSS、缺页、上下文切换、各线程CPU时间，
+以及（perf可用时）每样本指令数
+
+用法:
+    python benchmark.py                                  # 编译并测试全部引擎
+    python benchmark.py --engines cpp --batch-sizes 1,32 --repeat 10
+    python benchmark.py --engines cpp,numpy --batch-sizes 1,8,32   # ORT 与纯NumPy实现对比
+    python benchmark.py --engines c_gen,c_gen_fp16,c_gen_bf16     # 生成内核 FP32 / FP16 / BF16 权重
+    python benchmark.py --cpus 2 --cpus 2-3              # 比较不同CPU绑定
+    python benchmark.py --test-data test_data_1m         # data_loader.py --synthetic 生成的大规模测试集
+    python benchmark.py --ort-root ~/onnxruntime-linux-x64-1.16.0
+    python benchmark.py --perf on                        # 强制统计指令数
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+INFERENCE_DIR = PROJECT_ROOT / "inference"
+BUILD_DIR = PROJECT_ROOT / "build" / "build_linux"
+MODEL_PATH = PROJECT_ROOT / "models" / "mnist_model.onnx"
+DEFAULT_OUTPUT = PROJECT_ROOT / "results" / "benchmark_linux.json"
+
+# ONNX Runtime 查找路径（预编译包解压到 build/ 下或系统安装）
+ORT_SEARCH_ROOTS = [
+    *sorted(glob.glob(str(PROJECT_ROOT / "build" / "onnxruntime-linux-*"))),
+    "/usr/local",
+    "/usr",
+]
+
+# 引擎定义：可执行文件名（或Python脚本）、源文件（相对 inference/）、是否支持 --batch-size
+ENGINES = {
+    'cpp': {
+        'binary': 'cpp_inference',
+        'sources': ['cpp_inference.cpp'],
+        'headers': ['mnist_index.h', 'model_descriptor.h'],
+        'batching': True,
+    },
+    'c': {
+        'binary': 'c_inference',
+        'sources': ['c_inference.c'],
+        'headers': ['mnist_index.h', 'model_descriptor.h'],
+        'batching': False,
+    },
+    'c_lib': {
+        'binary': 'c_inference_lib',
+        'sources': ['c_inference_lib.c', 'c_inference_main.c'],
+        'headers': ['c_inference_lib.h', 'embedded_model.h', 'mnist_index.h', 'model_descriptor.h'],
+        'batching': False,
+    },
+    'c_gen': {
+        'binary': 'c_inference_gen',   # 同一C库，推理内核由 onnx_to_c_kernels.py 生成，不链接ONNX Runtime
+        'sources': ['c_inference_lib.c', 'c_inference_main.c'],
+        'headers': ['c_inference_lib.h', 'generated_model.h', 'mnist_index.h', 'model_descriptor.h'],
+        'defines': ['INFERENCE_USE_GENERATED_MODEL'],
+        'onnxruntime': False,
+        'batching': False,
+    },
+    # FP16 / BF16 权重存储模型（export_onnx.py 导出）生成的内核：全连接层权重以16位读取
+    'c_gen_fp16': {
+        'binary': 'c_inference_gen_fp16',
+        'model': 'mnist_model_fp16.onnx',
+        'sources': ['c_inference_lib.c', 'c_inference_main.c'],
+        'headers': ['c_inference_lib.h', 'generated_model.h', 'mnist_index.h', 'model_descriptor.h'],
+        'defines': ['INFERENCE_USE_GENERATED_MODEL'],
+        'onnxruntime': False,
+        'batching': False,
+    },
+    'c_gen_bf16': {
+        'binary': 'c_inference_gen_bf16',
+        'model': 'mnist_model_bf16.onnx',
+        'sources': ['c_inference_lib.c', 'c_inference_main.c'],
+        'headers': ['c_inference_lib.h', 'generated_model.h', 'mnist_index.h', 'model_descriptor.h'],
+        'defines': ['INFERENCE_USE_GENERATED_MODEL'],
+        'onnxruntime': False,
+        'batching': False,
+    },
+    'numpy': {
+        'script': 'numpy_inference.py',   # 无需编译，也不依赖ONNX Runtime
+        'sources': ['numpy_inference.py', 'mnist_data.py'],
+        'headers': [],
+        'batching': True,
+    },
+}
+
+# t分布双侧95%临界值（自由度1-30），更大自由度取正态近似
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+# C库共享库（c_lib 引擎编译时一并生成）
+SHARED_LIBRARY = 'libc_inference.so'
+
+METRICS = ['mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'throughput_fps']
+
+# 进程资源指标（wait4 的 rusage），与延迟指标一起汇总
+RESOURCE_METRICS = ['peak_rss_mb', 'minor_faults', 'major_faults', 'voluntary_ctx_switches',
+                    'involuntary_ctx_switches', 'cpu_utilization', 'cpu_ms_per_sample']
+
+# perf 硬件计数器（仅用户态，perf_event_paranoid=2 时普通用户也可用）
+PERF_EVENTS = ['instructions:u', 'cycles:u']
+
+SAMPLE_INTERVAL_S = 0.02
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def find_onnxruntime(ort_root=None):
+    """查找ONNX Runtime头文件和共享库目录，返回 (include_dir, lib_dir)"""
+    candidates = [ort_root] if ort_root else []
+    if os.environ.get('ONNXRUNTIME_ROOT'):
+        candidates.append(os.environ['ONNXRUNTIME_ROOT'])
+    candidates += ORT_SEARCH_ROOTS
+
+    for root in candidates:
+        root = Path(root).expanduser()
+        include_dir = next((d for d in [root / "include", root / "include" / "onnxruntime"]
+                            if (d / "onnxruntime_c_api.h").exists()), None)
+        lib_dir = next((d for d in [root / "lib", root / "lib64"]
+                        if list(d.glob("libonnxruntime.so*"))), None)
+        if include_dir and lib_dir:
+            return include_dir, lib_dir
+
+    raise FileNotFoundError(
+        "未找到ONNX Runtime！请下载 onnxruntime-linux-<arch>-<version>.tgz 解压到 build/ 下，"
+        "或通过 --ort-root / ONNXRUNTIME_ROOT 指定安装目录")
+
+
+def parse_cpu_list(text):
+    """解析CPU列表，如 '0,2-3' -> [0, 2, 3]"""
+    cpus = []
+    for part in text.split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+def is_up_to_date(target, dependencies):
+    """目标存在且比所有依赖都新时无需重新编译"""
+    if not target.exists():
+        return False
+    target_mtime = target.stat().st_mtime
+    return all(not dep.exists() or dep.stat().st_mtime <= target_mtime for dep in dependencies)
+
+
+def build_engine(name, include_dir, lib_dir, cc, cxx, extra_flags, force=False):
+    """编译单个引擎到 inference/ 目录（与程序内置的相对路径保持一致）"""
+    spec = ENGINES[name]
+    target = INFERENCE_DIR / spec['binary']
+    sources = [INFERENCE_DIR / src for src in spec['sources']]
+    dependencies = sources + [INFERENCE_DIR / h for h in spec['headers']]
+
+    if name == 'c_lib':
+        # C库使用嵌入式模型，模型或生成工具更新后需重新生成
+        embedded_c = BUILD_DIR / "embedded_model.c"
+        generator = INFERENCE_DIR / "onnx_to_c_array.py"
+        dependencies.append(MODEL_PATH)
+        if force or not is_up_to_date(embedded_c, [MODEL_PATH, generator]):
+            BUILD_DIR.mkdir(parents=True, exist_ok=True)
+            subprocess.run([sys.executable, str(INFERENCE_DIR / "onnx_to_c_array.py"),
+                            str(MODEL_PATH), str(embedded_c), "mnist_model_data"],
+                           check=True, stdout=subprocess.DEVNULL)
+        sources.append(embedded_c)
+        dependencies.append(embedded_c)
+    elif 'INFERENCE_USE_GENERATED_MODEL' in spec.get('defines', []):
+        # 模型或内核生成器更新后重新生成 generated_<模型名>.c
+        model_path = MODEL_PATH.parent / spec.get('model', MODEL_PATH.name)
+        generated_c = BUILD_DIR / f"generated_{model_path.stem}.c"
+        generator = INFERENCE_DIR / "onnx_to_c_kernels.py"
+        model_files = [model_path] + [p for p in [Path(f"{model_path}.data")] if p.exists()]
+        dependencies.extend(model_files)
+        if force or not is_up_to_date(generated_c, [*model_files, generator]):
+            BUILD_DIR.mkdir(parents=True, exist_ok=True)
+            subprocess.run([sys.executable, str(generator), str(model_path), str(generated_c)],
+                           check=True, stdout=subprocess.DEVNULL)
+        sources.append(generated_c)
+        dependencies.append(generated_c)
+
+    if not force and is_up_to_date(target, dependencies):
+        print(f"✓ {spec['binary']} 已是最新")
+        return target
+
+    is_cpp = any(src.suffix == '.cpp' for src in sources)
+    command = [cxx if is_cpp else cc, '-O3', '-DNDEBUG', '-std=c++17' if is_cpp else '-std=c99',
+               *extra_flags, *[f'-D{define}' for define in spec.get('defines', [])], f'-I{INFERENCE_DIR}']
+    if spec.get('onnxruntime', True):
+        command += [f'-I{include_dir}', *map(str, sources), '-o', str(target),
+                    f'-L{lib_dir}', '-lonnxruntime', f'-Wl,-rpath,{lib_dir}']
+    else:
+        command += [*map(str, sources), '-o', str(target)]
+    if not is_cpp:
+        command.append('-lm')
+
+    print(f"🔨 编译 {spec['binary']}...")
+    subprocess.run(command, check=True)
+    return target
+
+
+def build_shared_library(include_dir, lib_dir, cc, extra_flags, force=False):
+    """编译C库为共享库 inference/libc_inference.so，供 Python ctypes 绑定（c_inference_binding.py）使用"""
+    target = INFERENCE_DIR / SHARED_LIBRARY
+    embedded_c = BUILD_DIR / "embedded_model.c"   # 由 build_engine('c_lib') 生成
+    sources = [INFERENCE_DIR / "c_inference_lib.c", embedded_c]
+    dependencies = sources + [INFERENCE_DIR / h for h in ('c_inference_lib.h', 'embedded_model.h',
+                                                          'mnist_index.h', 'model_descriptor.h')]
+
+    if not force and is_up_to_date(target, dependencies):
+        print(f"✓ {SHARED_LIBRARY} 已是最新")
+        return target
+
+    command = [cc, '-O3', '-DNDEBUG', '-std=c99', '-shared', '-fPIC', *extra_flags,
+               f'-I{INFERENCE_DIR}', f'-I{include_dir}', *map(str, sources), '-o', str(target),
+               f'-L{lib_dir}', '-lonnxruntime', f'-Wl,-rpath,{lib_dir}', '-lm']
+    print(f"🔨 编译 {SHARED_LIBRARY}...")
+    subprocess.run(command, check=True)
+    return target
+
+
+def read_thread_times(pid):
+    """读取 /proc/<pid>/task/*/stat，返回 {tid: (线程名, 用户态+内核态CPU秒)}"""
+    threads = {}
+    for stat_path in glob.glob(f"/proc/{pid}/task/*/stat"):
+        try:
+            with open(stat_path, 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue   # 线程已退出
+        name = stat[stat.index('(') + 1:stat.rindex(')')]
+        fields = stat[stat.rindex(')') + 2:].split()
+        # fields[11] / fields[12] 即 stat 第14、15列 utime / stime（单位: 时钟滴答）
+        threads[int(stat_path.split('/')[-2])] = (name, (int(fields[11]) + int(fields[12])) / CLOCK_TICKS)
+    return threads
+
+
+def wait_and_sample(process, timeout, interval=SAMPLE_INTERVAL_S):
+    """
+    等待子进程结束，期间周期采样各线程CPU时间
+    使用 wait4 回收子进程以获得其 rusage（峰值RSS、缺页、上下文切换）
+    """
+    threads = {}
+    deadline = time.perf_counter() + timeout
+    while True:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return rusage, threads
+        threads.update(read_thread_times(process.pid))
+        if time.perf_counter() > deadline:
+            process.kill()
+            process.wait()
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        time.sleep(interval)
+
+
+def resource_metrics(rusage, threads, wall_time, samples):
+    """整理单次运行的进程资源指标"""
+    cpu_time = rusage.ru_utime + rusage.ru_stime
+    return {
+        'peak_rss_mb': rusage.ru_maxrss / 1024.0,   # Linux 上 ru_maxrss 单位为KB
+        'minor_faults': rusage.ru_minflt,
+        'major_faults': rusage.ru_majflt,
+        'voluntary_ctx_switches': rusage.ru_nvcsw,
+        'involuntary_ctx_switches': rusage.ru_nivcsw,
+        'cpu_user_s': rusage.ru_utime,
+        'cpu_sys_s': rusage.ru_stime,
+        'cpu_utilization': cpu_time / wall_time if wall_time > 0 else 0.0,
+        'cpu_ms_per_sample': cpu_time * 1000.0 / samples if samples else 0.0,
+        # 采样间隔内的CPU时间可能漏计，线程表用于观察负载分布而非精确计量
+        'threads': sorted(
+            ({'tid': tid, 'name': name, 'cpu_s': cpu_s,
+              'utilization': cpu_s / wall_time if wall_time > 0 else 0.0}
+             for tid, (name, cpu_s) in threads.items()),
+            key=lambda t: t['cpu_s'], reverse=True),
+    }
+
+
+def engine_program(name):
+    """引擎的可执行文件名或脚本名（用于日志）"""
+    spec = ENGINES[name]
+    return spec.get('binary') or spec['script']
+
+
+def engine_command(config, timings_path):
+    spec = ENGINES[config['engine']]
+    program = [sys.executable, spec['script']] if 'script' in spec else [f"./{spec['binary']}"]
+    command = [*program, '--timings', str(timings_path)]
+    if spec['batching']:
+        command += ['--batch-size', str(config['batch_size'])]
+    if config.get('test_data'):
+        command += ['--test-data', config['test_data']]
+    return command
+
+
+def run_once(config, cpus, timeout):
+    """运行一次配置，返回本次的延迟/吞吐量指标和进程资源指标"""
+    with tempfile.TemporaryDirectory(prefix='bench_') as work_dir:
+        timings_path = Path(work_dir) / "timings.bin"
+        log_path = Path(work_dir) / "output.log"
+
+        # 在子进程 exec 之前绑定CPU，ORT线程池继承亲和性
+        preexec = (lambda: os.sched_setaffinity(0, cpus)) if cpus else None
+
+        with open(log_path, 'w+') as log:
+            start = time.perf_counter()
+            process = subprocess.Popen(engine_command(config, timings_path), cwd=INFERENCE_DIR,
+                                       stdout=log, stderr=subprocess.STDOUT, preexec_fn=preexec)
+            rusage, threads = wait_and_sample(process, timeout)
+            wall_time = time.perf_counter() - start
+            if process.returncode != 0 or not timings_path.exists():
+                log.seek(0)
+                print(log.read()[-4000:])
+                raise RuntimeError(f"{engine_program(config['engine'])} 运行失败，退出码 {process.returncode}")
+
+        latencies = np.fromfile(timings_path, dtype=np.float64)
+
+    run = {
+        'samples': int(len(latencies)),
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p90_ms': float(np.percentile(latencies, 90)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'throughput_fps': float(len(latencies) / (latencies.sum() / 1000.0)),
+        'process_wall_s': wall_time,
+    }
+    run.update(resource_metrics(rusage, threads, wall_time, len(latencies)))
+    return run
+
+
+def parse_perf_stat(text):
+    """解析 perf stat -x, 的CSV输出，返回 {事件名: 计数}（不支持的事件跳过）"""
+    counters = {}
+    for line in text.splitlines():
+        fields = line.split(',')
+        if len(fields) < 3 or line.startswith('#'):
+            continue
+        try:
+            value = float(fields[0])
+        except ValueError:
+            continue   # <not supported> / <not counted>
+        counters[fields[2].split(':')[0]] = value
+    return counters
+
+
+def run_perf_counters(config, cpus, timeout):
+    """
+    额外运行一次 perf stat 统计用户态指令数和周期数
+    单独运行，避免 perf 包装进程影响延迟和 rusage 数据；计数包含模型加载等一次性开销
+    """
+    with tempfile.TemporaryDirectory(prefix='perf_') as work_dir:
+        perf_path = Path(work_dir) / "perf.csv"
+        timings_path = Path(work_dir) / "timings.bin"
+        command = ['perf', 'stat', '-x,', '-e', ','.join(PERF_EVENTS), '-o', str(perf_path), '--',
+                   *engine_command(config, timings_path)]
+        preexec = (lambda: os.sched_setaffinity(0, cpus)) if cpus else None
+        result = subprocess.run(command, cwd=INFERENCE_DIR, capture_output=True, text=True,
+                                timeout=timeout, preexec_fn=preexec)
+        if result.returncode != 0 or not perf_path.exists() or not timings_path.exists():
+            return None
+        counters = parse_perf_stat(perf_path.read_text())
+        samples = len(np.fromfile(timings_path, dtype=np.float64))
+
+    if 'instructions' not in counters or not samples:
+        return None
+    perf = {
+        'instructions': counters['instructions'],
+        'instructions_per_sample': counters['instructions'] / samples,
+    }
+    if counters.get('cycles'):
+        perf['cycles'] = counters['cycles']
+        perf['ipc'] = counters['instructions'] / counters['cycles']
+    return perf
+
+
+def confidence_interval(values):
+    """返回 (均值, 标准差, 95%置信区间半宽)，基于t分布"""
+    values = np.asarray(values, dtype=np.float64)
+    mean = float(values.mean())
+    if len(values) < 2:
+        return mean, 0.0, float('nan')
+    std = float(values.std(ddof=1))
+    df = len(values) - 1
+    t = T_CRITICAL_95[df - 1] if df <= len(T_CRITICAL_95) else 1.96
+    return mean, std, t * std / np.sqrt(len(values))
+
+
+def summarize(runs):
+    """对重复运行的每个指标计算均值与置信区间"""
+    summary = {}
+    for metric in METRICS + RESOURCE_METRICS:
+        mean, std, ci = confidence_interval([run[metric] for run in runs])
+        summary[metric] = {'mean': mean, 'std': std, 'ci95': ci}
+    return summary
+
+
+def print_summary(configs):
+    """打印基准测试结果表"""
+    print("\n=== Linux 本地基准测试结果 (均值 ± 95%置信区间) ===")
+    print(f"{'引擎':<10} {'批大小':>5} {'CPU':<8} {'次数':>4} {'平均延迟(ms)':>20} "
+          f"{'P99(ms)':>20} {'吞吐量(FPS)':>22}")
+    print("-" * 97)
+    for config in configs:
+        s = config['summary']
+        cpus = config['cpus_label']
+        print(f"{config['engine']:<10} {config['batch_size']:>5} {cpus:<8} {len(config['runs']):>4} "
+              f"{s['mean_ms']['mean']:>11.4f} ± {s['mean_ms']['ci95']:<7.4f}"
+              f"{s['p99_ms']['mean']:>11.4f} ± {s['p99_ms']['ci95']:<7.4f}"
+              f"{s['throughput_fps']['mean']:>12.0f} ± {s['throughput_fps']['ci95']:<8.0f}")
+
+    print("\n=== 进程资源占用 (重复运行均值) ===")
+    print(f"{'引擎':<10} {'批大小':>5} {'CPU':<8} {'峰值RSS(MB)':>11} {'缺页(次/主)':>16} "
+          f"{'上下文切换(自愿/非自愿)':>22} {'CPU利用率':>9} {'CPU ms/样本':>11} {'指令/样本':>11} {'IPC':>5}")
+    print("-" * 123)
+    for config in configs:
+        s = config['summary']
+        perf = config.get('perf') or {}
+        instructions = f"{perf['instructions_per_sample']:.3g}" if 'instructions_per_sample' in perf else "N/A"
+        ipc = f"{perf['ipc']:.2f}" if 'ipc' in perf else "N/A"
+        faults = f"{s['minor_faults']['mean']:.0f}/{s['major_faults']['mean']:.0f}"
+        switches = f"{s['voluntary_ctx_switches']['mean']:.0f}/{s['involuntary_ctx_switches']['mean']:.0f}"
+        print(f"{config['engine']:<10} {config['batch_size']:>5} {config['cpus_label']:<8} "
+              f"{s['peak_rss_mb']['mean']:>11.1f} {faults:>16} {switches:>22} "
+              f"{s['cpu_utilization']['mean']:>9.2f} {s['cpu_ms_per_sample']['mean']:>11.4f} "
+              f"{instructions:>11} {ipc:>5}")
+
+
+def model_info(model_path=MODEL_PATH):
+    """模型文件名与SHA-256，用于区分不同导出/量化版本的基准结果"""
+    if not model_path.exists():
+        return {'path': str(model_path.relative_to(PROJECT_ROOT)), 'sha256': None}
+    return {
+        'path': str(model_path.relative_to(PROJECT_ROOT)),
+        'sha256': hashlib.sha256(model_path.read_bytes()).hexdigest(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Linux本地C/C++推理基准测试")
+    parser.add_argument('--engines', default='cpp,c,c_lib', help=f"测试的引擎，逗号分隔 ({', '.join(ENGINES)})")
+    parser.add_argument('--batch-sizes', default='1', help='批大小列表（仅C++引擎支持批量）')
+    parser.add_argument('--cpus', action='append',
+                        help='绑定的CPU列表，如 "2" 或 "0-3"；可重复指定以比较多种绑定')
+    parser.add_argument('--repeat', type=int, default=5, help='每个配置的重复次数')
+    parser.add_argument('--warmup', type=int, default=1, help='每个配置预热运行次数（不计入结果）')
+    parser.add_argument('--timeout', type=float, default=1800, help='单次运行超时（秒）')
+    parser.add_argument('--ort-root', help='ONNX Runtime 安装目录（包含 include/ 和 lib/）')
+    parser.add_argument('--cc', default=os.environ.get('CC', 'gcc'), help='C编译器')
+    parser.add_argument('--cxx', default=os.environ.get('CXX', 'g++'), help='C++编译器')
+    parser.add_argument('--cflags', default='', help='附加编译选项，如 "-march=native"')
+    parser.add_argument('--rebuild', action='store_true', help='强制重新编译')
+    parser.add_argument('--no-build', action='store_true', help='跳过编译，直接使用已有可执行文件')
+    parser.add_argument('--build-only', action='store_true', help='只编译，不运行基准测试')
+    parser.add_argument('--perf', choices=['auto', 'on', 'off'], default='auto',
+                        help='是否用 perf stat 统计每样本指令数（auto: 找到perf时启用）')
+    parser.add_argument('--test-data', help='测试数据目录（默认各引擎的 ../test_data），'
+                                            '可用 data_loader.py --synthetic 生成数百万样本')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT), help='结果JSON路径')
+    args = parser.parse_args(argv)
+
+    if platform.system() != 'Linux':
+        print("❌ 本脚本仅支持Linux主机（macOS请使用 deploy_and_test.sh）")
+        return 1
+
+    engines = [e.strip() for e in args.engines.split(',') if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        print(f"❌ 未知引擎: {', '.join(unknown)}")
+        return 1
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',') if b.strip()]
+    available_cpus = sorted(os.sched_getaffinity(0))
+    # 默认绑定到最后一个可用CPU，避开通常承担中断处理的CPU 0
+    cpu_sets = [parse_cpu_list(c) for c in args.cpus] if args.cpus else [[available_cpus[-1]]]
+    for cpus in cpu_sets:
+        if not set(cpus) <= set(available_cpus):
+            print(f"❌ CPU {cpus} 不在可用范围 {available_cpus} 内")
+            return 1
+
+    # 编译
+    ort_info = {}
+    native_engines = [name for name in engines if 'binary' in ENGINES[name]]
+    if not args.no_build and native_engines:
+        include_dir = lib_dir = None
+        if any(ENGINES[name].get('onnxruntime', True) for name in native_engines):
+            try:
+                include_dir, lib_dir = find_onnxruntime(args.ort_root)
+            except FileNotFoundError as e:
+                print(f"❌ {e}")
+                return 1
+            print(f"✓ ONNX Runtime: {include_dir.parent}")
+            ort_info = {'include_dir': str(include_dir), 'lib_dir': str(lib_dir)}
+        for name in native_engines:
+            try:
+                build_engine(name, include_dir, lib_dir, args.cc, args.cxx,
+                             args.cflags.split(), force=args.rebuild)
+                if name == 'c_lib':
+                    build_shared_library(include_dir, lib_dir, args.cc, args.cflags.split(),
+                                         force=args.rebuild)
+            except subprocess.CalledProcessError as e:
+                print(f"❌ 编译 {name} 失败: {e}")
+                return 1
+    if args.build_only:
+        return 0
+
+    # 生成配置矩阵
+    configs = []
+    for name in engines:
+        for batch_size in (batch_sizes if ENGINES[name]['batching'] else [1]):
+            for cpus in cpu_sets:
+                configs.append({
+                    'engine': name,
+                    'batch_size': batch_size,
+                    'cpus': cpus,
+                    'cpus_label': ','.join(map(str, cpus)),
+                    # 引擎在 inference/ 下运行，传绝对路径
+                    'test_data': str(Path(args.test_data).resolve()) if args.test_data else None,
+                    'runs': [],
+                })
+
+    # 预热后按轮次交替运行各配置，避免系统状态漂移集中影响某一个配置
+    try:
+        for config in configs:
+            for _ in range(args.warmup):
+                run_once(config, config['cpus'], args.timeout)
+
+        for round_idx in range(args.repeat):
+            print(f"▶ 第 {round_idx + 1}/{args.repeat} 轮")
+            for config in configs:
+                config['runs'].append(run_once(config, config['cpus'], args.timeout))
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f"❌ {e}")
+        return 1
+
+    use_perf = args.perf == 'on' or (args.perf == 'auto' and shutil.which('perf'))
+    if args.perf == 'on' and not shutil.which('perf'):
+        print("⚠️ 未找到 perf，跳过指令计数")
+        use_perf = False
+    if use_perf:
+        print("▶ perf stat 指令计数")
+        for config in configs:
+            try:
+                config['perf'] = run_perf_counters(config, config['cpus'], args.timeout)
+            except subprocess.TimeoutExpired:
+                config['perf'] = None
+            if config['perf'] is None:
+                print(f"⚠️ {config['engine']} 无法读取perf计数器（检查 /proc/sys/kernel/perf_event_paranoid）")
+
+    for config in configs:
+        config['summary'] = summarize(config['runs'])
+
+    print_summary(configs)
+
+    report = {
+        'host': {
+            'machine': platform.machine(),
+            'kernel': platform.release(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+        },
+        'onnxruntime': ort_info,
+        'model': model_info(),
+        'repeat': args.repeat,
+        'warmup': args.warmup,
+        'configs': configs,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
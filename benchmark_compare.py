@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+推理性能回归门禁
+保存 benchmark.py 的结果作为基线（按 引擎/模型/批大小/CPU绑定 区分配置），
+之后用相同配置重新运行基准测试，对每个配置的重复运行结果做单侧 Mann-Whitney U 检验，
+显著变差且变化幅度超过最小效应量时判定为性能回归并以非零退出码结束
+
+用法:
+    python benchmark_compare.py save --engines cpp,c_lib --batch-sizes 1,32 --repeat 10
+    python benchmark_compare.py compare                     # 按基线配置重新运行并比较
+    python benchmark_compare.py compare --results results/benchmark_linux.json   # 比较已有结果
+    python benchmark_compare.py compare --alpha 0.01 --min-effect 0.1
+
+save / compare 未识别的参数会原样传给 benchmark.py（如 --ort-root、--no-build）
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import benchmark
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_BASELINE = PROJECT_ROOT / "results" / "benchmark_baseline.json"
+DEFAULT_REPORT = PROJECT_ROOT / "results" / "benchmark_compare.json"
+
+# 参与门禁的指标及其方向：'lower' 表示越小越好
+GATED_METRICS = {
+    'mean_ms': 'lower',
+    'p50_ms': 'lower',
+    'p90_ms': 'lower',
+    'p99_ms': 'lower',
+    'throughput_fps': 'higher',
+}
+
+DEFAULT_ALPHA = 0.05
+DEFAULT_MIN_EFFECT = 0.05   # 中位数相对变化至少5%才算回归
+EXACT_MAX_SAMPLES = 50      # 无并列值且样本量不超过此值时使用精确分布
+
+
+def config_key(config, model_path):
+    """配置唯一标识：引擎/模型/批大小/CPU绑定"""
+    return f"{config['engine']}|{Path(model_path).name}|b{config['batch_size']}|cpu{config['cpus_label']}"
+
+
+def index_configs(report):
+    model_path = report.get('model', {}).get('path', 'mnist_model.onnx')
+    return {config_key(c, model_path): c for c in report['configs']}
+
+
+def mann_whitney_u_greater(x, y):
+    """
+    单侧 Mann-Whitney U 检验，备择假设为 x 的分布整体大于 y
+    返回 (U, p值)；U 统计 x>y 的配对数（并列计0.5）
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n1, n2 = len(x), len(y)
+    u = float((x[:, None] > y[None, :]).sum() + 0.5 * (x[:, None] == y[None, :]).sum())
+
+    combined = np.concatenate([x, y])
+    _, tie_counts = np.unique(combined, return_counts=True)
+    has_ties = bool((tie_counts > 1).any())
+
+    if not has_ties and n1 + n2 <= EXACT_MAX_SAMPLES:
+        # 精确分布：counts[u] 为 U=u 的排列数，按 n2 逐个加入y样本递推
+        counts = exact_u_counts(n1, n2)
+        p = counts[int(math.ceil(u)):].sum() / counts.sum()
+        return u, float(p)
+
+    # 正态近似（并列值校正 + 连续性校正）
+    n = n1 + n2
+    mean = n1 * n2 / 2.0
+    tie_term = ((tie_counts ** 3 - tie_counts).sum()) / (n * (n - 1)) if n > 1 else 0.0
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term)
+    if variance <= 0:
+        return u, 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def exact_u_counts(n1, n2):
+    """U统计量在零假设下的频数分布（长度 n1*n2+1）"""
+    # table[i][j] 为 i 个x样本、j 个y样本时各U值的频数
+    table = [[None] * (n2 + 1) for _ in range(n1 + 1)]
+    for i in range(n1 + 1):
+        for j in range(n2 + 1):
+            if i == 0 or j == 0:
+                counts = np.zeros(i * j + 1)
+                counts[0] = 1
+            else:
+                # 最大元素来自x：它大于全部j个y，贡献j；来自y：贡献0
+                counts = np.zeros(i * j + 1)
+                from_x = table[i - 1][j]
+                counts[j:j + len(from_x)] += from_x
+                from_y = table[i][j - 1]
+                counts[:len(from_y)] += from_y
+            table[i][j] = counts
+    return table[n1][n2]
+
+
+def compare_metric(baseline_values, current_values, direction, alpha, min_effect):
+    """比较单个指标，返回检验结果（change 为中位数相对变化，正值表示变差）"""
+    baseline_median = float(np.median(baseline_values))
+    current_median = float(np.median(current_values))
+    relative = (current_median - baseline_median) / baseline_median if baseline_median else 0.0
+    worse_change = relative if direction == 'lower' else -relative
+
+    if direction == 'lower':
+        u, p_worse = mann_whitney_u_greater(current_values, baseline_values)
+        _, p_better = mann_whitney_u_greater(baseline_values, current_values)
+    else:
+        u, p_worse = mann_whitney_u_greater(baseline_values, current_values)
+        _, p_better = mann_whitney_u_greater(current_values, baseline_values)
+
+    if p_worse < alpha and worse_change >= min_effect:
+        status = 'regression'
+    elif p_better < alpha and -worse_change >= min_effect:
+        status = 'improvement'
+    else:
+        status = 'unchanged'
+
+    return {
+        'baseline_median': baseline_median,
+        'current_median': current_median,
+        'change': worse_change,
+        'u': u,
+        'p_worse': p_worse,
+        'p_better': p_better,
+        'cliffs_delta': 2.0 * u / (len(baseline_values) * len(current_values)) - 1.0,
+        'status': status,
+    }
+
+
+def compare_reports(baseline, current, alpha, min_effect):
+    """逐配置、逐指标比较两份基准测试结果"""
+    baseline_configs = index_configs(baseline)
+    current_configs = index_configs(current)
+    results = {}
+
+    for key, config in current_configs.items():
+        if key not in baseline_configs:
+            results[key] = {'status': 'new'}
+            continue
+        base_runs = baseline_configs[key]['runs']
+        runs = config['runs']
+        if len(base_runs) < 2 or len(runs) < 2:
+            results[key] = {'status': 'insufficient', 'reason': '重复次数不足2次，无法检验'}
+            continue
+
+        metrics = {
+            metric: compare_metric([r[metric] for r in base_runs], [r[metric] for r in runs],
+                                   direction, alpha, min_effect)
+            for metric, direction in GATED_METRICS.items()
+        }
+        statuses = {m['status'] for m in metrics.values()}
+        status = ('regression' if 'regression' in statuses else
+                  'improvement' if 'improvement' in statuses else 'unchanged')
+        results[key] = {'status': status, 'metrics': metrics}
+
+    for key in baseline_configs:
+        if key not in current_configs:
+            results[key] = {'status': 'missing'}
+
+    return results
+
+
+def print_comparison(results):
+    """打印比较结果表"""
+    print("\n=== 性能回归检查 (中位数相对变化，正值表示变差) ===")
+    print(f"{'配置':<30} {'指标':<15} {'基线':>12} {'当前':>12} {'变化':>8} {'p值':>8} {'结论':<6}")
+    print("-" * 98)
+    labels = {'regression': '❌ 回归', 'improvement': '✅ 提升', 'unchanged': '持平'}
+    for key, result in results.items():
+        if 'metrics' not in result:
+            note = {'new': '新增配置（基线中不存在）', 'missing': '⚠️ 本次未运行',
+                    'insufficient': result.get('reason', '')}[result['status']]
+            print(f"{key:<30} {note}")
+            continue
+        for metric, m in result['metrics'].items():
+            p = m['p_worse'] if m['change'] >= 0 else m['p_better']
+            print(f"{key:<30} {metric:<15} {m['baseline_median']:>12.4f} {m['current_median']:>12.4f} "
+                  f"{m['change']:>+8.1%} {p:>8.4f} {labels[m['status']]:<6}")
+
+
+def benchmark_args(report):
+    """根据基线结果还原 benchmark.py 的测试矩阵参数"""
+    configs = report['configs']
+    engines = list(dict.fromkeys(c['engine'] for c in configs))
+    batch_sizes = list(dict.fromkeys(c['batch_size'] for c in configs
+                                     if benchmark.ENGINES[c['engine']]['batching']))
+    cpu_labels = list(dict.fromkeys(c['cpus_label'] for c in configs))
+
+    args = ['--engines', ','.join(engines), '--repeat', str(report['repeat']),
+            '--warmup', str(report['warmup'])]
+    if batch_sizes:
+        args += ['--batch-sizes', ','.join(map(str, batch_sizes))]
+    for label in cpu_labels:
+        args += ['--cpus', label]
+    return args
+
+
+def run_benchmark(args):
+    """运行 benchmark.py 并读取结果"""
+    with tempfile.TemporaryDirectory(prefix='bench_compare_') as work_dir:
+        output = Path(work_dir) / "benchmark.json"
+        if benchmark.main([*args, '--output', str(output)]) != 0:
+            return None
+        with open(output, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def save_baseline(args, benchmark_argv):
+    if args.results:
+        with open(args.results, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    else:
+        report = run_benchmark(benchmark_argv)
+        if report is None:
+            print("❌ 基准测试失败，未保存基线")
+            return 1
+
+    report['git_revision'] = git_revision()
+    os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+    with open(args.baseline, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ 已保存 {len(report['configs'])} 个配置的基线到: {args.baseline}")
+    return 0
+
+
+def compare_baseline(args, benchmark_argv):
+    if not os.path.exists(args.baseline):
+        print(f"❌ 基线文件不存在: {args.baseline}（先运行 python benchmark_compare.py save）")
+        return 1
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    if args.results:
+        with open(args.results, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        print(f"▶ 按基线配置重新运行基准测试 (基线版本: {baseline.get('git_revision') or '未知'})")
+        current = run_benchmark(benchmark_args(baseline) + benchmark_argv)
+        if current is None:
+            print("❌ 基准测试失败")
+            return 1
+
+    if baseline.get('host', {}).get('machine') != current.get('host', {}).get('machine'):
+        print("⚠️ 基线与当前结果来自不同架构的主机，比较结果仅供参考")
+    base_model = baseline.get('model', {}).get('sha256')
+    current_model = current.get('model', {}).get('sha256')
+    if base_model and current_model and base_model != current_model:
+        print("ℹ️ 模型文件与基线不同（导出或量化有变化）")
+
+    results = compare_reports(baseline, current, args.alpha, args.min_effect)
+    print_comparison(results)
+
+    regressions = [key for key, r in results.items() if r['status'] == 'regression']
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'baseline': str(args.baseline),
+            'baseline_revision': baseline.get('git_revision'),
+            'current_revision': git_revision(),
+            'alpha': args.alpha,
+            'min_effect': args.min_effect,
+            'configs': results,
+            'regressions': regressions,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n报告已保存到: {args.output}")
+
+    if regressions:
+        print(f"\n❌ 检测到 {len(regressions)} 个配置性能回归 (p<{args.alpha:g}, 变化≥{args.min_effect:.0%}):")
+        for key in regressions:
+            print(f"  - {key}")
+        return 1
+
+    print("\n✅ 未检测到显著性能回归")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理性能回归门禁")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in [('save', '运行基准测试并保存为基线'),
+                            ('compare', '按基线配置重新运行并检查性能回归')]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='基线文件路径')
+        sub.add_argument('--results', help='直接使用已有的 benchmark.py 结果，不重新运行')
+        if name == 'compare':
+            sub.add_argument('--alpha', type=float, default=DEFAULT_ALPHA, help='显著性水平')
+            sub.add_argument('--min-effect', type=float, default=DEFAULT_MIN_EFFECT,
+                             help='判定回归的最小中位数相对变化')
+            sub.add_argument('--output', default=str(DEFAULT_REPORT), help='比较报告路径')
+    args, benchmark_argv = parser.parse_known_args()
+
+    if args.command == 'save':
+        return save_baseline(args, benchmark_argv)
+    return compare_baseline(args, benchmark_argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,86 @@
 #!/usr/bin/env python3
 """
 MNIST原始数据加载器
-直接读取MNIST原始格式数据，为三种语言提供统一的测试数据
+直接读取MNIST原始格式数据，为三种语言提供统一的测试数据；
+--synthetic N 以固定种子对MNIST样本做随机仿射变换和像素扰动，流式生成任意规模（数百万样本）的测试集
+
+用法:
+    python data_loader.py                                     # 从MNIST测试集抽取100个样本到 test_data/
+    python data_loader.py --num-samples 10000                 # 完整测试集
+    python data_loader.py --synthetic 1000000 --output-dir test_data_1m              # 二进制索引（各引擎直接读取）
+    python data_loader.py --synthetic 5000000 --format idx --output-dir data/synthetic  # MNIST idx 格式（uint8）
 """
 
+import argparse
 import struct
 import numpy as np
 import json
 import os
+import sys
 from pathlib import Path
 
+# 二进制索引格式（与 inference/mnist_index.h 保持一致）
+INDEX_MAGIC = b'DL2CIDX\0'
+INDEX_VERSION = 1
+INDEX_HEADER_SIZE = 32
+INDEX_FILENAME = "index.bin"
+INDEX_IMAGES_FILENAME = "images.bin"
+
+# 合成数据集的源MNIST文件
+SOURCE_FILES = {
+    'test': ("t10k-images-idx3-ubyte", "t10k-labels-idx1-ubyte"),
+    'train': ("train-images-idx3-ubyte", "train-labels-idx1-ubyte"),
+}
+# idx 格式合成数据集的文件名（与MNIST原始文件同样的格式，可直接用 MNISTDataLoader(目录).load_images 读取）
+SYNTHETIC_IDX_FILES = ("synthetic-images-idx3-ubyte", "synthetic-labels-idx1-ubyte")
+
+# 合成样本的默认扰动幅度：平移(像素)、旋转(度)、缩放、对比度、高斯噪声标准差
+DEFAULT_AUGMENTATION = {
+    'max_shift': 2.0,
+    'max_rotation': 10.0,
+    'max_scale': 0.1,
+    'max_contrast': 0.2,
+    'noise_std': 0.02,
+}
+
+def augment_images(images, rng, max_shift, max_rotation, max_scale, max_contrast, noise_std):
+    """
+    对 [N, H, W]（范围[0,1]）的图像逐样本做随机仿射变换（绕中心旋转、缩放、平移，双线性插值，边界外为0）
+    和像素扰动（对比度、高斯噪声），返回裁剪到[0,1]的 float32 图像
+    """
+    n, h, w = images.shape
+    angle = np.deg2rad(rng.uniform(-max_rotation, max_rotation, n)).astype(np.float32)
+    scale = rng.uniform(1 - max_scale, 1 + max_scale, n).astype(np.float32)
+    shift = rng.uniform(-max_shift, max_shift, (n, 2)).astype(np.float32)
+    contrast = rng.uniform(1 - max_contrast, 1 + max_contrast, n).astype(np.float32)
+    
+    # 逆映射：输出像素坐标 -> 源图像坐标
+    cy, cx = (h - 1) / 2, (w - 1) / 2
+    ys, xs = np.mgrid[0:h, 0:w].astype(np.float32)
+    cos = (np.cos(angle) / scale)[:, None, None]
+    sin = (np.sin(angle) / scale)[:, None, None]
+    yc = ys - cy - shift[:, 1, None, None]
+    xc = xs - cx - shift[:, 0, None, None]
+    src_x = cos * xc + sin * yc + cx
+    src_y = -sin * xc + cos * yc + cy
+    
+    # 四周补一圈0，坐标截断到补边范围内，越界采样点取到0
+    padded = np.pad(images, ((0, 0), (1, 1), (1, 1)))
+    x0 = np.floor(src_x)
+    y0 = np.floor(src_y)
+    fx = src_x - x0
+    fy = src_y - y0
+    x0 = np.clip(x0, -1, w).astype(np.intp) + 1
+    y0 = np.clip(y0, -1, h).astype(np.intp) + 1
+    x1 = np.minimum(x0 + 1, w + 1)
+    y1 = np.minimum(y0 + 1, h + 1)
+    sample = np.arange(n)[:, None, None]
+    out = ((padded[sample, y0, x0] * (1 - fx) + padded[sample, y0, x1] * fx) * (1 - fy)
+           + (padded[sample, y1, x0] * (1 - fx) + padded[sample, y1, x1] * fx) * fy)
+    
+    out = out * contrast[:, None, None] + rng.normal(0, noise_std, out.shape).astype(np.float32)
+    return np.clip(out, 0.0, 1.0).astype(np.float32)
+
 class MNISTDataLoader:
     """MNIST数据加载器"""
     
@@ -95,7 +166,7 @@ class MNISTDataLoader:
         # 保存元数据
         metadata = {
             'num_samples': len(images),
-            'image_shape': [28, 28],
+            'image_shape': list(images.shape[1:]),
             'data_type': 'float32',
             'pixel_range': [0.0, 1.0],
             'description': 'MNIST测试子集，用于三种语言推理对比',
@@ -122,13 +193,206 @@ class MNISTDataLoader:
                 labels=labels, 
                 indices=indices)
         
+        # 保存二进制索引供C/C++一次读取
+        index_file, images_file = self.save_binary_index(images, labels, indices, output_dir)
+        
         print(f"✅ 保存完成:")
         print(f"  - 二进制文件: {len(images)} 个 *.bin 文件")
         print(f"  - 元数据: {metadata_file}")
         print(f"  - Python数据: {npz_file}")
+        print(f"  - 二进制索引: {index_file}")
+        print(f"  - 打包图像: {images_file}")
         
         return metadata
     
+    def save_binary_index(self, images, labels, indices, output_dir="./test_data"):
+        """
+        保存二进制索引和打包图像，格式见 inference/mnist_index.h
+        images 为 [N, H, W]（单通道）或 [N, C, H, W]
+        """
+        output_dir = Path(output_dir)
+        if images.ndim == 3:
+            num_samples, rows, cols = images.shape
+            channels = 1
+        else:
+            num_samples, channels, rows, cols = images.shape
+        
+        # 所有图像连续存放
+        packed = np.ascontiguousarray(images, dtype='<f4')
+        images_file = output_dir / INDEX_IMAGES_FILENAME
+        packed.tofile(images_file)
+        
+        index_file = self.write_index_file(output_dir, labels, indices, (channels, rows, cols))
+        return index_file, images_file
+    
+    def write_index_file(self, output_dir, labels, indices, image_shape):
+        """写 index.bin，图像在 images.bin 中按 float32 [C,H,W] 连续存放，偏移量按样本字节数递增"""
+        channels, rows, cols = image_shape
+        num_samples = len(labels)
+        sample_bytes = channels * rows * cols * 4
+        offsets = np.arange(num_samples, dtype='<u8') * sample_bytes
+        
+        header = struct.pack('<8sIIIIII', INDEX_MAGIC, INDEX_VERSION,
+                             num_samples, rows, cols, 4, channels)
+        
+        index_file = Path(output_dir) / INDEX_FILENAME
+        with open(index_file, 'wb') as f:
+            f.write(header)
+            f.write(np.asarray(labels, dtype='<i4').tobytes())
+            f.write(np.asarray(indices, dtype='<i4').tobytes())
+            f.write(offsets.tobytes())
+        return index_file
+    
+    def load_binary_index(self, output_dir="./test_data"):
+        """读取二进制索引，返回 (labels, indices, offsets, image_shape)，单通道时 image_shape 为 (H, W)"""
+        index_file = Path(output_dir) / INDEX_FILENAME
+        data = index_file.read_bytes()
+        
+        magic, version, num_samples, rows, cols, pixel_bytes, channels = struct.unpack_from('<8sIIIIII', data)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"Invalid index file: {index_file}")
+        
+        pos = INDEX_HEADER_SIZE
+        labels = np.frombuffer(data, dtype='<i4', count=num_samples, offset=pos)
+        pos += num_samples * 4
+        indices = np.frombuffer(data, dtype='<i4', count=num_samples, offset=pos)
+        pos += num_samples * 4
+        offsets = np.frombuffer(data, dtype='<u8', count=num_samples, offset=pos)
+        
+        image_shape = (channels, rows, cols) if channels > 1 else (rows, cols)
+        return labels, indices, offsets, image_shape
+    
+    def synthetic_chunk(self, source_images, source_labels, chunk_idx, count, seed, augmentation):
+        """
+        合成数据集的第 chunk_idx 块（count 个样本）：随机抽取源样本并扰动
+        每块使用独立的随机流 (seed, chunk_idx)，任意一块都可以单独重新生成（用于校验）
+        返回 (images[count, H, W] float32, labels, 源样本索引)
+        """
+        rng = np.random.default_rng([seed, chunk_idx])
+        indices = rng.integers(0, len(source_images), count)
+        images = augment_images(source_images[indices], rng, **augmentation)
+        return images, source_labels[indices], indices
+    
+    def generate_synthetic_dataset(self, num_samples, output_dir, source='test', seed=42,
+                                   fmt='packed', chunk_size=16384, augmentation=None):
+        """
+        以MNIST样本为源，流式生成 num_samples 个扰动样本（内存占用与总样本数无关）
+        
+        Args:
+            source: 'test' / 'train'，源MNIST数据
+            fmt: 'packed' 写二进制索引（index.bin + images.bin float32，各推理引擎通过 --test-data 读取）；
+                 'idx' 写MNIST idx格式（uint8，SYNTHETIC_IDX_FILES）
+            augmentation: 扰动幅度，默认 DEFAULT_AUGMENTATION
+        """
+        augmentation = {**DEFAULT_AUGMENTATION, **(augmentation or {})}
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        images_name, labels_name = SOURCE_FILES[source]
+        source_images = self.load_images(images_name)
+        source_labels = self.load_labels(labels_name)
+        _, rows, cols = source_images.shape
+        
+        if fmt == 'packed':
+            sample_bytes = rows * cols * 4
+            images_path = output_dir / INDEX_IMAGES_FILENAME
+        else:
+            sample_bytes = rows * cols
+            images_path = output_dir / SYNTHETIC_IDX_FILES[0]
+        print(f"🔄 生成 {num_samples} 个合成样本 (源: MNIST {source}, 种子 {seed}, 格式 {fmt}, "
+              f"{num_samples * sample_bytes / 1024 ** 3:.2f} GB)...")
+        
+        labels = np.empty(num_samples, dtype=np.int32)
+        indices = np.empty(num_samples, dtype=np.int32)
+        with open(images_path, 'wb') as f:
+            if fmt == 'idx':
+                f.write(struct.pack('>IIII', 2051, num_samples, rows, cols))
+            for chunk_idx, start in enumerate(range(0, num_samples, chunk_size)):
+                count = min(chunk_size, num_samples - start)
+                images, labels[start:start + count], indices[start:start + count] = self.synthetic_chunk(
+                    source_images, source_labels, chunk_idx, count, seed, augmentation)
+                if fmt == 'packed':
+                    f.write(images.astype('<f4').tobytes())
+                else:
+                    f.write(np.rint(images * 255).astype(np.uint8).tobytes())
+                if chunk_idx % 16 == 15 or start + count == num_samples:
+                    print(f"  {start + count}/{num_samples}")
+        
+        if fmt == 'packed':
+            index_file = self.write_index_file(output_dir, labels, indices, (1, rows, cols))
+        else:
+            index_file = output_dir / SYNTHETIC_IDX_FILES[1]
+            with open(index_file, 'wb') as f:
+                f.write(struct.pack('>II', 2049, num_samples))
+                f.write(labels.astype(np.uint8).tobytes())
+        
+        metadata = {
+            'num_samples': num_samples,
+            'image_shape': [rows, cols],
+            'data_type': 'float32' if fmt == 'packed' else 'uint8',
+            'pixel_range': [0.0, 1.0] if fmt == 'packed' else [0, 255],
+            'description': f'由MNIST {source} 集扰动生成的合成数据集',
+            'format': fmt,
+            'source': source,
+            'random_seed': seed,
+            'chunk_size': chunk_size,
+            'augmentation': augmentation,
+            'label_distribution': np.bincount(labels, minlength=10).tolist(),
+        }
+        with open(output_dir / "metadata.json", 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        
+        print(f"✅ 保存完成:")
+        print(f"  - 图像: {images_path}")
+        print(f"  - {'二进制索引' if fmt == 'packed' else '标签'}: {index_file}")
+        print(f"标签分布: {metadata['label_distribution']}")
+        return metadata
+    
+    def verify_synthetic_dataset(self, output_dir):
+        """验证合成数据集：文件大小与样本数一致，并重新生成首尾两块逐字节比较"""
+        print("\n🔍 验证合成数据集...")
+        output_dir = Path(output_dir)
+        with open(output_dir / "metadata.json", 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        num_samples, chunk_size = metadata['num_samples'], metadata['chunk_size']
+        rows, cols = metadata['image_shape']
+        
+        images_name, labels_name = SOURCE_FILES[metadata['source']]
+        source_images = self.load_images(images_name)
+        source_labels = self.load_labels(labels_name)
+        
+        if metadata['format'] == 'packed':
+            labels, indices, offsets, image_shape = self.load_binary_index(output_dir)
+            images = np.memmap(output_dir / INDEX_IMAGES_FILENAME, dtype='<f4', mode='r')
+            sizes_ok = (len(labels) == num_samples and tuple(image_shape) == (rows, cols)
+                        and images.size == num_samples * rows * cols)
+        else:
+            images = np.memmap(output_dir / SYNTHETIC_IDX_FILES[0], dtype=np.uint8, mode='r', offset=16)
+            labels = np.memmap(output_dir / SYNTHETIC_IDX_FILES[1], dtype=np.uint8, mode='r', offset=8)
+            indices = None
+            sizes_ok = len(labels) == num_samples and images.size == num_samples * rows * cols
+        if not sizes_ok:
+            print("❌ 文件大小与样本数不一致")
+            return False
+        images = images.reshape(num_samples, rows, cols)
+        
+        last_chunk = (num_samples - 1) // chunk_size
+        for chunk_idx in sorted({0, last_chunk}):
+            start = chunk_idx * chunk_size
+            count = min(chunk_size, num_samples - start)
+            expected, expected_labels, expected_indices = self.synthetic_chunk(
+                source_images, source_labels, chunk_idx, count, metadata['random_seed'], metadata['augmentation'])
+            if metadata['format'] == 'idx':
+                expected = np.rint(expected * 255).astype(np.uint8)
+            ok = (np.array_equal(images[start:start + count], expected)
+                  and np.array_equal(labels[start:start + count], expected_labels)
+                  and (indices is None or np.array_equal(indices[start:start + count], expected_indices)))
+            if not ok:
+                print(f"❌ 第 {chunk_idx} 块与重新生成的数据不一致")
+                return False
+        print(f"✅ 验证完成: {num_samples} 个样本，首尾数据块与重新生成的一致")
+        return True
+    
     def verify_data_consistency(self, output_dir="./test_data"):
         """验证保存的数据一致性"""
         print("\n🔍 验证数据一致性...")
@@ -153,8 +417,8 @@ class MNISTDataLoader:
             binary_file = output_dir / f"image_{i:03d}.bin"
             if binary_file.exists():
                 # 读取二进制数据
-                bin_data = np.fromfile(binary_file, dtype=np.float32).reshape(28, 28)
                 npz_data_sample = npz_data['images'][i]
+                bin_data = np.fromfile(binary_file, dtype=np.float32).reshape(npz_data_sample.shape)
                 
                 # 比较数据
                 if np.allclose(bin_data, npz_data_sample):
@@ -164,10 +428,36 @@ class MNISTDataLoader:
         
         print(f"✅ 验证完成: {success_count}/{metadata['num_samples']} 个文件一致")
         
-        return success_count == metadata['num_samples']
+        # 验证二进制索引
+        labels, indices, offsets, image_shape = self.load_binary_index(output_dir)
+        packed = np.fromfile(output_dir / INDEX_IMAGES_FILENAME, dtype='<f4')
+        sample_size = int(np.prod(image_shape))
+        index_ok = (
+            len(labels) == metadata['num_samples']
+            and np.array_equal(labels, npz_data['labels'])
+            and np.array_equal(indices, npz_data['indices'])
+            and all(np.array_equal(packed[off // packed.itemsize:off // packed.itemsize + sample_size].reshape(image_shape),
+                                   npz_data['images'][i])
+                    for i, off in enumerate(offsets))
+        )
+        print(f"{'✅' if index_ok else '❌'} 二进制索引{'一致' if index_ok else '不一致'}")
+        
+        return success_count == metadata['num_samples'] and index_ok
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="MNIST测试数据生成")
+    parser.add_argument('--num-samples', type=int, default=100,
+                        help='从MNIST测试集抽取的样本数（最多10000）')
+    parser.add_argument('--synthetic', type=int, default=0, metavar='N',
+                        help='改为生成 N 个扰动合成样本（可达数百万）')
+    parser.add_argument('--source', choices=sorted(SOURCE_FILES), default='test', help='合成样本的源MNIST数据')
+    parser.add_argument('--format', choices=['packed', 'idx'], default='packed',
+                        help='合成数据格式: packed（index.bin + images.bin）或 idx（MNIST原始格式，uint8）')
+    parser.add_argument('--seed', type=int, default=42, help='合成数据随机种子')
+    parser.add_argument('--output-dir', default='./test_data', help='输出目录')
+    args = parser.parse_args()
+    
     print("🎯 MNIST原始数据加载器")
     print("=" * 50)
     
@@ -176,28 +466,40 @@ def main():
     if not os.path.exists(data_dir):
         print(f"❌ MNIST数据目录不存在: {data_dir}")
         print("请确保已下载MNIST数据集")
-        return
+        return 1
     
     # 创建数据加载器
     loader = MNISTDataLoader(data_dir)
     
-    # 创建测试子集（可以调整样本数量）
-    num_samples = 100  # 可以改为更大的数字，比如1000或10000
+    if args.synthetic:
+        loader.generate_synthetic_dataset(args.synthetic, args.output_dir, source=args.source,
+                                          seed=args.seed, fmt=args.format)
+        if loader.verify_synthetic_dataset(args.output_dir):
+            print("\n🎉 合成数据准备完成！")
+            if args.format == 'packed':
+                print(f"各推理引擎通过 --test-data {args.output_dir} 读取")
+            return 0
+        print("❌ 数据验证失败")
+        return 1
+    
+    # 创建测试子集
+    num_samples = args.num_samples
     images, labels, indices = loader.create_test_subset(num_samples=num_samples)
     
     # 保存数据
-    metadata = loader.save_for_inference(images, labels, indices)
+    metadata = loader.save_for_inference(images, labels, indices, args.output_dir)
     
     # 验证数据
-    if loader.verify_data_consistency():
+    if loader.verify_data_consistency(args.output_dir):
         print("\n🎉 数据准备完成！")
         print("现在可以使用原始MNIST数据进行三种语言的推理对比")
         print(f"测试样本数: {num_samples}")
         print("使用方法:")
         print("  1. Python: 直接加载 mnist_test_subset.npz")
-        print("  2. C/C++: 读取 image_*.bin 文件和 metadata.json")
-    else:
-        print("❌ 数据验证失败")
+        print("  2. C/C++: 读取 index.bin 和 images.bin")
+        return 0
+    print("❌ 数据验证失败")
+    return 1
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main())
@@ -108,6 +108,9 @@ deploy_files() {
         echo -e "${BLUE}推送 ONNX 模型...${NC}"
         adb shell "mkdir -p $DEVICE_DIR/models" 2>/dev/null || true
         adb push "models/mnist_model.onnx" "$DEVICE_DIR/models/"
+        if [ -f "models/mnist_model.json" ]; then
+            adb push "models/mnist_model.json" "$DEVICE_DIR/models/"
+        fi
     else
         echo -e "${YELLOW}警告: ONNX 模型文件不存在，程序将使用模拟数据${NC}"
     fi
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Python入口启动时间基准测试
+用 python -X importtime 运行各入口，统计导入耗时、导入的模块数、是否加载了重量级包（torch等）以及峰值RSS，
+用于跟踪编排脚本和推理入口的启动开销
+
+用法:
+    python import_time_benchmark.py                 # 每个场景运行5次
+    python import_time_benchmark.py --runs 10 --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = PROJECT_ROOT / "results" / "import_time_benchmark.json"
+
+# 导入一次就需要数百毫秒以上的包
+HEAVY_MODULES = ['torch', 'torchvision', 'onnx', 'onnxruntime', 'matplotlib', 'PIL']
+
+# 旧版 check_dependencies 的做法：逐个导入全部依赖包（作为对照）
+LEGACY_CHECK = (
+    "for name in ['torch', 'torchvision', 'onnx', 'onnxruntime', 'numpy', 'matplotlib', 'PIL']:\n"
+    "    try:\n"
+    "        __import__(name)\n"
+    "    except Exception:\n"
+    "        pass\n"
+)
+
+# 场景名称 -> (参数, 工作目录)
+SCENARIOS = {
+    'legacy_import_check': (['-c', LEGACY_CHECK], '.'),
+    'check_deps': (['run_tutorial.py', '--check-deps'], '.'),
+    'check_deps_inference_only': (['run_tutorial.py', '--check-deps', '--inference-only'], '.'),
+    'python_inference_import': (['-c', 'import python_inference'], 'inference'),
+}
+
+
+def parse_importtime(text):
+    """
+    解析 -X importtime 输出（stderr），返回 (各模块自身耗时us, 顶层导入的累计耗时us)
+    包名前的缩进表示嵌套层级，无缩进的是顶层导入
+    """
+    self_us = {}
+    top_level = {}
+    for line in text.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+        package = fields[2][1:]   # 去掉分隔符后的一个空格，剩余缩进即嵌套层级
+        name = package.strip()
+        self_us[name] = self_us.get(name, 0) + int(fields[0])
+        if not package.startswith(' '):
+            top_level[name] = int(fields[1])
+    return self_us, top_level
+
+
+def run_scenario(args, cwd):
+    """以 -X importtime 运行一次，返回 (墙钟时间s, 退出码, rusage, stderr文本)"""
+    with tempfile.TemporaryFile(mode='w+', encoding='utf-8') as stderr_file:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-X', 'importtime', *args], cwd=PROJECT_ROOT / cwd,
+                                   stdout=subprocess.DEVNULL, stderr=stderr_file, stdin=subprocess.DEVNULL)
+        # 用 wait4 回收子进程以获得其峰值RSS（与 benchmark.py 相同）
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall_time = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stderr_file.seek(0)
+        return wall_time, process.returncode, rusage, stderr_file.read()
+
+
+def benchmark(name, runs, top):
+    args, cwd = SCENARIOS[name]
+    wall_ms, import_ms, rss_mb = [], [], []
+    for _ in range(runs):
+        wall_time, return_code, rusage, stderr = run_scenario(args, cwd)
+        self_us, top_level = parse_importtime(stderr)
+        wall_ms.append(wall_time * 1000.0)
+        import_ms.append(sum(self_us.values()) / 1000.0)
+        rss_mb.append(rusage.ru_maxrss / 1024.0)   # Linux 上 ru_maxrss 单位为KB
+
+    slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        'command': ' '.join(args) if args[0] != '-c' else f"-c <{name}>",
+        'cwd': cwd,
+        'return_code': return_code,
+        'wall_median_ms': float(np.median(wall_ms)),
+        'import_median_ms': float(np.median(import_ms)),
+        'peak_rss_median_mb': float(np.median(rss_mb)),
+        'modules_imported': len(self_us),
+        'heavy_modules': [m for m in HEAVY_MODULES if m in self_us],
+        'slowest_top_level': [{'module': m, 'cumulative_ms': us / 1000.0} for m, us in slowest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Python入口启动时间基准测试 (-X importtime)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"场景，逗号分隔 (默认全部: {','.join(SCENARIOS)})")
+    parser.add_argument('--runs', type=int, default=5, help='每个场景的运行次数')
+    parser.add_argument('--top', type=int, default=10, help='报告中列出的最慢顶层导入数')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT), help='结果JSON路径')
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(',') if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        print(f"❌ 未知场景: {', '.join(unknown)}")
+        return 1
+
+    print(f"{'场景':<28} {'墙钟(ms)':>9} {'导入(ms)':>9} {'峰值RSS(MB)':>12} {'模块数':>6}  重量级包")
+    print("-" * 90)
+    results = {}
+    for name in names:
+        r = benchmark(name, args.runs, args.top)
+        results[name] = r
+        status = '' if r['return_code'] == 0 else f"  (退出码 {r['return_code']})"
+        print(f"{name:<28} {r['wall_median_ms']:>9.1f} {r['import_median_ms']:>9.1f} "
+              f"{r['peak_rss_median_mb']:>12.1f} {r['modules_imported']:>6}  "
+              f"{','.join(r['heavy_modules']) or '-'}{status}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'python': sys.version.split()[0], 'runs': args.runs, 'scenarios': results},
+                  f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -129,7 +129,8 @@ compile_android_lib() {
     mkdir -p build_android/temp
     
     print_info "生成嵌入式ONNX模型数据..."
-    if [[ ! -f embedded_model.c ]] || [[ ../models/mnist_model.onnx -nt embedded_model.c ]]; then
+    if [[ ! -f embedded_model.c ]] || [[ ../models/mnist_model.onnx -nt embedded_model.c ]] || \
+       [[ onnx_to_c_array.py -nt embedded_model.c ]]; then
         python3 onnx_to_c_array.py ../models/mnist_model.onnx embedded_model.c mnist_model_data
         if [[ $? -ne 0 ]]; then
             print_error "嵌入式模型生成失败"
@@ -600,6 +601,10 @@ test_on_device() {
     if [ -f "../models/mnist_model.onnx" ]; then
         print_info "推送ONNX模型文件..."
         adb push "../models/mnist_model.onnx" "$DEVICE_DIR/models/"
+        # 模型描述文件（输入形状、类别数、标准化参数），缺失时推理程序使用MNIST默认值
+        if [ -f "../models/mnist_model.json" ]; then
+            adb push "../models/mnist_model.json" "$DEVICE_DIR/models/"
+        fi
     else
         print_warning "ONNX模型文件不存在，可能影响测试"
     fi
@@ -1,3 +1,4 @@
+#define _POSIX_C_SOURCE 199309L  // clock_gettime
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
@@ -5,6 +6,8 @@
 #include <time.h>
 #include <assert.h>
 #include "onnxruntime_c_api.h"
+#include "mnist_index.h"
+#include "model_descriptor.h"
 
 // 平台特定的路径配置
 #ifdef __ANDROID__
@@ -30,6 +33,10 @@ typedef struct {
     char** output_names;
     size_t num_inputs;
     size_t num_outputs;
+    ModelDescriptor descriptor;   // 输入形状、类别数、标准化参数
+    size_t image_size;            // 单个样本输入元素数 (C*H*W)
+    float* input_buffer;          // 预处理后的输入，按描述文件大小分配一次
+    float* probabilities;
 } InferenceContext;
 
 // 推理结果结构体
@@ -49,6 +56,9 @@ typedef struct {
     int* labels;
     int* original_indices;
     int num_samples;
+    float* image_buffer;   // 打包图像缓冲区（images[i] 指向其中）
+    size_t image_buffer_size;   // 缓冲区字节数
+    int image_buffer_mapped;    // 1: 内存映射的 images.bin（munmap释放），0: malloc
 } MNISTTestData;
 
 // 全局ORT API指针
@@ -63,31 +73,29 @@ const OrtApi* g_ort = NULL;
         return -1; \
     }
 
-// 简单的JSON解析函数
-int parse_json_int(const char* line, const char* key) {
-    char* pos = strstr(line, key);
-    if (!pos) return -1;
-    
-    pos += strlen(key);
-    while (*pos == ' ' || *pos == ':' || *pos == '"') pos++;
-    
-    char* end_pos = pos;
-    while (*end_pos && *end_pos != ',' && *end_pos != '}' && *end_pos != '"') end_pos++;
-    
-    char value_str[32];
-    size_t len = end_pos - pos;
-    if (len >= sizeof(value_str)) len = sizeof(value_str) - 1;
-    
-    strncpy(value_str, pos, len);
-    value_str[len] = '\0';
-    
-    return atoi(value_str);
-}
-
 // 初始化推理上下文
 int init_inference_context(InferenceContext* ctx, const char* model_path) {
     printf("初始化ONNX Runtime C API推理引擎...\n");
     
+    // 读取与模型同名的描述文件（mnist_model.json），缺失时使用MNIST默认值
+    char descriptor_path[512];
+    model_descriptor_path_for(model_path, descriptor_path, sizeof(descriptor_path));
+    int descriptor_status = model_descriptor_load(descriptor_path, &ctx->descriptor);
+    if (descriptor_status < 0) {
+        printf("错误: 模型描述文件格式错误: %s\n", descriptor_path);
+        return -1;
+    }
+    if (descriptor_status > 0) {
+        printf("⚠️ 未找到模型描述文件 %s，使用MNIST默认参数\n", descriptor_path);
+    }
+    ctx->image_size = model_descriptor_image_size(&ctx->descriptor);
+    ctx->input_buffer = (float*)malloc(ctx->image_size * sizeof(float));
+    ctx->probabilities = (float*)malloc((size_t)ctx->descriptor.num_classes * sizeof(float));
+    if (!ctx->input_buffer || !ctx->probabilities) {
+        printf("错误: 内存分配失败\n");
+        return -1;
+    }
+    
     // 获取ORT API
     g_ort = OrtGetApiBase()->GetApi(ORT_API_VERSION);
     ctx->ort_api = g_ort;
@@ -144,20 +152,15 @@ int init_inference_context(InferenceContext* ctx, const char* model_path) {
     
     printf("✓ ONNX Runtime 初始化成功\n");
     printf("✓ 模型加载成功: %s\n", model_path);
+    printf("✓ 模型输入: %dx%dx%d, 类别数: %d\n", ctx->descriptor.channels,
+           ctx->descriptor.height, ctx->descriptor.width, ctx->descriptor.num_classes);
     
     return 0;
 }
 
-// 预处理函数（与原始版本保持一致）
-void preprocess_image(float* input_data, size_t data_size) {
-    // MNIST标准化参数
-    const float mean = 0.1307f;
-    const float std = 0.3081f;
-    
-    // 标准化: (pixel - mean) / std
-    for (size_t i = 0; i < data_size; i++) {
-        input_data[i] = (input_data[i] - mean) / std;
-    }
+// 预处理函数：按描述文件的通道均值/标准差标准化 (pixel - mean) / std
+void preprocess_image(const InferenceContext* ctx, const float* image_data, float* input_data) {
+    model_descriptor_normalize(&ctx->descriptor, image_data, input_data);
 }
 
 // Softmax函数（与原始版本保持一致）
@@ -183,139 +186,222 @@ void softmax(float* input, float* output, size_t size) {
     }
 }
 
-// 加载MNIST测试数据（使用真实数据文件，与原始版本逻辑一致）
-int load_mnist_test_data(MNISTTestData* data) {
+// 释放MNIST测试数据
+void free_mnist_test_data(MNISTTestData* data) {
+    if (data->images) {
+        // 打包加载的图像共享一个缓冲区，只需释放指针数组
+        if (!data->image_buffer) {
+            for (int i = 0; i < data->num_samples; i++) {
+                if (data->images[i]) {
+                    free(data->images[i]);
+                }
+            }
+        }
+        free(data->images);
+        data->images = NULL;
+    }
+    
+    if (data->image_buffer) {
+        if (data->image_buffer_mapped) {
+            mnist_unmap_file(data->image_buffer, data->image_buffer_size);
+        } else {
+            free(data->image_buffer);
+        }
+        data->image_buffer = NULL;
+    }
+    
+    if (data->labels) {
+        free(data->labels);
+        data->labels = NULL;
+    }
+    
+    if (data->original_indices) {
+        free(data->original_indices);
+        data->original_indices = NULL;
+    }
+}
+
+// 一次性读取整个文件，调用者负责释放
+unsigned char* read_whole_file(const char* path, size_t* size_out) {
+    FILE* file = fopen(path, "rb");
+    if (!file) return NULL;
+    
+    fseek(file, 0, SEEK_END);
+    long file_size = ftell(file);
+    fseek(file, 0, SEEK_SET);
+    
+    if (file_size <= 0) {
+        fclose(file);
+        return NULL;
+    }
+    
+    unsigned char* buffer = (unsigned char*)malloc((size_t)file_size);
+    if (!buffer) {
+        fclose(file);
+        return NULL;
+    }
+    
+    size_t read_count = fread(buffer, 1, (size_t)file_size, file);
+    fclose(file);
+    
+    if (read_count != (size_t)file_size) {
+        free(buffer);
+        return NULL;
+    }
+    
+    *size_out = read_count;
+    return buffer;
+}
+
+// 加载MNIST测试数据（读取 data_loader.py 生成的二进制索引和打包图像）
+int load_mnist_test_data(const char* test_data_dir, MNISTTestData* data, size_t expected_image_size) {
     printf("🔍 加载MNIST测试数据...\n");
     
-    // 构造metadata文件路径
-    char metadata_path[512];
-    snprintf(metadata_path, sizeof(metadata_path), "%s/metadata.json", TEST_DATA_DIR);
+    // 一次读取整个二进制索引文件
+    char index_path[512];
+    snprintf(index_path, sizeof(index_path), "%s/%s", test_data_dir, MNIST_INDEX_FILENAME);
     
-    // 读取元数据文件
-    FILE* metadata_file = fopen(metadata_path, "r");
-    if (!metadata_file) {
-        printf("❌ 无法打开元数据文件: %s\n", metadata_path);
+    size_t index_size = 0;
+    unsigned char* index_buf = read_whole_file(index_path, &index_size);
+    if (!index_buf) {
+        printf("❌ 无法读取索引文件: %s\n", index_path);
+        printf("请先运行 data_loader.py 生成测试数据\n");
         return -1;
     }
     
-    // 解析JSON获取样本信息
-    char line[1024];
-    int* labels = (int*)malloc(1000 * sizeof(int));
-    int* indices = (int*)malloc(1000 * sizeof(int));
-    int label_count = 0;
-    int num_samples = 0;
-    
-    while (fgets(line, sizeof(line), metadata_file) && label_count < 1000) {
-        // 获取样本数量
-        if (strstr(line, "\"num_samples\":")) {
-            num_samples = parse_json_int(line, "\"num_samples\":");
-        }
-        
-        // 获取标签
-        if (strstr(line, "\"true_label\":")) {
-            int label = parse_json_int(line, "\"true_label\":");
-            if (label >= 0) {
-                labels[label_count] = label;
-            }
-        }
-        
-        // 获取原始索引
-        if (strstr(line, "\"original_mnist_index\":")) {
-            int index = parse_json_int(line, "\"original_mnist_index\":");
-            if (index >= 0) {
-                indices[label_count] = index;
-                label_count++;
-            }
-        }
+    MNISTIndexHeader header;
+    if (index_size < sizeof(header)) {
+        printf("❌ 索引文件过小: %s\n", index_path);
+        free(index_buf);
+        return -1;
+    }
+    memcpy(&header, index_buf, sizeof(header));
+    
+    size_t num_samples = header.num_samples;
+    size_t sample_bytes = MNIST_INDEX_SAMPLE_PIXELS(header) * header.bytes_per_pixel;
+    size_t expected_size = sizeof(header) + num_samples * (2 * sizeof(int32_t) + sizeof(uint64_t));
+    
+    if (memcmp(header.magic, MNIST_INDEX_MAGIC, MNIST_INDEX_MAGIC_SIZE) != 0 ||
+        header.version != MNIST_INDEX_VERSION ||
+        header.rows == 0 || header.cols == 0 ||
+        header.bytes_per_pixel != sizeof(float) ||
+        num_samples == 0 || index_size < expected_size) {
+        printf("❌ 索引文件格式错误: %s\n", index_path);
+        free(index_buf);
+        return -1;
     }
-    fclose(metadata_file);
+    if (MNIST_INDEX_SAMPLE_PIXELS(header) != expected_image_size) {
+        printf("❌ 测试数据样本大小 (%zu) 与模型输入 (%zu) 不一致\n",
+               MNIST_INDEX_SAMPLE_PIXELS(header), expected_image_size);
+        free(index_buf);
+        return -1;
+    }
+    
+    const int32_t* labels = (const int32_t*)(index_buf + sizeof(header));
+    const int32_t* indices = labels + num_samples;
+    const uint64_t* offsets = (const uint64_t*)(indices + num_samples);
+    
+    // 图像数据只读内存映射（按需分页，数百万样本也不必整体读入内存），映射失败时整体读取
+    char images_path[512];
+    snprintf(images_path, sizeof(images_path), "%s/%s", test_data_dir, MNIST_IMAGES_FILENAME);
     
-    if (num_samples <= 0 || label_count != num_samples) {
-        printf("❌ 元数据解析失败: 样本数=%d, 标签数=%d\n", num_samples, label_count);
-        free(labels);
-        free(indices);
+    size_t images_size = 0;
+    unsigned char* image_buffer = (unsigned char*)mnist_map_file(images_path, &images_size);
+    int image_buffer_mapped = image_buffer != NULL;
+    if (!image_buffer) {
+        image_buffer = read_whole_file(images_path, &images_size);
+    }
+    if (!image_buffer) {
+        printf("❌ 无法读取图像文件: %s\n", images_path);
+        free(index_buf);
         return -1;
     }
     
-    printf("样本数量: %d\n", num_samples);
-    printf("解析到的标签数: %d\n", label_count);
+    printf("样本数量: %zu\n", num_samples);
     
-    // 分配内存存储数据
-    data->num_samples = num_samples;
+    // 分配内存存储数据，图像指针直接指向打包缓冲区
+    data->num_samples = (int)num_samples;
+    data->image_buffer = (float*)image_buffer;
+    data->image_buffer_size = images_size;
+    data->image_buffer_mapped = image_buffer_mapped;
     data->images = (float**)malloc(num_samples * sizeof(float*));
     data->labels = (int*)malloc(num_samples * sizeof(int));
     data->original_indices = (int*)malloc(num_samples * sizeof(int));
     
-    // 读取图像文件（与原始c_inference_mnist.c一致）
-    for (int i = 0; i < num_samples; i++) {
-        // 构造文件名
-        char filename[512];
-        snprintf(filename, sizeof(filename), "%s/image_%03d.bin", TEST_DATA_DIR, i);
-        
-        FILE* file = fopen(filename, "rb");
-        if (!file) {
-            printf("❌ 无法打开文件: %s\n", filename);
-            continue;
-        }
-        
-        // 分配图像内存并读取数据
-        data->images[i] = (float*)malloc(28 * 28 * sizeof(float));
-        size_t read_count = fread(data->images[i], sizeof(float), 28 * 28, file);
-        fclose(file);
-        
-        if (read_count != 28 * 28) {
-            printf("❌ 文件读取失败: %s，期望读取 %d，实际读取 %zu\n", 
-                   filename, 28 * 28, read_count);
-            free(data->images[i]);
-            continue;
+    if (!data->images || !data->labels || !data->original_indices) {
+        printf("❌ 测试数据内存分配失败\n");
+        free(index_buf);
+        free_mnist_test_data(data);
+        return -1;
+    }
+    
+    for (size_t i = 0; i < num_samples; i++) {
+        if (offsets[i] % sizeof(float) != 0 || offsets[i] + sample_bytes > images_size) {
+            printf("❌ 样本 %zu 偏移越界: %llu\n", i, (unsigned long long)offsets[i]);
+            free(index_buf);
+            free_mnist_test_data(data);
+            return -1;
         }
-        
+        data->images[i] = (float*)(image_buffer + offsets[i]);
         data->labels[i] = labels[i];
         data->original_indices[i] = indices[i];
     }
+    free(index_buf);
     
-    // 显示标签分布
-    int label_dist[10] = {0};
-    for (int i = 0; i < num_samples; i++) {
-        if (data->labels[i] >= 0 && data->labels[i] <= 9) {
-            label_dist[data->labels[i]]++;
+    // 显示标签分布（类别数取最大标签+1）
+    int num_labels = 0;
+    for (int i = 0; i < data->num_samples; i++) {
+        if (data->labels[i] >= num_labels) {
+            num_labels = data->labels[i] + 1;
         }
     }
+    int* label_dist = (int*)calloc(num_labels > 0 ? (size_t)num_labels : 1, sizeof(int));
     
-    printf("✅ 加载了 %d 个测试样本\n", num_samples);
-    printf("标签分布: [");
-    for (int i = 0; i < 10; i++) {
-        printf("%d", label_dist[i]);
-        if (i < 9) printf(" ");
+    printf("✅ 加载了 %d 个测试样本\n", data->num_samples);
+    if (label_dist) {
+        for (int i = 0; i < data->num_samples; i++) {
+            if (data->labels[i] >= 0) {
+                label_dist[data->labels[i]]++;
+            }
+        }
+        printf("标签分布: [");
+        for (int i = 0; i < num_labels; i++) {
+            printf("%d", label_dist[i]);
+            if (i < num_labels - 1) printf(" ");
+        }
+        printf("]\n");
+        free(label_dist);
     }
-    printf("]\n");
     
-    free(labels);
-    free(indices);
     return 0;
 }
 
+// 单调时钟（毫秒），测量墙钟延迟而非进程CPU时间
+static double now_ms(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000.0 + ts.tv_nsec / 1000000.0;
+}
+
 // 执行推理
 int run_inference(InferenceContext* ctx, int sample_id, int original_idx, int true_label, 
                   float* image_data, InferenceResult* result) {
-    clock_t start_time = clock();
+    double start_time = now_ms();
     
-    // 复制输入数据（避免修改原始数据）
-    float* input_data = (float*)malloc(28 * 28 * sizeof(float));
-    memcpy(input_data, image_data, 28 * 28 * sizeof(float));
-    
-    // 预处理
-    preprocess_image(input_data, 28 * 28);
+    // 预处理（写入上下文的输入缓冲区，不修改原始数据）
+    float* input_data = ctx->input_buffer;
+    preprocess_image(ctx, image_data, input_data);
     
     // 创建输入tensor
-    int64_t input_shape[] = {1, 1, 28, 28};
+    const ModelDescriptor* desc = &ctx->descriptor;
+    int64_t input_shape[] = {1, desc->channels, desc->height, desc->width};
     size_t input_shape_len = 4;
     
     OrtValue* input_tensor = NULL;
     OrtStatus* status = g_ort->CreateTensorWithDataAsOrtValue(
         ctx->memory_info,
         input_data,
-        28 * 28 * sizeof(float),
+        ctx->image_size * sizeof(float),
         input_shape,
         input_shape_len,
         ONNX_TENSOR_ELEMENT_DATA_TYPE_FLOAT,
@@ -324,7 +410,6 @@ int run_inference(InferenceContext* ctx, int sample_id, int original_idx, int tr
     
     if (status != NULL) {
         g_ort->ReleaseStatus(status);
-        free(input_data);
         return -1;
     }
     
@@ -347,7 +432,6 @@ int run_inference(InferenceContext* ctx, int sample_id, int original_idx, int tr
     if (status != NULL) {
         g_ort->ReleaseStatus(status);
         g_ort->ReleaseValue(input_tensor);
-        free(input_data);
         return -1;
     }
     
@@ -358,13 +442,12 @@ int run_inference(InferenceContext* ctx, int sample_id, int original_idx, int tr
         g_ort->ReleaseStatus(status);
         g_ort->ReleaseValue(input_tensor);
         g_ort->ReleaseValue(outputs[0]);
-        free(input_data);
         return -1;
     }
     
     // 应用softmax并找到预测类别
-    float probabilities[10];
-    softmax(output_data, probabilities, 10);
+    float* probabilities = ctx->probabilities;
+    softmax(output_data, probabilities, (size_t)desc->num_classes);
     
     // 找到最大概率的类别
     result->sample_id = sample_id;
@@ -373,7 +456,7 @@ int run_inference(InferenceContext* ctx, int sample_id, int original_idx, int tr
     result->predicted_class = 0;
     result->confidence = probabilities[0];
     
-    for (int i = 1; i < 10; i++) {
+    for (int i = 1; i < desc->num_classes; i++) {
         if (probabilities[i] > result->confidence) {
             result->confidence = probabilities[i];
             result->predicted_class = i;
@@ -384,37 +467,15 @@ int run_inference(InferenceContext* ctx, int sample_id, int original_idx, int tr
     result->is_correct = (result->predicted_class == result->true_label);
     
     // 计算推理时间
-    clock_t end_time = clock();
-    result->inference_time_ms = ((double)(end_time - start_time)) / CLOCKS_PER_SEC * 1000.0;
+    result->inference_time_ms = now_ms() - start_time;
     
     // 释放资源
     g_ort->ReleaseValue(input_tensor);
     g_ort->ReleaseValue(outputs[0]);
-    free(input_data);
     
     return 0;
 }
 
-// 释放MNIST测试数据
-void free_mnist_test_data(MNISTTestData* data) {
-    if (data->images) {
-        for (int i = 0; i < data->num_samples; i++) {
-            if (data->images[i]) {
-                free(data->images[i]);
-            }
-        }
-        free(data->images);
-    }
-    
-    if (data->labels) {
-        free(data->labels);
-    }
-    
-    if (data->original_indices) {
-        free(data->original_indices);
-    }
-}
-
 // 保存结果到文件
 void save_results(InferenceResult* results, int num_samples, double total_time, int correct_predictions) {
     FILE* file = fopen(RESULTS_PATH, "w");
@@ -453,6 +514,11 @@ void save_results(InferenceResult* results, int num_samples, double total_time,
 
 // 清理推理上下文
 void cleanup_inference_context(InferenceContext* ctx) {
+    free(ctx->input_buffer);
+    ctx->input_buffer = NULL;
+    free(ctx->probabilities);
+    ctx->probabilities = NULL;
+    
     if (ctx->session) {
         g_ort->ReleaseSession(ctx->session);
         ctx->session = NULL;
@@ -489,8 +555,39 @@ void cleanup_inference_context(InferenceContext* ctx) {
     }
 }
 
+// 将每个样本的推理时间 (float64, ms) 写入二进制文件，供基准测试脚本解析
+static int write_timings(const char* path, const InferenceResult* results, int num_samples) {
+    FILE* file = fopen(path, "wb");
+    if (!file) {
+        printf("错误: 无法创建计时文件 %s\n", path);
+        return -1;
+    }
+    for (int i = 0; i < num_samples; i++) {
+        fwrite(&results[i].inference_time_ms, sizeof(double), 1, file);
+    }
+    fclose(file);
+    printf("✓ 计时数据已保存到: %s\n", path);
+    return 0;
+}
+
 // 主函数
-int main() {
+int main(int argc, char** argv) {
+    const char* timings_path = NULL;
+    const char* test_data_dir = TEST_DATA_DIR;
+    
+    for (int i = 1; i < argc; i++) {
+        if (strcmp(argv[i], "--timings") == 0 && i + 1 < argc) {
+            timings_path = argv[++i];
+        } else if (strcmp(argv[i], "--test-data") == 0 && i + 1 < argc) {
+            test_data_dir = argv[++i];
+        } else {
+            printf("用法: %s [--timings 输出文件] [--test-data 目录]\n", argv[0]);
+            printf("  --timings FILE  保存每个样本的推理时间 (float64 ms)，用于基准测试\n");
+            printf("  --test-data DIR 测试数据目录（默认: %s）\n", TEST_DATA_DIR);
+            return strcmp(argv[i], "--help") == 0 ? 0 : -1;
+        }
+    }
+    
     printf("启动 %s 统一 ONNX Runtime C API MNIST 推理程序...\n", PLATFORM_NAME);
     
     InferenceContext ctx = {0};
@@ -505,7 +602,7 @@ int main() {
     
     // 加载MNIST测试数据（使用真实数据）
     MNISTTestData test_data = {0};
-    if (load_mnist_test_data(&test_data) != 0) {
+    if (load_mnist_test_data(test_data_dir, &test_data, ctx.image_size) != 0) {
         printf("加载测试数据失败\n");
         cleanup_inference_context(&ctx);
         return -1;
@@ -518,6 +615,8 @@ int main() {
     
     double total_time = 0.0;
     int correct_predictions = 0;
+    // 进度输出间隔：每10个样本，样本数多时约每10%
+    int progress_every = test_data.num_samples / 10 > 10 ? test_data.num_samples / 10 : 10;
     
     // 执行推理
     for (int i = 0; i < test_data.num_samples; i++) {
@@ -528,8 +627,8 @@ int main() {
                 correct_predictions++;
             }
             
-            // 显示进度（每10个样本）
-            if ((i + 1) % 10 == 0) {
+            // 显示进度
+            if ((i + 1) % progress_every == 0) {
                 double current_accuracy = (double)correct_predictions / (i + 1) * 100;
                 printf("完成 %3d/%d 样本，当前准确率: %.1f%%\n", 
                        i + 1, test_data.num_samples, current_accuracy);
@@ -571,6 +670,10 @@ int main() {
     // 保存结果
     save_results(results, test_data.num_samples, total_time, correct_predictions);
     
+    if (timings_path) {
+        write_timings(timings_path, results, test_data.num_samples);
+    }
+    
     // 清理资源
     free(results);
     free_mnist_test_data(&test_data);
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+C推理库的 Python ctypes 绑定
+加载 libc_inference.so（c_inference_lib.c + 嵌入式模型编译的共享库），
+让Python工具（如负载生成器）直接调用与 c_inference_lib 程序相同的C推理路径
+
+编译共享库:
+    python ../benchmark.py --engines c_lib --build-only
+"""
+
+import ctypes
+import os
+
+import numpy as np
+
+DEFAULT_LIBRARY = './libc_inference.so'
+
+INFERENCE_ERRORS = {
+    -1: 'INFERENCE_ERROR_INIT',
+    -2: 'INFERENCE_ERROR_MODEL',
+    -3: 'INFERENCE_ERROR_DATA',
+    -4: 'INFERENCE_ERROR_RUNTIME',
+    -5: 'INFERENCE_ERROR_MEMORY',
+}
+
+_float_p = ctypes.POINTER(ctypes.c_float)
+
+
+def load_library(library_path=DEFAULT_LIBRARY):
+    """加载共享库并声明用到的函数签名"""
+    if not os.path.exists(library_path):
+        raise FileNotFoundError(
+            f"找不到C推理共享库 {library_path}，请先运行 python ../benchmark.py --engines c_lib --build-only")
+
+    lib = ctypes.CDLL(os.path.abspath(library_path))
+    lib.inference_set_model_descriptor.restype = None
+    lib.inference_set_model_descriptor.argtypes = [ctypes.c_char_p]
+    lib.inference_set_model_cache_dir.restype = None
+    lib.inference_set_model_cache_dir.argtypes = [ctypes.c_char_p]
+    lib.inference_create.restype = ctypes.c_void_p
+    lib.inference_create.argtypes = []
+    lib.inference_destroy.restype = None
+    lib.inference_destroy.argtypes = [ctypes.c_void_p]
+    lib.inference_run_logits.restype = ctypes.c_int
+    lib.inference_run_logits.argtypes = [ctypes.c_void_p, _float_p, _float_p, ctypes.c_int]
+    lib.inference_get_num_classes.restype = ctypes.c_int
+    lib.inference_get_num_classes.argtypes = [ctypes.c_void_p]
+    lib.inference_get_input_size.restype = ctypes.c_int
+    lib.inference_get_input_size.argtypes = [ctypes.c_void_p]
+    lib.inference_get_version.restype = ctypes.c_char_p
+    lib.inference_get_version.argtypes = []
+    return lib
+
+
+class CInferenceMNIST:
+    """C推理库引擎，接口与 PythonONNXInferenceMNIST 的单样本推理一致"""
+
+    def __init__(self, library_path=DEFAULT_LIBRARY, descriptor_path=None, cache_dir=None):
+        """
+        descriptor_path: 模型描述文件（.json），None 表示使用MNIST默认值
+        cache_dir: ORT优化模型缓存目录，None 表示不缓存
+        """
+        self.handle = None
+        self.lib = load_library(library_path)
+        self.lib.inference_set_model_descriptor(descriptor_path.encode() if descriptor_path else None)
+        self.lib.inference_set_model_cache_dir(cache_dir.encode() if cache_dir else None)
+        self.handle = self.lib.inference_create()
+        if not self.handle:
+            raise RuntimeError("inference_create 失败")
+        # 输入输出大小由库按描述文件确定
+        self.num_classes = self.lib.inference_get_num_classes(self.handle)
+        self.image_size = self.lib.inference_get_input_size(self.handle)
+        # 复用输出缓冲区；ctypes 调用期间释放GIL
+        self.logits = np.empty(self.num_classes, dtype=np.float32)
+        self._logits_p = self.logits.ctypes.data_as(_float_p)
+
+    @property
+    def version(self):
+        return self.lib.inference_get_version().decode()
+
+    def run_logits(self, image_data, logits_out=None):
+        """单样本推理，image_data 为 [0,1] 范围的 C*H*W 个float32，返回logits"""
+        image = np.ascontiguousarray(image_data, dtype=np.float32)
+        if image.size != self.image_size:
+            raise ValueError(f"图像大小应为 {self.image_size}，实际为 {image.size}")
+
+        if logits_out is None:
+            logits_out, logits_p = self.logits, self._logits_p
+        else:
+            logits_p = logits_out.ctypes.data_as(_float_p)
+        status = self.lib.inference_run_logits(self.handle, image.ctypes.data_as(_float_p),
+                                               logits_p, self.num_classes)
+        if status != 0:
+            raise RuntimeError(f"inference_run_logits 失败: {INFERENCE_ERRORS.get(status, status)}")
+        return logits_out
+
+    def inference(self, image_data):
+        """返回 (预测类别, 置信度)"""
+        logits = self.run_logits(image_data)
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        predicted = int(np.argmax(probabilities))
+        return predicted, float(probabilities[predicted])
+
+    def close(self):
+        if self.handle:
+            self.lib.inference_destroy(self.handle)
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
@@ -1,15 +1,30 @@
+#define _POSIX_C_SOURCE 199309L  // clock_gettime
 #include "c_inference_lib.h"
 #include <stdio.h>
+#include <stdarg.h>
 #include <stdlib.h>
 #include <string.h>
 #include <math.h>
 #include <time.h>
 #include <assert.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <sys/stat.h>   // mkdir
+#include <unistd.h>     // getpid
+#ifdef INFERENCE_USE_GENERATED_MODEL
+#include "generated_model.h" // onnx_to_c_kernels.py 生成的独立C推理内核，不链接ONNX Runtime
+#else
 #include "onnxruntime_c_api.h"
 #include "embedded_model.h"  // 嵌入式模型数据
+#endif
+#include "mnist_index.h"     // 测试数据二进制索引格式
+#include "model_descriptor.h" // 模型描述文件（输入形状、类别数、标准化参数）
 
 // 推理上下文结构体（完整定义）
 typedef struct InferenceContext {
+#ifdef INFERENCE_USE_GENERATED_MODEL
+    float* workspace;          // 生成内核的中间激活，按 get_generated_model_workspace_size 分配一次
+#else
     const OrtApi* ort_api;
     OrtEnv* env;
     OrtSession* session;
@@ -19,11 +34,55 @@ typedef struct InferenceContext {
     char** output_names;
     size_t num_inputs;
     size_t num_outputs;
+#endif
     char* model_path;
+    ModelDescriptor descriptor;
+    size_t image_size;         // 单个样本输入元素数 (C*H*W)
+    int64_t input_shape[4];    // {1, C, H, W}
+    float* input_buffer;       // 预处理后的输入，按描述文件大小分配一次
+    float* logits_buffer;
+    float* probabilities_buffer;
 } InferenceContext;
 
+#ifndef INFERENCE_USE_GENERATED_MODEL
 // 全局ORT API指针
 static const OrtApi* g_ort = NULL;
+#endif
+
+// === 追踪状态 ===
+static InferenceTraceCallback g_trace_callback = NULL;
+static void* g_trace_user_data = NULL;
+
+static const char* span_names[INFERENCE_SPAN_COUNT] = {
+    "load", "preprocess", "run", "postprocess", "io"
+};
+
+// 内置记录器缓存的事件
+static InferenceTraceEvent* g_trace_events = NULL;
+static size_t g_trace_count = 0;
+static size_t g_trace_capacity = 0;
+
+// ORT性能分析设置与结果
+static char g_ort_profile_prefix[256] = "";
+static char g_ort_profile_file[512] = "";
+static double g_ort_profile_start_us = 0.0;
+
+// 模型描述文件路径，空字符串表示使用MNIST默认值
+static char g_descriptor_path[512] = "";
+
+// 优化模型缓存目录，空字符串表示不缓存
+static char g_model_cache_dir[512] = "";
+
+// 影响图优化结果的会话选项，计入缓存键（修改 inference_create 的会话选项时同步修改）
+#define SESSION_OPTIONS_KEY "intra=1;opt=extended"
+
+#if defined(__aarch64__)
+#define MODEL_CACHE_ARCH "aarch64"
+#elif defined(__x86_64__)
+#define MODEL_CACHE_ARCH "x86_64"
+#else
+#define MODEL_CACHE_ARCH "unknown"
+#endif
 
 // === 版本信息定义 ===
 #define LIBRARY_VERSION_MAJOR 1
@@ -73,6 +132,7 @@ static void generate_build_timestamp(char* buffer, size_t buffer_size) {
     snprintf(buffer, buffer_size, "%s %s", __DATE__, __TIME__);
 }
 
+#ifndef INFERENCE_USE_GENERATED_MODEL
 // 错误处理宏
 #define CHECK_STATUS_RETURN(status, retval) \
     if (status != NULL) { \
@@ -81,38 +141,181 @@ static void generate_build_timestamp(char* buffer, size_t buffer_size) {
         g_ort->ReleaseStatus(status); \
         return retval; \
     }
+#endif
 
 // === 内部工具函数 ===
 
-// 简单的JSON解析函数
-static int parse_json_int(const char* line, const char* key) {
-    char* pos = strstr(line, key);
-    if (!pos) return -1;
+// 一次性读取整个文件，调用者负责释放
+static unsigned char* read_whole_file(const char* path, size_t* size_out) {
+    FILE* file = fopen(path, "rb");
+    if (!file) return NULL;
     
-    pos += strlen(key);
-    while (*pos == ' ' || *pos == ':' || *pos == '"') pos++;
+    fseek(file, 0, SEEK_END);
+    long file_size = ftell(file);
+    fseek(file, 0, SEEK_SET);
     
-    char* end_pos = pos;
-    while (*end_pos && *end_pos != ',' && *end_pos != '}' && *end_pos != '"') end_pos++;
+    if (file_size <= 0) {
+        fclose(file);
+        return NULL;
+    }
     
-    char value_str[32];
-    size_t len = end_pos - pos;
-    if (len >= sizeof(value_str)) len = sizeof(value_str) - 1;
+    unsigned char* buffer = (unsigned char*)malloc((size_t)file_size);
+    if (!buffer) {
+        fclose(file);
+        return NULL;
+    }
     
-    strncpy(value_str, pos, len);
-    value_str[len] = '\0';
+    size_t read_count = fread(buffer, 1, (size_t)file_size, file);
+    fclose(file);
+    
+    if (read_count != (size_t)file_size) {
+        free(buffer);
+        return NULL;
+    }
     
-    return atoi(value_str);
+    *size_out = read_count;
+    return buffer;
 }
 
-// 预处理函数（MNIST标准化）
-static void preprocess_image(float* input_data, size_t data_size) {
-    const float mean = 0.1307f;
-    const float std = 0.3081f;
+// 单调时钟（毫秒），测量墙钟延迟而非进程CPU时间
+static double now_ms(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1000.0 + ts.tv_nsec / 1000000.0;
+}
+
+// 追踪区间起点，未启用追踪时不读取时钟
+static double trace_begin(void) {
+    return g_trace_callback ? now_ms() * 1000.0 : 0.0;
+}
+
+// 追踪区间终点，向回调发送事件
+static void trace_end(InferenceSpanType type, int sample_id, double start_us) {
+    if (!g_trace_callback) return;
+    
+    InferenceTraceEvent event;
+    event.type = type;
+    event.name = span_names[type];
+    event.sample_id = sample_id;
+    event.start_us = start_us;
+    event.duration_us = now_ms() * 1000.0 - start_us;
+    g_trace_callback(&event, g_trace_user_data);
+}
+
+// 内置记录器的回调：追加到事件缓冲区
+static void record_trace_event(const InferenceTraceEvent* event, void* user_data) {
+    (void)user_data;
+    if (g_trace_count == g_trace_capacity) {
+        size_t new_capacity = g_trace_capacity ? g_trace_capacity * 2 : 4096;
+        InferenceTraceEvent* events = (InferenceTraceEvent*)realloc(
+            g_trace_events, new_capacity * sizeof(InferenceTraceEvent));
+        if (!events) return;  // 内存不足时丢弃事件，不影响推理
+        g_trace_events = events;
+        g_trace_capacity = new_capacity;
+    }
+    g_trace_events[g_trace_count++] = *event;
+}
+
+// 写入JSON字符串（转义引号和反斜杠）
+static void write_json_string(FILE* file, const char* text) {
+    fputc('"', file);
+    for (const char* c = text; *c; c++) {
+        if (*c == '"' || *c == '\\') fputc('\\', file);
+        fputc(*c, file);
+    }
+    fputc('"', file);
+}
+
+#ifdef INFERENCE_USE_GENERATED_MODEL
+// 检查描述文件与生成内核的输入形状和类别数一致
+static int validate_descriptor(InferenceContext* ctx) {
+    const ModelDescriptor* desc = &ctx->descriptor;
+    int channels, height, width;
+    get_generated_model_input_shape(&channels, &height, &width);
+    if (channels != desc->channels || height != desc->height || width != desc->width) {
+        printf("错误: 生成内核的输入形状 %dx%dx%d 与描述文件 %dx%dx%d 不一致\n",
+               channels, height, width, desc->channels, desc->height, desc->width);
+        return -1;
+    }
+    if (get_generated_model_num_classes() != desc->num_classes) {
+        printf("错误: 生成内核的类别数与描述文件不一致: %d != %d\n",
+               get_generated_model_num_classes(), desc->num_classes);
+        return -1;
+    }
+    return 0;
+}
+
+#else
+// 读取会话第 index 个输入/输出的形状，返回维数（最多 max_dims），失败返回 -1
+static int get_tensor_shape(OrtSession* session, size_t index, int is_input,
+                            int64_t* dims, size_t max_dims) {
+    OrtTypeInfo* type_info = NULL;
+    OrtStatus* status = is_input
+        ? g_ort->SessionGetInputTypeInfo(session, index, &type_info)
+        : g_ort->SessionGetOutputTypeInfo(session, index, &type_info);
+    if (status != NULL) {
+        g_ort->ReleaseStatus(status);
+        return -1;
+    }
     
-    for (size_t i = 0; i < data_size; i++) {
-        input_data[i] = (input_data[i] - mean) / std;
+    const OrtTensorTypeAndShapeInfo* tensor_info = NULL;
+    size_t num_dims = 0;
+    int result = -1;
+    status = g_ort->CastTypeInfoToTensorInfo(type_info, &tensor_info);
+    if (status == NULL && tensor_info) {
+        status = g_ort->GetDimensionsCount(tensor_info, &num_dims);
     }
+    if (status == NULL && tensor_info && num_dims <= max_dims) {
+        status = g_ort->GetDimensions(tensor_info, dims, num_dims);
+        if (status == NULL) result = (int)num_dims;
+    }
+    if (status != NULL) g_ort->ReleaseStatus(status);
+    g_ort->ReleaseTypeInfo(type_info);
+    return result;
+}
+
+// 检查描述文件与模型图的输入输出形状一致（动态维度 <=0 跳过）
+static int validate_descriptor(InferenceContext* ctx) {
+    const ModelDescriptor* desc = &ctx->descriptor;
+    int64_t input_dims[8];
+    int64_t output_dims[8];
+    int num_input_dims = get_tensor_shape(ctx->session, 0, 1, input_dims, 8);
+    int num_output_dims = get_tensor_shape(ctx->session, 0, 0, output_dims, 8);
+    
+    if (num_input_dims != 4 || num_output_dims < 1) {
+        printf("错误: 模型输入应为 NCHW 四维张量（实际 %d 维）\n", num_input_dims);
+        return -1;
+    }
+    const int64_t expected[3] = { desc->channels, desc->height, desc->width };
+    for (int i = 0; i < 3; i++) {
+        if (input_dims[i + 1] > 0 && input_dims[i + 1] != expected[i]) {
+            printf("错误: 模型输入形状与描述文件不一致: 第%d维 %lld != %lld\n",
+                   i + 1, (long long)input_dims[i + 1], (long long)expected[i]);
+            return -1;
+        }
+    }
+    int64_t classes = output_dims[num_output_dims - 1];
+    if (classes > 0 && classes != desc->num_classes) {
+        printf("错误: 模型输出类别数与描述文件不一致: %lld != %d\n",
+               (long long)classes, desc->num_classes);
+        return -1;
+    }
+    return 0;
+}
+#endif
+
+// 按描述文件分配输入与输出缓冲区
+static int allocate_buffers(InferenceContext* ctx) {
+    const ModelDescriptor* desc = &ctx->descriptor;
+    ctx->image_size = model_descriptor_image_size(desc);
+    ctx->input_shape[0] = 1;
+    ctx->input_shape[1] = desc->channels;
+    ctx->input_shape[2] = desc->height;
+    ctx->input_shape[3] = desc->width;
+    ctx->input_buffer = (float*)malloc(ctx->image_size * sizeof(float));
+    ctx->logits_buffer = (float*)malloc((size_t)desc->num_classes * sizeof(float));
+    ctx->probabilities_buffer = (float*)malloc((size_t)desc->num_classes * sizeof(float));
+    return ctx->input_buffer && ctx->logits_buffer && ctx->probabilities_buffer ? 0 : -1;
 }
 
 // Softmax函数
@@ -138,8 +341,170 @@ static void softmax(float* input, float* output, size_t size) {
     }
 }
 
+#ifndef INFERENCE_USE_GENERATED_MODEL
+// FNV-1a 64位哈希
+static uint64_t fnv1a_update(uint64_t hash, const void* data, size_t size) {
+    const unsigned char* bytes = (const unsigned char*)data;
+    for (size_t i = 0; i < size; i++) {
+        hash ^= bytes[i];
+        hash *= 1099511628211ULL;
+    }
+    return hash;
+}
+
+// 优化模型缓存路径：<缓存目录>/embedded_mnist_model.<缓存键>.onnx
+// 缓存键 = 模型内容哈希（onnx_to_c_array.py 生成时计算）+ 会话选项 + ORT版本 + CPU架构（与 model_cache.py 的规则一致）
+static void model_cache_path(char* out, size_t out_size) {
+    const char* model_sha256 = get_embedded_model_sha256();
+    const char* ort_version = OrtGetApiBase()->GetVersionString();
+    uint64_t hash = 14695981039346656037ULL;
+    hash = fnv1a_update(hash, model_sha256, strlen(model_sha256));
+    hash = fnv1a_update(hash, SESSION_OPTIONS_KEY, strlen(SESSION_OPTIONS_KEY));
+    hash = fnv1a_update(hash, ort_version, strlen(ort_version));
+    hash = fnv1a_update(hash, MODEL_CACHE_ARCH, strlen(MODEL_CACHE_ARCH));
+    snprintf(out, out_size, "%s/embedded_mnist_model.%016llx.onnx", g_model_cache_dir, (unsigned long long)hash);
+}
+
+// 创建会话；启用缓存时优先加载已优化的模型，未命中时把优化后的模型写入缓存
+static OrtStatus* create_session(OrtEnv* env, const unsigned char* model_data, size_t model_size,
+                                 OrtSessionOptions* session_options, OrtSession** session) {
+    if (!g_model_cache_dir[0]) {
+        return g_ort->CreateSessionFromArray(env, model_data, model_size, session_options, session);
+    }
+    
+    char cache_path[1024];
+    model_cache_path(cache_path, sizeof(cache_path));
+    
+    FILE* cached = fopen(cache_path, "rb");
+    if (cached) {
+        fclose(cached);
+        // 缓存中的模型已经过图优化，再次优化只会增加启动时间
+        OrtStatus* status = g_ort->SetSessionGraphOptimizationLevel(session_options, ORT_DISABLE_ALL);
+        if (status == NULL) {
+            status = g_ort->CreateSession(env, cache_path, session_options, session);
+        }
+        if (status == NULL) {
+            printf("✓ 优化模型缓存命中: %s\n", cache_path);
+            return NULL;
+        }
+        // 缓存文件损坏或不兼容时重新优化并覆盖
+        printf("⚠️ 优化模型缓存不可用，重新生成: %s\n", g_ort->GetErrorMessage(status));
+        g_ort->ReleaseStatus(status);
+        status = g_ort->SetSessionGraphOptimizationLevel(session_options, ORT_ENABLE_EXTENDED);
+        if (status != NULL) return status;
+    }
+    
+    // 先写临时文件再重命名，避免并发启动或中途退出时留下不完整的缓存
+    mkdir(g_model_cache_dir, 0755);  // 目录已存在时失败，忽略
+    char temp_path[1100];
+    snprintf(temp_path, sizeof(temp_path), "%s.%ld.tmp", cache_path, (long)getpid());
+    OrtStatus* status = g_ort->SetOptimizedModelFilePath(session_options, temp_path);
+    if (status != NULL) return status;
+    
+    status = g_ort->CreateSessionFromArray(env, model_data, model_size, session_options, session);
+    if (status != NULL) {
+        remove(temp_path);
+        return status;
+    }
+    if (rename(temp_path, cache_path) == 0) {
+        printf("✓ 优化模型已写入缓存: %s\n", cache_path);
+    } else {
+        printf("⚠️ 无法写入优化模型缓存: %s\n", cache_path);
+        remove(temp_path);
+    }
+    return NULL;
+}
+#endif
+
 // === 公开API实现 ===
 
+#ifdef INFERENCE_USE_GENERATED_MODEL
+
+InferenceHandle inference_create(void) {
+    printf("初始化生成的C推理内核（不依赖ONNX Runtime）...\n");
+    
+    InferenceContext* ctx = (InferenceContext*)calloc(1, sizeof(InferenceContext));
+    if (!ctx) {
+        printf("错误: 内存分配失败\n");
+        return NULL;
+    }
+    
+    ctx->model_path = (char*)malloc(32);
+    strcpy(ctx->model_path, "generated_mnist_model");
+    
+    // 读取模型描述文件，缺失时使用MNIST默认值
+    int descriptor_status = g_descriptor_path[0]
+        ? model_descriptor_load(g_descriptor_path, &ctx->descriptor) : 1;
+    if (descriptor_status < 0) {
+        printf("错误: 模型描述文件格式错误: %s\n", g_descriptor_path);
+        inference_destroy(ctx);
+        return NULL;
+    }
+    if (descriptor_status > 0) {
+        model_descriptor_default(&ctx->descriptor);
+        if (g_descriptor_path[0]) {
+            printf("⚠️ 未找到模型描述文件 %s，使用MNIST默认参数\n", g_descriptor_path);
+        }
+    }
+    if (validate_descriptor(ctx) != 0) {
+        inference_destroy(ctx);
+        return NULL;
+    }
+    
+    // 权重已编译进库，加载只需分配缓冲区
+    double load_start = trace_begin();
+    ctx->workspace = (float*)malloc(get_generated_model_workspace_size() * sizeof(float));
+    if (allocate_buffers(ctx) != 0 || !ctx->workspace) {
+        printf("错误: 内存分配失败\n");
+        inference_destroy(ctx);
+        return NULL;
+    }
+    trace_end(INFERENCE_SPAN_LOAD, -1, load_start);
+    
+    if (g_model_cache_dir[0] || g_ort_profile_prefix[0]) {
+        printf("⚠️ 生成内核不使用ONNX Runtime，忽略优化模型缓存与ORT性能分析设置\n");
+    }
+    
+    printf("✓ 生成内核加载成功: %s (参数: %zu 个float)\n", ctx->model_path,
+           get_generated_model_parameter_count());
+    printf("✓ 模型输入: %dx%dx%d, 类别数: %d\n", ctx->descriptor.channels,
+           ctx->descriptor.height, ctx->descriptor.width, ctx->descriptor.num_classes);
+    
+    return (InferenceHandle)ctx;
+}
+
+void inference_destroy(InferenceHandle handle) {
+    if (!handle) return;
+    
+    InferenceContext* ctx = (InferenceContext*)handle;
+    free(ctx->model_path);
+    free(ctx->workspace);
+    free(ctx->input_buffer);
+    free(ctx->logits_buffer);
+    free(ctx->probabilities_buffer);
+    free(ctx);
+}
+
+// 执行一次前向计算，将模型原始输出（log_softmax）写入 logits_out
+static int run_model(InferenceContext* ctx, int sample_id, const float* image_data, 
+                     float* logits_out, int num_classes) {
+    (void)num_classes;  // 已在创建时与描述文件核对
+    double span_start = trace_begin();
+    
+    // 预处理：标准化写入上下文的输入缓冲区（不修改原始数据）
+    float* input_data = ctx->input_buffer;
+    model_descriptor_normalize(&ctx->descriptor, image_data, input_data);
+    trace_end(INFERENCE_SPAN_PREPROCESS, sample_id, span_start);
+    
+    span_start = trace_begin();
+    generated_model_run(input_data, logits_out, ctx->workspace);
+    trace_end(INFERENCE_SPAN_RUN, sample_id, span_start);
+    
+    return INFERENCE_SUCCESS;
+}
+
+#else
+
 InferenceHandle inference_create(void) {
     printf("初始化ONNX Runtime C API推理引擎（使用嵌入式模型）...\n");
     
@@ -154,6 +519,26 @@ InferenceHandle inference_create(void) {
     ctx->model_path = (char*)malloc(32);
     strcpy(ctx->model_path, "embedded_mnist_model");
     
+    // 读取模型描述文件，缺失时使用MNIST默认值
+    int descriptor_status = g_descriptor_path[0]
+        ? model_descriptor_load(g_descriptor_path, &ctx->descriptor) : 1;
+    if (descriptor_status < 0) {
+        printf("错误: 模型描述文件格式错误: %s\n", g_descriptor_path);
+        inference_destroy(ctx);
+        return NULL;
+    }
+    if (descriptor_status > 0) {
+        model_descriptor_default(&ctx->descriptor);
+        if (g_descriptor_path[0]) {
+            printf("⚠️ 未找到模型描述文件 %s，使用MNIST默认参数\n", g_descriptor_path);
+        }
+    }
+    if (allocate_buffers(ctx) != 0) {
+        printf("错误: 内存分配失败\n");
+        inference_destroy(ctx);
+        return NULL;
+    }
+    
     // 获取ORT API
     g_ort = OrtGetApiBase()->GetApi(ORT_API_VERSION);
     ctx->ort_api = g_ort;
@@ -173,11 +558,19 @@ InferenceHandle inference_create(void) {
     status = g_ort->SetSessionGraphOptimizationLevel(session_options, ORT_ENABLE_EXTENDED);
     CHECK_STATUS_RETURN(status, NULL);
     
+    if (g_ort_profile_prefix[0]) {
+        status = g_ort->EnableProfiling(session_options, g_ort_profile_prefix);
+        CHECK_STATUS_RETURN(status, NULL);
+        g_ort_profile_start_us = now_ms() * 1000.0;
+    }
+    
     // 创建会话 - 使用嵌入式模型数据
+    double load_start = trace_begin();
     const unsigned char* model_data = get_embedded_model_data();
     size_t model_size = get_embedded_model_size();
-    status = g_ort->CreateSessionFromArray(ctx->env, model_data, model_size, session_options, &ctx->session);
+    status = create_session(ctx->env, model_data, model_size, session_options, &ctx->session);
     CHECK_STATUS_RETURN(status, NULL);
+    trace_end(INFERENCE_SPAN_LOAD, -1, load_start);
     
     g_ort->ReleaseSessionOptions(session_options);
     
@@ -210,8 +603,15 @@ InferenceHandle inference_create(void) {
         CHECK_STATUS_RETURN(status, NULL);
     }
     
+    if (validate_descriptor(ctx) != 0) {
+        inference_destroy(ctx);
+        return NULL;
+    }
+    
     printf("✓ ONNX Runtime 初始化成功\n");
     printf("✓ 嵌入式模型加载成功: %s (大小: %zu bytes)\n", ctx->model_path, get_embedded_model_size());
+    printf("✓ 模型输入: %dx%dx%d, 类别数: %d\n", ctx->descriptor.channels,
+           ctx->descriptor.height, ctx->descriptor.width, ctx->descriptor.num_classes);
     
     return (InferenceHandle)ctx;
 }
@@ -221,6 +621,18 @@ void inference_destroy(InferenceHandle handle) {
     
     InferenceContext* ctx = (InferenceContext*)handle;
     
+    if (ctx->session && g_ort_profile_prefix[0] && ctx->allocator) {
+        char* profile_file = NULL;
+        OrtStatus* status = g_ort->SessionEndProfiling(ctx->session, ctx->allocator, &profile_file);
+        if (status == NULL) {
+            snprintf(g_ort_profile_file, sizeof(g_ort_profile_file), "%s", profile_file);
+            printf("✓ ORT性能分析已保存到: %s\n", profile_file);
+            (void)g_ort->AllocatorFree(ctx->allocator, profile_file);
+        } else {
+            g_ort->ReleaseStatus(status);
+        }
+    }
+    
     if (ctx->session) {
         g_ort->ReleaseSession(ctx->session);
     }
@@ -255,46 +667,36 @@ void inference_destroy(InferenceHandle handle) {
         free(ctx->model_path);
     }
     
+    free(ctx->input_buffer);
+    free(ctx->logits_buffer);
+    free(ctx->probabilities_buffer);
     free(ctx);
 }
 
-int inference_run_single(InferenceHandle handle, int sample_id, int original_idx, 
-                        int true_label, float* image_data, InferenceResult* result) {
-    if (!handle || !image_data || !result) {
-        return INFERENCE_ERROR_DATA;
-    }
+// 执行一次前向计算，将模型原始输出（log_softmax）写入 logits_out
+static int run_model(InferenceContext* ctx, int sample_id, const float* image_data, 
+                     float* logits_out, int num_classes) {
+    double span_start = trace_begin();
     
-    InferenceContext* ctx = (InferenceContext*)handle;
-    clock_t start_time = clock();
-    
-    // 复制输入数据（避免修改原始数据）
-    float* input_data = (float*)malloc(28 * 28 * sizeof(float));
-    if (!input_data) {
-        return INFERENCE_ERROR_MEMORY;
-    }
-    memcpy(input_data, image_data, 28 * 28 * sizeof(float));
-    
-    // 预处理
-    preprocess_image(input_data, 28 * 28);
+    // 预处理：标准化写入上下文的输入缓冲区（不修改原始数据）
+    float* input_data = ctx->input_buffer;
+    model_descriptor_normalize(&ctx->descriptor, image_data, input_data);
+    trace_end(INFERENCE_SPAN_PREPROCESS, sample_id, span_start);
     
     // 创建输入tensor
-    int64_t input_shape[] = {1, 1, 28, 28};
-    size_t input_shape_len = 4;
-    
     OrtValue* input_tensor = NULL;
     OrtStatus* status = g_ort->CreateTensorWithDataAsOrtValue(
         ctx->memory_info,
         input_data,
-        28 * 28 * sizeof(float),
-        input_shape,
-        input_shape_len,
+        ctx->image_size * sizeof(float),
+        ctx->input_shape,
+        4,
         ONNX_TENSOR_ELEMENT_DATA_TYPE_FLOAT,
         &input_tensor
     );
     
     if (status != NULL) {
         g_ort->ReleaseStatus(status);
-        free(input_data);
         return INFERENCE_ERROR_RUNTIME;
     }
     
@@ -303,6 +705,7 @@ int inference_run_single(InferenceHandle handle, int sample_id, int original_idx
     OrtValue* outputs[1] = { NULL };
     
     // 运行推理
+    span_start = trace_begin();
     status = g_ort->Run(
         ctx->session,
         NULL,
@@ -313,11 +716,11 @@ int inference_run_single(InferenceHandle handle, int sample_id, int original_idx
         ctx->num_outputs,
         outputs
     );
+    trace_end(INFERENCE_SPAN_RUN, sample_id, span_start);
     
     if (status != NULL) {
         g_ort->ReleaseStatus(status);
         g_ort->ReleaseValue(input_tensor);
-        free(input_data);
         return INFERENCE_ERROR_RUNTIME;
     }
     
@@ -328,13 +731,40 @@ int inference_run_single(InferenceHandle handle, int sample_id, int original_idx
         g_ort->ReleaseStatus(status);
         g_ort->ReleaseValue(input_tensor);
         g_ort->ReleaseValue(outputs[0]);
-        free(input_data);
         return INFERENCE_ERROR_RUNTIME;
     }
     
+    memcpy(logits_out, output_data, (size_t)num_classes * sizeof(float));
+    
+    // 释放资源
+    g_ort->ReleaseValue(input_tensor);
+    g_ort->ReleaseValue(outputs[0]);
+    
+    return INFERENCE_SUCCESS;
+}
+
+#endif // INFERENCE_USE_GENERATED_MODEL
+
+int inference_run_single(InferenceHandle handle, int sample_id, int original_idx, 
+                        int true_label, float* image_data, InferenceResult* result) {
+    if (!handle || !image_data || !result) {
+        return INFERENCE_ERROR_DATA;
+    }
+    
+    InferenceContext* ctx = (InferenceContext*)handle;
+    double start_time = now_ms();
+    
+    int num_classes = ctx->descriptor.num_classes;
+    float* logits = ctx->logits_buffer;
+    int status = run_model(ctx, sample_id, image_data, logits, num_classes);
+    if (status != INFERENCE_SUCCESS) {
+        return status;
+    }
+    
     // 应用softmax并找到预测类别
-    float probabilities[10];
-    softmax(output_data, probabilities, 10);
+    double span_start = trace_begin();
+    float* probabilities = ctx->probabilities_buffer;
+    softmax(logits, probabilities, (size_t)num_classes);
     
     // 找到最大概率的类别
     result->sample_id = sample_id;
@@ -343,7 +773,7 @@ int inference_run_single(InferenceHandle handle, int sample_id, int original_idx
     result->predicted_class = 0;
     result->confidence = probabilities[0];
     
-    for (int i = 1; i < 10; i++) {
+    for (int i = 1; i < num_classes; i++) {
         if (probabilities[i] > result->confidence) {
             result->confidence = probabilities[i];
             result->predicted_class = i;
@@ -352,16 +782,40 @@ int inference_run_single(InferenceHandle handle, int sample_id, int original_idx
     
     // 检查是否正确
     result->is_correct = (result->predicted_class == result->true_label);
+    trace_end(INFERENCE_SPAN_POSTPROCESS, sample_id, span_start);
     
     // 计算推理时间
-    clock_t end_time = clock();
-    result->inference_time_ms = ((double)(end_time - start_time)) / CLOCKS_PER_SEC * 1000.0;
+    result->inference_time_ms = now_ms() - start_time;
     
-    // 释放资源
-    g_ort->ReleaseValue(input_tensor);
-    g_ort->ReleaseValue(outputs[0]);
-    free(input_data);
+    return INFERENCE_SUCCESS;
+}
+
+int inference_run_logits(InferenceHandle handle, const float* image_data, 
+                        float* logits, int num_classes) {
+    InferenceContext* ctx = (InferenceContext*)handle;
+    if (!ctx || !image_data || !logits || num_classes < ctx->descriptor.num_classes) {
+        return INFERENCE_ERROR_DATA;
+    }
     
+    return run_model(ctx, -1, image_data, logits, ctx->descriptor.num_classes);
+}
+
+int inference_get_num_classes(InferenceHandle handle) {
+    return handle ? ((InferenceContext*)handle)->descriptor.num_classes : -1;
+}
+
+int inference_get_input_size(InferenceHandle handle) {
+    return handle ? (int)((InferenceContext*)handle)->image_size : -1;
+}
+
+// 检查测试数据的样本大小与模型输入一致
+static int check_test_data(InferenceHandle handle, const MNISTTestData* test_data) {
+    InferenceContext* ctx = (InferenceContext*)handle;
+    if (test_data->image_size != 0 && (size_t)test_data->image_size != ctx->image_size) {
+        printf("❌ 测试数据样本大小 (%d) 与模型输入 (%zu) 不一致\n",
+               test_data->image_size, ctx->image_size);
+        return INFERENCE_ERROR_DATA;
+    }
     return INFERENCE_SUCCESS;
 }
 
@@ -370,6 +824,9 @@ int inference_run_batch(InferenceHandle handle, MNISTTestData* test_data,
     if (!handle || !test_data || !results) {
         return INFERENCE_ERROR_DATA;
     }
+    if (check_test_data(handle, test_data) != INFERENCE_SUCCESS) {
+        return INFERENCE_ERROR_DATA;
+    }
     
     int correct_predictions = 0;
     
@@ -387,118 +844,134 @@ int inference_run_batch(InferenceHandle handle, MNISTTestData* test_data,
     return correct_predictions;
 }
 
+static int load_test_data(const char* test_data_dir, MNISTTestData* data);
+
 int mnist_load_test_data(const char* test_data_dir, MNISTTestData* data) {
+    double span_start = trace_begin();
+    int status = load_test_data(test_data_dir, data);
+    trace_end(INFERENCE_SPAN_IO, -1, span_start);
+    return status;
+}
+
+static int load_test_data(const char* test_data_dir, MNISTTestData* data) {
     if (!test_data_dir || !data) {
         return INFERENCE_ERROR_DATA;
     }
     
     printf("🔍 加载MNIST测试数据...\n");
     
-    // 构造metadata文件路径
-    char metadata_path[512];
-    snprintf(metadata_path, sizeof(metadata_path), "%s/metadata.json", test_data_dir);
+    // 一次读取整个二进制索引文件
+    char index_path[512];
+    snprintf(index_path, sizeof(index_path), "%s/%s", test_data_dir, MNIST_INDEX_FILENAME);
     
-    // 读取元数据文件
-    FILE* metadata_file = fopen(metadata_path, "r");
-    if (!metadata_file) {
-        printf("❌ 无法打开元数据文件: %s\n", metadata_path);
+    size_t index_size = 0;
+    unsigned char* index_buf = read_whole_file(index_path, &index_size);
+    if (!index_buf) {
+        printf("❌ 无法读取索引文件: %s\n", index_path);
+        printf("请先运行 data_loader.py 生成测试数据\n");
         return INFERENCE_ERROR_DATA;
     }
     
-    // 解析JSON获取样本信息
-    char line[1024];
-    int* labels = (int*)malloc(1000 * sizeof(int));
-    int* indices = (int*)malloc(1000 * sizeof(int));
-    int label_count = 0;
-    int num_samples = 0;
-    
-    while (fgets(line, sizeof(line), metadata_file) && label_count < 1000) {
-        // 获取样本数量
-        if (strstr(line, "\"num_samples\":")) {
-            num_samples = parse_json_int(line, "\"num_samples\":");
-        }
-        
-        // 获取标签
-        if (strstr(line, "\"true_label\":")) {
-            int label = parse_json_int(line, "\"true_label\":");
-            if (label >= 0) {
-                labels[label_count] = label;
-            }
-        }
-        
-        // 获取原始索引
-        if (strstr(line, "\"original_mnist_index\":")) {
-            int index = parse_json_int(line, "\"original_mnist_index\":");
-            if (index >= 0) {
-                indices[label_count] = index;
-                label_count++;
-            }
-        }
+    MNISTIndexHeader header;
+    if (index_size < sizeof(header)) {
+        printf("❌ 索引文件过小: %s\n", index_path);
+        free(index_buf);
+        return INFERENCE_ERROR_DATA;
+    }
+    memcpy(&header, index_buf, sizeof(header));
+    
+    size_t num_samples = header.num_samples;
+    size_t sample_bytes = MNIST_INDEX_SAMPLE_PIXELS(header) * header.bytes_per_pixel;
+    size_t expected_size = sizeof(header) + num_samples * (2 * sizeof(int32_t) + sizeof(uint64_t));
+    
+    if (memcmp(header.magic, MNIST_INDEX_MAGIC, MNIST_INDEX_MAGIC_SIZE) != 0 ||
+        header.version != MNIST_INDEX_VERSION ||
+        header.rows == 0 || header.cols == 0 ||
+        header.bytes_per_pixel != sizeof(float) ||
+        num_samples == 0 || index_size < expected_size) {
+        printf("❌ 索引文件格式错误: %s\n", index_path);
+        free(index_buf);
+        return INFERENCE_ERROR_DATA;
     }
-    fclose(metadata_file);
     
-    if (num_samples <= 0 || label_count != num_samples) {
-        printf("❌ 元数据解析失败: 样本数=%d, 标签数=%d\n", num_samples, label_count);
-        free(labels);
-        free(indices);
+    const int32_t* labels = (const int32_t*)(index_buf + sizeof(header));
+    const int32_t* indices = labels + num_samples;
+    const uint64_t* offsets = (const uint64_t*)(indices + num_samples);
+    
+    // 图像数据只读内存映射（按需分页，数百万样本也不必整体读入内存），映射失败时整体读取
+    char images_path[512];
+    snprintf(images_path, sizeof(images_path), "%s/%s", test_data_dir, MNIST_IMAGES_FILENAME);
+    
+    size_t images_size = 0;
+    unsigned char* image_buffer = (unsigned char*)mnist_map_file(images_path, &images_size);
+    int image_buffer_mapped = image_buffer != NULL;
+    if (!image_buffer) {
+        image_buffer = read_whole_file(images_path, &images_size);
+    }
+    if (!image_buffer) {
+        printf("❌ 无法读取图像文件: %s\n", images_path);
+        free(index_buf);
         return INFERENCE_ERROR_DATA;
     }
     
-    printf("样本数量: %d\n", num_samples);
-    printf("解析到的标签数: %d\n", label_count);
+    printf("样本数量: %zu\n", num_samples);
     
-    // 分配内存存储数据
-    data->num_samples = num_samples;
+    // 分配内存存储数据，图像指针直接指向打包缓冲区
+    data->num_samples = (int)num_samples;
+    data->image_size = (int)MNIST_INDEX_SAMPLE_PIXELS(header);
+    data->image_buffer = (float*)image_buffer;
+    data->image_buffer_size = images_size;
+    data->image_buffer_mapped = image_buffer_mapped;
     data->images = (float**)malloc(num_samples * sizeof(float*));
     data->labels = (int*)malloc(num_samples * sizeof(int));
     data->original_indices = (int*)malloc(num_samples * sizeof(int));
     
-    // 读取图像文件
-    for (int i = 0; i < num_samples; i++) {
-        // 构造文件名
-        char filename[512];
-        snprintf(filename, sizeof(filename), "%s/image_%03d.bin", test_data_dir, i);
-        
-        FILE* file = fopen(filename, "rb");
-        if (!file) {
-            printf("❌ 无法打开文件: %s\n", filename);
-            continue;
-        }
-        
-        // 分配图像内存并读取数据
-        data->images[i] = (float*)malloc(28 * 28 * sizeof(float));
-        size_t read_count = fread(data->images[i], sizeof(float), 28 * 28, file);
-        fclose(file);
-        
-        if (read_count != 28 * 28) {
-            printf("❌ 文件读取失败: %s，期望读取 %d，实际读取 %zu\n", 
-                   filename, 28 * 28, read_count);
-            free(data->images[i]);
-            continue;
+    if (!data->images || !data->labels || !data->original_indices) {
+        printf("❌ 测试数据内存分配失败\n");
+        free(index_buf);
+        mnist_free_test_data(data);
+        return INFERENCE_ERROR_MEMORY;
+    }
+    
+    for (size_t i = 0; i < num_samples; i++) {
+        if (offsets[i] % sizeof(float) != 0 || offsets[i] + sample_bytes > images_size) {
+            printf("❌ 样本 %zu 偏移越界: %llu\n", i, (unsigned long long)offsets[i]);
+            free(index_buf);
+            mnist_free_test_data(data);
+            return INFERENCE_ERROR_DATA;
         }
-        
+        data->images[i] = (float*)(image_buffer + offsets[i]);
         data->labels[i] = labels[i];
         data->original_indices[i] = indices[i];
     }
+    free(index_buf);
     
-    // 显示标签分布
-    int label_dist[10] = {0};
-    for (int i = 0; i < num_samples; i++) {
-        if (data->labels[i] >= 0 && data->labels[i] <= 9) {
-            label_dist[data->labels[i]]++;
+    // 显示标签分布（类别数取最大标签+1）
+    int num_labels = 0;
+    for (int i = 0; i < data->num_samples; i++) {
+        if (data->labels[i] >= num_labels) {
+            num_labels = data->labels[i] + 1;
         }
     }
+    int* label_dist = (int*)calloc(num_labels > 0 ? (size_t)num_labels : 1, sizeof(int));
     
-    printf("✅ 加载了 %d 个测试样本\n", num_samples);
-    printf("标签分布: [");
-    for (int i = 0; i < 10; i++) {
-        printf("%d", label_dist[i]);
-        if (i < 9) printf(" ");
+    printf("✅ 加载了 %d 个测试样本 (%ux%ux%u)\n", data->num_samples,
+           header.channels ? header.channels : 1, header.rows, header.cols);
+    if (label_dist) {
+        for (int i = 0; i < data->num_samples; i++) {
+            if (data->labels[i] >= 0) {
+                label_dist[data->labels[i]]++;
+            }
+        }
+        printf("标签分布: [");
+        for (int i = 0; i < num_labels; i++) {
+            printf("%d", label_dist[i]);
+            if (i < num_labels - 1) printf(" ");
+        }
+        printf("]\n");
+        free(label_dist);
     }
-    printf("]\n");
     
-    free(labels);
-    free(indices);
     return INFERENCE_SUCCESS;
 }
 
@@ -506,15 +979,27 @@ void mnist_free_test_data(MNISTTestData* data) {
     if (!data) return;
     
     if (data->images) {
-        for (int i = 0; i < data->num_samples; i++) {
-            if (data->images[i]) {
-                free(data->images[i]);
+        // 打包加载的图像共享一个缓冲区，只需释放指针数组
+        if (!data->image_buffer) {
+            for (int i = 0; i < data->num_samples; i++) {
+                if (data->images[i]) {
+                    free(data->images[i]);
+                }
             }
         }
         free(data->images);
         data->images = NULL;
     }
     
+    if (data->image_buffer) {
+        if (data->image_buffer_mapped) {
+            mnist_unmap_file(data->image_buffer, data->image_buffer_size);
+        } else {
+            free(data->image_buffer);
+        }
+        data->image_buffer = NULL;
+    }
+    
     if (data->labels) {
         free(data->labels);
         data->labels = NULL;
@@ -528,11 +1013,62 @@ void mnist_free_test_data(MNISTTestData* data) {
     data->num_samples = 0;
 }
 
+// === 缓冲结果写入 ===
+
+#define RESULT_BUFFER_SIZE (256 * 1024)
+
+// 用户态写缓冲：逐样本的格式化结果先拼接到内存，满了再整块 fwrite
+typedef struct {
+    FILE* file;
+    char* data;
+    size_t used;
+} ResultBuffer;
+
+static void result_buffer_flush(ResultBuffer* buffer) {
+    if (buffer->used > 0) {
+        fwrite(buffer->data, 1, buffer->used, buffer->file);
+        buffer->used = 0;
+    }
+}
+
+// 按 printf 格式直接写入缓冲区（与 fprintf 的输出逐字节一致），空间不足时先整块写出再重试
+static void result_buffer_printf(ResultBuffer* buffer, const char* format, ...) {
+    for (int attempt = 0; attempt < 2; attempt++) {
+        size_t available = RESULT_BUFFER_SIZE - buffer->used;
+        va_list args;
+        va_start(args, format);
+        int length = vsnprintf(buffer->data + buffer->used, available, format, args);
+        va_end(args);
+        if (length < 0) {
+            return;
+        }
+        if ((size_t)length < available) {
+            buffer->used += (size_t)length;
+            return;
+        }
+        result_buffer_flush(buffer);
+    }
+    // 单条记录超过整个缓冲区（实际不会出现），直接写文件
+    va_list args;
+    va_start(args, format);
+    vfprintf(buffer->file, format, args);
+    va_end(args);
+}
+
 void inference_save_results(InferenceResult* results, int num_samples, 
                            double total_time, int correct_predictions,
                            const char* output_path, const char* platform_name) {
-    if (!results || !output_path || !platform_name) return;
+    inference_save_results_ex(results, num_samples, total_time, correct_predictions,
+                              output_path, platform_name, INFERENCE_OUTPUT_PREDICTIONS);
+}
+
+void inference_save_results_ex(InferenceResult* results, int num_samples, 
+                              double total_time, int correct_predictions,
+                              const char* output_path, const char* platform_name,
+                              InferenceOutputLevel level) {
+    if (!results || !output_path || !platform_name || level == INFERENCE_OUTPUT_NONE) return;
     
+    double span_start = trace_begin();
     FILE* file = fopen(output_path, "w");
     if (file == NULL) {
         printf("警告: 无法打开结果文件进行写入: %s\n", output_path);
@@ -551,22 +1087,159 @@ void inference_save_results(InferenceResult* results, int num_samples,
     fprintf(file, "准确率: %.2f%%\n", accuracy * 100);
     fprintf(file, "平均推理时间: %.2f ms\n", avg_time);
     fprintf(file, "推理速度: %.1f FPS\n", fps);
-    fprintf(file, "\n样本详细结果:\n");
     
-    for (int i = 0; i < num_samples; i++) {
-        fprintf(file, "样本 %3d: 真实=%d, 预测=%d, 置信度=%.3f, 时间=%.2f ms, %s\n",
-                results[i].sample_id,
-                results[i].true_label,
-                results[i].predicted_class,
-                results[i].confidence,
-                results[i].inference_time_ms,
-                results[i].is_correct ? "正确" : "错误");
+    if (level >= INFERENCE_OUTPUT_PREDICTIONS) {
+        fprintf(file, "\n样本详细结果:\n");
+        fflush(file);
+        
+        ResultBuffer buffer = {file, (char*)malloc(RESULT_BUFFER_SIZE), 0};
+        if (!buffer.data) {
+            printf("警告: 结果写缓冲区分配失败\n");
+            fclose(file);
+            return;
+        }
+        for (int i = 0; i < num_samples; i++) {
+            result_buffer_printf(&buffer, "样本 %3d: 真实=%d, 预测=%d, 置信度=%.3f, 时间=%.2f ms, %s\n",
+                                 results[i].sample_id, results[i].true_label, results[i].predicted_class,
+                                 results[i].confidence, results[i].inference_time_ms,
+                                 results[i].is_correct ? "正确" : "错误");
+        }
+        result_buffer_flush(&buffer);
+        free(buffer.data);
     }
     
     fclose(file);
+    trace_end(INFERENCE_SPAN_IO, -1, span_start);
     printf("✓ 结果已保存到 %s\n", output_path);
 }
 
+// 追加一个结构化dtype字段描述，如 ('sample_id', '<i4')
+static size_t append_npy_field(char* descr, size_t pos, size_t size,
+                               const char* name, const char* type) {
+    int written = snprintf(descr + pos, size - pos, "('%s', '%s'), ", name, type);
+    return written > 0 ? pos + (size_t)written : pos;
+}
+
+// 补齐上一个字段结尾到下一个字段偏移之间的结构体填充
+static size_t append_npy_padding(char* descr, size_t pos, size_t size, size_t from, size_t to) {
+    if (to > from) {
+        char type[16];
+        snprintf(type, sizeof(type), "|V%zu", to - from);
+        pos = append_npy_field(descr, pos, size, "", type);
+    }
+    return pos;
+}
+
+int inference_save_results_npy(const InferenceResult* results, int num_samples,
+                               const char* output_path) {
+    if (!results || !output_path || num_samples < 0) {
+        return INFERENCE_ERROR_DATA;
+    }
+    
+    // dtype 按 InferenceResult 的实际内存布局生成（含填充），结果数组可整块写出
+    const unsigned short probe = 1;
+    const char endian = *(const unsigned char*)&probe ? '<' : '>';
+    char int_type[4] = {endian, 'i', '4', '\0'};
+    char float_type[4] = {endian, 'f', '4', '\0'};
+    char double_type[4] = {endian, 'f', '8', '\0'};
+    
+    struct { const char* name; const char* type; size_t offset; size_t size; } fields[] = {
+        {"sample_id", int_type, offsetof(InferenceResult, sample_id), sizeof(int)},
+        {"original_mnist_index", int_type, offsetof(InferenceResult, original_mnist_index), sizeof(int)},
+        {"true_label", int_type, offsetof(InferenceResult, true_label), sizeof(int)},
+        {"predicted_class", int_type, offsetof(InferenceResult, predicted_class), sizeof(int)},
+        {"confidence", float_type, offsetof(InferenceResult, confidence), sizeof(float)},
+        {"inference_time_ms", double_type, offsetof(InferenceResult, inference_time_ms), sizeof(double)},
+        {"is_correct", int_type, offsetof(InferenceResult, is_correct), sizeof(int)},
+    };
+    
+    char descr[512] = "[";
+    size_t pos = 1;
+    size_t end = 0;
+    for (size_t i = 0; i < sizeof(fields) / sizeof(fields[0]); i++) {
+        pos = append_npy_padding(descr, pos, sizeof(descr), end, fields[i].offset);
+        pos = append_npy_field(descr, pos, sizeof(descr), fields[i].name, fields[i].type);
+        end = fields[i].offset + fields[i].size;
+    }
+    pos = append_npy_padding(descr, pos, sizeof(descr), end, sizeof(InferenceResult));
+    snprintf(descr + pos, sizeof(descr) - pos, "]");
+    
+    // NPY 1.0: 魔数 + 版本 + 头长度(uint16 LE) + 字典头，总长度按64字节对齐并以换行结尾
+    char header[768];
+    int header_length = snprintf(header, sizeof(header),
+                                 "{'descr': %s, 'fortran_order': False, 'shape': (%d,), }",
+                                 descr, num_samples);
+    if (header_length < 0 || header_length >= (int)sizeof(header) - 64) {
+        return INFERENCE_ERROR_DATA;
+    }
+    size_t total = 10 + (size_t)header_length + 1;
+    size_t padded = (total + 63) / 64 * 64;
+    memset(header + header_length, ' ', padded - total);
+    header[header_length + (padded - total)] = '\n';
+    unsigned short dict_length = (unsigned short)(padded - 10);
+    unsigned char preamble[10] = {0x93, 'N', 'U', 'M', 'P', 'Y', 1, 0,
+                                  (unsigned char)(dict_length & 0xff), (unsigned char)(dict_length >> 8)};
+    
+    double span_start = trace_begin();
+    FILE* file = fopen(output_path, "wb");
+    if (!file) {
+        printf("警告: 无法打开结果文件进行写入: %s\n", output_path);
+        return INFERENCE_ERROR_DATA;
+    }
+    int ok = fwrite(preamble, 1, sizeof(preamble), file) == sizeof(preamble) &&
+             fwrite(header, 1, dict_length, file) == dict_length &&
+             fwrite(results, sizeof(InferenceResult), (size_t)num_samples, file) == (size_t)num_samples;
+    fclose(file);
+    trace_end(INFERENCE_SPAN_IO, -1, span_start);
+    
+    if (!ok) {
+        printf("警告: 写入结果文件失败: %s\n", output_path);
+        return INFERENCE_ERROR_DATA;
+    }
+    printf("✓ 结果已保存到 %s\n", output_path);
+    return INFERENCE_SUCCESS;
+}
+
+int inference_dump_logits(InferenceHandle handle, MNISTTestData* test_data, 
+                         const char* output_path) {
+    if (!handle || !test_data || !output_path) {
+        return INFERENCE_ERROR_DATA;
+    }
+    
+    if (check_test_data(handle, test_data) != INFERENCE_SUCCESS) {
+        return INFERENCE_ERROR_DATA;
+    }
+    
+    FILE* file = fopen(output_path, "wb");
+    if (!file) {
+        printf("错误: 无法创建logits文件 %s\n", output_path);
+        return INFERENCE_ERROR_DATA;
+    }
+    
+    int num_classes = inference_get_num_classes(handle);
+    float* logits = ((InferenceContext*)handle)->logits_buffer;
+    for (int i = 0; i < test_data->num_samples; i++) {
+        int status = inference_run_logits(handle, test_data->images[i], logits, num_classes);
+        if (status != INFERENCE_SUCCESS) {
+            printf("样本 %d 推理失败\n", i);
+            fclose(file);
+            return status;
+        }
+        double span_start = trace_begin();
+        size_t written = fwrite(logits, sizeof(float), (size_t)num_classes, file);
+        trace_end(INFERENCE_SPAN_IO, i, span_start);
+        if (written != (size_t)num_classes) {
+            printf("错误: 写入logits文件失败\n");
+            fclose(file);
+            return INFERENCE_ERROR_DATA;
+        }
+    }
+    
+    fclose(file);
+    printf("✓ 已导出 %d 个样本的logits到: %s\n", test_data->num_samples, output_path);
+    return INFERENCE_SUCCESS;
+}
+
 void inference_print_statistics(InferenceResult* results, int num_samples, 
                                const char* platform_name) {
     if (!results || !platform_name) return;
@@ -638,7 +1311,75 @@ void inference_print_version_info(void) {
     printf("=== C推理库版本信息 ===\n");
     printf("版本号: %s\n", inference_get_version());
     printf("构建时间: %s\n", inference_get_build_timestamp());
+#ifdef INFERENCE_USE_GENERATED_MODEL
+    printf("生成的C推理内核（不依赖ONNX Runtime）\n");
+#else
     printf("ONNX Runtime C API 集成\n");
+#endif
     printf("支持平台: Android ARM64\n");
     printf("========================\n");
-} 
\ No newline at end of file
+} 
+
+// === 性能追踪API实现 ===
+
+void inference_set_trace_callback(InferenceTraceCallback callback, void* user_data) {
+    g_trace_callback = callback;
+    g_trace_user_data = user_data;
+}
+
+int inference_trace_start(void) {
+    g_trace_count = 0;
+    inference_set_trace_callback(record_trace_event, NULL);
+    return INFERENCE_SUCCESS;
+}
+
+int inference_trace_save(const char* output_path) {
+    if (!output_path) {
+        return INFERENCE_ERROR_DATA;
+    }
+    
+    if (g_trace_callback == record_trace_event) {
+        inference_set_trace_callback(NULL, NULL);
+    }
+    
+    FILE* file = fopen(output_path, "w");
+    if (!file) {
+        printf("错误: 无法创建追踪文件 %s\n", output_path);
+        return INFERENCE_ERROR_DATA;
+    }
+    
+    // Chrome trace 事件格式：ph=X 表示带持续时间的完整事件，时间单位为微秒
+    fprintf(file, "{\"traceEvents\":[\n");
+    for (size_t i = 0; i < g_trace_count; i++) {
+        const InferenceTraceEvent* event = &g_trace_events[i];
+        fprintf(file, "{\"name\":\"%s\",\"cat\":\"c_lib\",\"ph\":\"X\",\"ts\":%.3f,\"dur\":%.3f,"
+                      "\"pid\":1,\"tid\":1,\"args\":{\"sample_id\":%d}}%s\n",
+                event->name, event->start_us, event->duration_us, event->sample_id,
+                i + 1 < g_trace_count ? "," : "");
+    }
+    fprintf(file, "],\"displayTimeUnit\":\"ms\",\"otherData\":{\"engine\":\"c_lib\",\"ort_profile\":");
+    write_json_string(file, g_ort_profile_file);
+    fprintf(file, ",\"ort_profile_start_us\":%.3f}}\n", g_ort_profile_start_us);
+    fclose(file);
+    
+    printf("✓ 已导出 %zu 个追踪事件到: %s\n", g_trace_count, output_path);
+    
+    free(g_trace_events);
+    g_trace_events = NULL;
+    g_trace_count = 0;
+    g_trace_capacity = 0;
+    return INFERENCE_SUCCESS;
+}
+
+void inference_set_ort_profiling(const char* profile_prefix) {
+    snprintf(g_ort_profile_prefix, sizeof(g_ort_profile_prefix), "%s", profile_prefix ? profile_prefix : "");
+    g_ort_profile_file[0] = '\0';
+}
+
+void inference_set_model_descriptor(const char* descriptor_path) {
+    snprintf(g_descriptor_path, sizeof(g_descriptor_path), "%s", descriptor_path ? descriptor_path : "");
+}
+
+void inference_set_model_cache_dir(const char* cache_dir) {
+    snprintf(g_model_cache_dir, sizeof(g_model_cache_dir), "%s", cache_dir ? cache_dir : "");
+}
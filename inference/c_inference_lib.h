@@ -1,10 +1,15 @@
 #ifndef C_INFERENCE_LIB_H
 #define C_INFERENCE_LIB_H
 
+#include <stddef.h>
+
 #ifdef __cplusplus
 extern "C" {
 #endif
 
+// 默认模型（MNIST）输出类别数，实际类别数由模型描述文件决定，见 inference_get_num_classes
+#define INFERENCE_NUM_CLASSES 10
+
 // 推理结果结构体
 typedef struct {
     int sample_id;
@@ -22,6 +27,10 @@ typedef struct {
     int* labels;
     int* original_indices;
     int num_samples;
+    float* image_buffer;   // 打包图像缓冲区（images[i] 指向其中），可为NULL
+    int image_size;        // 每个样本的float数 (C*H*W)，0表示未知（不做检查）
+    size_t image_buffer_size;   // 缓冲区字节数
+    int image_buffer_mapped;    // 1: mnist_load_test_data 内存映射的 images.bin（munmap释放），0: malloc
 } MNISTTestData;
 
 // 推理引擎句柄（不透明指针）
@@ -48,12 +57,40 @@ void inference_print_version_info(void);
 
 // === 核心API接口 ===
 
+/**
+ * 设置模型描述文件路径（export_onnx.py 生成的 .json），须在 inference_create 之前调用
+ * 引擎按描述文件中的输入形状、类别数和标准化参数分配缓冲区，并与模型图的形状核对
+ * 未设置或文件不存在时使用MNIST默认值 (1x28x28, 10类)
+ * @param descriptor_path 描述文件路径，NULL表示使用默认值
+ */
+void inference_set_model_descriptor(const char* descriptor_path);
+
+/**
+ * 设置ORT优化模型缓存目录，须在 inference_create 之前调用
+ * 首次创建时把图优化后的模型写入 <cache_dir>/embedded_mnist_model.<缓存键>.onnx，之后直接加载并跳过图优化
+ * 缓存键包含模型内容、会话选项、ORT版本和CPU架构，任一项变化都会生成新文件
+ * @param cache_dir 缓存目录（不存在时创建最后一级），NULL表示不缓存
+ */
+void inference_set_model_cache_dir(const char* cache_dir);
+
 /**
  * 初始化推理引擎（使用嵌入式模型）
  * @return 推理引擎句柄，失败返回NULL
  */
 InferenceHandle inference_create(void);
 
+/**
+ * 获取模型输出类别数
+ * @return 类别数，句柄无效返回-1
+ */
+int inference_get_num_classes(InferenceHandle handle);
+
+/**
+ * 获取单个样本的输入元素数 (C*H*W)
+ * @return 元素数，句柄无效返回-1
+ */
+int inference_get_input_size(InferenceHandle handle);
+
 /**
  * 销毁推理引擎
  * @param handle 推理引擎句柄
@@ -66,13 +103,24 @@ void inference_destroy(InferenceHandle handle);
  * @param sample_id 样本ID
  * @param original_idx 原始MNIST索引
  * @param true_label 真实标签
- * @param image_data 图像数据 (28x28 float数组)
+ * @param image_data 图像数据 (inference_get_input_size 个float)
  * @param result 推理结果输出
  * @return 0成功，-1失败
  */
 int inference_run_single(InferenceHandle handle, int sample_id, int original_idx, 
                         int true_label, float* image_data, InferenceResult* result);
 
+/**
+ * 单次推理，输出模型原始logits（log_softmax，未做softmax）
+ * @param handle 推理引擎句柄
+ * @param image_data 图像数据 (inference_get_input_size 个float，范围[0,1]，不会被修改)
+ * @param logits 输出缓冲区，至少 num_classes 个float
+ * @param num_classes 输出缓冲区容量，不小于 inference_get_num_classes
+ * @return 0成功，负数为错误码
+ */
+int inference_run_logits(InferenceHandle handle, const float* image_data, 
+                        float* logits, int num_classes);
+
 /**
  * 批量推理测试
  * @param handle 推理引擎句柄
@@ -87,7 +135,7 @@ int inference_run_batch(InferenceHandle handle, MNISTTestData* test_data,
 // === 数据加载API ===
 
 /**
- * 加载MNIST测试数据
+ * 加载MNIST测试数据（读取 data_loader.py 生成的 index.bin 和 images.bin）
  * @param test_data_dir 测试数据目录路径
  * @param data 输出的测试数据结构
  * @return 0成功，-1失败
@@ -115,6 +163,43 @@ void inference_save_results(InferenceResult* results, int num_samples,
                            double total_time, int correct_predictions,
                            const char* output_path, const char* platform_name);
 
+/**
+ * 结果输出粒度
+ */
+typedef enum {
+    INFERENCE_OUTPUT_NONE = 0,        // 不写结果文件
+    INFERENCE_OUTPUT_SUMMARY,         // 只写汇总（准确率、平均时间、FPS）
+    INFERENCE_OUTPUT_PREDICTIONS      // 汇总 + 逐样本预测（inference_save_results 的默认行为）
+} InferenceOutputLevel;
+
+/**
+ * 按输出粒度保存文本结果，逐样本部分经用户态缓冲整块写入
+ * 参数同 inference_save_results，level 为 INFERENCE_OUTPUT_NONE 时不写文件
+ */
+void inference_save_results_ex(InferenceResult* results, int num_samples, 
+                              double total_time, int correct_predictions,
+                              const char* output_path, const char* platform_name,
+                              InferenceOutputLevel level);
+
+/**
+ * 以NumPy .npy 结构化数组保存逐样本结果（np.load 直接读取）
+ * dtype 与 InferenceResult 内存布局一致，结果数组整块写出，不做逐样本格式化
+ * @return 0成功，负数为错误码
+ */
+int inference_save_results_npy(const InferenceResult* results, int num_samples,
+                               const char* output_path);
+
+/**
+ * 对全部测试样本推理并将logits导出为二进制文件
+ * 文件内容为 float32 [num_samples, 类别数]，按样本顺序连续存放（本机字节序）
+ * @param handle 推理引擎句柄
+ * @param test_data 测试数据
+ * @param output_path 输出文件路径
+ * @return 0成功，负数为错误码
+ */
+int inference_dump_logits(InferenceHandle handle, MNISTTestData* test_data, 
+                         const char* output_path);
+
 /**
  * 计算统计信息并打印
  * @param results 推理结果数组
@@ -124,6 +209,63 @@ void inference_save_results(InferenceResult* results, int num_samples,
 void inference_print_statistics(InferenceResult* results, int num_samples, 
                                const char* platform_name);
 
+// === 性能追踪API ===
+
+// 追踪区间类型
+typedef enum {
+    INFERENCE_SPAN_LOAD = 0,      // 模型加载（ORT会话创建）
+    INFERENCE_SPAN_PREPROCESS,    // 输入复制与标准化
+    INFERENCE_SPAN_RUN,           // ORT会话执行
+    INFERENCE_SPAN_POSTPROCESS,   // softmax与类别选择
+    INFERENCE_SPAN_IO,            // 测试数据读取、结果与logits写入
+    INFERENCE_SPAN_COUNT
+} InferenceSpanType;
+
+// 追踪事件，时间为单调时钟微秒
+typedef struct {
+    InferenceSpanType type;
+    const char* name;       // 区间名称（静态字符串）
+    int sample_id;          // 与样本无关的区间为 -1
+    double start_us;
+    double duration_us;
+} InferenceTraceEvent;
+
+/**
+ * 追踪回调，在区间结束时于推理线程上同步调用，应尽量轻量
+ * @param event 追踪事件（仅在回调期间有效）
+ * @param user_data 注册时传入的用户数据
+ */
+typedef void (*InferenceTraceCallback)(const InferenceTraceEvent* event, void* user_data);
+
+/**
+ * 注册全局追踪回调（模型加载和数据读取发生在句柄之外，因此回调为进程级）
+ * 未注册回调时热路径不会读取时钟
+ * @param callback 回调函数，NULL表示关闭追踪
+ * @param user_data 透传给回调的用户数据
+ */
+void inference_set_trace_callback(InferenceTraceCallback callback, void* user_data);
+
+/**
+ * 启用内置追踪记录器：缓存所有事件，由 inference_trace_save 导出
+ * @return 0成功，负数为错误码
+ */
+int inference_trace_start(void);
+
+/**
+ * 将内置记录器缓存的事件导出为 Chrome trace / Perfetto JSON 并停止记录
+ * 如已启用ORT性能分析，应在 inference_destroy 之后调用，以便记录ORT分析文件路径
+ * @param output_path 输出文件路径
+ * @return 0成功，负数为错误码
+ */
+int inference_trace_save(const char* output_path);
+
+/**
+ * 启用ONNX Runtime自带的算子级性能分析，须在 inference_create 之前调用
+ * 分析结果在 inference_destroy 时写出为 <profile_prefix>_<时间>.json
+ * @param profile_prefix 输出文件前缀，NULL表示关闭
+ */
+void inference_set_ort_profiling(const char* profile_prefix);
+
 // === 错误码定义 ===
 #define INFERENCE_SUCCESS           0
 #define INFERENCE_ERROR_INIT       -1
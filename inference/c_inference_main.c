@@ -6,17 +6,105 @@
 // 平台特定的路径配置
 #ifdef __ANDROID__
     #define MODEL_PATH "/data/local/tmp/mnist_onnx/models/mnist_model.onnx"
+    #define MODEL_DESCRIPTOR_PATH "/data/local/tmp/mnist_onnx/models/mnist_model.json"
+    #define MODEL_CACHE_DIR "/data/local/tmp/mnist_onnx/models/.ort_cache"
     #define RESULTS_PATH "/data/local/tmp/mnist_onnx/results/android_c_lib_results.txt"
+    #define RESULTS_NPY_PATH "/data/local/tmp/mnist_onnx/results/android_c_lib_results.npy"
     #define TEST_DATA_DIR "/data/local/tmp/mnist_onnx/test_data"
     #define PLATFORM_NAME "Android"
 #else
     #define MODEL_PATH "../models/mnist_model.onnx"
+    #define MODEL_DESCRIPTOR_PATH "../models/mnist_model.json"
+    #define MODEL_CACHE_DIR "../models/.ort_cache"
     #define RESULTS_PATH "../results/macos_c_lib_results.txt"
+    #define RESULTS_NPY_PATH "../results/macos_c_lib_results.npy"
     #define TEST_DATA_DIR "../test_data"
     #define PLATFORM_NAME "macOS"
 #endif
 
-int main() {
+// 将每个样本的推理时间 (float64, ms) 写入二进制文件，供基准测试脚本解析
+static int write_timings(const char* path, const InferenceResult* results, int num_samples) {
+    FILE* file = fopen(path, "wb");
+    if (!file) {
+        printf("错误: 无法创建计时文件 %s\n", path);
+        return -1;
+    }
+    for (int i = 0; i < num_samples; i++) {
+        fwrite(&results[i].inference_time_ms, sizeof(double), 1, file);
+    }
+    fclose(file);
+    printf("✓ 计时数据已保存到: %s\n", path);
+    return 0;
+}
+
+static void print_usage(const char* program) {
+    printf("用法: %s [--test-data 目录] [--descriptor 描述文件] [--dump-logits 输出文件] [--timings 输出文件]\n"
+           "       [--trace 输出文件] [--ort-profile 前缀] [--model-cache 目录]\n"
+           "       [--output-level none|summary|predictions] [--results-format text|npy]\n", program);
+    printf("  --test-data DIR     测试数据目录（默认: %s）\n", TEST_DATA_DIR);
+    printf("  --descriptor FILE   模型描述文件（默认: %s，不存在时使用MNIST默认值）\n",
+           MODEL_DESCRIPTOR_PATH);
+    printf("  --dump-logits FILE  只导出全部样本的logits (float32 [N,类别数])，用于数值一致性检查\n");
+    printf("  --timings FILE      保存每个样本的推理时间 (float64 ms)，用于基准测试\n");
+    printf("  --trace FILE        导出加载/预处理/推理/后处理/IO区间为 Chrome trace JSON\n");
+    printf("  --ort-profile PFX   启用ONNX Runtime算子级性能分析，输出 PFX_<时间>.json\n");
+    printf("  --model-cache DIR   启用ORT优化模型缓存（如 %s），之后的启动跳过图优化\n", MODEL_CACHE_DIR);
+    printf("  --output-level L    结果输出粒度（默认: predictions）\n");
+    printf("  --results-format F  逐样本结果格式: text (%s) 或 npy (%s)\n",
+           RESULTS_PATH, RESULTS_NPY_PATH);
+}
+
+static int parse_output_level(const char* text, InferenceOutputLevel* level) {
+    if (strcmp(text, "none") == 0) {
+        *level = INFERENCE_OUTPUT_NONE;
+    } else if (strcmp(text, "summary") == 0) {
+        *level = INFERENCE_OUTPUT_SUMMARY;
+    } else if (strcmp(text, "predictions") == 0) {
+        *level = INFERENCE_OUTPUT_PREDICTIONS;
+    } else {
+        return -1;
+    }
+    return 0;
+}
+
+int main(int argc, char** argv) {
+    const char* test_data_dir = TEST_DATA_DIR;
+    const char* descriptor_path = MODEL_DESCRIPTOR_PATH;
+    const char* dump_logits_path = NULL;
+    const char* timings_path = NULL;
+    const char* trace_path = NULL;
+    const char* ort_profile_prefix = NULL;
+    const char* model_cache_dir = NULL;
+    InferenceOutputLevel output_level = INFERENCE_OUTPUT_PREDICTIONS;
+    int npy_results = 0;
+    
+    for (int i = 1; i < argc; i++) {
+        if (strcmp(argv[i], "--test-data") == 0 && i + 1 < argc) {
+            test_data_dir = argv[++i];
+        } else if (strcmp(argv[i], "--descriptor") == 0 && i + 1 < argc) {
+            descriptor_path = argv[++i];
+        } else if (strcmp(argv[i], "--dump-logits") == 0 && i + 1 < argc) {
+            dump_logits_path = argv[++i];
+        } else if (strcmp(argv[i], "--timings") == 0 && i + 1 < argc) {
+            timings_path = argv[++i];
+        } else if (strcmp(argv[i], "--trace") == 0 && i + 1 < argc) {
+            trace_path = argv[++i];
+        } else if (strcmp(argv[i], "--ort-profile") == 0 && i + 1 < argc) {
+            ort_profile_prefix = argv[++i];
+        } else if (strcmp(argv[i], "--model-cache") == 0 && i + 1 < argc) {
+            model_cache_dir = argv[++i];
+        } else if (strcmp(argv[i], "--output-level") == 0 && i + 1 < argc &&
+                   parse_output_level(argv[i + 1], &output_level) == 0) {
+            i++;
+        } else if (strcmp(argv[i], "--results-format") == 0 && i + 1 < argc &&
+                   (strcmp(argv[i + 1], "text") == 0 || strcmp(argv[i + 1], "npy") == 0)) {
+            npy_results = strcmp(argv[++i], "npy") == 0;
+        } else {
+            print_usage(argv[0]);
+            return strcmp(argv[i], "--help") == 0 ? 0 : -1;
+        }
+    }
+    
     printf("启动 %s 统一 ONNX Runtime C库 MNIST 推理程序...\n", PLATFORM_NAME);
     
     // 显示库版本信息
@@ -24,6 +112,16 @@ int main() {
     printf("\n");
     
     // 创建推理引擎（使用嵌入式模型）
+    // 追踪与ORT性能分析须在创建引擎前启用，才能覆盖模型加载阶段
+    if (trace_path) {
+        inference_trace_start();
+    }
+    if (ort_profile_prefix) {
+        inference_set_ort_profiling(ort_profile_prefix);
+    }
+    inference_set_model_descriptor(descriptor_path);
+    inference_set_model_cache_dir(model_cache_dir);
+    
     InferenceHandle inference_handle = inference_create();
     if (!inference_handle) {
         printf("❌ 推理引擎初始化失败\n");
@@ -34,13 +132,24 @@ int main() {
     
     // 加载MNIST测试数据
     MNISTTestData test_data = {0};
-    int load_result = mnist_load_test_data(TEST_DATA_DIR, &test_data);
+    int load_result = mnist_load_test_data(test_data_dir, &test_data);
     if (load_result != INFERENCE_SUCCESS) {
         printf("❌ 加载测试数据失败，错误码: %d\n", load_result);
         inference_destroy(inference_handle);
         return -1;
     }
     
+    // 数值一致性检查模式：只导出logits
+    if (dump_logits_path) {
+        int dump_result = inference_dump_logits(inference_handle, &test_data, dump_logits_path);
+        mnist_free_test_data(&test_data);
+        inference_destroy(inference_handle);
+        if (trace_path) {
+            inference_trace_save(trace_path);
+        }
+        return dump_result == INFERENCE_SUCCESS ? 0 : -1;
+    }
+    
     printf("开始推理 %d 个样本...\n", test_data.num_samples);
     
     // 分配内存存储结果
@@ -63,16 +172,15 @@ int main() {
         printf("❌ 批量推理执行失败\n");
     } else {
         // 计算总时间
+        // 进度输出间隔：每10个样本，样本数多时约每10%
+        int progress_every = test_data.num_samples / 10 > 10 ? test_data.num_samples / 10 : 10;
+        int current_correct = 0;
         for (int i = 0; i < test_data.num_samples; i++) {
             total_time += results[i].inference_time_ms;
+            if (results[i].is_correct) current_correct++;
             
-            // 显示进度（每10个样本）
-            if ((i + 1) % 10 == 0) {
-                // 重新计算当前的正确预测数
-                int current_correct = 0;
-                for (int j = 0; j <= i; j++) {
-                    if (results[j].is_correct) current_correct++;
-                }
+            // 显示进度
+            if ((i + 1) % progress_every == 0) {
                 double current_accuracy = (double)current_correct / (i + 1) * 100;
                 printf("完成 %3d/%d 样本，当前准确率: %.1f%%\n", 
                        i + 1, test_data.num_samples, current_accuracy);
@@ -82,9 +190,21 @@ int main() {
         // 显示统计信息
         inference_print_statistics(results, test_data.num_samples, PLATFORM_NAME);
         
-        // 保存结果
-        inference_save_results(results, test_data.num_samples, total_time, 
-                              correct_predictions, RESULTS_PATH, PLATFORM_NAME);
+        // 保存结果：npy格式时文本文件只保留汇总，逐样本结果整块写入 .npy
+        if (npy_results && output_level == INFERENCE_OUTPUT_PREDICTIONS) {
+            inference_save_results_ex(results, test_data.num_samples, total_time,
+                                      correct_predictions, RESULTS_PATH, PLATFORM_NAME,
+                                      INFERENCE_OUTPUT_SUMMARY);
+            inference_save_results_npy(results, test_data.num_samples, RESULTS_NPY_PATH);
+        } else {
+            inference_save_results_ex(results, test_data.num_samples, total_time,
+                                      correct_predictions, RESULTS_PATH, PLATFORM_NAME,
+                                      output_level);
+        }
+        
+        if (timings_path) {
+            write_timings(timings_path, results, test_data.num_samples);
+        }
     }
     
     // 演示单次推理API（可选）
@@ -118,6 +238,11 @@ int main() {
     mnist_free_test_data(&test_data);
     inference_destroy(inference_handle);
     
+    // 在销毁引擎之后导出，以便包含ORT性能分析文件路径
+    if (trace_path) {
+        inference_trace_save(trace_path);
+    }
+    
     printf("\n✅ %s 统一推理库测试完成\n", PLATFORM_NAME);
     
     return 0;
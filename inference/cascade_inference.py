@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+级联推理：小模型（train_model.py --arch tiny）先对全部样本分类，
+softmax置信度低于阈值的样本攒批后交给完整 MNISTNet 重新分类
+大多数手写数字很容易识别，只有少量样本需要完整模型，平均每个请求的计算量大幅下降
+
+对每个阈值报告升级比例、准确率和有效吞吐量，并与只用完整模型、只用小模型比较
+存在图内 top-1 输出的模型（export_onnx.py --top1-head 导出的 <模型>_top1.onnx）时优先使用，
+inference_batch_top1 直接取 (类别, 置信度)，不在主机上做softmax
+
+用法:
+    python cascade_inference.py
+    python cascade_inference.py --thresholds 0.9,0.99,0.999 --batch-size 64 --escalation-batch-size 64
+    python cascade_inference.py --no-top1-head          # 使用只输出logits的模型（对比主机端后处理）
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from python_inference import PythonONNXInferenceMNIST, load_mnist_test_data_mmap
+
+DEFAULT_THRESHOLDS = '0.5,0.8,0.9,0.95,0.99,0.995,0.999'
+
+
+def top1_variant(model_path):
+    """图内 top-1 输出模型（mnist_tiny_model.onnx -> mnist_tiny_model_top1.onnx）存在时返回其路径，否则返回原路径"""
+    stem, ext = os.path.splitext(model_path)
+    path = f"{stem}_top1{ext}"
+    return path if os.path.exists(path) else model_path
+
+
+class CascadeInferenceMNIST:
+    """
+    两级级联推理：first_stage 分类全部样本，置信度 < threshold 的样本攒批交给 full_model
+    置信度为最大类别的softmax概率（inference_batch_top1，与 postprocess / inference_run_single 一致）
+    """
+
+    def __init__(self, first_stage, full_model, threshold=0.99, escalation_batch_size=64):
+        """
+        Args:
+            first_stage / full_model: 推理引擎（PythonONNXInferenceMNIST），需输入形状和类别数相同
+            threshold: 置信度阈值，0 表示从不升级（只用小模型），大于1 表示全部升级
+            escalation_batch_size: 升级样本攒够该数量后才运行一次完整模型，最后不足一批的部分单独运行
+        """
+        if (first_stage.image_shape != full_model.image_shape
+                or first_stage.num_classes != full_model.num_classes):
+            raise ValueError(f"级联模型不兼容: 输入 {first_stage.image_shape} vs {full_model.image_shape}, "
+                             f"类别数 {first_stage.num_classes} vs {full_model.num_classes}")
+        self.first_stage = first_stage
+        self.full_model = full_model
+        self.threshold = threshold
+        self.escalation_batch_size = escalation_batch_size
+
+    def run(self, images, batch_size=64):
+        """
+        按 batch_size 个样本一批处理 images（每个样本 C*H*W 个值，范围[0,1]）
+
+        Returns:
+            dict: predictions / confidences [N]（升级样本为完整模型的结果）、escalated [N] 布尔掩码、
+                  first_stage_s / full_model_s 两级各自的耗时（秒）
+        """
+        count = len(images)
+        predictions = np.empty(count, dtype=np.int32)
+        confidences = np.empty(count, dtype=np.float32)
+        escalated = np.zeros(count, dtype=bool)
+        pending = []
+        pending_count = 0
+        timings = {'first_stage_s': 0.0, 'full_model_s': 0.0}
+
+        def escalate():
+            indices = np.concatenate(pending)
+            pending.clear()
+            start = time.perf_counter()
+            # 升级样本分散在各批中，按索引收集后一次运行
+            predictions[indices], confidences[indices] = self.full_model.inference_batch_top1(
+                images[indices], batch_size=len(indices))
+            timings['full_model_s'] += time.perf_counter() - start
+            escalated[indices] = True
+
+        for offset in range(0, count, batch_size):
+            start = time.perf_counter()
+            batch_predictions, batch_confidences = self.first_stage.inference_batch_top1(
+                images[offset:offset + batch_size], batch_size=batch_size)
+            timings['first_stage_s'] += time.perf_counter() - start
+
+            end = offset + len(batch_predictions)
+            predictions[offset:end] = batch_predictions
+            confidences[offset:end] = batch_confidences
+            low = np.flatnonzero(batch_confidences < self.threshold) + offset
+            if len(low):
+                pending.append(low)
+                pending_count += len(low)
+            if pending_count >= self.escalation_batch_size:
+                escalate()
+                pending_count = 0
+        if pending:
+            escalate()
+
+        return {'predictions': predictions, 'confidences': confidences, 'escalated': escalated, **timings}
+
+
+def median_run(run, runs):
+    """执行 runs 次 run()，返回 (最后一次结果, 墙钟时间中位数s)"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return result, float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="置信度级联推理（小模型 + 完整MNISTNet）")
+    parser.add_argument('--first-model', default='../models/mnist_tiny_model.onnx',
+                        help='第一级小模型（train_model.py --arch tiny 训练，export_onnx.py --arch tiny 导出）')
+    parser.add_argument('--model', default='../models/mnist_model.onnx', help='完整模型路径')
+    parser.add_argument('--test-data', default='../test_data', help='测试数据目录')
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS, help='置信度阈值，逗号分隔')
+    parser.add_argument('--batch-size', type=int, default=64, help='每批请求的样本数')
+    parser.add_argument('--escalation-batch-size', type=int, default=64, help='升级样本攒批大小')
+    parser.add_argument('--runs', type=int, default=3, help='每个配置的重复次数（取墙钟时间中位数）')
+    parser.add_argument('--model-cache', nargs='?', const='../models/.ort_cache', default=None,
+                        help='启用ORT优化模型缓存')
+    parser.add_argument('--no-top1-head', action='store_true',
+                        help='不使用图内 top-1 输出模型（<模型>_top1.onnx），在主机上由logits计算置信度')
+    parser.add_argument('--output', default='../results/cascade_benchmark.json', help='结果JSON路径')
+    args = parser.parse_args()
+
+    thresholds = [float(t) for t in args.thresholds.split(',') if t.strip()]
+    if not args.no_top1_head:
+        args.first_model = top1_variant(args.first_model)
+        args.model = top1_variant(args.model)
+    for path in (args.first_model, args.model):
+        if not os.path.exists(path):
+            print(f"❌ 找不到模型 {path}")
+            return 1
+
+    first_stage = PythonONNXInferenceMNIST(args.first_model, cache_dir=args.model_cache)
+    full_model = PythonONNXInferenceMNIST(args.model, cache_dir=args.model_cache)
+    try:
+        cascade = CascadeInferenceMNIST(first_stage, full_model, escalation_batch_size=args.escalation_batch_size)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    images, labels, _ = load_mnist_test_data_mmap(args.test_data)
+    # 读入内存，避免首次运行的缺页计入耗时
+    images = np.ascontiguousarray(images)
+    count = len(images)
+    print(f"\n🔍 {count} 个样本，请求批大小 {args.batch_size}，升级攒批大小 {args.escalation_batch_size}")
+
+    # 预热两个会话
+    first_stage.inference_batch(images[:args.batch_size], args.batch_size)
+    full_model.inference_batch(images[:args.batch_size], args.batch_size)
+
+    def single_model(engine):
+        (predictions, _), seconds = median_run(lambda: engine.inference_batch_top1(images, args.batch_size),
+                                               args.runs)
+        return predictions, seconds
+
+    full_predictions, full_seconds = single_model(full_model)
+    tiny_predictions, tiny_seconds = single_model(first_stage)
+
+    def summary(predictions, seconds, escalated_fraction):
+        return {
+            'escalated_fraction': escalated_fraction,
+            'accuracy': float(np.mean(predictions == labels)),
+            'agreement_with_full': float(np.mean(predictions == full_predictions)),
+            'wall_time_s': seconds,
+            'throughput_per_s': count / seconds,
+            'us_per_sample': seconds * 1e6 / count,
+            'speedup_vs_full': full_seconds / seconds,
+        }
+
+    baselines = {
+        'full_only': summary(full_predictions, full_seconds, 1.0),
+        'first_stage_only': summary(tiny_predictions, tiny_seconds, 0.0),
+    }
+
+    print(f"\n{'配置':>14} {'升级比例':>8} {'准确率':>8} {'与完整模型一致':>14} {'吞吐(样本/s)':>13} "
+          f"{'us/样本':>9} {'加速比':>7}")
+    print("-" * 84)
+
+    def print_row(name, r):
+        print(f"{name:>14} {r['escalated_fraction']:>8.2%} {r['accuracy']:>8.2%} {r['agreement_with_full']:>14.2%} "
+              f"{r['throughput_per_s']:>13.0f} {r['us_per_sample']:>9.1f} {r['speedup_vs_full']:>6.2f}x")
+
+    print_row('仅完整模型', baselines['full_only'])
+    print_row('仅小模型', baselines['first_stage_only'])
+
+    levels = []
+    for threshold in thresholds:
+        cascade.threshold = threshold
+        result, seconds = median_run(lambda: cascade.run(images, args.batch_size), args.runs)
+        level = {'threshold': threshold, **summary(result['predictions'], seconds,
+                                                   float(result['escalated'].mean()))}
+        level['first_stage_s'] = result['first_stage_s']
+        level['full_model_s'] = result['full_model_s']
+        levels.append(level)
+        print_row(f"阈值 {threshold:g}", level)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'first_model': args.first_model,
+            'model': args.model,
+            'samples': count,
+            'batch_size': args.batch_size,
+            'escalation_batch_size': args.escalation_batch_size,
+            'runs': args.runs,
+            'baselines': baselines,
+            'levels': levels,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,23 +6,139 @@
 #include <algorithm>
 #include <cmath>
 #include <iomanip>
-#include <map>
 #include <string>
+#include <cstring>
+#include <cstdlib>
+#include <cstdint>
+#include <cstdio>
+#include <functional>
 #include "onnxruntime_c_api.h"
+#include "mnist_index.h"
+#include "model_descriptor.h"
 
 // 平台特定的路径配置
 #ifdef __ANDROID__
     #define MODEL_PATH "/data/local/tmp/mnist_onnx/models/mnist_model.onnx"
     #define RESULTS_PATH "/data/local/tmp/mnist_onnx/results/android_cpp_results.txt"
+    #define RESULTS_NPY_PATH "/data/local/tmp/mnist_onnx/results/android_cpp_results.npy"
     #define TEST_DATA_DIR "/data/local/tmp/mnist_onnx/test_data"
     #define PLATFORM_NAME "Android"
 #else
     #define MODEL_PATH "../models/mnist_model.onnx"
     #define RESULTS_PATH "../results/macos_cpp_results.txt"
+    #define RESULTS_NPY_PATH "../results/macos_cpp_results.npy"
     #define TEST_DATA_DIR "../test_data"
     #define PLATFORM_NAME "macOS"
 #endif
 
+static constexpr size_t kBufferAlignment = 64; // 缓存行对齐，便于编译器生成SIMD代码
+
+// 结果输出粒度：不写文件 / 只写汇总 / 汇总 + 逐样本预测
+enum class OutputLevel { None, Summary, Predictions };
+
+// .npy 结构化结果记录（字段自然对齐，无填充）
+struct ResultRecord {
+    int32_t sample_id;
+    int32_t true_label;
+    int32_t predicted_class;
+    int32_t is_correct;
+    double inference_time_ms;
+};
+static_assert(sizeof(ResultRecord) == 24, "ResultRecord 布局须与 .npy dtype 一致");
+
+// 追踪事件：区间名称为 load / preprocess / run / postprocess / io，时间为单调时钟微秒
+struct TraceEvent {
+    const char* name;
+    int sample_id;       // 批次中第一个样本的索引，与样本无关时为 -1
+    size_t batch_size;
+    double start_us;
+    double duration_us;
+};
+
+// 追踪回调，在区间结束时于推理线程上同步调用
+using TraceCallback = std::function<void(const TraceEvent&)>;
+
+// images.bin 的像素数据：POSIX平台上只读内存映射（按需分页），映射失败时整体读入 fallback
+class TestImages {
+public:
+    TestImages() = default;
+    TestImages(const TestImages&) = delete;
+    TestImages& operator=(const TestImages&) = delete;
+    ~TestImages() { mnist_unmap_file(mapped, mapped_bytes); }
+
+    bool load(const std::string& path) {
+        mapped = mnist_map_file(path.c_str(), &mapped_bytes);
+        if (mapped) {
+            pixels = static_cast<const float*>(mapped);
+            bytes = mapped_bytes;
+            return true;
+        }
+        std::ifstream file(path, std::ios::binary | std::ios::ate);
+        if (!file.is_open()) {
+            return false;
+        }
+        bytes = static_cast<size_t>(file.tellg());
+        fallback.resize(bytes / sizeof(float));
+        file.seekg(0);
+        file.read(reinterpret_cast<char*>(fallback.data()), fallback.size() * sizeof(float));
+        pixels = fallback.data();
+        return static_cast<bool>(file);
+    }
+
+    const float* data() const { return pixels; }
+    size_t size_bytes() const { return bytes; }
+
+private:
+    void* mapped = nullptr;
+    size_t mapped_bytes = 0;
+    std::vector<float> fallback;
+    const float* pixels = nullptr;
+    size_t bytes = 0;
+};
+
+static double nowUs() {
+    return std::chrono::duration<double, std::micro>(
+        std::chrono::steady_clock::now().time_since_epoch()).count();
+}
+
+// 缓存追踪事件并导出为 Chrome trace / Perfetto JSON
+class TraceRecorder {
+public:
+    void record(const TraceEvent& event) {
+        events.push_back(event);
+    }
+
+    bool save(const std::string& path, const std::string& ort_profile, double ort_profile_start_us) const {
+        std::ofstream file(path);
+        if (!file.is_open()) {
+            std::cerr << "❌ 无法创建追踪文件: " << path << std::endl;
+            return false;
+        }
+        
+        // ph=X 表示带持续时间的完整事件，时间单位为微秒
+        file << std::fixed << std::setprecision(3) << "{\"traceEvents\":[\n";
+        for (size_t i = 0; i < events.size(); ++i) {
+            const TraceEvent& e = events[i];
+            file << "{\"name\":\"" << e.name << "\",\"cat\":\"cpp\",\"ph\":\"X\",\"ts\":" << e.start_us
+                 << ",\"dur\":" << e.duration_us << ",\"pid\":1,\"tid\":1,\"args\":{\"sample_id\":"
+                 << e.sample_id << ",\"batch_size\":" << e.batch_size << "}}"
+                 << (i + 1 < events.size() ? "," : "") << "\n";
+        }
+        file << "],\"displayTimeUnit\":\"ms\",\"otherData\":{\"engine\":\"cpp\",\"ort_profile\":\"";
+        for (char c : ort_profile) {
+            if (c == '"' || c == '\\') file << '\\';
+            file << c;
+        }
+        file << "\",\"ort_profile_start_us\":" << ort_profile_start_us << "}}\n";
+        
+        std::cout << "✓ 已导出 " << events.size() << " 个追踪事件到: " << path << std::endl;
+        return true;
+    }
+
+private:
+    std::vector<TraceEvent> events;
+};
+
 class UnifiedONNXInference {
 private:
     const OrtApi* ort_api;
@@ -31,11 +147,37 @@ private:
     OrtSessionOptions* session_options;
     OrtMemoryInfo* memory_info;
     
-    std::vector<const char*> input_names = {"input"};
-    std::vector<const char*> output_names = {"output"};
+    // 模型描述文件（与模型同名的 .json）给出输入形状、类别数、标准化参数与输入输出名称
+    ModelDescriptor descriptor;
+    size_t image_size = 0;   // 单个样本输入元素数 (C*H*W)
+    size_t num_classes = 0;
+    std::vector<const char*> input_names;
+    std::vector<const char*> output_names;
+    // 图内 top-1 输出 (类别, 置信度)（export_onnx.py --top1-head），为空时在主机上对logits做argmax
+    std::vector<const char*> top1_output_names;
     
     bool model_loaded = false;
     std::string model_path;
+    std::string test_data_dir = TEST_DATA_DIR;
+    
+    // 复用的对齐输入缓冲区（按最大批大小增长，不随每次推理分配）
+    float* input_buffer = nullptr;
+    size_t input_capacity = 0;  // 可容纳的图像数
+    std::vector<float> logits_buffer;
+    std::vector<float> probabilities_buffer;
+    
+    // 固定批大小会话（<模型>_b<N>.onnx），按批大小升序；请求按最匹配的会话运行，不足部分补零
+    std::vector<std::pair<size_t, OrtSession*>> static_sessions;
+    std::vector<float> padded_logits;   // 补齐批次的输出，运行后只复制有效行
+    
+    // 追踪与ORT性能分析
+    TraceCallback trace_callback;
+    std::string ort_profile_prefix;
+    double ort_profile_start_us = 0.0;
+    
+    // 结果输出设置
+    OutputLevel output_level = OutputLevel::Predictions;
+    bool npy_results = false;
 
 public:
     UnifiedONNXInference() : ort_api(nullptr), env(nullptr), session(nullptr), 
@@ -48,8 +190,58 @@ public:
         cleanup();
     }
 
-    bool initialize() {
-        model_path = MODEL_PATH;
+    void setTestDataDir(const std::string& dir) {
+        test_data_dir = dir;
+    }
+
+    // npy 为 true 时逐样本结果写入 RESULTS_NPY_PATH，文本文件只保留汇总
+    void setOutputOptions(OutputLevel level, bool npy) {
+        output_level = level;
+        npy_results = npy;
+    }
+
+    // 注册追踪回调，需在 initialize 之前调用才能覆盖模型加载；未注册时热路径不读取时钟
+    void setTraceCallback(TraceCallback callback) {
+        trace_callback = std::move(callback);
+    }
+
+    // 启用ORT算子级性能分析，需在 initialize 之前调用
+    void enableOrtProfiling(const std::string& prefix) {
+        ort_profile_prefix = prefix;
+    }
+
+    double ortProfileStartUs() const {
+        return ort_profile_start_us;
+    }
+
+    // 结束ORT性能分析并返回输出文件路径（未启用时返回空字符串）
+    std::string endOrtProfiling() {
+        if (!session || ort_profile_prefix.empty()) {
+            return "";
+        }
+        OrtAllocator* allocator = nullptr;
+        char* profile_file = nullptr;
+        OrtStatus* status = ort_api->GetAllocatorWithDefaultOptions(&allocator);
+        if (status == nullptr) {
+            status = ort_api->SessionEndProfiling(session, allocator, &profile_file);
+        }
+        if (status != nullptr) {
+            std::cerr << "错误: 结束ORT性能分析失败: " << ort_api->GetErrorMessage(status) << std::endl;
+            ort_api->ReleaseStatus(status);
+            return "";
+        }
+        std::string path = profile_file;
+        (void)ort_api->AllocatorFree(allocator, profile_file);
+        ort_profile_prefix.clear();
+        std::cout << "✓ ORT性能分析已保存到: " << path << std::endl;
+        return path;
+    }
+
+    bool initialize(const std::string& path = MODEL_PATH) {
+        model_path = path;
+        if (!loadDescriptor()) {
+            return false;
+        }
         
         std::cout << "初始化ONNX Runtime C API..." << std::endl;
         
@@ -90,21 +282,112 @@ public:
             return false;
         }
 
+        if (!ort_profile_prefix.empty()) {
+            status = ort_api->EnableProfiling(session_options, ort_profile_prefix.c_str());
+            if (status != nullptr) {
+                std::cerr << "错误: 启用ORT性能分析失败: " << ort_api->GetErrorMessage(status) << std::endl;
+                ort_api->ReleaseStatus(status);
+                return false;
+            }
+            ort_profile_start_us = nowUs();
+        }
+
         // 加载模型
+        double span_start = traceBegin();
         status = ort_api->CreateSession(env, model_path.c_str(), session_options, &session);
         if (status != nullptr) {
             std::cerr << "❌ 推理测试失败: 加载模型失败: " << model_path << std::endl;
             ort_api->ReleaseStatus(status);
             return false;
         }
+        traceEnd("load", -1, 0, span_start);
 
         model_loaded = true;
         std::cout << "✅ 模型加载成功: " << model_path << std::endl;
+        std::cout << "✓ 模型输入: " << descriptor.channels << "x" << descriptor.height << "x"
+                  << descriptor.width << ", 类别数: " << num_classes << std::endl;
+        if (!top1_output_names.empty()) {
+            std::cout << "✓ 图内 top-1 输出: " << top1_output_names[0] << ", " << top1_output_names[1]
+                      << "（批量推理跳过主机端后处理）" << std::endl;
+        }
         
         return true;
     }
 
+    // 读取模型描述文件并按其大小分配输出缓冲区，文件缺失时使用MNIST默认值
+    bool loadDescriptor() {
+        char descriptor_path[1024];
+        model_descriptor_path_for(model_path.c_str(), descriptor_path, sizeof(descriptor_path));
+        int status = model_descriptor_load(descriptor_path, &descriptor);
+        if (status < 0) {
+            std::cerr << "❌ 模型描述文件格式错误: " << descriptor_path << std::endl;
+            return false;
+        }
+        if (status > 0) {
+            std::cout << "⚠️ 未找到模型描述文件 " << descriptor_path << "，使用MNIST默认参数" << std::endl;
+        }
+        image_size = model_descriptor_image_size(&descriptor);
+        num_classes = static_cast<size_t>(descriptor.num_classes);
+        input_names = {descriptor.input_name};
+        output_names = {descriptor.output_name};
+        top1_output_names.clear();
+        if (model_descriptor_has_top1(&descriptor)) {
+            top1_output_names = {descriptor.class_output_name, descriptor.confidence_output_name};
+        }
+        logits_buffer.assign(num_classes, 0.0f);
+        probabilities_buffer.assign(num_classes, 0.0f);
+        return true;
+    }
+
+    size_t numClasses() const {
+        return num_classes;
+    }
+
+    // 固定批大小模型路径：mnist_model.onnx -> mnist_model_b8.onnx
+    static std::string staticModelPath(const std::string& path, size_t batch_size) {
+        size_t dot = path.find_last_of('.');
+        size_t slash = path.find_last_of('/');
+        std::string stem = (dot != std::string::npos && (slash == std::string::npos || dot > slash))
+            ? path.substr(0, dot) : path;
+        std::string ext = stem.size() < path.size() ? path.substr(stem.size()) : ".onnx";
+        return stem + "_b" + std::to_string(batch_size) + ext;
+    }
+
+    // 加载固定批大小模型（export_onnx.py --static-batches 导出），须在 initialize 之后调用，缺失的文件跳过
+    void loadStaticSessions(std::vector<size_t> batch_sizes) {
+        std::sort(batch_sizes.begin(), batch_sizes.end());
+        batch_sizes.erase(std::unique(batch_sizes.begin(), batch_sizes.end()), batch_sizes.end());
+        for (size_t batch_size : batch_sizes) {
+            std::string path = staticModelPath(model_path, batch_size);
+            OrtSession* static_session = nullptr;
+            double span_start = traceBegin();
+            OrtStatus* status = ort_api->CreateSession(env, path.c_str(), session_options, &static_session);
+            if (status != nullptr) {
+                std::cerr << "⚠️ 跳过固定批大小模型 " << path << ": " << ort_api->GetErrorMessage(status) << std::endl;
+                ort_api->ReleaseStatus(status);
+                continue;
+            }
+            traceEnd("load", -1, batch_size, span_start);
+            static_sessions.emplace_back(batch_size, static_session);
+            std::cout << "✓ 固定批大小模型: " << path << std::endl;
+        }
+    }
+
+    // 选择能容纳 count 张图像的最小固定批大小会话，没有时使用动态批会话
+    std::pair<OrtSession*, size_t> selectSession(size_t count) const {
+        for (const auto& entry : static_sessions) {
+            if (entry.first >= count) {
+                return {entry.second, entry.first};
+            }
+        }
+        return {session, count};
+    }
+
     void cleanup() {
+        for (auto& entry : static_sessions) {
+            ort_api->ReleaseSession(entry.second);
+        }
+        static_sessions.clear();
         if (session) {
             ort_api->ReleaseSession(session);
             session = nullptr;
@@ -121,122 +404,146 @@ public:
             ort_api->ReleaseEnv(env);
             env = nullptr;
         }
+        std::free(input_buffer);
+        input_buffer = nullptr;
+        input_capacity = 0;
     }
 
-    // 从metadata.json加载标签映射（与原始android_real_onnx_inference.cpp一致）
-    std::map<int, int> loadLabelsFromMetadata() {
-        std::map<int, int> image_to_label;
+    // 从二进制索引加载测试数据（index.bin + images.bin，格式见 mnist_index.h）
+    bool loadTestIndex(std::vector<int>& labels, std::vector<size_t>& offsets, TestImages& images) {
+        std::string index_path = test_data_dir + "/" + MNIST_INDEX_FILENAME;
+        std::ifstream index_file(index_path, std::ios::binary | std::ios::ate);
+        if (!index_file.is_open()) {
+            std::cerr << "❌ 无法打开索引文件: " << index_path << std::endl;
+            std::cerr << "请先运行 data_loader.py 生成测试数据" << std::endl;
+            return false;
+        }
+        
+        // 一次读取整个索引文件
+        std::vector<char> index_buf(static_cast<size_t>(index_file.tellg()));
+        index_file.seekg(0);
+        index_file.read(index_buf.data(), index_buf.size());
+        index_file.close();
         
-        std::string metadata_path = std::string(TEST_DATA_DIR) + "/metadata.json";
-        std::ifstream metadata_file(metadata_path);
-        if (!metadata_file.is_open()) {
-            std::cerr << "❌ 无法打开元数据文件: " << metadata_path << std::endl;
-            std::cout << "使用默认标签映射..." << std::endl;
-            // 提供前10个样本的后备标签
-            image_to_label[0] = 2; image_to_label[1] = 1; image_to_label[2] = 1; 
-            image_to_label[3] = 1; image_to_label[4] = 2; image_to_label[5] = 6;
-            image_to_label[6] = 3; image_to_label[7] = 8; image_to_label[8] = 2; 
-            image_to_label[9] = 6;
-            return image_to_label;
+        MNISTIndexHeader header;
+        if (index_buf.size() < sizeof(header)) {
+            std::cerr << "❌ 索引文件过小: " << index_path << std::endl;
+            return false;
         }
+        std::memcpy(&header, index_buf.data(), sizeof(header));
         
-        // 简单解析JSON获取标签信息
-        std::string line;
-        std::vector<int> labels;
-        int num_samples = 0;
+        const size_t num_samples = header.num_samples;
+        const size_t expected_size = sizeof(header) + num_samples * (2 * sizeof(int32_t) + sizeof(uint64_t));
+        if (std::memcmp(header.magic, MNIST_INDEX_MAGIC, MNIST_INDEX_MAGIC_SIZE) != 0 ||
+            header.version != MNIST_INDEX_VERSION ||
+            header.rows == 0 || header.cols == 0 ||
+            header.bytes_per_pixel != sizeof(float) ||
+            num_samples == 0 || index_buf.size() < expected_size) {
+            std::cerr << "❌ 索引文件格式错误: " << index_path << std::endl;
+            return false;
+        }
+        if (MNIST_INDEX_SAMPLE_PIXELS(header) != image_size) {
+            std::cerr << "❌ 测试数据样本大小 (" << MNIST_INDEX_SAMPLE_PIXELS(header)
+                      << ") 与模型输入 (" << image_size << ") 不一致" << std::endl;
+            return false;
+        }
         
-        while (std::getline(metadata_file, line)) {
-            // 获取样本数量
-            size_t pos = line.find("\"num_samples\":");
-            if (pos != std::string::npos) {
-                pos += 14;
-                while (pos < line.length() && (line[pos] == ' ' || line[pos] == '"')) pos++;
-                size_t end_pos = line.find(',', pos);
-                if (end_pos == std::string::npos) end_pos = line.find('}', pos);
-                num_samples = std::stoi(line.substr(pos, end_pos - pos));
-            }
-            
-            // 获取标签
-            pos = line.find("\"true_label\":");
-            if (pos != std::string::npos) {
-                pos += 13;
-                while (pos < line.length() && (line[pos] == ' ' || line[pos] == '"')) pos++;
-                size_t end_pos = line.find(',', pos);
-                int label = std::stoi(line.substr(pos, end_pos - pos));
-                labels.push_back(label);
-            }
+        const char* cursor = index_buf.data() + sizeof(header);
+        std::vector<int32_t> raw_labels(num_samples);
+        std::memcpy(raw_labels.data(), cursor, num_samples * sizeof(int32_t));
+        cursor += 2 * num_samples * sizeof(int32_t);  // 跳过原始MNIST索引
+        std::vector<uint64_t> raw_offsets(num_samples);
+        std::memcpy(raw_offsets.data(), cursor, num_samples * sizeof(uint64_t));
+        
+        // 图像数据只读内存映射（数百万样本也不必整体读入内存），映射失败时整体读取
+        std::string images_path = test_data_dir + "/" + MNIST_IMAGES_FILENAME;
+        if (!images.load(images_path)) {
+            std::cerr << "❌ 无法读取图像文件: " << images_path << std::endl;
+            return false;
         }
-        metadata_file.close();
+        size_t images_bytes = images.size_bytes();
         
-        // 构建样本索引到标签的映射
-        for (int i = 0; i < std::min(num_samples, (int)labels.size()); ++i) {
-            image_to_label[i] = labels[i];
+        labels.assign(raw_labels.begin(), raw_labels.end());
+        offsets.resize(num_samples);
+        for (size_t i = 0; i < num_samples; ++i) {
+            if (raw_offsets[i] % sizeof(float) != 0 || raw_offsets[i] + image_size * sizeof(float) > images_bytes) {
+                std::cerr << "❌ 样本 " << i << " 偏移越界: " << raw_offsets[i] << std::endl;
+                return false;
+            }
+            offsets[i] = static_cast<size_t>(raw_offsets[i] / sizeof(float));
         }
         
-        std::cout << "✓ 已从metadata.json加载 " << image_to_label.size() << " 个样本的标签信息" << std::endl;
-        return image_to_label;
+        std::cout << "✓ 已从" << MNIST_INDEX_FILENAME << "加载 " << num_samples << " 个样本" << std::endl;
+        return true;
     }
 
-    // 加载真实测试数据（与原始版本逻辑一致）
-    std::vector<float> loadTestData(const std::string& filename, int& expected_label) {
-        std::ifstream file(filename, std::ios::binary);
-        if (!file.is_open()) {
-            std::cerr << "警告: 无法打开测试数据文件: " << filename << std::endl;
-            std::cout << "使用随机测试数据..." << std::endl;
-            expected_label = 7; // 随机标签
-            
-            // 生成随机测试数据
-            std::vector<float> data(784);
-            for (int i = 0; i < 784; i++) {
-                data[i] = static_cast<float>(rand()) / static_cast<float>(RAND_MAX);
-            }
-            return data;
+    // 预处理 count 张图像到复用的对齐输入缓冲区（run_size > count 时补零）并包装为输入张量，失败返回nullptr
+    OrtValue* prepareInput(const float* const* images, size_t count, size_t run_size, int first_sample) {
+        if (!reserveInput(run_size)) {
+            std::cerr << "错误: 输入缓冲区分配失败" << std::endl;
+            return nullptr;
         }
+        double span_start = traceBegin();
+        for (size_t i = 0; i < count; ++i) {
+            normalizeInto(images[i], input_buffer + i * image_size);
+        }
+        if (run_size > count) {
+            std::fill(input_buffer + count * image_size, input_buffer + run_size * image_size, 0.0f);
+        }
+        traceEnd("preprocess", first_sample, count, span_start);
 
-        // 读取图像数据（与原始版本一致）
-        std::vector<float> data(784);
-        file.read(reinterpret_cast<char*>(data.data()), 784 * sizeof(float));
-        file.close();
-
-        std::cout << "✓ 加载测试数据: " << filename << std::endl;
-        return data;
+        int64_t input_shape[] = {static_cast<int64_t>(run_size), descriptor.channels,
+                                 descriptor.height, descriptor.width};
+        OrtValue* input_tensor = nullptr;
+        OrtStatus* status = ort_api->CreateTensorWithDataAsOrtValue(
+            memory_info, input_buffer, run_size * image_size * sizeof(float),
+            input_shape, 4, ONNX_TENSOR_ELEMENT_DATA_TYPE_FLOAT, &input_tensor);
+        if (status != nullptr) {
+            std::cerr << "错误: 创建张量失败: " << ort_api->GetErrorMessage(status) << std::endl;
+            ort_api->ReleaseStatus(status);
+            return nullptr;
+        }
+        return input_tensor;
     }
 
-    std::pair<int, double> runInference(const std::vector<float>& input_data) {
+    // 批量前向计算：images[i] 指向第i张 CxHxW 图像（范围[0,1]），
+    // 预处理直接写入复用的对齐缓冲区，logits_out 为调用者提供的 [count, 类别数] 存储，ORT直接写入
+    bool computeLogits(const float* const* images, size_t count, float* logits_out, int first_sample = -1) {
         if (!model_loaded) {
             std::cerr << "错误: 模型未加载" << std::endl;
-            return {-1, 0.0};
+            return false;
         }
+        if (count == 0) {
+            return true;
+        }
+        // 固定批大小会话的批可能大于 count，多出的输入补零，输出写入 padded_logits
+        auto [run_session, run_size] = selectSession(count);
+        OrtValue* input_tensor = prepareInput(images, count, run_size, first_sample);
+        if (!input_tensor) {
+            return false;
+        }
+        if (run_size > count) {
+            padded_logits.resize(run_size * num_classes);
+        }
+        float* run_logits = run_size > count ? padded_logits.data() : logits_out;
 
-        auto start_time = std::chrono::high_resolution_clock::now();
-
-        // 添加预处理步骤（与原始版本保持一致）
-        auto processed_data = preprocess(input_data);
-
-        // 创建输入张量
-        std::vector<int64_t> input_shape = {1, 1, 28, 28};
-        OrtValue* input_tensor = nullptr;
-        
+        // 输入输出张量只包装已有内存，不复制数据
+        int64_t output_shape[] = {static_cast<int64_t>(run_size), static_cast<int64_t>(num_classes)};
+        OrtValue* output_tensor = nullptr;
         OrtStatus* status = ort_api->CreateTensorWithDataAsOrtValue(
-            memory_info,
-            const_cast<float*>(processed_data.data()),
-            processed_data.size() * sizeof(float),
-            input_shape.data(),
-            input_shape.size(),
-            ONNX_TENSOR_ELEMENT_DATA_TYPE_FLOAT,
-            &input_tensor
-        );
-
+            memory_info, run_logits, run_size * num_classes * sizeof(float),
+            output_shape, 2, ONNX_TENSOR_ELEMENT_DATA_TYPE_FLOAT, &output_tensor);
         if (status != nullptr) {
-            std::cerr << "错误: 创建输入张量失败: " << ort_api->GetErrorMessage(status) << std::endl;
+            std::cerr << "错误: 创建张量失败: " << ort_api->GetErrorMessage(status) << std::endl;
             ort_api->ReleaseStatus(status);
-            return {-1, 0.0};
+            ort_api->ReleaseValue(input_tensor);
+            return false;
         }
 
-        // 运行推理
-        OrtValue* output_tensor = nullptr;
+        // 运行推理（输出写入预分配的 logits_out）
+        double span_start = traceBegin();
         status = ort_api->Run(
-            session,
+            run_session,
             nullptr,  // RunOptions
             input_names.data(),
             (const OrtValue* const*)&input_tensor,
@@ -246,45 +553,153 @@ public:
             &output_tensor
         );
 
+        traceEnd("run", first_sample, count, span_start);
+        ort_api->ReleaseValue(input_tensor);
+        ort_api->ReleaseValue(output_tensor);
+
         if (status != nullptr) {
             std::cerr << "错误: 推理执行失败: " << ort_api->GetErrorMessage(status) << std::endl;
             ort_api->ReleaseStatus(status);
-            ort_api->ReleaseValue(input_tensor);
-            return {-1, 0.0};
+            return false;
+        }
+        if (run_logits != logits_out) {
+            std::copy(run_logits, run_logits + count * num_classes, logits_out);
+        }
+
+        return true;
+    }
+
+    // 批量前向计算（图内 top-1 输出）：只取类别输出，ORT直接写入 predictions_out，
+    // 不复制logits、不在主机上做argmax（批量结果只记录类别，不取置信度输出）；
+    // 固定批大小模型不含 top-1 输出，始终使用动态批会话
+    bool computeTop1(const float* const* images, size_t count, int* predictions_out, int first_sample = -1) {
+        static_assert(sizeof(int) == sizeof(int32_t), "类别输出为 int32");
+        if (!model_loaded) {
+            std::cerr << "错误: 模型未加载" << std::endl;
+            return false;
+        }
+        if (count == 0) {
+            return true;
+        }
+        OrtValue* input_tensor = prepareInput(images, count, count, first_sample);
+        if (!input_tensor) {
+            return false;
+        }
+
+        int64_t output_shape[] = {static_cast<int64_t>(count)};
+        OrtValue* output_tensor = nullptr;
+        OrtStatus* status = ort_api->CreateTensorWithDataAsOrtValue(
+            memory_info, predictions_out, count * sizeof(int32_t),
+            output_shape, 1, ONNX_TENSOR_ELEMENT_DATA_TYPE_INT32, &output_tensor);
+        if (status == nullptr) {
+            double span_start = traceBegin();
+            status = ort_api->Run(session, nullptr, input_names.data(), (const OrtValue* const*)&input_tensor, 1,
+                                  top1_output_names.data(), 1, &output_tensor);
+            traceEnd("run", first_sample, count, span_start);
         }
+        ort_api->ReleaseValue(input_tensor);
+        if (output_tensor) ort_api->ReleaseValue(output_tensor);
 
-        // 获取输出数据
-        float* output_data;
-        status = ort_api->GetTensorMutableData(output_tensor, (void**)&output_data);
         if (status != nullptr) {
-            std::cerr << "错误: 获取输出数据失败: " << ort_api->GetErrorMessage(status) << std::endl;
+            std::cerr << "错误: 推理执行失败: " << ort_api->GetErrorMessage(status) << std::endl;
             ort_api->ReleaseStatus(status);
-            ort_api->ReleaseValue(input_tensor);
-            ort_api->ReleaseValue(output_tensor);
+            return false;
+        }
+        return true;
+    }
+
+    // 单张图像推理，probabilities_out 可为nullptr（否则写入 num_classes 个类别概率）
+    std::pair<int, double> runInference(const float* image, float* probabilities_out = nullptr,
+                                        int sample_id = -1) {
+        auto start_time = std::chrono::high_resolution_clock::now();
+
+        if (!computeLogits(&image, 1, logits_buffer.data(), sample_id)) {
             return {-1, 0.0};
         }
 
-        // 复制输出数据并应用softmax（与原始版本保持一致）
-        std::vector<float> logits(output_data, output_data + 10);  // MNIST有10个类别
-        std::vector<float> probabilities = softmax(logits);
-        
-        // 找到预测类别
-        auto max_it = std::max_element(probabilities.begin(), probabilities.end());
-        int predicted_class = std::distance(probabilities.begin(), max_it);
-        float max_prob = *max_it;
+        // 应用softmax（与原始版本保持一致）
+        double span_start = traceBegin();
+        float* probabilities = probabilities_out ? probabilities_out : probabilities_buffer.data();
+        softmaxInto(logits_buffer.data(), probabilities, num_classes);
+        int predicted_class = static_cast<int>(
+            std::max_element(probabilities, probabilities + num_classes) - probabilities);
+        traceEnd("postprocess", sample_id, 1, span_start);
 
         auto end_time = std::chrono::high_resolution_clock::now();
-        auto duration = std::chrono::duration_cast<std::chrono::microseconds>(end_time - start_time);
-        double inference_time_ms = duration.count() / 1000.0;
-
-        // 清理资源
-        ort_api->ReleaseValue(input_tensor);
-        ort_api->ReleaseValue(output_tensor);
+        double inference_time_ms = std::chrono::duration<double, std::milli>(end_time - start_time).count();
 
         return {predicted_class, inference_time_ms};
     }
 
-    void runTests() {
+    // 批量推理：一次Run处理 count 张图像，预测类别写入 predictions_out，
+    // logits_out 为 [count, 类别数] 的调用者存储（模型带图内 top-1 输出时不写入）；返回本批耗时（毫秒），失败返回负数
+    double runBatch(const float* const* images, size_t count, float* logits_out, int* predictions_out,
+                    int first_sample = -1) {
+        auto start_time = std::chrono::high_resolution_clock::now();
+
+        if (!top1_output_names.empty()) {
+            if (!computeTop1(images, count, predictions_out, first_sample)) {
+                return -1.0;
+            }
+            auto end_time = std::chrono::high_resolution_clock::now();
+            return std::chrono::duration<double, std::milli>(end_time - start_time).count();
+        }
+        if (!computeLogits(images, count, logits_out, first_sample)) {
+            return -1.0;
+        }
+        double span_start = traceBegin();
+        for (size_t i = 0; i < count; ++i) {
+            const float* row = logits_out + i * num_classes;
+            predictions_out[i] = static_cast<int>(std::max_element(row, row + num_classes) - row);
+        }
+        traceEnd("postprocess", first_sample, count, span_start);
+
+        auto end_time = std::chrono::high_resolution_clock::now();
+        return std::chrono::duration<double, std::milli>(end_time - start_time).count();
+    }
+
+    // 对全部测试样本推理，将logits以 float32 [N, 类别数] 写入二进制文件（数值一致性检查用）
+    bool dumpLogits(const std::string& output_path, size_t batch_size) {
+        std::vector<int> labels;
+        std::vector<size_t> offsets;
+        TestImages images;
+        double span_start = traceBegin();
+        bool loaded = loadTestIndex(labels, offsets, images);
+        traceEnd("io", -1, 0, span_start);
+        if (!loaded) {
+            return false;
+        }
+
+        std::ofstream file(output_path, std::ios::binary);
+        if (!file.is_open()) {
+            std::cerr << "❌ 无法创建logits文件: " << output_path << std::endl;
+            return false;
+        }
+
+        std::vector<const float*> image_ptrs = imagePointers(images, offsets);
+        std::vector<float> logits(batch_size * num_classes);
+        for (size_t start = 0; start < image_ptrs.size(); start += batch_size) {
+            size_t count = std::min(batch_size, image_ptrs.size() - start);
+            if (!computeLogits(image_ptrs.data() + start, count, logits.data(), static_cast<int>(start))) {
+                std::cerr << "❌ 样本 " << start << " 起的批次推理失败" << std::endl;
+                return false;
+            }
+            double span_start = traceBegin();
+            file.write(reinterpret_cast<const char*>(logits.data()), count * num_classes * sizeof(float));
+            traceEnd("io", static_cast<int>(start), count, span_start);
+        }
+
+        if (!file) {
+            std::cerr << "❌ 写入logits文件失败: " << output_path << std::endl;
+            return false;
+        }
+        std::cout << "✓ 已导出 " << offsets.size() << " 个样本的logits到: " << output_path << std::endl;
+        return true;
+    }
+
+    // batch_size > 1 时每次Run处理一批图像，单样本时间按批耗时均摊；
+    // timings_path 非空时将每个样本的推理时间 (float64 ms) 写入二进制文件
+    void runTests(size_t batch_size = 1, const std::string& timings_path = "") {
         if (!model_loaded) {
             std::cerr << "错误: 模型未加载，无法运行测试" << std::endl;
             return;
@@ -292,48 +707,61 @@ public:
 
         std::cout << "加载" << PLATFORM_NAME << "测试数据..." << std::endl;
 
-        // 加载正确的标签信息
-        auto label_map = loadLabelsFromMetadata();
+        // 加载二进制索引和打包图像
+        std::vector<int> labels;
+        std::vector<size_t> offsets;
+        TestImages images;
+        double load_start = traceBegin();
+        bool loaded = loadTestIndex(labels, offsets, images);
+        traceEnd("io", -1, 0, load_start);
+        if (!loaded) {
+            return;
+        }
         
-        std::vector<std::string> test_files;
         std::vector<std::pair<int, double>> results;
         int correct_predictions = 0;
         double total_time = 0.0;
 
-        // 测试所有样本（与原始版本完全一致）
-        int num_samples = label_map.size();
+        int num_samples = labels.size();
         std::cout << "✓ 加载 " << num_samples << " 个" << PLATFORM_NAME << "测试样本" << std::endl;
         std::cout << "\n=== 开始 " << PLATFORM_NAME << " 统一推理测试 ===" << std::endl;
-        std::cout << "开始推理 " << num_samples << " 个样本..." << std::endl;
+        std::cout << "开始推理 " << num_samples << " 个样本 (批大小: " << batch_size << ")..." << std::endl;
         
-        for (int idx = 0; idx < num_samples; ++idx) {
-            std::string filename = std::string(TEST_DATA_DIR) + "/image_" + 
-                                 std::string(3 - std::to_string(idx).length(), '0') + 
-                                 std::to_string(idx) + ".bin";
-            int expected_label;
-            auto input_data = loadTestData(filename, expected_label);
-            
-            // 使用正确的标签
-            if (label_map.find(idx) != label_map.end()) {
-                expected_label = label_map[idx];
+        // 图像直接从打包缓冲区按指针读取，循环内不再分配内存
+        std::vector<const float*> image_ptrs = imagePointers(images, offsets);
+        std::vector<float> batch_logits(batch_size * num_classes);
+        std::vector<int> batch_predictions(batch_size);
+        results.reserve(num_samples);
+        // 进度输出间隔：每10个样本，样本数多时约每10%
+        const int progress_every = std::max(10, num_samples / 10);
+        
+        for (size_t start = 0; start < image_ptrs.size(); start += batch_size) {
+            size_t count = std::min(batch_size, image_ptrs.size() - start);
+            double batch_time;
+            if (count == 1) {
+                auto result = runInference(image_ptrs[start], nullptr, static_cast<int>(start));
+                batch_predictions[0] = result.first;
+                batch_time = result.first >= 0 ? result.second : -1.0;
             } else {
-                std::cerr << "警告: 找不到样本 " << idx << " 的标签信息" << std::endl;
+                batch_time = runBatch(image_ptrs.data() + start, count, batch_logits.data(),
+                                      batch_predictions.data(), static_cast<int>(start));
+            }
+            if (batch_time < 0) {
                 continue;
             }
             
-            auto result = runInference(input_data);
-            int predicted_class = result.first;
-            double inference_time = result.second;
-            
-            if (predicted_class >= 0) {
-                results.push_back(result);
+            double inference_time = batch_time / count;
+            for (size_t i = 0; i < count; ++i) {
+                int idx = static_cast<int>(start + i);
+                int predicted_class = batch_predictions[i];
+                results.push_back({predicted_class, inference_time});
                 total_time += inference_time;
                 
-                bool correct = (predicted_class == expected_label);
+                bool correct = (predicted_class == labels[idx]);
                 if (correct) correct_predictions++;
                 
-                // 显示进度（每10个样本）
-                if ((idx + 1) % 10 == 0) {
+                // 显示进度
+                if ((idx + 1) % progress_every == 0) {
                     double current_accuracy = (double)correct_predictions / (idx + 1) * 100;
                     std::cout << "完成 " << std::setw(3) << (idx+1) << "/" << num_samples 
                               << " 样本，当前准确率: " << std::fixed << std::setprecision(1) 
@@ -360,17 +788,15 @@ public:
                 std::cout << "\n❌ 错误预测样本 (" << wrong_count << " 个):" << std::endl;
                 int shown = 0;
                 for (int idx = 0; idx < results.size() && shown < 5; ++idx) {
-                    if (label_map.find(idx) != label_map.end()) {
-                        int expected_label = label_map[idx];
-                        int predicted_class = results[idx].first;
-                        if (predicted_class != expected_label) {
-                            double inference_time = results[idx].second;
-                            std::cout << "  样本 " << std::setw(3) << idx 
-                                      << ": 真实=" << expected_label
-                                      << ", 预测=" << predicted_class
-                                      << ", 时间=" << std::setprecision(2) << inference_time << " ms" << std::endl;
-                            shown++;
-                        }
+                    int expected_label = labels[idx];
+                    int predicted_class = results[idx].first;
+                    if (predicted_class != expected_label) {
+                        double inference_time = results[idx].second;
+                        std::cout << "  样本 " << std::setw(3) << idx 
+                                  << ": 真实=" << expected_label
+                                  << ", 预测=" << predicted_class
+                                  << ", 时间=" << std::setprecision(2) << inference_time << " ms" << std::endl;
+                        shown++;
                     }
                 }
                 if (wrong_count > 5) {
@@ -379,7 +805,12 @@ public:
             }
             
             // 保存结果到文件
-            saveResults(results, label_map, accuracy, avg_time, fps);
+            double span_start = traceBegin();
+            saveResults(results, labels, accuracy, avg_time, fps);
+            if (!timings_path.empty()) {
+                saveTimings(results, timings_path);
+            }
+            traceEnd("io", -1, 0, span_start);
         } else {
             std::cout << "没有成功的推理结果" << std::endl;
         }
@@ -388,89 +819,299 @@ public:
     }
 
 private:
-    // 添加预处理函数（与原始版本保持一致）
-    std::vector<float> preprocess(const std::vector<float>& raw_data) {
-        std::vector<float> processed = raw_data;
-        
-        // MNIST标准化参数（与原始版本保持一致）
-        const float mean = 0.1307f;
-        const float std = 0.3081f;
-        
-        // 标准化: (pixel - mean) / std
-        for (auto& pixel : processed) {
-            pixel = (pixel - mean) / std;
+    // 追踪区间起点，未注册回调时不读取时钟
+    double traceBegin() const {
+        return trace_callback ? nowUs() : 0.0;
+    }
+
+    // 追踪区间终点，向回调发送事件
+    void traceEnd(const char* name, int sample_id, size_t batch_size, double start_us) const {
+        if (trace_callback) {
+            trace_callback({name, sample_id, batch_size, start_us, nowUs() - start_us});
         }
-        
-        return processed;
     }
 
-    // 添加softmax函数（与原始版本保持一致）
-    std::vector<float> softmax(const std::vector<float>& logits) {
-        std::vector<float> probabilities(logits.size());
-        float max_logit = *std::max_element(logits.begin(), logits.end());
+    // 确保对齐输入缓冲区至少能容纳 count 张图像
+    bool reserveInput(size_t count) {
+        if (count <= input_capacity) {
+            return true;
+        }
+        // posix_memalign 而非 std::aligned_alloc：后者在 Android bionic 中 API 28 起才提供（本项目最低 API 21）
+        void* buffer = nullptr;
+        if (posix_memalign(&buffer, kBufferAlignment, count * image_size * sizeof(float)) != 0) {
+            return false;
+        }
+        std::free(input_buffer);
+        input_buffer = static_cast<float*>(buffer);
+        input_capacity = count;
+        return true;
+    }
+
+    // 按通道标准化: (pixel - mean[c]) / std[c]，保持与Python/C版本逐位一致的运算顺序
+    void normalizeInto(const float* src, float* dst) const {
+        const size_t plane = static_cast<size_t>(descriptor.height) * descriptor.width;
+        for (int c = 0; c < descriptor.channels; ++c) {
+            normalizePlane(src + c * plane, dst + c * plane, plane, descriptor.mean[c], descriptor.std[c]);
+        }
+    }
+
+    // 无别名的连续循环可被编译器自动向量化
+    static void normalizePlane(const float* __restrict src, float* __restrict dst, size_t size,
+                               const float mean, const float std) {
+        for (size_t i = 0; i < size; ++i) {
+            dst[i] = (src[i] - mean) / std;
+        }
+    }
+
+    // softmax写入调用者提供的存储（与原始版本保持一致）
+    static void softmaxInto(const float* logits, float* probabilities, size_t size) {
+        float max_logit = *std::max_element(logits, logits + size);
         
         float sum = 0.0f;
-        for (size_t i = 0; i < logits.size(); ++i) {
+        for (size_t i = 0; i < size; ++i) {
             probabilities[i] = std::exp(logits[i] - max_logit);
             sum += probabilities[i];
         }
         
-        for (auto& prob : probabilities) {
-            prob /= sum;
+        for (size_t i = 0; i < size; ++i) {
+            probabilities[i] /= sum;
         }
-        
-        return probabilities;
+    }
+
+    // 打包图像缓冲区中每个样本的起始指针
+    static std::vector<const float*> imagePointers(const TestImages& images,
+                                                   const std::vector<size_t>& offsets) {
+        std::vector<const float*> pointers(offsets.size());
+        for (size_t i = 0; i < offsets.size(); ++i) {
+            pointers[i] = images.data() + offsets[i];
+        }
+        return pointers;
+    }
+
+    void saveTimings(const std::vector<std::pair<int, double>>& results, const std::string& path) {
+        std::ofstream file(path, std::ios::binary);
+        if (!file.is_open()) {
+            std::cerr << "❌ 无法创建计时文件: " << path << std::endl;
+            return;
+        }
+        for (const auto& result : results) {
+            file.write(reinterpret_cast<const char*>(&result.second), sizeof(double));
+        }
+        std::cout << "✓ 计时数据已保存到 " << path << std::endl;
     }
 
     void saveResults(const std::vector<std::pair<int, double>>& results, 
-                    const std::map<int, int>& label_map,
+                    const std::vector<int>& labels,
                     double accuracy, double avg_time, double fps) {
-        std::ofstream file(RESULTS_PATH);
-        if (file.is_open()) {
-            file << PLATFORM_NAME << " 统一 ONNX Runtime C++ 推理结果\n";
-            file << "==========================================\n";
-            file << "平台: " << PLATFORM_NAME << "\n";
-            file << "总样本数: " << results.size() << "\n";
-            file << "准确率: " << std::fixed << std::setprecision(2) << accuracy << "%\n";
-            file << "平均推理时间: " << std::fixed << std::setprecision(2) << avg_time << " ms\n";
-            file << "推理速度: " << std::fixed << std::setprecision(1) << fps << " FPS\n\n";
-            
-            file << "样本详细结果:\n";
-            for (int idx = 0; idx < results.size(); ++idx) {
-                if (label_map.find(idx) != label_map.end()) {
-                    int expected_label = label_map.at(idx);
-                    int predicted_class = results[idx].first;
-                    double inference_time = results[idx].second;
-                    bool correct = (predicted_class == expected_label);
-                    
-                    file << "样本 " << std::setw(3) << idx 
-                         << ": 真实=" << expected_label
-                         << ", 预测=" << predicted_class
-                         << ", 置信度=" << std::setprecision(3) << "N/A"  // 在此版本中不保存置信度
-                         << ", 时间=" << std::setprecision(2) << inference_time << " ms, "
-                         << (correct ? "正确" : "错误") << "\n";
-                }
+        if (output_level == OutputLevel::None) {
+            return;
+        }
+        bool text_details = output_level == OutputLevel::Predictions && !npy_results;
+        
+        // 整个文件先格式化到内存，再一次写出
+        std::string content;
+        content.reserve(256 + (text_details ? results.size() * 96 : 0));
+        char line[160];
+        snprintf(line, sizeof(line), "%s 统一 ONNX Runtime C++ 推理结果\n", PLATFORM_NAME);
+        content += line;
+        content += "==========================================\n";
+        snprintf(line, sizeof(line), "平台: %s\n总样本数: %zu\n", PLATFORM_NAME, results.size());
+        content += line;
+        snprintf(line, sizeof(line), "准确率: %.2f%%\n平均推理时间: %.2f ms\n推理速度: %.1f FPS\n\n",
+                 accuracy, avg_time, fps);
+        content += line;
+        
+        if (text_details) {
+            content += "样本详细结果:\n";
+            for (size_t idx = 0; idx < results.size(); ++idx) {
+                int expected_label = labels[idx];
+                int predicted_class = results[idx].first;
+                int length = snprintf(line, sizeof(line),
+                                      "样本 %3zu: 真实=%d, 预测=%d, 置信度=N/A, 时间=%.2f ms, %s\n",  // 在此版本中不保存置信度
+                                      idx, expected_label, predicted_class, results[idx].second,
+                                      predicted_class == expected_label ? "正确" : "错误");
+                content.append(line, static_cast<size_t>(length));
             }
-            
-            file.close();
-            std::cout << "✓ 结果已保存到 " << RESULTS_PATH << std::endl;
+        }
+        
+        std::ofstream file(RESULTS_PATH, std::ios::binary);
+        if (!file.is_open()) {
+            std::cerr << "警告: 无法打开结果文件进行写入: " << RESULTS_PATH << std::endl;
+            return;
+        }
+        file.write(content.data(), static_cast<std::streamsize>(content.size()));
+        file.close();
+        std::cout << "✓ 结果已保存到 " << RESULTS_PATH << std::endl;
+        
+        if (output_level == OutputLevel::Predictions && npy_results) {
+            saveResultsNpy(results, labels, RESULTS_NPY_PATH);
         }
     }
+
+    // 以NumPy .npy 结构化数组保存逐样本结果
+    void saveResultsNpy(const std::vector<std::pair<int, double>>& results,
+                        const std::vector<int>& labels, const std::string& path) {
+        std::vector<ResultRecord> records(results.size());
+        for (size_t idx = 0; idx < results.size(); ++idx) {
+            records[idx] = {static_cast<int32_t>(idx), labels[idx], results[idx].first,
+                            results[idx].first == labels[idx] ? 1 : 0, results[idx].second};
+        }
+        
+        const uint16_t probe = 1;
+        const char endian = *reinterpret_cast<const uint8_t*>(&probe) ? '<' : '>';
+        std::string header = std::string("{'descr': [('sample_id', '") + endian + "i4'), ('true_label', '" +
+                             endian + "i4'), ('predicted_class', '" + endian + "i4'), ('is_correct', '" +
+                             endian + "i4'), ('inference_time_ms', '" + endian + "f8')], " +
+                             "'fortran_order': False, 'shape': (" + std::to_string(records.size()) + ",), }";
+        // NPY 1.0: 魔数 + 版本 + 头长度(uint16 LE) + 字典头，总长度按64字节对齐并以换行结尾
+        size_t total = 10 + header.size() + 1;
+        header.append((total + 63) / 64 * 64 - total, ' ');
+        header += '\n';
+        const uint16_t header_length = static_cast<uint16_t>(header.size());
+        const char preamble[10] = {'\x93', 'N', 'U', 'M', 'P', 'Y', 1, 0,
+                                   static_cast<char>(header_length & 0xff),
+                                   static_cast<char>(header_length >> 8)};
+        
+        std::ofstream file(path, std::ios::binary);
+        if (!file.is_open()) {
+            std::cerr << "警告: 无法打开结果文件进行写入: " << path << std::endl;
+            return;
+        }
+        file.write(preamble, sizeof(preamble));
+        file.write(header.data(), static_cast<std::streamsize>(header.size()));
+        file.write(reinterpret_cast<const char*>(records.data()),
+                   static_cast<std::streamsize>(records.size() * sizeof(ResultRecord)));
+        std::cout << "✓ 逐样本结果已保存到 " << path << std::endl;
+    }
 };
 
-int main() {
+static void printUsage(const char* program) {
+    std::cout << "用法: " << program << " [--model 模型路径] [--test-data 目录] [--batch-size N] [--dump-logits 输出文件] [--timings 输出文件]"
+              << " [--trace 输出文件] [--ort-profile 前缀]"
+              << " [--output-level none|summary|predictions] [--results-format text|npy]"
+              << " [--static-batches 1,8,32,128]" << std::endl;
+    std::cout << "  --model PATH        ONNX模型路径（默认: " << MODEL_PATH << "）" << std::endl;
+    std::cout << "  --test-data DIR     测试数据目录（默认: " << TEST_DATA_DIR << "）" << std::endl;
+    std::cout << "  --batch-size N      每次Run处理的图像数（默认: 1）" << std::endl;
+    std::cout << "  --dump-logits FILE  只导出全部样本的logits (float32 [N,类别数])，用于数值一致性检查" << std::endl;
+    std::cout << "  --timings FILE      保存每个样本的推理时间 (float64 ms)，用于基准测试" << std::endl;
+    std::cout << "  --trace FILE        导出加载/预处理/推理/后处理/IO区间为 Chrome trace JSON" << std::endl;
+    std::cout << "  --ort-profile PFX   启用ONNX Runtime算子级性能分析，输出 PFX_<时间>.json" << std::endl;
+    std::cout << "  --output-level L    结果输出粒度（默认: predictions）" << std::endl;
+    std::cout << "  --results-format F  逐样本结果格式: text (" << RESULTS_PATH << ") 或 npy ("
+              << RESULTS_NPY_PATH << ")" << std::endl;
+    std::cout << "  --static-batches L  加载固定批大小模型 <模型>_b<N>.onnx，每批选用能容纳它的最小模型，"
+              << "最后不足一批补零" << std::endl;
+}
+
+int main(int argc, char** argv) {
+    std::string model_path = MODEL_PATH;
+    std::string test_data_dir = TEST_DATA_DIR;
+    std::string dump_logits_path;
+    size_t batch_size = 1;
+    std::string timings_path;
+    OutputLevel output_level = OutputLevel::Predictions;
+    bool npy_results = false;
+    std::string trace_path;
+    std::string ort_profile_prefix;
+    std::vector<size_t> static_batches;
+    
+    for (int i = 1; i < argc; ++i) {
+        std::string arg = argv[i];
+        if (arg == "--model" && i + 1 < argc) {
+            model_path = argv[++i];
+        } else if (arg == "--test-data" && i + 1 < argc) {
+            test_data_dir = argv[++i];
+        } else if (arg == "--batch-size" && i + 1 < argc) {
+            long value = std::strtol(argv[++i], nullptr, 10);
+            if (value <= 0) {
+                std::cerr << "错误: 批大小必须为正整数" << std::endl;
+                return -1;
+            }
+            batch_size = static_cast<size_t>(value);
+        } else if (arg == "--timings" && i + 1 < argc) {
+            timings_path = argv[++i];
+        } else if (arg == "--trace" && i + 1 < argc) {
+            trace_path = argv[++i];
+        } else if (arg == "--ort-profile" && i + 1 < argc) {
+            ort_profile_prefix = argv[++i];
+        } else if (arg == "--output-level" && i + 1 < argc) {
+            std::string level = argv[++i];
+            if (level == "none") {
+                output_level = OutputLevel::None;
+            } else if (level == "summary") {
+                output_level = OutputLevel::Summary;
+            } else if (level == "predictions") {
+                output_level = OutputLevel::Predictions;
+            } else {
+                printUsage(argv[0]);
+                return -1;
+            }
+        } else if (arg == "--results-format" && i + 1 < argc) {
+            std::string format = argv[++i];
+            if (format != "text" && format != "npy") {
+                printUsage(argv[0]);
+                return -1;
+            }
+            npy_results = format == "npy";
+        } else if (arg == "--dump-logits" && i + 1 < argc) {
+            dump_logits_path = argv[++i];
+        } else if (arg == "--static-batches" && i + 1 < argc) {
+            // 逗号分隔的批大小列表，如 1,8,32,128
+            for (char* token = std::strtok(argv[++i], ","); token; token = std::strtok(nullptr, ",")) {
+                long value = std::strtol(token, nullptr, 10);
+                if (value <= 0) {
+                    std::cerr << "错误: 固定批大小必须为正整数" << std::endl;
+                    return -1;
+                }
+                static_batches.push_back(static_cast<size_t>(value));
+            }
+        } else {
+            printUsage(argv[0]);
+            return arg == "--help" ? 0 : -1;
+        }
+    }
+    
     std::cout << "启动 " << PLATFORM_NAME << " 统一 C++ ONNX推理程序..." << std::endl;
     
     UnifiedONNXInference inference;
+    inference.setTestDataDir(test_data_dir);
+    inference.setOutputOptions(output_level, npy_results);
+    
+    TraceRecorder recorder;
+    if (!trace_path.empty()) {
+        inference.setTraceCallback([&recorder](const TraceEvent& event) { recorder.record(event); });
+    }
+    if (!ort_profile_prefix.empty()) {
+        inference.enableOrtProfiling(ort_profile_prefix);
+    }
+    
+    // 结束ORT性能分析并导出追踪文件
+    auto finishTracing = [&]() {
+        std::string ort_profile = inference.endOrtProfiling();
+        if (!trace_path.empty()) {
+            recorder.save(trace_path, ort_profile, inference.ortProfileStartUs());
+        }
+    };
     
     // 初始化
-    if (!inference.initialize()) {
+    if (!inference.initialize(model_path)) {
         std::cerr << "初始化失败" << std::endl;
         return -1;
     }
+    inference.loadStaticSessions(static_batches);
+    
+    // 数值一致性检查模式：只导出logits
+    if (!dump_logits_path.empty()) {
+        // 未指定批大小时按批导出，减少Run调用次数
+        bool dumped = inference.dumpLogits(dump_logits_path, batch_size > 1 ? batch_size : 256);
+        finishTracing();
+        return dumped ? 0 : -1;
+    }
     
     // 运行测试
-    inference.runTests();
+    inference.runTests(batch_size, timings_path);
+    finishTracing();
     
     std::cout << "\n" << PLATFORM_NAME << " 统一推理测试完成！" << std::endl;
     return 0;
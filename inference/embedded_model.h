@@ -19,6 +19,7 @@ extern const size_t mnist_model_data_size;
 // 获取嵌入式模型数据的函数
 const unsigned char* get_embedded_model_data(void);
 size_t get_embedded_model_size(void);
+const char* get_embedded_model_sha256(void);
 
 #ifdef __cplusplus
 }
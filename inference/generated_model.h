@@ -0,0 +1,38 @@
+/*
+ * 生成的C推理内核接口（由 onnx_to_c_kernels.py 生成 generated_model.c 实现）
+ * c_inference_lib.c 以 -DINFERENCE_USE_GENERATED_MODEL 编译时使用这些函数代替ONNX Runtime
+ */
+
+#ifndef GENERATED_MODEL_H
+#define GENERATED_MODEL_H
+
+#include <stddef.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+// 模型输入形状 (C, H, W) 与输出类别数，生成时由ONNX图确定
+void get_generated_model_input_shape(int* channels, int* height, int* width);
+int get_generated_model_num_classes(void);
+
+// generated_model_run 需要的工作区大小（float个数）
+size_t get_generated_model_workspace_size(void);
+
+// 模型参数个数与原始ONNX模型（含外部数据）的SHA-256
+size_t get_generated_model_parameter_count(void);
+const char* get_generated_model_sha256(void);
+
+/**
+ * 单个样本前向计算
+ * @param input 标准化后的输入，C*H*W 个float（CHW顺序）
+ * @param output 模型输出，num_classes 个float
+ * @param workspace 工作区，get_generated_model_workspace_size() 个float，调用之间不需要保留内容
+ */
+void generated_model_run(const float* input, float* output, float* workspace);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // GENERATED_MODEL_H
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+开环负载生成器
+按预先生成的到达时间（泊松 / 突发 / 均匀）向推理引擎发送请求，到达过程不受服务快慢影响，
+分别记录排队延迟（计划到达 -> 开始服务）和服务时间（开始 -> 完成），
+在不同负载水平下测量并输出延迟-负载曲线
+
+闭环测试（逐个样本背靠背调用）在引擎变慢时会同步减少发送的请求，
+从而掩盖尾延迟（coordinated omission）；开环测试从计划到达时间开始计算延迟
+
+用法:
+    python load_generator.py                                   # Python引擎，泊松到达，按容量比例扫描
+    python load_generator.py --engine c_lib --pattern bursty --burst-factor 4
+    python load_generator.py --qps 500,1000,2000 --requests 5000
+    python load_generator.py --workers 2 --loads 0.5,0.9
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from python_inference import PythonONNXInferenceMNIST, load_mnist_test_data_mmap, model_descriptor_path
+
+ARRIVAL_PATTERNS = ['poisson', 'bursty', 'uniform']
+DEFAULT_LOADS = '0.1,0.3,0.5,0.7,0.8,0.9,0.95'
+PERCENTILES = [50, 90, 99, 99.9]
+SPIN_THRESHOLD_S = 0.0005   # 距离到达时间小于此值时忙等，避免sleep唤醒延迟
+
+
+def create_engine(name, model_path, library_path):
+    """创建单个推理引擎，返回 (单样本推理函数, 引擎对象)"""
+    if name == 'python':
+        engine = PythonONNXInferenceMNIST(model_path)
+        return engine.inference, engine
+    if name == 'c_lib':
+        from c_inference_binding import CInferenceMNIST
+        engine = CInferenceMNIST(library_path, model_descriptor_path(model_path))
+        return engine.inference, engine
+    raise ValueError(f"未知引擎: {name}")
+
+
+def arrival_times(pattern, qps, num_requests, rng, burst_factor=4.0, burst_period=0.1):
+    """
+    生成相对起点的计划到达时间（秒），平均速率均为 qps
+    - poisson: 指数分布到达间隔
+    - bursty: 开关调制泊松过程，每个周期的前 1/burst_factor 时间内以 qps*burst_factor 速率到达，其余时间空闲
+    - uniform: 等间隔到达
+    """
+    if pattern == 'uniform':
+        return np.arange(num_requests) / qps
+    if pattern == 'poisson':
+        return np.cumsum(rng.exponential(1.0 / qps, num_requests))
+    if pattern == 'bursty':
+        on_time = burst_period / burst_factor
+        busy = np.cumsum(rng.exponential(1.0 / (qps * burst_factor), num_requests))
+        period_index = np.floor(busy / on_time)
+        return period_index * burst_period + (busy - period_index * on_time)
+    raise ValueError(f"未知到达模式: {pattern}")
+
+
+def wait_until(deadline):
+    """等待到指定的 perf_counter 时间点"""
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_THRESHOLD_S:
+            time.sleep(remaining - SPIN_THRESHOLD_S)
+
+
+def run_open_loop(runners, images, arrivals):
+    """
+    按计划到达时间执行请求：FIFO队列 + len(runners) 个服务线程
+    每个线程按顺序领取下一个请求，在其计划到达时间之前不会开始服务
+    返回 (计划到达, 开始, 完成) 三个数组（相对起点，秒）
+    """
+    num_requests = len(arrivals)
+    starts = np.empty(num_requests)
+    ends = np.empty(num_requests)
+    next_request = [0]
+    lock = threading.Lock()
+    t0 = time.perf_counter() + 0.01
+
+    def worker(run):
+        while True:
+            with lock:
+                i = next_request[0]
+                next_request[0] += 1
+            if i >= num_requests:
+                return
+            wait_until(t0 + arrivals[i])
+            start = time.perf_counter()
+            run(images[i % len(images)])
+            ends[i] = time.perf_counter() - t0
+            starts[i] = start - t0
+
+    threads = [threading.Thread(target=worker, args=(run,)) for run in runners]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return arrivals, starts, ends
+
+
+def measure_service_time(runners, images, num_requests):
+    """闭环测量平均服务时间（秒），用于估算容量"""
+    run = runners[0]
+    start = time.perf_counter()
+    for i in range(num_requests):
+        run(images[i % len(images)])
+    return (time.perf_counter() - start) / num_requests
+
+
+def percentile_summary(values_s):
+    values_ms = np.asarray(values_s) * 1000.0
+    summary = {f"p{p:g}_ms": float(np.percentile(values_ms, p)) for p in PERCENTILES}
+    summary['mean_ms'] = float(values_ms.mean())
+    summary['max_ms'] = float(values_ms.max())
+    return summary
+
+
+def summarize_level(offered_qps, arrivals, starts, ends, workers):
+    """汇总单个负载水平：达到的吞吐量、利用率，以及排队/服务/总延迟分位数"""
+    queue = starts - arrivals
+    service = ends - starts
+    latency = ends - arrivals
+    elapsed = ends.max()
+    return {
+        'offered_qps': offered_qps,
+        'achieved_qps': float(len(arrivals) / elapsed),
+        'utilization': float(service.sum() / (workers * elapsed)),
+        'requests': int(len(arrivals)),
+        'queue': percentile_summary(queue),
+        'service': percentile_summary(service),
+        'latency': percentile_summary(latency),
+    }
+
+
+def print_curve(levels):
+    print(f"\n{'目标QPS':>9} {'实际QPS':>9} {'利用率':>6} {'排队P50':>9} {'排队P99':>9} "
+          f"{'服务P50':>9} {'服务P99':>9} {'延迟P50':>9} {'延迟P99':>9} {'延迟P99.9':>10}")
+    print("-" * 100)
+    for level in levels:
+        q, s, l = level['queue'], level['service'], level['latency']
+        print(f"{level['offered_qps']:>9.0f} {level['achieved_qps']:>9.0f} {level['utilization']:>6.0%} "
+              f"{q['p50_ms']:>9.3f} {q['p99_ms']:>9.3f} {s['p50_ms']:>9.3f} {s['p99_ms']:>9.3f} "
+              f"{l['p50_ms']:>9.3f} {l['p99_ms']:>9.3f} {l['p99.9_ms']:>10.3f}")
+
+
+def plot_curve(levels, title, output_path):
+    """绘制延迟-负载曲线"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    qps = [level['offered_qps'] for level in levels]
+    fig, ax = plt.subplots(figsize=(8, 5))
+    ax.plot(qps, [level['latency']['p50_ms'] for level in levels], 'o-', label='latency p50')
+    ax.plot(qps, [level['latency']['p99_ms'] for level in levels], 'o-', label='latency p99')
+    ax.plot(qps, [level['service']['p99_ms'] for level in levels], 's--', label='service p99')
+    ax.set_xlabel('offered load (QPS)')
+    ax.set_ylabel('latency (ms)')
+    ax.set_yscale('log')
+    ax.set_title(title)
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=120)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="开环负载生成器")
+    parser.add_argument('--engine', choices=['python', 'c_lib'], default='python', help='推理引擎')
+    parser.add_argument('--model', default='../models/mnist_model.onnx',
+                        help='ONNX模型路径（Python引擎；c_lib引擎读取同名 .json 描述文件）')
+    parser.add_argument('--library', default='./libc_inference.so', help='C推理共享库路径（c_lib引擎）')
+    parser.add_argument('--test-data', default='../test_data', help='测试数据目录')
+    parser.add_argument('--pattern', choices=ARRIVAL_PATTERNS, default='poisson', help='到达模式')
+    parser.add_argument('--qps', help='目标QPS列表，逗号分隔（指定时忽略 --loads）')
+    parser.add_argument('--loads', default=DEFAULT_LOADS, help='按估算容量比例的负载水平列表')
+    parser.add_argument('--requests', type=int, default=2000, help='每个负载水平的请求数')
+    parser.add_argument('--workers', type=int, default=1, help='服务线程数（每个线程一个引擎实例）')
+    parser.add_argument('--burst-factor', type=float, default=4.0, help='突发模式的峰值/平均速率比')
+    parser.add_argument('--burst-period', type=float, default=0.1, help='突发模式的周期（秒）')
+    parser.add_argument('--warmup', type=int, default=200, help='每个引擎实例预热请求数')
+    parser.add_argument('--seed', type=int, default=0, help='到达过程随机种子')
+    parser.add_argument('--output', help='结果JSON路径（默认 ../results/load_curve_<引擎>_<模式>.json）')
+    parser.add_argument('--no-plot', action='store_true', help='不生成延迟-负载曲线图')
+    args = parser.parse_args()
+
+    images, _, _ = load_mnist_test_data_mmap(args.test_data)
+    images = np.asarray(images, dtype=np.float32)   # 读入内存，避免缺页计入服务时间
+
+    try:
+        engines = [create_engine(args.engine, args.model, args.library) for _ in range(args.workers)]
+    except (FileNotFoundError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+    runners = [run for run, _ in engines]
+
+    for run in runners:
+        for i in range(args.warmup):
+            run(images[i % len(images)])
+
+    mean_service = measure_service_time(runners, images, min(args.requests, 1000))
+    capacity = args.workers / mean_service
+    print(f"\n📏 闭环平均服务时间 {mean_service * 1000:.3f} ms，估算容量 {capacity:.0f} QPS "
+          f"({args.workers} 个服务线程)")
+
+    if args.qps:
+        targets = [float(q) for q in args.qps.split(',') if q.strip()]
+    else:
+        targets = [float(f) * capacity for f in args.loads.split(',') if f.strip()]
+
+    rng = np.random.default_rng(args.seed)
+    levels = []
+    for qps in targets:
+        print(f"▶ {args.pattern} 到达, 目标 {qps:.0f} QPS, {args.requests} 个请求")
+        arrivals = arrival_times(args.pattern, qps, args.requests, rng,
+                                 args.burst_factor, args.burst_period)
+        levels.append(summarize_level(qps, *run_open_loop(runners, images, arrivals), args.workers))
+
+    print_curve(levels)
+
+    output = args.output or f"../results/load_curve_{args.engine}_{args.pattern}.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'engine': args.engine,
+            'pattern': args.pattern,
+            'workers': args.workers,
+            'burst_factor': args.burst_factor if args.pattern == 'bursty' else None,
+            'burst_period_s': args.burst_period if args.pattern == 'bursty' else None,
+            'closed_loop_service_ms': mean_service * 1000,
+            'estimated_capacity_qps': capacity,
+            'levels': levels,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {output}")
+
+    if not args.no_plot:
+        plot_path = os.path.splitext(output)[0] + '.png'
+        try:
+            plot_curve(levels, f"{args.engine} / {args.pattern} / {args.workers} worker(s)", plot_path)
+            print(f"延迟-负载曲线: {plot_path}")
+        except ImportError:
+            print("⚠️ 未安装matplotlib，跳过绘图（pip install matplotlib）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+测试数据与模型描述文件读取
+只依赖NumPy，供各Python推理引擎（ONNX Runtime、纯NumPy）和测试工具共用
+"""
+
+import json
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+# 二进制索引格式（与 mnist_index.h 保持一致）
+INDEX_MAGIC = b'DL2CIDX\0'
+INDEX_VERSION = 1
+INDEX_HEADER_SIZE = 32
+INDEX_FILENAME = "index.bin"
+INDEX_IMAGES_FILENAME = "images.bin"
+
+# 没有模型描述文件时使用的MNIST默认值（与 model_descriptor.h 的 model_descriptor_default 一致）
+MNIST_DESCRIPTOR = {
+    'input_shape': [-1, 1, 28, 28],
+    'input_dtype': 'float32',
+    'num_classes': 10,
+    'mean': [0.1307],
+    'std': [0.3081],
+}
+
+def model_descriptor_path(model_path):
+    """模型描述文件路径：与模型同名的 .json（由 train/export_onnx.py 生成）"""
+    return os.path.splitext(str(model_path))[0] + '.json'
+
+def load_model_descriptor(model_path):
+    """读取模型描述文件（输入形状、类别数、标准化参数），不存在时返回MNIST默认值"""
+    path = model_descriptor_path(model_path)
+    if not os.path.exists(path):
+        print(f"⚠️ 未找到模型描述文件 {path}，使用MNIST默认参数")
+        return dict(MNIST_DESCRIPTOR)
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        descriptor = json.load(f)
+    shape = descriptor.get('input_shape', [])
+    if (len(shape) != 4 or descriptor.get('input_dtype', 'float32') != 'float32'
+            or len(descriptor.get('mean', [])) != shape[1] or len(descriptor.get('std', [])) != shape[1]):
+        raise ValueError(f"模型描述文件格式错误: {path}（需要 NCHW float32 输入，mean/std 按通道给出）")
+    return descriptor
+
+def load_mnist_test_data_mmap(test_data_dir="../test_data"):
+    """
+    以内存映射方式加载二进制索引测试数据（index.bin + images.bin）
+    返回 (images[N, H, W] 或多通道 [N, C, H, W], labels, indices)，images 按需分页读入，适合大规模测试集
+    """
+    test_data_dir = Path(test_data_dir)
+    index_data = (test_data_dir / INDEX_FILENAME).read_bytes()
+    
+    magic, version, num_samples, rows, cols, pixel_bytes, channels = struct.unpack_from('<8sIIIIII', index_data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION or pixel_bytes != 4:
+        raise ValueError(f"Invalid index file: {test_data_dir / INDEX_FILENAME}")
+    
+    pos = INDEX_HEADER_SIZE
+    labels = np.frombuffer(index_data, dtype='<i4', count=num_samples, offset=pos).astype(np.int64)
+    pos += num_samples * 4
+    indices = np.frombuffer(index_data, dtype='<i4', count=num_samples, offset=pos).astype(np.int64)
+    pos += num_samples * 4
+    offsets = np.frombuffer(index_data, dtype='<u8', count=num_samples, offset=pos)
+    
+    pixels = np.memmap(test_data_dir / INDEX_IMAGES_FILENAME, dtype='<f4', mode='r')
+    image_shape = (channels, rows, cols) if channels > 1 else (rows, cols)
+    image_size = int(np.prod(image_shape))
+    element_offsets = offsets // 4
+    
+    if np.array_equal(element_offsets, np.arange(num_samples, dtype=np.uint64) * image_size):
+        # 连续存放：直接在映射上构造视图，零拷贝
+        images = pixels[:num_samples * image_size].reshape(num_samples, *image_shape)
+    else:
+        gather = element_offsets[:, None].astype(np.int64) + np.arange(image_size)
+        images = pixels[gather].reshape(num_samples, *image_shape)
+    
+    return images, labels, indices
@@ -0,0 +1,94 @@
+/*
+ * MNIST测试数据二进制索引格式
+ * 由 data_loader.py 生成；C/C++ 推理程序一次 fread 读取 index.bin，
+ * images.bin 在POSIX平台上只读内存映射（数百万样本时按需分页，不整体读入内存）
+ *
+ * index.bin 布局（小端序）:
+ *   MNISTIndexHeader                       文件头 (32 bytes)
+ *   int32_t  labels[num_samples]           真实标签
+ *   int32_t  original_indices[num_samples] 原始MNIST索引
+ *   uint64_t offsets[num_samples]          图像在 images.bin 中的字节偏移
+ *
+ * images.bin: 所有样本的 float32 像素数据连续存放（范围 [0,1]），多通道图像按 [C,H,W] 排列
+ */
+
+#ifndef MNIST_INDEX_H
+#define MNIST_INDEX_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+#if defined(__unix__) || defined(__APPLE__)
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#define MNIST_INDEX_HAVE_MMAP 1
+#endif
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define MNIST_INDEX_MAGIC       "DL2CIDX\0"
+#define MNIST_INDEX_MAGIC_SIZE  8
+#define MNIST_INDEX_VERSION     1
+#define MNIST_INDEX_FILENAME    "index.bin"
+#define MNIST_IMAGES_FILENAME   "images.bin"
+
+// 索引文件头
+typedef struct {
+    char magic[MNIST_INDEX_MAGIC_SIZE];
+    uint32_t version;
+    uint32_t num_samples;
+    uint32_t rows;
+    uint32_t cols;
+    uint32_t bytes_per_pixel;
+    uint32_t channels;          // 通道数，0 表示单通道（旧版本文件）
+} MNISTIndexHeader;
+
+// 每个样本的像素数 (C*H*W)
+#define MNIST_INDEX_SAMPLE_PIXELS(header) \
+    ((size_t)((header).channels ? (header).channels : 1) * (header).rows * (header).cols)
+
+// 只读内存映射整个文件，成功时写入 *size_out；
+// 非POSIX平台或映射失败（空文件等）返回NULL，调用者回退到整体读取
+static inline void* mnist_map_file(const char* path, size_t* size_out) {
+#ifdef MNIST_INDEX_HAVE_MMAP
+    int fd = open(path, O_RDONLY);
+    if (fd < 0) return NULL;
+    
+    void* addr = NULL;
+    struct stat st;
+    if (fstat(fd, &st) == 0 && st.st_size > 0) {
+        addr = mmap(NULL, (size_t)st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+        if (addr == MAP_FAILED) {
+            addr = NULL;
+        } else {
+            *size_out = (size_t)st.st_size;
+        }
+    }
+    close(fd);  // 映射在关闭文件后仍然有效
+    return addr;
+#else
+    (void)path;
+    (void)size_out;
+    return NULL;
+#endif
+}
+
+// 解除 mnist_map_file 的映射
+static inline void mnist_unmap_file(void* addr, size_t size) {
+#ifdef MNIST_INDEX_HAVE_MMAP
+    if (addr) munmap(addr, size);
+#else
+    (void)addr;
+    (void)size;
+#endif
+}
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // MNIST_INDEX_H
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime 优化模型缓存
+首次创建会话时通过 SessionOptions.optimized_model_filepath 把图优化后的模型写入缓存目录，
+之后的启动直接加载优化后的模型并关闭图优化，省去重复的图变换
+
+缓存键 = 模型文件内容哈希 + 影响优化结果的会话选项 + ORT版本 + CPU架构，
+任一项变化都会生成新的缓存文件，旧文件不会被误用（与 c_inference_lib.c 的 inference_set_model_cache_dir 规则一致）
+
+写入缓存时图优化级别最高为 ORT_ENABLE_EXTENDED（与C库的 "opt=extended" 一致）：ORT_ENABLE_ALL 的布局优化
+（NCHWc）按本机指令集（AVX2 / AVX-512）选择分块大小，序列化后的模型只适用于同样的硬件；
+请求 ORT_ENABLE_ALL 时，命中缓存后在本机重新做布局优化
+"""
+
+import hashlib
+import json
+import os
+import platform
+
+import onnxruntime as ort
+
+DEFAULT_CACHE_DIR = '../models/.ort_cache'
+DIGEST_INDEX = 'digests.json'
+
+_CHUNK_SIZE = 1 << 20
+
+# 复制 SessionOptions 时保留的属性（ORT 的 SessionOptions 不支持复制）
+_SESSION_OPTION_ATTRS = [
+    'graph_optimization_level', 'intra_op_num_threads', 'inter_op_num_threads', 'execution_mode',
+    'execution_order', 'enable_cpu_mem_arena', 'enable_mem_pattern', 'enable_mem_reuse', 'enable_profiling',
+    'profile_file_prefix', 'log_severity_level', 'log_verbosity_level', 'logid', 'use_deterministic_compute',
+]
+
+
+def file_digest(path):
+    """模型文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_digest(model_path, cache_dir):
+    """
+    模型内容哈希；torch导出的大模型把权重放在同名 .onnx.data 文件中，一并计入哈希，重新训练后缓存自动失效
+    完整读取模型的耗时与图优化相当，因此按文件大小和修改时间在缓存目录的 digests.json 中记住上次的结果
+    """
+    files = [str(model_path)] + [p for p in [f"{model_path}.data"] if os.path.exists(p)]
+    stamp = [[os.stat(p).st_size, os.stat(p).st_mtime_ns] for p in files]
+    index_path = os.path.join(cache_dir, DIGEST_INDEX)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    key = os.path.abspath(model_path)
+    entry = index.get(key)
+    if entry and entry.get('stamp') == stamp:
+        return entry['sha256']
+
+    digest = hashlib.sha256(''.join(file_digest(p) for p in files).encode()).hexdigest()
+    index[key] = {'stamp': stamp, 'sha256': digest}
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_path, index_path)
+    return digest
+
+
+def copy_session_options(session_options):
+    """复制会话选项，缓存逻辑修改副本而不改动调用者的对象"""
+    copy = ort.SessionOptions()
+    for attr in _SESSION_OPTION_ATTRS:
+        setattr(copy, attr, getattr(session_options, attr))
+    return copy
+
+
+def cache_optimization_level(session_options):
+    """写入缓存时使用的图优化级别：不超过 ORT_ENABLE_EXTENDED，避免缓存与硬件相关的布局优化"""
+    return min(session_options.graph_optimization_level, ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+               key=int)
+
+
+def cache_key(model_path, session_options, providers, cache_dir):
+    """由模型内容、会话选项、执行提供者、ORT版本和CPU架构计算缓存键"""
+    parts = [
+        model_digest(model_path, cache_dir),
+        f"opt={int(cache_optimization_level(session_options))}",
+        f"intra={session_options.intra_op_num_threads}",
+        f"mode={int(session_options.execution_mode)}",
+        f"providers={','.join(providers)}",
+        f"ort={ort.__version__}",
+        f"arch={platform.machine()}",
+    ]
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def cached_model_path(model_path, session_options, providers, cache_dir=DEFAULT_CACHE_DIR):
+    """优化模型的缓存路径：<cache_dir>/<模型名>.<缓存键>.onnx"""
+    stem = os.path.splitext(os.path.basename(str(model_path)))[0]
+    key = cache_key(model_path, session_options, providers, cache_dir)
+    return os.path.join(cache_dir, f"{stem}.{key}.onnx")
+
+
+def create_session(model_path, session_options=None, providers=None, cache_dir=None):
+    """
+    创建ORT会话，cache_dir 不为空时使用优化模型缓存
+
+    Returns:
+        (会话, 是否命中缓存)；未启用缓存时第二项为 None
+    """
+    session_options = session_options or ort.SessionOptions()
+    providers = providers or ['CPUExecutionProvider']
+    if not cache_dir:
+        return ort.InferenceSession(str(model_path), sess_options=session_options, providers=providers), None
+
+    cached_path = cached_model_path(model_path, session_options, providers, cache_dir)
+    cache_level = cache_optimization_level(session_options)
+    if os.path.exists(cached_path):
+        # 缓存中的模型已做到 cache_level 的图优化，只剩 ORT_ENABLE_ALL 的布局优化需要在本机完成
+        hit_options = copy_session_options(session_options)
+        if session_options.graph_optimization_level == cache_level:
+            hit_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        try:
+            return ort.InferenceSession(cached_path, sess_options=hit_options, providers=providers), True
+        except Exception as e:
+            # 缓存文件损坏或不兼容时重新优化并覆盖
+            print(f"⚠️ 优化模型缓存不可用，重新生成: {e}")
+
+    # 先写临时文件再重命名，避免并发启动或中途退出时留下不完整的缓存
+    # 权重写入缓存目录内的外部数据文件，模型按相对路径引用（torch导出的 .onnx.data 不在缓存目录中）
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{cached_path}.{os.getpid()}.tmp"
+    write_options = copy_session_options(session_options)
+    write_options.graph_optimization_level = cache_level
+    write_options.optimized_model_filepath = temp_path
+    write_options.add_session_config_entry('session.optimized_model_external_initializers_file_name',
+                                           os.path.basename(cached_path) + '.data')
+    session = ort.InferenceSession(str(model_path), sess_options=write_options, providers=providers)
+    if os.path.exists(temp_path):
+        os.replace(temp_path, cached_path)
+    if session_options.graph_optimization_level != cache_level:
+        # 写缓存的会话只做到 cache_level；按调用者请求的级别（含布局优化）另建运行用的会话
+        session = ort.InferenceSession(cached_path, sess_options=copy_session_options(session_options),
+                                       providers=providers)
+    return session, False
@@ -0,0 +1,203 @@
+/*
+ * 模型描述文件
+ * 由 train/export_onnx.py 根据ONNX图的输入输出形状生成（与模型同名的 .json，如 mnist_model.json），
+ * C/C++ 推理程序据此确定输入形状、类别数和标准化参数，并分配缓冲区
+ *
+ * 文件为扁平JSON（无嵌套对象），示例:
+ *   {
+ *     "format_version": 1,
+ *     "input_name": "input",
+ *     "output_name": "output",
+ *     "input_shape": [-1, 1, 28, 28],
+ *     "input_dtype": "float32",
+ *     "num_classes": 10,
+ *     "mean": [0.1307],
+ *     "std": [0.3081]
+ *   }
+ * mean/std 按通道给出，像素输入范围为 [0,1]，标准化为 (x - mean[c]) / std[c]
+ * 带图内 top-1 输出的模型（export_onnx.py --top1-head）另有 "class_output_name" (int32 [N]) 和
+ * "confidence_output_name" (float32 [N])，没有时对应字段为空字符串
+ */
+
+#ifndef MODEL_DESCRIPTOR_H
+#define MODEL_DESCRIPTOR_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define MODEL_DESCRIPTOR_VERSION      1
+#define MODEL_DESCRIPTOR_MAX_CHANNELS 4
+#define MODEL_DESCRIPTOR_NAME_SIZE    64
+#define MODEL_DESCRIPTOR_MAX_BYTES    (64 * 1024)
+
+typedef struct {
+    int channels;
+    int height;
+    int width;
+    int num_classes;
+    float mean[MODEL_DESCRIPTOR_MAX_CHANNELS];
+    float std[MODEL_DESCRIPTOR_MAX_CHANNELS];
+    char input_name[MODEL_DESCRIPTOR_NAME_SIZE];
+    char output_name[MODEL_DESCRIPTOR_NAME_SIZE];
+    char class_output_name[MODEL_DESCRIPTOR_NAME_SIZE];        // 图内 top-1 类别输出，可为空
+    char confidence_output_name[MODEL_DESCRIPTOR_NAME_SIZE];   // 图内 top-1 置信度输出，可为空
+} ModelDescriptor;
+
+// MNIST默认值：没有描述文件时使用，与旧版本行为一致
+static inline void model_descriptor_default(ModelDescriptor* desc) {
+    memset(desc, 0, sizeof(*desc));
+    desc->channels = 1;
+    desc->height = 28;
+    desc->width = 28;
+    desc->num_classes = 10;
+    desc->mean[0] = 0.1307f;
+    desc->std[0] = 0.3081f;
+    strcpy(desc->input_name, "input");
+    strcpy(desc->output_name, "output");
+}
+
+// 模型是否带图内 top-1 输出 (类别, 置信度)
+static inline int model_descriptor_has_top1(const ModelDescriptor* desc) {
+    return desc->class_output_name[0] != '\0' && desc->confidence_output_name[0] != '\0';
+}
+
+// 单个样本的输入元素数 (C*H*W)
+static inline size_t model_descriptor_image_size(const ModelDescriptor* desc) {
+    return (size_t)desc->channels * (size_t)desc->height * (size_t)desc->width;
+}
+
+// 模型路径对应的描述文件路径：替换扩展名为 .json
+static inline void model_descriptor_path_for(const char* model_path, char* out, size_t out_size) {
+    const char* dot = strrchr(model_path, '.');
+    const char* slash = strrchr(model_path, '/');
+    size_t stem = (dot && (!slash || dot > slash)) ? (size_t)(dot - model_path) : strlen(model_path);
+    snprintf(out, out_size, "%.*s.json", (int)stem, model_path);
+}
+
+// 定位 "key": 之后的值起点，找不到返回NULL
+static inline const char* model_descriptor_find(const char* text, const char* key) {
+    char pattern[MODEL_DESCRIPTOR_NAME_SIZE + 4];
+    snprintf(pattern, sizeof(pattern), "\"%s\"", key);
+    const char* p = strstr(text, pattern);
+    if (!p) return NULL;
+    p = strchr(p + strlen(pattern), ':');
+    if (!p) return NULL;
+    p++;
+    while (*p == ' ' || *p == '\t' || *p == '\n' || *p == '\r') p++;
+    return p;
+}
+
+// 读取数值数组 [a, b, ...]，返回元素个数，格式错误返回 -1
+static inline int model_descriptor_numbers(const char* text, const char* key, double* values, int max_values) {
+    const char* p = model_descriptor_find(text, key);
+    if (!p || *p != '[') return -1;
+    p++;
+    int count = 0;
+    while (*p && *p != ']') {
+        char* end = NULL;
+        double value = strtod(p, &end);
+        if (end == p) return -1;
+        if (count < max_values) values[count] = value;
+        count++;
+        p = end;
+        while (*p == ' ' || *p == ',' || *p == '\n' || *p == '\r' || *p == '\t') p++;
+    }
+    return *p == ']' ? count : -1;
+}
+
+// 读取字符串值（不支持转义字符），找不到时保持原值
+static inline void model_descriptor_string(const char* text, const char* key, char* out, size_t out_size) {
+    const char* p = model_descriptor_find(text, key);
+    if (!p || *p != '"') return;
+    const char* end = strchr(p + 1, '"');
+    if (!end || (size_t)(end - p - 1) >= out_size) return;
+    memcpy(out, p + 1, (size_t)(end - p - 1));
+    out[end - p - 1] = '\0';
+}
+
+/*
+ * 读取描述文件到 desc（先填充MNIST默认值）
+ * 返回 0 成功；1 文件不存在（desc 为默认值）；-1 格式错误或不支持
+ */
+static inline int model_descriptor_load(const char* path, ModelDescriptor* desc) {
+    model_descriptor_default(desc);
+
+    FILE* file = fopen(path, "rb");
+    if (!file) return 1;
+    char* text = (char*)malloc(MODEL_DESCRIPTOR_MAX_BYTES + 1);
+    if (!text) {
+        fclose(file);
+        return -1;
+    }
+    size_t length = fread(text, 1, MODEL_DESCRIPTOR_MAX_BYTES, file);
+    fclose(file);
+    text[length] = '\0';
+
+    int status = 0;
+    double shape[4];
+    double mean[MODEL_DESCRIPTOR_MAX_CHANNELS];
+    double std[MODEL_DESCRIPTOR_MAX_CHANNELS];
+    const char* classes = model_descriptor_find(text, "num_classes");
+    const char* dtype = model_descriptor_find(text, "input_dtype");
+    int num_classes = classes ? atoi(classes) : 0;
+
+    // 只支持 NCHW float32 输入
+    if (model_descriptor_numbers(text, "input_shape", shape, 4) != 4 || num_classes < 1 ||
+        shape[1] < 1 || shape[1] > MODEL_DESCRIPTOR_MAX_CHANNELS || shape[2] < 1 || shape[3] < 1 ||
+        (dtype && strncmp(dtype, "\"float32\"", 9) != 0)) {
+        status = -1;
+    } else {
+        desc->channels = (int)shape[1];
+        desc->height = (int)shape[2];
+        desc->width = (int)shape[3];
+        desc->num_classes = num_classes;
+        int mean_count = model_descriptor_numbers(text, "mean", mean, MODEL_DESCRIPTOR_MAX_CHANNELS);
+        int std_count = model_descriptor_numbers(text, "std", std, MODEL_DESCRIPTOR_MAX_CHANNELS);
+        if (mean_count != desc->channels || std_count != desc->channels) {
+            status = -1;
+        } else {
+            for (int c = 0; c < desc->channels; c++) {
+                desc->mean[c] = (float)mean[c];
+                desc->std[c] = (float)std[c];
+                if (desc->std[c] == 0.0f) status = -1;
+            }
+        }
+        model_descriptor_string(text, "input_name", desc->input_name, sizeof(desc->input_name));
+        model_descriptor_string(text, "output_name", desc->output_name, sizeof(desc->output_name));
+        model_descriptor_string(text, "class_output_name", desc->class_output_name,
+                                sizeof(desc->class_output_name));
+        model_descriptor_string(text, "confidence_output_name", desc->confidence_output_name,
+                                sizeof(desc->confidence_output_name));
+    }
+
+    free(text);
+    if (status != 0) {
+        model_descriptor_default(desc);
+    }
+    return status;
+}
+
+// 按通道标准化: dst = (src - mean[c]) / std[c]，src 为 [C,H,W] 连续存放
+static inline void model_descriptor_normalize(const ModelDescriptor* desc, const float* src, float* dst) {
+    size_t plane = (size_t)desc->height * (size_t)desc->width;
+    for (int c = 0; c < desc->channels; c++) {
+        const float mean = desc->mean[c];
+        const float std = desc->std[c];
+        const float* s = src + (size_t)c * plane;
+        float* d = dst + (size_t)c * plane;
+        for (size_t i = 0; i < plane; i++) {
+            d[i] = (s[i] - mean) / std;
+        }
+    }
+}
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // MODEL_DESCRIPTOR_H
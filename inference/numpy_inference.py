@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+纯NumPy推理引擎 - MNISTNet
+不依赖 ONNX Runtime / PyTorch / onnx 包：权重直接从 mnist_model.pth（torch.save 的zip格式）
+或ONNX模型的初始化器中读取，卷积按批做 im2col + GEMM，所有中间结果使用预分配的工作区
+
+既是依赖最少的部署目标，也是衡量小批量下ORT调用开销的基线
+
+用法:
+    python numpy_inference.py                                   # ../models/mnist_model.onnx
+    python numpy_inference.py --model ../models/mnist_model.pth --batch-size 32
+    python numpy_inference.py --dump-logits logits.bin          # 供 parity_check.py 比较
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+import zipfile
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+
+from mnist_data import load_model_descriptor, load_mnist_test_data_mmap
+
+# MNISTNet 各层参数形状（与 train/train_model.py 一致）
+MNISTNET_SHAPES = {
+    'conv1.weight': (32, 1, 3, 3),
+    'conv1.bias': (32,),
+    'conv2.weight': (64, 32, 3, 3),
+    'conv2.bias': (64,),
+    'fc1.weight': (128, 9216),
+    'fc1.bias': (128,),
+    'fc2.weight': (10, 128),
+    'fc2.bias': (10,),
+}
+
+# ONNX TensorProto.DataType -> NumPy 类型（只列出权重可能用到的类型）
+ONNX_DTYPES = {1: np.float32, 6: np.int32, 7: np.int64, 10: np.float16, 11: np.float64}
+# BFLOAT16（16）按 uint16 位模式读取，左移16位即为float32
+BFLOAT16 = 16
+
+# torch 存储类 -> NumPy 类型
+TORCH_STORAGE_DTYPES = {
+    'FloatStorage': np.float32,
+    'DoubleStorage': np.float64,
+    'HalfStorage': np.float16,
+    'LongStorage': np.int64,
+    'IntStorage': np.int32,
+}
+
+# 工作区容纳的最大样本数：conv2 的 im2col 每个样本 576x288 个float（约650KB），
+# 更大的批按此大小分块执行，工作区保持在缓存附近而不是随批大小线性增长
+WORKSPACE_BATCH = 32
+
+
+# ---------------------------------------------------------------------------
+# ONNX 初始化器读取（protobuf 线格式的最小解析，只解析 ModelProto.graph.initializer）
+# ---------------------------------------------------------------------------
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _protobuf_fields(data):
+    """逐个返回 (字段号, 线类型, 值)；长度分隔字段的值为 memoryview，不复制"""
+    data = memoryview(data)
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        elif wire_type == 5:
+            value, pos = data[pos:pos + 4], pos + 4
+        else:
+            raise ValueError(f"不支持的protobuf线类型 {wire_type}")
+        yield field, wire_type, value
+
+
+def _parse_tensor(data, model_dir):
+    """解析 TensorProto，返回 (名称, 数组)；支持 raw_data、float_data 和外部数据文件"""
+    dims, name, data_type = [], '', 1
+    raw, floats, external = None, [], {}
+    for field, wire_type, value in _protobuf_fields(data):
+        if field == 1:
+            if wire_type == 2:   # packed repeated int64
+                pos = 0
+                while pos < len(value):
+                    dim, pos = _read_varint(value, pos)
+                    dims.append(dim)
+            else:
+                dims.append(value)
+        elif field == 2:
+            data_type = value
+        elif field == 4:
+            floats.append(np.frombuffer(value, dtype='<f4'))
+        elif field == 8:
+            name = bytes(value).decode('utf-8')
+        elif field == 9:
+            raw = value
+        elif field == 13:   # StringStringEntryProto {key=1, value=2}
+            entry = {f: bytes(v).decode('utf-8') for f, _, v in _protobuf_fields(value)}
+            external[entry.get(1, '')] = entry.get(2, '')
+
+    if data_type not in ONNX_DTYPES and data_type != BFLOAT16:
+        raise ValueError(f"初始化器 {name} 的数据类型 {data_type} 不受支持")
+    dtype = np.dtype(np.uint16 if data_type == BFLOAT16 else ONNX_DTYPES[data_type]).newbyteorder('<')
+    count = int(np.prod(dims)) if dims else 1
+    if external:
+        # torch 导出的大模型把权重放在同目录的 .onnx.data 文件中
+        with open(os.path.join(model_dir, external['location']), 'rb') as f:
+            f.seek(int(external.get('offset', 0)))
+            raw = f.read(int(external.get('length', count * dtype.itemsize)))
+    if raw is not None:
+        array = np.frombuffer(raw, dtype=dtype, count=count)
+    elif floats:
+        array = np.concatenate(floats)
+    else:
+        array = np.zeros(count, dtype=dtype)
+    if data_type == BFLOAT16:
+        # raw_data 为 uint16 位模式；int32_data（字段5）形式的 BF16 不常见，未支持
+        array = (array.astype(np.uint32) << 16).view(np.float32)
+    return name, array.astype(np.float32).reshape(dims)
+
+
+def load_onnx_initializers(model_path):
+    """读取ONNX模型的全部初始化器，返回 {名称: float32数组}"""
+    with open(model_path, 'rb') as f:
+        model = f.read()
+    model_dir = os.path.dirname(os.path.abspath(model_path))
+    initializers = {}
+    for field, _, graph in _protobuf_fields(model):
+        if field != 7:   # ModelProto.graph
+            continue
+        for graph_field, _, tensor in _protobuf_fields(graph):
+            if graph_field == 5:   # GraphProto.initializer
+                name, array = _parse_tensor(tensor, model_dir)
+                initializers[name] = array
+    return initializers
+
+
+# ---------------------------------------------------------------------------
+# PyTorch state_dict 读取（torch.save 的zip格式，用受限的 Unpickler 还原张量）
+# ---------------------------------------------------------------------------
+
+def _rebuild_tensor(storage, storage_offset, size, stride, *args):
+    itemsize = storage.dtype.itemsize
+    return as_strided(storage[storage_offset:], shape=tuple(size),
+                      strides=tuple(s * itemsize for s in stride)).copy()
+
+
+class _StateDictUnpickler(pickle.Unpickler):
+    """只允许还原 OrderedDict 和张量，不执行 data.pkl 中的其他任意对象"""
+
+    def __init__(self, file, archive, prefix):
+        super().__init__(file)
+        self.archive = archive
+        self.prefix = prefix
+
+    def find_class(self, module, name):
+        if (module, name) == ('collections', 'OrderedDict'):
+            import collections
+            return collections.OrderedDict
+        if module == 'torch._utils' and name == '_rebuild_tensor_v2':
+            return _rebuild_tensor
+        if module == 'torch' and name in TORCH_STORAGE_DTYPES:
+            return np.dtype(TORCH_STORAGE_DTYPES[name])
+        raise pickle.UnpicklingError(f"不支持的对象 {module}.{name}")
+
+    def persistent_load(self, pid):
+        # ('storage', 存储类型, 键, 设备, 元素数)
+        _, dtype, key, _, numel = pid
+        data = self.archive.read(f"{self.prefix}/data/{key}")
+        return np.frombuffer(data, dtype=np.dtype(dtype).newbyteorder('<'), count=numel)
+
+
+def load_torch_state_dict(model_path):
+    """读取 torch.save(model.state_dict()) 保存的权重，返回 {名称: float32数组}"""
+    with zipfile.ZipFile(model_path) as archive:
+        pickle_name = next((n for n in archive.namelist() if n.endswith('/data.pkl')), None)
+        if pickle_name is None:
+            raise ValueError(f"不是 torch.save 的zip格式: {model_path}")
+        prefix = pickle_name[:-len('/data.pkl')]
+        with archive.open(pickle_name) as f:
+            state_dict = _StateDictUnpickler(f, archive, prefix).load()
+    return {name: np.asarray(value, dtype=np.float32) for name, value in state_dict.items()}
+
+
+def load_mnistnet_weights(model_path):
+    """
+    从 .pth 或 .onnx 读取 MNISTNet 权重，返回按 MNISTNET_SHAPES 命名的数组
+    ONNX导出器可能重命名初始化器或把全连接层权重转置，名称对不上时按唯一的形状匹配
+    """
+    if str(model_path).endswith('.pth'):
+        tensors = load_torch_state_dict(model_path)
+    else:
+        tensors = load_onnx_initializers(model_path)
+
+    weights = {}
+    for name, shape in MNISTNET_SHAPES.items():
+        if name in tensors and tensors[name].shape == shape:
+            weights[name] = tensors[name]
+            continue
+        matches = [t for t in tensors.values() if t.shape == shape]
+        transposed = [t.T for t in tensors.values() if t.ndim == 2 and t.shape[::-1] == shape]
+        candidates = matches or transposed
+        if len(candidates) != 1:
+            raise ValueError(f"{model_path} 中找不到 MNISTNet 参数 {name} {shape}")
+        weights[name] = candidates[0]
+    return weights
+
+
+# ---------------------------------------------------------------------------
+# 推理引擎
+# ---------------------------------------------------------------------------
+
+class NumpyInferenceMNIST:
+    """
+    MNISTNet 纯NumPy实现，激活全部按 NHWC 存放:
+      conv1/conv2: im2col 工作区 [N*H*W, 3*3*C] -> GEMM，列按 (kh, kw, c) 排列，
+                   每个卷积核位置整块复制 C 个连续通道
+      maxpool:     [N, 12, 2, 12, 2, 64] 两两取最大值
+      fc1:         权重列在加载时由 (c,h,w) 重排为 (h,w,c)，池化结果无需转置
+    """
+
+    def __init__(self, model_path='../models/mnist_model.onnx', descriptor_path=None):
+        self.model_path = str(model_path)
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"模型文件不存在: {self.model_path}")
+
+        descriptor = load_model_descriptor(descriptor_path or self.model_path)
+        if list(descriptor['input_shape'][1:]) != [1, 28, 28] or descriptor['num_classes'] != 10:
+            raise ValueError(f"NumPy引擎只支持 MNISTNet (1x28x28, 10类)，模型描述为 "
+                             f"{descriptor['input_shape']}, {descriptor['num_classes']} 类")
+        self.image_shape = (28, 28)
+        self.num_classes = 10
+        self.mean = np.float32(descriptor['mean'][0])
+        self.std = np.float32(descriptor['std'][0])
+
+        weights = load_mnistnet_weights(self.model_path)
+        # GEMM 右侧矩阵 [K, C_out]，K 的顺序与 im2col 列 (kh, kw, c) 一致
+        self.w1 = np.ascontiguousarray(weights['conv1.weight'].reshape(32, 9).T)
+        self.b1 = weights['conv1.bias']
+        self.w2 = np.ascontiguousarray(weights['conv2.weight'].transpose(0, 2, 3, 1).reshape(64, 288).T)
+        self.b2 = weights['conv2.bias']
+        fc1 = weights['fc1.weight'].reshape(128, 64, 12, 12).transpose(0, 2, 3, 1).reshape(128, 9216)
+        self.w3 = np.ascontiguousarray(fc1.T)
+        self.b3 = weights['fc1.bias']
+        self.w4 = np.ascontiguousarray(weights['fc2.weight'].T)
+        self.b4 = weights['fc2.bias']
+
+        self.capacity = 0
+        print(f"✓ NumPy引擎加载权重: {self.model_path}")
+
+    def _reserve(self, batch_size):
+        """按批大小分配工作区（最多 WORKSPACE_BATCH 个样本），只在出现更大的批时重新分配"""
+        n = min(batch_size, WORKSPACE_BATCH)
+        if n <= self.capacity:
+            return
+        self.input = np.empty((n, 28, 28), dtype=np.float32)
+        self.cols1 = np.empty((n * 676, 9), dtype=np.float32)
+        self.act1 = np.empty((n * 676, 32), dtype=np.float32)
+        self.cols2 = np.empty((n * 576, 288), dtype=np.float32)
+        self.act2 = np.empty((n * 576, 64), dtype=np.float32)
+        self.row_max = np.empty((n, 12, 24, 64), dtype=np.float32)
+        self.pooled = np.empty((n, 12, 12, 64), dtype=np.float32)
+        self.hidden = np.empty((n, 128), dtype=np.float32)
+        self.logits = np.empty((n, 10), dtype=np.float32)
+        self.capacity = n
+
+    def run_batch(self, batch):
+        """对已标准化的 [N, 1, 28, 28] 或 [N, 28, 28] 批次推理，返回 log_softmax 输出 [N, 10]（新数组）"""
+        batch = batch.reshape(-1, 28, 28)
+        self._reserve(len(batch))
+        output = np.empty((len(batch), 10), dtype=np.float32)
+        for start in range(0, len(batch), self.capacity):
+            self._forward(batch[start:start + self.capacity], output[start:start + self.capacity])
+        return output
+
+    def _forward(self, batch, output):
+        """不超过工作区容量的一块样本的前向计算，结果写入 output"""
+        n = len(batch)
+        x = self.input[:n]
+        np.copyto(x, batch)
+
+        # conv1 + ReLU: [N*26*26, 9] @ [9, 32]
+        cols1, act1 = self.cols1[:n * 676], self.act1[:n * 676]
+        np.copyto(cols1.reshape(n, 26, 26, 3, 3), sliding_window_view(x, (3, 3), axis=(1, 2)))
+        np.matmul(cols1, self.w1, out=act1)
+        act1 += self.b1
+        np.maximum(act1, 0, out=act1)
+
+        # conv2 + ReLU: [N*24*24, 288] @ [288, 64]
+        cols2, act2 = self.cols2[:n * 576], self.act2[:n * 576]
+        feature, patches = act1.reshape(n, 26, 26, 32), cols2.reshape(n, 24, 24, 3, 3, 32)
+        for kh in range(3):
+            for kw in range(3):
+                patches[:, :, :, kh, kw] = feature[:, kh:kh + 24, kw:kw + 24]
+        np.matmul(cols2, self.w2, out=act2)
+        act2 += self.b2
+        np.maximum(act2, 0, out=act2)
+
+        # 2x2 最大池化 -> [N, 12, 12, 64]，按 (h, w, c) 展平
+        windows = act2.reshape(n, 12, 2, 12, 2, 64)
+        row_max, pooled = self.row_max[:n].reshape(n, 12, 12, 2, 64), self.pooled[:n]
+        np.maximum(windows[:, :, 0], windows[:, :, 1], out=row_max)
+        np.maximum(row_max[:, :, :, 0], row_max[:, :, :, 1], out=pooled)
+
+        # fc1 + ReLU, fc2
+        hidden, logits = self.hidden[:n], self.logits[:n]
+        np.matmul(pooled.reshape(n, 9216), self.w3, out=hidden)
+        hidden += self.b3
+        np.maximum(hidden, 0, out=hidden)
+        np.matmul(hidden, self.w4, out=logits)
+        logits += self.b4
+
+        # log_softmax
+        np.subtract(logits, logits.max(axis=1, keepdims=True), out=output)
+        output -= np.log(np.exp(output).sum(axis=1, keepdims=True))
+
+    def inference_batch(self, images, batch_size=1000):
+        """批量推理，images 为 [N, 28, 28]，范围[0,1]，返回模型原始logits [N, 10]"""
+        outputs = []
+        for start in range(0, len(images), batch_size):
+            batch = np.asarray(images[start:start + batch_size], dtype=np.float32)
+            outputs.append(self.run_batch((batch - self.mean) / self.std))
+        return np.concatenate(outputs)
+
+
+def run_tests(engine, images, labels, batch_size, timings_path=None):
+    """逐批推理全部测试样本，打印准确率和延迟；timings_path 非空时保存每个样本的推理时间 (float64 ms)"""
+    num_samples = len(labels)
+    print(f"\n=== 开始 NumPy 推理测试 ===")
+    print(f"开始推理 {num_samples} 个样本 (批大小: {batch_size})...")
+
+    timings = np.empty(num_samples, dtype=np.float64)
+    predictions = np.empty(num_samples, dtype=np.int64)
+    for start in range(0, num_samples, batch_size):
+        batch = np.asarray(images[start:start + batch_size], dtype=np.float32)
+        count = len(batch)
+        begin = time.perf_counter()
+        logits = engine.run_batch((batch - engine.mean) / engine.std)
+        elapsed_ms = (time.perf_counter() - begin) * 1000.0
+        predictions[start:start + count] = logits.argmax(axis=1)
+        timings[start:start + count] = elapsed_ms / count
+
+    correct = int((predictions == labels).sum())
+    avg_time = float(timings.mean())
+    print(f"\n=== NumPy 推理结果统计 ===")
+    print(f"总样本数: {num_samples}")
+    print(f"正确预测: {correct}")
+    print(f"准确率: {correct / num_samples * 100:.2f}%")
+    print(f"平均推理时间: {avg_time:.4f} ms")
+    print(f"推理速度: {1000.0 / avg_time:.1f} FPS")
+
+    if timings_path:
+        timings.tofile(timings_path)
+        print(f"✓ 推理时间已保存到: {timings_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MNISTNet 纯NumPy推理")
+    parser.add_argument('--model', default='../models/mnist_model.onnx', help='模型路径（.onnx 或 .pth）')
+    parser.add_argument('--descriptor', help='模型描述文件（默认与 --model 同名的 .json）')
+    parser.add_argument('--test-data', default='../test_data', help='测试数据目录（index.bin + images.bin）')
+    parser.add_argument('--batch-size', type=int, default=1, help='批大小')
+    parser.add_argument('--dump-logits', help='只导出全部样本的logits (float32 [N,10])，用于数值一致性检查')
+    parser.add_argument('--timings', help='保存每个样本的推理时间 (float64 ms)，用于基准测试')
+    args = parser.parse_args()
+
+    try:
+        engine = NumpyInferenceMNIST(args.model, args.descriptor)
+        images, labels, _ = load_mnist_test_data_mmap(args.test_data)
+    except (OSError, ValueError, pickle.UnpicklingError, zipfile.BadZipFile) as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✓ 加载 {len(labels)} 个测试样本")
+
+    if args.dump_logits:
+        logits = engine.inference_batch(images, batch_size=max(args.batch_size, 256))
+        logits.astype(np.float32).tofile(args.dump_logits)
+        print(f"✓ logits 已保存到: {args.dump_logits} ({logits.shape[0]}x{logits.shape[1]})")
+        return 0
+
+    run_tests(engine, images, labels, args.batch_size, args.timings)
+    print("\n✅ NumPy 推理测试完成")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
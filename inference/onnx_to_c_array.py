@@ -6,6 +6,7 @@ ONNX模型转C数组工具
 
 import sys
 import os
+import hashlib
 from pathlib import Path
 
 def onnx_to_c_array(onnx_file_path, output_c_file, array_name="embedded_model_data"):
@@ -30,6 +31,7 @@ def onnx_to_c_array(onnx_file_path, output_c_file, array_name="embedded_model_da
         return False
     
     model_size = len(model_data)
+    model_sha256 = hashlib.sha256(model_data).hexdigest()
     print(f"📄 模型文件: {onnx_file_path}")
     print(f"📏 模型大小: {model_size:,} bytes ({model_size/1024/1024:.1f} MB)")
     
@@ -76,6 +78,11 @@ const unsigned char* get_embedded_model_data(void) {{
 size_t get_embedded_model_size(void) {{
     return {array_name}_size;
 }}
+
+// 获取嵌入式模型数据SHA-256的函数（生成时计算，用作优化模型缓存键）
+const char* get_embedded_model_sha256(void) {{
+    return "{model_sha256}";
+}}
 """
     
     # 写入C文件
@@ -119,6 +126,7 @@ extern const size_t {array_name}_size;
 // 获取嵌入式模型数据的函数
 const unsigned char* get_embedded_model_data(void);
 size_t get_embedded_model_size(void);
+const char* get_embedded_model_sha256(void);
 
 #ifdef __cplusplus
 }}
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+ONNX模型转独立C推理内核
+读取ONNX计算图（Conv / Relu / MaxPool / Flatten / Reshape / Gemm / LogSoftmax / Softmax），
+生成不依赖ONNX Runtime的C源文件：权重为 const 数组，每层一个常量尺寸的内核函数，
+循环按输出像素和输出通道分块，最内层沿连续的输出通道展开，便于编译器自动向量化
+
+生成的文件实现 generated_model.h 中的接口，与 c_inference_lib.c 以 -DINFERENCE_USE_GENERATED_MODEL
+一起编译即得到与 c_inference_lib.h 接口相同、但不链接ONNX Runtime的推理库
+
+激活在内核之间按 HWC（通道最内）存放；模型输入保持 CHW（与其他引擎的预处理一致），
+由第一层卷积直接按 CHW 读取；Flatten 后的全连接层权重在生成时按 HWC 重排，运行时不做转置
+
+FP16 / BF16 权重存储模型（export_onnx.py 导出的 *_fp16.onnx / *_bf16.onnx，初始化器后接 Cast）：
+全连接层权重保持16位存放，在内层循环中转换为float后以FP32累加，权重读取字节减半；
+卷积权重很小，生成时直接展开为float
+
+用法:
+    python onnx_to_c_kernels.py ../models/mnist_model.onnx generated_model.c
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import onnx
+from onnx import numpy_helper, TensorProto
+
+# 卷积每次计算的输出像素数 x 输出通道数（累加器保持在寄存器中）
+CONV_TILE_PIXELS = 4
+CONV_TILE_CHANNELS = 64
+# 全连接层每次计算的输出数
+GEMM_TILE_OUTPUTS = 32
+
+# 权重数组每行的元素数
+VALUES_PER_LINE = 6
+
+# 权重存储类型 -> (C类型, 每个元素的字节数)
+WEIGHT_STORAGE_TYPES = {
+    'float': ('float', 4),
+    'float16': ('uint16_t', 2),
+    'bfloat16': ('uint16_t', 2),
+}
+# 可保持16位存放的ONNX初始化器类型
+REDUCED_PRECISION_TYPES = {TensorProto.FLOAT16: 'float16', TensorProto.BFLOAT16: 'bfloat16'}
+
+
+def c_float(value):
+    """float32 的精确C字面量（C99 十六进制浮点数）"""
+    value = float(np.float32(value))
+    if value == 0.0:
+        return '0.0f' if not np.signbit(value) else '-0.0f'
+    mantissa, exponent = value.hex().split('p')
+    return f"{mantissa.rstrip('0').rstrip('.')}p{exponent}f"
+
+
+def half_bits(array, storage):
+    """float32（由16位权重精确展开而来）-> float16 / bfloat16 位模式"""
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    if storage == 'float16':
+        return array.astype(np.float16).view(np.uint16)
+    return (array.view(np.uint32) >> 16).astype(np.uint16)
+
+
+def largest_divisor(n, limit):
+    """不超过 limit 的 n 的最大因子，使分块没有尾部"""
+    return max(d for d in range(1, min(n, limit) + 1) if n % d == 0)
+
+
+class Activation:
+    """中间张量：kind 为 'chw' / 'hwc'（三维特征图）或 'vec'（展平向量）"""
+
+    def __init__(self, kind, shape, flatten_from=None):
+        self.kind = kind
+        self.shape = tuple(shape)               # chw/hwc: (C, H, W)；vec: (N,)
+        self.flatten_from = flatten_from        # vec 由特征图展平而来时，记录展平前的 (C, H, W)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+
+class KernelGenerator:
+    """按计算图顺序为每个算子生成一个内核函数"""
+
+    def __init__(self, model):
+        self.graph = model.graph
+        self.initializers = {t.name: numpy_helper.to_array(t) for t in self.graph.initializer}
+        # 16位初始化器经 Cast 转为float后的张量名 -> 原存储类型（'float16' / 'bfloat16'）
+        self.storage = {t.name: REDUCED_PRECISION_TYPES[t.data_type] for t in self.graph.initializer
+                        if t.data_type in REDUCED_PRECISION_TYPES}
+        self.constants = {}                     # Constant / 常量 Cast 节点的输出
+        self.activations = {}                   # 张量名 -> Activation
+        self.layers = []                        # (函数名, 注释, 函数体代码, 输入Activation, 输出Activation)
+        self.weights = []                       # (数组名, float32数组, 存储类型)
+        self.consumers = {}
+        for node in self.graph.node:
+            for name in node.input:
+                self.consumers.setdefault(name, []).append(node)
+
+    # --- 图读取 ---
+
+    def tensor(self, name):
+        if name in self.initializers:
+            return self.initializers[name]
+        if name in self.constants:
+            return self.constants[name]
+        raise ValueError(f"张量 {name} 不是常量，不支持动态权重")
+
+    @staticmethod
+    def attributes(node):
+        return {a.name: onnx.helper.get_attribute_value(a) for a in node.attribute}
+
+    def fusable_relu(self, output_name):
+        """output_name 只被一个 Relu 使用且不是图输出时，返回该 Relu 节点（融合到上一层）"""
+        consumers = self.consumers.get(output_name, [])
+        graph_outputs = {o.name for o in self.graph.output}
+        if len(consumers) == 1 and consumers[0].op_type == 'Relu' and output_name not in graph_outputs:
+            return consumers[0]
+        return None
+
+    def add_weight(self, name, array, storage='float'):
+        self.weights.append((name, np.ascontiguousarray(array, dtype=np.float32), storage))
+        return name
+
+    def cast(self, node):
+        """常量的 Cast（to=FLOAT）在生成时折叠，记录源张量的16位存储类型"""
+        name = node.input[0]
+        if self.attributes(node).get('to') != TensorProto.FLOAT or name in self.activations:
+            raise ValueError(f"{node.name}: 只支持对常量权重做 Cast(to=FLOAT)")
+        self.constants[node.output[0]] = self.tensor(name).astype(np.float32)
+        if name in self.storage:
+            self.storage[node.output[0]] = self.storage[name]
+
+    # --- 算子 ---
+
+    def conv(self, node, relu):
+        x = self.activations[node.input[0]]
+        weight = self.tensor(node.input[1]).astype(np.float32)
+        bias = (self.tensor(node.input[2]).astype(np.float32) if len(node.input) > 2 and node.input[2]
+                else np.zeros(weight.shape[0], dtype=np.float32))
+        attrs = self.attributes(node)
+        if attrs.get('group', 1) != 1 or any(d != 1 for d in attrs.get('dilations', [1, 1])):
+            raise ValueError(f"{node.name}: 不支持分组卷积或空洞卷积")
+        if any(p != 0 for p in attrs.get('pads', [0, 0, 0, 0])) or attrs.get('auto_pad', b'NOTSET') not in (b'NOTSET', b'VALID'):
+            raise ValueError(f"{node.name}: 不支持带填充的卷积")
+
+        co, ci, kh, kw = weight.shape
+        c, h, w = x.shape
+        if ci != c:
+            raise ValueError(f"{node.name}: 输入通道数 {c} 与权重 {ci} 不一致")
+        sh, sw = attrs.get('strides', [1, 1])
+        oh, ow = (h - kh) // sh + 1, (w - kw) // sw + 1
+        index = self.layer_index()
+        # 权重重排为 [KH][KW][CI][CO]，最内层沿输出通道连续
+        w_name = self.add_weight(f"layer{index}_weight", weight.transpose(2, 3, 1, 0))
+        b_name = self.add_weight(f"layer{index}_bias", bias)
+
+        tile_p = largest_divisor(ow, CONV_TILE_PIXELS)
+        tile_c = largest_divisor(co, CONV_TILE_CHANNELS)
+        if x.kind == 'chw':
+            in_index = f"(ci * {h} + ih) * {w} + iw"
+        else:
+            in_index = f"(ih * {w} + iw) * {ci} + ci"
+        activation = "acc[p][k] > 0.0f ? acc[p][k] : 0.0f" if relu else "acc[p][k]"
+        body = f"""    for (int oy = 0; oy < {oh}; oy++) {{
+        for (int ox = 0; ox < {ow}; ox += {tile_p}) {{
+            for (int oc = 0; oc < {co}; oc += {tile_c}) {{
+                float acc[{tile_p}][{tile_c}];
+                for (int p = 0; p < {tile_p}; p++)
+                    for (int k = 0; k < {tile_c}; k++) acc[p][k] = {b_name}[oc + k];
+                for (int ky = 0; ky < {kh}; ky++) {{
+                    const int ih = oy * {sh} + ky;
+                    for (int kx = 0; kx < {kw}; kx++) {{
+                        for (int ci = 0; ci < {ci}; ci++) {{
+                            const float* wk = &{w_name}[((ky * {kw} + kx) * {ci} + ci) * {co} + oc];
+                            for (int p = 0; p < {tile_p}; p++) {{
+                                const int iw = (ox + p) * {sw} + kx;
+                                const float v = input[{in_index}];
+                                for (int k = 0; k < {tile_c}; k++) acc[p][k] += v * wk[k];
+                            }}
+                        }}
+                    }}
+                }}
+                for (int p = 0; p < {tile_p}; p++) {{
+                    float* out = &output[(oy * {ow} + ox + p) * {co} + oc];
+                    for (int k = 0; k < {tile_c}; k++) out[k] = {activation};
+                }}
+            }}
+        }}
+    }}
+"""
+        out = Activation('hwc', (co, oh, ow))
+        comment = (f"Conv {ci}x{h}x{w} -> {co}x{oh}x{ow}, {kh}x{kw} 步长{sh}" + (" + ReLU" if relu else "")
+                   + f"（分块 {tile_p} 像素 x {tile_c} 通道）")
+        self.add_layer(f"layer{index}_conv", comment, body, x, out)
+        return out
+
+    def max_pool(self, node):
+        x = self.activations[node.input[0]]
+        attrs = self.attributes(node)
+        kh, kw = attrs['kernel_shape']
+        sh, sw = attrs.get('strides', [1, 1])
+        if any(p != 0 for p in attrs.get('pads', [0, 0, 0, 0])) or attrs.get('ceil_mode', 0):
+            raise ValueError(f"{node.name}: 不支持带填充或 ceil_mode 的池化")
+        if x.kind != 'hwc':
+            raise ValueError(f"{node.name}: 池化输入应为卷积输出")
+        c, h, w = x.shape
+        oh, ow = (h - kh) // sh + 1, (w - kw) // sw + 1
+        index = self.layer_index()
+        body = f"""    for (int oy = 0; oy < {oh}; oy++) {{
+        for (int ox = 0; ox < {ow}; ox++) {{
+            float* out = &output[(oy * {ow} + ox) * {c}];
+            const float* first = &input[(oy * {sh} * {w} + ox * {sw}) * {c}];
+            for (int k = 0; k < {c}; k++) out[k] = first[k];
+            for (int ky = 0; ky < {kh}; ky++) {{
+                for (int kx = 0; kx < {kw}; kx++) {{
+                    const float* in = &input[((oy * {sh} + ky) * {w} + ox * {sw} + kx) * {c}];
+                    for (int k = 0; k < {c}; k++) out[k] = in[k] > out[k] ? in[k] : out[k];
+                }}
+            }}
+        }}
+    }}
+"""
+        out = Activation('hwc', (c, oh, ow))
+        self.add_layer(f"layer{index}_maxpool", f"MaxPool {c}x{h}x{w} -> {c}x{oh}x{ow}, {kh}x{kw} 步长{sh}",
+                       body, x, out)
+        return out
+
+    def flatten(self, node):
+        """展平不移动数据，只记录展平前的形状，供下一个全连接层重排权重"""
+        x = self.activations[node.input[0]]
+        if node.op_type == 'Reshape':
+            shape = [int(d) for d in self.tensor(node.input[1])]
+            if len(shape) != 2 or shape[1] not in (-1, x.size):
+                raise ValueError(f"{node.name}: 只支持展平为 [batch, -1] 的 Reshape，实际 {shape}")
+        elif self.attributes(node).get('axis', 1) != 1:
+            raise ValueError(f"{node.name}: 只支持 axis=1 的 Flatten")
+        return Activation('vec', (x.size,), flatten_from=x)
+
+    def gemm(self, node, relu):
+        x = self.activations[node.input[0]]
+        attrs = self.attributes(node)
+        if attrs.get('transA', 0) or attrs.get('alpha', 1.0) != 1.0 or attrs.get('beta', 1.0) != 1.0:
+            raise ValueError(f"{node.name}: 只支持 transA=0, alpha=beta=1 的 Gemm")
+        weight = self.tensor(node.input[1]).astype(np.float32)
+        if attrs.get('transB', 0):
+            weight = weight.T                  # -> [K, N]
+        k_size, n_size = weight.shape
+        bias = (self.tensor(node.input[2]).astype(np.float32).reshape(-1) if len(node.input) > 2 and node.input[2]
+                else np.zeros(n_size, dtype=np.float32))
+        if x.size != k_size:
+            raise ValueError(f"{node.name}: 输入长度 {x.size} 与权重 {k_size} 不一致")
+        source = x.flatten_from if x.kind == 'vec' else x
+        if source is not None and source.kind == 'hwc':
+            # 权重行由 (c, h, w) 展平顺序重排为特征图实际存放的 (h, w, c) 顺序
+            c, h, w = source.shape
+            weight = weight.reshape(c, h, w, n_size).transpose(1, 2, 0, 3).reshape(k_size, n_size)
+
+        index = self.layer_index()
+        tile = largest_divisor(n_size, GEMM_TILE_OUTPUTS)
+        # 权重按输出分块存放 [N/tile][K][tile]，每块计算时顺序读取
+        blocked = weight.reshape(k_size, n_size // tile, tile).transpose(1, 0, 2)
+        # 16位存储的权重保持16位（全连接层权重占模型的绝大部分，batch=1 时受内存带宽限制）
+        storage = self.storage.get(node.input[1], 'float')
+        w_type = WEIGHT_STORAGE_TYPES[storage][0]
+        w_name = self.add_weight(f"layer{index}_weight", blocked, storage)
+        b_name = self.add_weight(f"layer{index}_bias", bias)
+        activation = "acc[j] > 0.0f ? acc[j] : 0.0f" if relu else "acc[j]"
+        load = "wk[j]" if storage == 'float' else f"{storage}_to_float(wk[j])"
+        body = f"""    for (int block = 0; block < {n_size // tile}; block++) {{
+        const {w_type}* wb = &{w_name}[block * {k_size * tile}];
+        float acc[{tile}];
+        for (int j = 0; j < {tile}; j++) acc[j] = {b_name}[block * {tile} + j];
+        for (int k = 0; k < {k_size}; k++) {{
+            const float v = input[k];
+            const {w_type}* wk = &wb[k * {tile}];
+            for (int j = 0; j < {tile}; j++) acc[j] += v * {load};
+        }}
+        for (int j = 0; j < {tile}; j++) output[block * {tile} + j] = {activation};
+    }}
+"""
+        out = Activation('vec', (n_size,))
+        comment = (f"Gemm {k_size} -> {n_size}" + (" + ReLU" if relu else "") + f"（分块 {tile} 输出"
+                   + ("" if storage == 'float' else f"，{storage} 权重") + "）")
+        self.add_layer(f"layer{index}_gemm", comment, body, x, out)
+        return out
+
+    def relu(self, node):
+        x = self.activations[node.input[0]]
+        index = self.layer_index()
+        body = f"""    for (int i = 0; i < {x.size}; i++) output[i] = input[i] > 0.0f ? input[i] : 0.0f;
+"""
+        out = Activation(x.kind, x.shape, x.flatten_from)
+        self.add_layer(f"layer{index}_relu", f"ReLU {x.size}", body, x, out)
+        return out
+
+    def softmax(self, node, log):
+        x = self.activations[node.input[0]]
+        if x.kind != 'vec' or self.attributes(node).get('axis', -1) not in (-1, 1):
+            raise ValueError(f"{node.name}: 只支持对类别维做 {node.op_type}")
+        n = x.size
+        index = self.layer_index()
+        if log:
+            finish = f"""    const float log_sum = logf(sum);
+    for (int i = 0; i < {n}; i++) output[i] = input[i] - max_value - log_sum;
+"""
+        else:
+            finish = f"""    for (int i = 0; i < {n}; i++) output[i] = expf(input[i] - max_value) / sum;
+"""
+        body = f"""    float max_value = input[0];
+    for (int i = 1; i < {n}; i++) max_value = input[i] > max_value ? input[i] : max_value;
+    float sum = 0.0f;
+    for (int i = 0; i < {n}; i++) sum += expf(input[i] - max_value);
+{finish}"""
+        out = Activation('vec', (n,))
+        self.add_layer(f"layer{index}_{node.op_type.lower()}", f"{node.op_type} {n}", body, x, out)
+        return out
+
+    # --- 生成 ---
+
+    def layer_index(self):
+        return len(self.layers)
+
+    def add_layer(self, name, comment, body, x, out):
+        self.layers.append((name, comment, body, x, out))
+
+    def build(self):
+        graph_input = next(i for i in self.graph.input if i.name not in self.initializers)
+        dims = [d.dim_value if d.HasField('dim_value') else -1 for d in graph_input.type.tensor_type.shape.dim]
+        if len(dims) != 4 or min(dims[1:]) < 1:
+            raise ValueError(f"不支持的模型输入形状 {dims}（需要 NCHW 且 C/H/W 固定）")
+        self.input_shape = tuple(dims[1:])
+        self.activations[graph_input.name] = Activation('chw', self.input_shape)
+
+        fused = set()
+        for node in self.graph.node:
+            if id(node) in fused:
+                continue
+            op = node.op_type
+            if op == 'Constant':
+                self.constants[node.output[0]] = numpy_helper.to_array(self.attributes(node)['value'])
+                continue
+            if op == 'Cast':
+                self.cast(node)
+                continue
+            relu = self.fusable_relu(node.output[0]) if op in ('Conv', 'Gemm') else None
+            if relu is not None:
+                fused.add(id(relu))
+            if op == 'Conv':
+                out = self.conv(node, relu is not None)
+            elif op == 'Gemm':
+                out = self.gemm(node, relu is not None)
+            elif op == 'Relu':
+                out = self.relu(node)
+            elif op == 'MaxPool':
+                out = self.max_pool(node)
+            elif op in ('Flatten', 'Reshape'):
+                out = self.flatten(node)
+            elif op in ('LogSoftmax', 'Softmax'):
+                out = self.softmax(node, log=(op == 'LogSoftmax'))
+            elif op in ('Identity', 'Dropout'):
+                out = self.activations[node.input[0]]
+            else:
+                raise ValueError(f"不支持的算子: {op} ({node.name})")
+            self.activations[(relu or node).output[0]] = out
+
+        graph_output = self.graph.output[0].name
+        final = self.activations.get(graph_output)
+        if final is None or final.kind != 'vec' or not self.layers:
+            raise ValueError("模型输出应为类别向量")
+        self.num_classes = final.size
+
+    def render(self, source_name, model_sha256):
+        """生成C源文件内容：权重数组、各层内核、generated_model.h 接口实现"""
+        # 相邻两层的激活交替使用工作区的两半，第一层读模型输入，最后一层写输出
+        half = max(out.size for *_, out in self.layers[:-1]) if len(self.layers) > 1 else 0
+        workspace_size = 2 * half
+        c, h, w = self.input_shape
+        weight_count = sum(a.size for _, a, _ in self.weights)
+        weight_bytes = sum(a.size * WEIGHT_STORAGE_TYPES[storage][1] for _, a, storage in self.weights)
+        storages = {storage for *_, storage in self.weights}
+
+        lines = [f"""/*
+ * 自动生成的独立C推理内核（不依赖ONNX Runtime）
+ * 原始文件: {source_name}
+ * 输入: {c}x{h}x{w}, 类别数: {self.num_classes}, 参数: {weight_count:,} 个（{weight_bytes / 1024:.1f} KB）
+ * 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+ *
+ * 注意: 此文件由 onnx_to_c_kernels.py 自动生成，请勿手动编辑
+ */
+
+#include <math.h>
+#include <stddef.h>
+#include "generated_model.h"
+
+// x86-64 上为每个内核生成 AVX-512 / AVX2+FMA / 基线三个版本，加载时按CPU选择，无需 -march 编译选项
+// （ARM64 的 NEON 是基线指令集，直接 -O3 即可向量化）
+#if defined(__x86_64__) && defined(__GNUC__) && !defined(__clang__)
+#define KERNEL_CLONES __attribute__((target_clones("arch=x86-64-v4", "arch=x86-64-v3", "default")))
+#else
+#define KERNEL_CLONES
+#endif
+
+#if defined(__GNUC__)
+#define WEIGHT_ALIGN __attribute__((aligned(64)))
+#else
+#define WEIGHT_ALIGN
+#endif
+"""]
+        if storages - {'float'}:
+            lines.append("""#include <stdint.h>
+#include <string.h>
+
+// 16位权重在内层循环中展开为float，可与累加一起向量化
+// （x86 上 GCC 不能向量化 _Float16 的转换，改用整数移位和乘法）
+static inline float bits_to_float(uint32_t bits) {
+    float result;
+    memcpy(&result, &bits, sizeof(result));
+    return result;
+}
+
+// FP16: ARM64 上由 fcvtl 指令转换；其他平台把指数和尾数移到float32的位置后乘 2^112 修正指数偏置
+// （非规格化数同样正确；权重不含 Inf/NaN）
+static inline float float16_to_float(uint16_t value) {
+#if defined(__aarch64__)
+    _Float16 half;
+    memcpy(&half, &value, sizeof(half));
+    return (float)half;
+#else
+    const float magnitude = bits_to_float((uint32_t)(value & 0x7fff) << 13) * 0x1p112f;
+    uint32_t bits;
+    memcpy(&bits, &magnitude, sizeof(bits));
+    return bits_to_float(bits | (uint32_t)(value & 0x8000) << 16);
+#endif
+}
+
+// BF16 即float32的高16位
+static inline float bfloat16_to_float(uint16_t value) {
+    return bits_to_float((uint32_t)value << 16);
+}
+""")
+        lines.append("// === 权重 ===\n")
+        for name, array, storage in self.weights:
+            if storage == 'float':
+                values = [c_float(v) for v in array.reshape(-1)]
+            else:
+                values = [f"0x{v:04x}" for v in half_bits(array, storage).reshape(-1)]
+            c_type = WEIGHT_STORAGE_TYPES[storage][0]
+            lines.append(f"static const {c_type} {name}[{len(values)}] WEIGHT_ALIGN = {{")
+            for i in range(0, len(values), VALUES_PER_LINE):
+                lines.append("    " + ", ".join(values[i:i + VALUES_PER_LINE]) + ",")
+            lines.append("};\n")
+
+        lines.append("// === 各层内核 ===\n")
+        for name, comment, body, _, _ in self.layers:
+            lines.append(f"// {comment}")
+            lines.append(f"KERNEL_CLONES static void {name}(const float* restrict input, float* restrict output) {{")
+            lines.append(body.rstrip('\n'))
+            lines.append("}\n")
+
+        lines.append("// === 接口实现（generated_model.h） ===\n")
+        lines.append(f"""void get_generated_model_input_shape(int* channels, int* height, int* width) {{
+    *channels = {c};
+    *height = {h};
+    *width = {w};
+}}
+
+int get_generated_model_num_classes(void) {{
+    return {self.num_classes};
+}}
+
+size_t get_generated_model_workspace_size(void) {{
+    return {workspace_size};
+}}
+
+size_t get_generated_model_parameter_count(void) {{
+    return {weight_count};
+}}
+
+const char* get_generated_model_sha256(void) {{
+    return "{model_sha256}";
+}}
+
+void generated_model_run(const float* input, float* output, float* workspace) {{""")
+        buffers = [f"workspace", f"workspace + {half}"]
+        source = "input"
+        for i, (name, *_rest) in enumerate(self.layers):
+            target = "output" if i == len(self.layers) - 1 else buffers[i % 2]
+            lines.append(f"    {name}({source}, {target});")
+            source = target
+        lines.append("}\n")
+        return "\n".join(lines)
+
+
+def generate(onnx_path, output_path):
+    """生成C内核文件，成功返回True"""
+    try:
+        model = onnx.load(onnx_path)   # 外部数据（.onnx.data）一并加载
+    except FileNotFoundError:
+        print(f"❌ 错误: 找不到模型文件 {onnx_path}")
+        return False
+    except Exception as e:
+        print(f"❌ 错误: 读取模型文件失败 - {e}")
+        return False
+
+    digest = hashlib.sha256()
+    for path in [onnx_path] + [p for p in [f"{onnx_path}.data"] if os.path.exists(p)]:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+
+    generator = KernelGenerator(model)
+    try:
+        generator.build()
+    except (ValueError, KeyError) as e:
+        print(f"❌ 错误: {e}")
+        return False
+
+    source = generator.render(os.path.basename(onnx_path), digest.hexdigest())
+    with open(output_path, 'w') as f:
+        f.write(source)
+
+    print(f"📄 模型文件: {onnx_path}")
+    for name, comment, *_ in generator.layers:
+        print(f"  {name:<18} {comment}")
+    print(f"✅ 已生成C推理内核: {output_path} ({os.path.getsize(output_path) / 1024 / 1024:.1f} MB 源码)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX模型转独立C推理内核")
+    parser.add_argument('onnx_file', help='ONNX模型路径')
+    parser.add_argument('output_c_file', nargs='?', default='generated_model.c', help='输出的C文件路径')
+    args = parser.parse_args()
+    return 0 if generate(args.onnx_file, args.output_c_file) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Python / NumPy / C / C++ 推理引擎数值一致性检查
+各引擎读取同一份内存映射测试数据（index.bin + images.bin），
+逐元素比较模型原始logits，统计超出容差的元素、预测不一致的样本和偏差最大的样本
+
+用法:
+    python parity_check.py                       # 使用默认路径比较全部可用引擎
+    python parity_check.py --atol 1e-5 --rtol 1e-5
+    python parity_check.py --engines python,cpp
+    python parity_check.py --engines python,numpy     # 纯NumPy引擎（numpy_inference.py）
+    python parity_check.py --engines python,c_gen     # 生成内核的C库（onnx_to_c_kernels.py，不依赖ORT）
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from mnist_data import load_mnist_test_data_mmap, load_model_descriptor, model_descriptor_path
+
+DEFAULT_ATOL = 1e-4
+DEFAULT_RTOL = 1e-4
+WORST_SAMPLES = 10
+
+# 本地可执行引擎：名称 -> (默认可执行文件, 是否支持 --model 参数)
+NATIVE_ENGINES = {
+    'c_lib': ('./c_inference_lib', False),   # 嵌入式模型，编译时固定
+    'c_gen': ('./c_inference_gen', False),   # 生成的推理内核，权重编译进程序
+    'cpp': ('./cpp_inference', True),
+}
+
+# 在本进程内运行的Python引擎（按需导入，只比较NumPy引擎时不需要安装 onnxruntime）
+PYTHON_ENGINES = ['python', 'numpy']
+
+
+def run_python_engine(model_path, images, batch_size):
+    """Python ONNX Runtime 批量推理，返回 logits [N, 类别数]"""
+    from python_inference import PythonONNXInferenceMNIST
+    engine = PythonONNXInferenceMNIST(model_path)
+    return engine.inference_batch(images, batch_size=batch_size)
+
+
+def run_numpy_engine(model_path, images, batch_size):
+    """纯NumPy引擎批量推理，返回 logits [N, 10]"""
+    from numpy_inference import NumpyInferenceMNIST
+    engine = NumpyInferenceMNIST(model_path)
+    return engine.inference_batch(images, batch_size=batch_size)
+
+
+def run_native_engine(name, executable, model_path, test_data_dir, work_dir, timeout, num_classes):
+    """调用本地引擎的 --dump-logits 模式，返回 logits [N, num_classes]（内存映射）"""
+    _, accepts_model = NATIVE_ENGINES[name]
+    logits_path = Path(work_dir) / f"{name}_logits.bin"
+
+    command = [executable, '--test-data', str(test_data_dir), '--dump-logits', str(logits_path)]
+    if accepts_model:
+        command += ['--model', str(model_path)]
+    else:
+        # 嵌入式模型的描述文件需显式指定
+        command += ['--descriptor', model_descriptor_path(model_path)]
+
+    result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        print(result.stdout[-2000:])
+        print(result.stderr[-2000:])
+        raise RuntimeError(f"{name} 引擎退出码 {result.returncode}")
+
+    return np.memmap(logits_path, dtype=np.float32, mode='r').reshape(-1, num_classes)
+
+
+def compare_engine(logits, reference, labels, atol, rtol):
+    """逐元素比较两组logits，返回一致性报告"""
+    if logits.shape != reference.shape:
+        return {'error': f"形状不一致: {logits.shape} vs {reference.shape}"}
+
+    logits = np.asarray(logits, dtype=np.float32)
+    abs_diff = np.abs(logits - reference)
+    rel_diff = abs_diff / np.maximum(np.abs(reference), np.finfo(np.float32).tiny)
+    mismatch = abs_diff > atol + rtol * np.abs(reference)   # 与 np.isclose 相同的判定
+
+    sample_max_diff = abs_diff.max(axis=1)
+    predictions = logits.argmax(axis=1)
+    reference_predictions = reference.argmax(axis=1)
+    disagreements = np.flatnonzero(predictions != reference_predictions)
+
+    worst = np.argsort(sample_max_diff)[::-1][:WORST_SAMPLES]
+
+    return {
+        'samples': int(len(reference)),
+        'accuracy': float((predictions == labels).mean()),
+        'max_abs_diff': float(abs_diff.max()),
+        'mean_abs_diff': float(abs_diff.mean()),
+        'max_rel_diff': float(rel_diff.max()),
+        'p99_sample_diff': float(np.percentile(sample_max_diff, 99)),
+        'mismatched_elements': int(mismatch.sum()),
+        'mismatched_samples': int(mismatch.any(axis=1).sum()),
+        'disagreements': int(len(disagreements)),
+        'disagreement_samples': disagreements[:100].tolist(),
+        'worst_samples': [
+            {
+                'sample_id': int(i),
+                'true_label': int(labels[i]),
+                'predicted': int(predictions[i]),
+                'reference_predicted': int(reference_predictions[i]),
+                'max_abs_diff': float(sample_max_diff[i]),
+            }
+            for i in worst
+        ],
+    }
+
+
+def print_parity(reports, reference_name, atol, rtol):
+    """打印一致性汇总表"""
+    print(f"\n=== 数值一致性检查 (参考引擎: {reference_name}, atol={atol:g}, rtol={rtol:g}) ===")
+    print(f"{'引擎':<8} {'样本数':>7} {'准确率':>8} {'最大偏差':>10} {'平均偏差':>10} "
+          f"{'超差元素':>8} {'超差样本':>8} {'预测不一致':>10} {'耗时(s)':>8}")
+    print("-" * 90)
+    for name, r in reports.items():
+        if 'error' in r:
+            print(f"{name:<8} ❌ {r['error']}")
+            continue
+        print(f"{name:<8} {r['samples']:>7} {r['accuracy']:>8.2%} {r['max_abs_diff']:>10.2e} "
+              f"{r['mean_abs_diff']:>10.2e} {r['mismatched_elements']:>8} {r['mismatched_samples']:>8} "
+              f"{r['disagreements']:>10} {r['run_time_s']:>8.2f}")
+
+    for name, r in reports.items():
+        if name == reference_name or 'error' in r or r['mismatched_elements'] == 0:
+            continue
+        print(f"\n{name} 偏差最大的样本:")
+        for w in r['worst_samples'][:5]:
+            print(f"  样本 {w['sample_id']:5d}: 真实={w['true_label']}, 预测={w['predicted']}, "
+                  f"参考预测={w['reference_predicted']}, 最大偏差={w['max_abs_diff']:.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Python / NumPy / C / C++ 推理引擎数值一致性检查")
+    parser.add_argument('--model', default='../models/mnist_model.onnx', help='ONNX模型路径')
+    parser.add_argument('--test-data', default='../test_data', help='测试数据目录（index.bin + images.bin）')
+    parser.add_argument('--engines', default='python,numpy,c_lib,c_gen,cpp',
+                        help='参与比较的引擎，逗号分隔（第一个为参考引擎）')
+    parser.add_argument('--c-lib-exe', default=NATIVE_ENGINES['c_lib'][0], help='C库推理程序路径')
+    parser.add_argument('--c-gen-exe', default=NATIVE_ENGINES['c_gen'][0], help='生成内核的C推理程序路径')
+    parser.add_argument('--cpp-exe', default=NATIVE_ENGINES['cpp'][0], help='C++推理程序路径')
+    parser.add_argument('--atol', type=float, default=DEFAULT_ATOL, help='绝对容差')
+    parser.add_argument('--rtol', type=float, default=DEFAULT_RTOL, help='相对容差')
+    parser.add_argument('--max-disagreements', type=int, default=0, help='允许的预测不一致样本数')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Python / NumPy 引擎批大小')
+    parser.add_argument('--timeout', type=float, default=3600, help='单个本地引擎超时（秒）')
+    parser.add_argument('--output', default='../results/parity_report.json', help='报告输出路径')
+    args = parser.parse_args()
+
+    engines = [e.strip() for e in args.engines.split(',') if e.strip()]
+    executables = {'c_lib': args.c_lib_exe, 'c_gen': args.c_gen_exe, 'cpp': args.cpp_exe}
+    unknown = [e for e in engines if e not in PYTHON_ENGINES and e not in NATIVE_ENGINES]
+    if unknown:
+        print(f"❌ 未知引擎: {', '.join(unknown)}")
+        return 1
+
+    images, labels, _ = load_mnist_test_data_mmap(args.test_data)
+    print(f"🔍 内存映射加载 {len(labels)} 个测试样本: {args.test_data}")
+    num_classes = int(load_model_descriptor(args.model)['num_classes'])
+
+    logits_by_engine = {}
+    run_times = {}
+    with tempfile.TemporaryDirectory(prefix='parity_') as work_dir:
+        for name in engines:
+            if name not in PYTHON_ENGINES and not os.access(executables[name], os.X_OK):
+                print(f"⚠️ 跳过 {name}: 找不到可执行文件 {executables[name]}")
+                continue
+
+            print(f"\n▶ 运行 {name} 引擎...")
+            start = time.perf_counter()
+            try:
+                if name == 'python':
+                    logits = run_python_engine(args.model, images, args.batch_size)
+                elif name == 'numpy':
+                    logits = run_numpy_engine(args.model, images, args.batch_size)
+                else:
+                    logits = run_native_engine(name, executables[name], args.model,
+                                               args.test_data, work_dir, args.timeout, num_classes)
+                    logits = np.array(logits)   # 临时目录删除前读入内存
+            except (RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+                print(f"❌ {name} 引擎运行失败: {e}")
+                return 1
+            run_times[name] = time.perf_counter() - start
+            logits_by_engine[name] = logits
+
+    if len(logits_by_engine) < 2:
+        print("❌ 可用引擎不足两个，无法比较")
+        return 1
+
+    reference_name = next(iter(logits_by_engine))
+    reference = logits_by_engine[reference_name]
+    reports = {}
+    for name, logits in logits_by_engine.items():
+        reports[name] = compare_engine(logits, reference, labels, args.atol, args.rtol)
+        reports[name]['run_time_s'] = run_times[name]
+
+    print_parity(reports, reference_name, args.atol, args.rtol)
+
+    failures = []
+    for name, r in reports.items():
+        if 'error' in r:
+            failures.append(f"{name}: {r['error']}")
+            continue
+        if r['mismatched_elements'] > 0:
+            failures.append(f"{name}: {r['mismatched_elements']} 个元素超出容差")
+        if r['disagreements'] > args.max_disagreements:
+            failures.append(f"{name}: 预测不一致 {r['disagreements']} 个，超过 {args.max_disagreements}")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'reference': reference_name,
+            'model': args.model,
+            'test_data': args.test_data,
+            'atol': args.atol,
+            'rtol': args.rtol,
+            'engines': reports,
+            'failures': failures,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n报告已保存到: {args.output}")
+
+    if failures:
+        print("\n❌ 数值一致性检查未通过:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\n✅ 所有引擎数值一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
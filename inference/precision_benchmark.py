@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+权重精度变体基准测试：FP32 / FP16 / BF16（export_onnx.py 导出的权重存储模型）/ INT8（动态量化）/
+QAT INT8（train_model.py --qat + export_onnx.py --qat 导出的QDQ模型，ORT融合为 QLinearConv / QGemm）
+对每个存在的模型文件报告文件大小、会话创建时间、batch=1 与 batch=64 的 Run 延迟、测试集准确率，
+以及相对FP32模型的最大logit差异和预测一致率
+
+FP16 / BF16 模型只改变权重的存储精度，ORT 加载时把常量 Cast 折叠回 float32，运行时计算与FP32相同；
+其收益在文件大小和加载IO。全连接层权重以16位读取的效果见 benchmark.py --engines c_gen,c_gen_fp16,c_gen_bf16
+
+用法:
+    python precision_benchmark.py
+    python precision_benchmark.py --variants fp32,bf16 --batch-sizes 1,8,64 --runs 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import onnxruntime as ort
+
+from python_inference import load_mnist_test_data_mmap, load_model_descriptor
+from static_batch_benchmark import latency_summary, time_runs
+
+# 变体名称 -> 模型文件后缀（mnist_model.onnx -> mnist_model_fp16.onnx）
+VARIANTS = {'fp32': '', 'fp16': '_fp16', 'bf16': '_bf16', 'int8': '_int8', 'qat_int8': '_qat_int8'}
+
+
+def variant_path(model_path, variant):
+    stem, ext = os.path.splitext(model_path)
+    return f"{stem}{VARIANTS[variant]}{ext}"
+
+
+def model_size(model_path):
+    """模型文件大小（字节），包括外部数据文件 .onnx.data"""
+    return sum(os.path.getsize(p) for p in (model_path, f"{model_path}.data") if os.path.exists(p))
+
+
+def create_session(model_path):
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+
+def load_time_ms(model_path, runs):
+    """会话创建时间中位数（毫秒），包括读取文件、图优化和权重预打包"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        create_session(model_path)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000.0
+
+
+def run_logits(session, images, chunk=1000):
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+    return np.concatenate([session.run([output_name], {input_name: images[i:i + chunk]})[0]
+                           for i in range(0, len(images), chunk)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FP32 / FP16 / BF16 / INT8 / QAT INT8 模型变体基准测试")
+    parser.add_argument('--model', default='../models/mnist_model.onnx', help='FP32 ONNX模型路径')
+    parser.add_argument('--variants', default=','.join(VARIANTS), help='测试的变体，逗号分隔')
+    parser.add_argument('--test-data', default='../test_data', help='测试数据目录')
+    parser.add_argument('--batch-sizes', default='1,64', help='计时的批大小，逗号分隔')
+    parser.add_argument('--runs', type=int, default=200, help='每个批大小的计时运行次数')
+    parser.add_argument('--warmup', type=int, default=20, help='每个批大小的预热运行次数')
+    parser.add_argument('--load-runs', type=int, default=10, help='会话创建的重复次数')
+    parser.add_argument('--output', default='../results/precision_benchmark.json', help='结果JSON路径')
+    args = parser.parse_args()
+
+    names = [v.strip() for v in args.variants.split(',') if v.strip()]
+    unknown = [v for v in names if v not in VARIANTS]
+    if unknown:
+        print(f"❌ 未知变体: {', '.join(unknown)}")
+        return 1
+    if 'fp32' not in names:
+        names.insert(0, 'fp32')   # 作为比较基准
+    paths = {v: variant_path(args.model, v) for v in names}
+    missing = [v for v in names if not os.path.exists(paths[v])]
+    for v in missing:
+        print(f"⚠️  跳过 {v}: 找不到 {paths[v]}")
+    if 'fp32' in missing:
+        return 1
+    names = [v for v in names if v not in missing]
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',') if b.strip()]
+
+    descriptor = load_model_descriptor(args.model)
+    image_shape = tuple(descriptor['input_shape'][1:])
+    mean = np.asarray(descriptor['mean'], dtype=np.float32).reshape(-1, 1, 1)
+    std = np.asarray(descriptor['std'], dtype=np.float32).reshape(-1, 1, 1)
+    images, labels, _ = load_mnist_test_data_mmap(args.test_data)
+    images = ((np.asarray(images, dtype=np.float32).reshape(-1, *image_shape) - mean) / std).astype(np.float32)
+    print(f"\n🔍 {len(images)} 个测试样本，变体: {', '.join(names)}")
+
+    sessions = {v: create_session(paths[v]) for v in names}
+    logits = {v: run_logits(sessions[v], images) for v in names}
+    reference = logits['fp32'].argmax(axis=1)
+
+    results = {}
+    for v in names:
+        predictions = logits[v].argmax(axis=1)
+        results[v] = {
+            'path': paths[v],
+            'size_bytes': model_size(paths[v]),
+            'load_ms': load_time_ms(paths[v], args.load_runs),
+            'accuracy': float(np.mean(predictions == labels)),
+            'agreement_with_fp32': float(np.mean(predictions == reference)),
+            'max_logit_diff_vs_fp32': float(np.abs(logits[v] - logits['fp32']).max()),
+            'latency': {},
+        }
+
+    # 各变体交替计时，漂移对各变体的影响相同
+    for batch_size in batch_sizes:
+        batch = images[np.arange(batch_size) % len(images)]
+        runners = []
+        for v in names:
+            session = sessions[v]
+            feed_name, fetch_name = session.get_inputs()[0].name, session.get_outputs()[0].name
+            runners.append(lambda x, session=session, feed_name=feed_name, fetch_name=fetch_name:
+                           session.run([fetch_name], {feed_name: x}))
+        times = time_runs(runners, batch, args.runs, args.warmup)
+        for v, variant_times in zip(names, times):
+            results[v]['latency'][str(batch_size)] = latency_summary(variant_times, batch_size)
+
+    latency_headers = ''.join(f" {f'b={b} 中位数(ms)':>15}" for b in batch_sizes)
+    print(f"\n{'变体':>8} {'大小(MB)':>9} {'加载(ms)':>9}{latency_headers} {'准确率':>8} {'与FP32一致':>10} "
+          f"{'最大logit差':>11}")
+    print("-" * (62 + 16 * len(batch_sizes)))
+    for v in names:
+        r = results[v]
+        latencies = ''.join(f" {r['latency'][str(b)]['median_ms']:>15.4f}" for b in batch_sizes)
+        print(f"{v:>8} {r['size_bytes'] / 1024 / 1024:>9.2f} {r['load_ms']:>9.2f}{latencies} "
+              f"{r['accuracy']:>8.2%} {r['agreement_with_fp32']:>10.2%} {r['max_logit_diff_vs_fp32']:>11.2e}")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'model': args.model,
+            'ort_version': ort.__version__,
+            'samples': len(images),
+            'runs': args.runs,
+            'warmup': args.warmup,
+            'variants': results,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,49 +6,112 @@ Python ONNX推理 - 使用真实MNIST测试数据
 
 import onnxruntime as ort
 import numpy as np
-import json
+import argparse
 import time
 import os
 from pathlib import Path
 
+from tracing import ChromeTracer, maybe_span, now_us
+from result_writer import OUTPUT_LEVELS, PROBABILITY_DTYPES, save_results
+from model_cache import DEFAULT_CACHE_DIR, create_session
+from mnist_data import INDEX_FILENAME, model_descriptor_path, load_model_descriptor, load_mnist_test_data_mmap
+
+def static_model_path(model_path, batch_size):
+    """固定批大小模型路径（由 export_onnx.py --static-batches 生成）：mnist_model.onnx -> mnist_model_b8.onnx"""
+    stem, ext = os.path.splitext(str(model_path))
+    return f"{stem}_b{batch_size}{ext}"
+
+def softmax_top1(logits):
+    """
+    logits [N, 类别数] -> (预测类别 [N], softmax置信度 [N])，与 postprocess 的结果一致
+    最大项平移后为0，其概率即 1 / sum(exp)
+    """
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    return shifted.argmax(axis=1).astype(np.int32), (1.0 / np.exp(shifted).sum(axis=1)).astype(np.float32)
+
 class PythonONNXInferenceMNIST:
     """Python ONNX推理类 - 使用真实MNIST数据"""
     
-    def __init__(self, model_path):
-        """初始化ONNX推理引擎"""
+    def __init__(self, model_path, tracer=None, ort_profile_prefix=None, static_batches=None,
+                 cache_dir=None):
+        """
+        初始化ONNX推理引擎
+        
+        Args:
+            tracer: 追踪钩子（实现 record(name, start_us, duration_us, **args)，如 ChromeTracer），
+                    为 None 时热路径不计时
+            ort_profile_prefix: 启用ONNX Runtime算子级性能分析的输出文件前缀
+            static_batches: 额外加载的固定批大小模型列表（<模型>_b<N>.onnx），不存在的文件跳过
+            cache_dir: 优化模型缓存目录（见 model_cache.py），为 None 时每次启动都重新做图优化
+        """
         print(f"加载ONNX模型: {model_path}")
+        self.tracer = tracer
+        
+        session_options = ort.SessionOptions()
+        if ort_profile_prefix:
+            session_options.enable_profiling = True
+            session_options.profile_file_prefix = ort_profile_prefix
+        self.profiling = bool(ort_profile_prefix)
+        self.profile_start_us = now_us()
         
         # 创建ONNX Runtime会话
         providers = ['CPUExecutionProvider']
-        self.session = ort.InferenceSession(model_path, providers=providers)
+        with maybe_span(self.tracer, 'load'):
+            self.session, cache_hit = create_session(model_path, session_options, providers, cache_dir)
+        if cache_hit is not None:
+            print(f"优化模型缓存: {'命中' if cache_hit else '未命中，已写入'} ({cache_dir})")
         
         # 获取输入输出信息
         self.input_name = self.session.get_inputs()[0].name
         self.output_name = self.session.get_outputs()[0].name
         
+        # 固定批大小会话：批大小 -> 会话，按批大小升序
+        self.static_sessions = {}
+        for batch_size in sorted(set(static_batches or [])):
+            path = static_model_path(model_path, batch_size)
+            if not os.path.exists(path):
+                print(f"⚠️ 未找到固定批大小模型 {path}，跳过")
+                continue
+            with maybe_span(self.tracer, 'load', batch_size=batch_size):
+                self.static_sessions[batch_size], _ = create_session(path, ort.SessionOptions(),
+                                                                     providers, cache_dir)
+        if self.static_sessions:
+            print(f"固定批大小模型: {sorted(self.static_sessions)}")
+        
+        # 输入形状、类别数、标准化参数来自模型描述文件
+        self.descriptor = load_model_descriptor(model_path)
+        self.image_shape = tuple(self.descriptor['input_shape'][1:])   # (C, H, W)
+        self.num_classes = int(self.descriptor['num_classes'])
+        self.mean = np.asarray(self.descriptor['mean'], dtype=np.float32).reshape(-1, 1, 1)
+        self.std = np.asarray(self.descriptor['std'], dtype=np.float32).reshape(-1, 1, 1)
+        
+        # 图内 top-1 输出（export_onnx.py --top1-head）：批量推理直接取 (类别, 置信度)
+        top1_names = [self.descriptor.get('class_output_name'), self.descriptor.get('confidence_output_name')]
+        session_outputs = {output.name for output in self.session.get_outputs()}
+        self.top1_output_names = top1_names if all(name in session_outputs for name in top1_names) else None
+        
         print(f"✅ Python ONNX Runtime初始化成功")
         print(f"输入名称: {self.input_name}")
         print(f"输出名称: {self.output_name}")
+        print(f"输入形状: {self.image_shape}, 类别数: {self.num_classes}")
+        if self.top1_output_names:
+            print(f"图内 top-1 输出: {', '.join(self.top1_output_names)}")
         
     def preprocess(self, image_data):
         """预处理图像数据"""
-        # 输入数据已经是[28, 28]的float32数组，范围[0,1]
-        # 需要标准化并调整形状
-        
-        # 标准化 (MNIST标准化参数)
-        mean = 0.1307
-        std = 0.3081
-        normalized = (image_data - mean) / std
+        # 输入数据为 C*H*W 个float32（如MNIST的[28, 28]），范围[0,1]
+        # 按通道标准化并调整形状为 [1, C, H, W]
+        image = np.asarray(image_data, dtype=np.float32).reshape(self.image_shape)
+        normalized = (image - self.mean) / self.std
         
-        # 调整形状为 [1, 1, 28, 28]
-        input_data = normalized.reshape(1, 1, 28, 28).astype(np.float32)
+        input_data = normalized.reshape(1, *self.image_shape).astype(np.float32)
         
         return input_data
     
     def postprocess(self, output):
         """后处理输出结果"""
         # 获取ONNX输出
-        logits = output[0][0]  # 从 [1, 10] 变为 [10]
+        logits = output[0][0]  # 从 [1, 类别数] 变为 [类别数]
         
         # 应用softmax获得概率分布
         exp_logits = np.exp(logits - np.max(logits))
@@ -61,110 +124,209 @@ class PythonONNXInferenceMNIST:
         return {
             'predicted_class': int(predicted_class),
             'confidence': float(confidence),
-            'probabilities': probabilities.tolist(),
-            'raw_logits': logits.tolist()
+            'probabilities': probabilities,
+            'raw_logits': logits
         }
     
-    def inference(self, image_data):
+    def select_session(self, count):
+        """
+        为 count 个样本的请求选择会话，返回 (会话, 实际运行的批大小)
+        优先选择能容纳请求的最小固定批大小模型（不足部分补零），没有时使用动态批模型
+        """
+        for batch_size, session in self.static_sessions.items():
+            if batch_size >= count:
+                return session, batch_size
+        return self.session, count
+    
+    def run_batch(self, batch):
+        """对已预处理的 [n, C, H, W] 输入运行模型，按需补齐到固定批大小，返回 logits [n, 类别数]"""
+        count = len(batch)
+        session, run_size = self.select_session(count)
+        if run_size > count:
+            padded = np.zeros((run_size, *batch.shape[1:]), dtype=np.float32)
+            padded[:count] = batch
+            batch = padded
+        return session.run([self.output_name], {self.input_name: batch})[0][:count]
+    
+    def inference(self, image_data, sample_id=-1):
         """执行推理"""
         start_time = time.time()
         
         # 预处理
-        processed_input = self.preprocess(image_data)
+        with maybe_span(self.tracer, 'preprocess', sample_id=sample_id):
+            processed_input = self.preprocess(image_data)
         
         # 运行推理
-        ort_inputs = {self.input_name: processed_input}
-        ort_outputs = self.session.run([self.output_name], ort_inputs)
+        with maybe_span(self.tracer, 'run', sample_id=sample_id):
+            ort_outputs = [self.run_batch(processed_input)]
         
         end_time = time.time()
         inference_time = (end_time - start_time) * 1000  # 转换为毫秒
         
         # 后处理
-        result = self.postprocess(ort_outputs)
+        with maybe_span(self.tracer, 'postprocess', sample_id=sample_id):
+            result = self.postprocess(ort_outputs)
         result['inference_time_ms'] = inference_time
         
         return result
+    
+    def inference_batch(self, images, batch_size=1000):
+        """
+        批量推理，images 为 [N, ...] 每个样本 C*H*W 个值，范围[0,1]，返回模型原始logits [N, 类别数]
+        已加载固定批大小模型时，每批使用最匹配的模型，最后不足一批的部分补零
+        """
+        outputs = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            # 最后一批可能不足 batch_size，按实际样本数记录
+            with maybe_span(self.tracer, 'preprocess', sample_id=start, batch_size=len(chunk)):
+                batch = self.preprocess_batch(chunk)
+            with maybe_span(self.tracer, 'run', sample_id=start, batch_size=len(batch)):
+                outputs.append(self.run_batch(batch))
+        return np.concatenate(outputs)
+    
+    def inference_batch_top1(self, images, batch_size=1000):
+        """
+        批量推理，返回 (预测类别 [N] int32, 置信度 [N] float32)
+        模型含图内 top-1 输出时只取 (class, confidence) 两个输出，不复制logits、不在主机上做softmax和argmax；
+        否则由logits计算（softmax_top1）
+        """
+        if self.top1_output_names is None:
+            return softmax_top1(self.inference_batch(images, batch_size))
+        classes, confidences = [], []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            # 最后一批可能不足 batch_size，按实际样本数记录
+            with maybe_span(self.tracer, 'preprocess', sample_id=start, batch_size=len(chunk)):
+                batch = self.preprocess_batch(chunk)
+            # 固定批大小模型不含 top-1 输出，直接使用动态批模型
+            with maybe_span(self.tracer, 'run', sample_id=start, batch_size=len(batch)):
+                batch_classes, batch_confidences = self.session.run(self.top1_output_names,
+                                                                    {self.input_name: batch})
+            classes.append(batch_classes)
+            confidences.append(batch_confidences)
+        return np.concatenate(classes), np.concatenate(confidences)
+    
+    def preprocess_batch(self, images):
+        """[n, ...] 每个样本 C*H*W 个值（范围[0,1]）-> 标准化的 [n, C, H, W] float32"""
+        # 调用方按批切片传入，内存映射数据只读入当前批次
+        batch = np.asarray(images, dtype=np.float32).reshape(-1, *self.image_shape)
+        return ((batch - self.mean) / self.std).astype(np.float32)
+    
+    def end_profiling(self):
+        """结束ORT性能分析，返回分析文件路径并合并到追踪结果（未启用时返回None）"""
+        if not self.profiling:
+            return None
+        self.profiling = False
+        profile_path = self.session.end_profiling()
+        print(f"✓ ORT性能分析已保存到: {profile_path}")
+        if self.tracer is not None and hasattr(self.tracer, 'add_ort_profile'):
+            self.tracer.add_ort_profile(profile_path, self.profile_start_us)
+        return profile_path
 
-def load_mnist_test_data():
-    """加载MNIST测试数据"""
-    test_data_dir = Path("../test_data")
+def load_mnist_test_data(test_data_dir="../test_data"):
+    """加载MNIST测试数据：优先读取 NPZ，没有时（如 data_loader.py --synthetic 生成的大规模数据）内存映射二进制索引"""
+    test_data_dir = Path(test_data_dir)
     npz_file = test_data_dir / "mnist_test_subset.npz"
     
-    if not npz_file.exists():
-        print("❌ 找不到MNIST测试数据，请先运行 mnist_data_loader.py")
+    if npz_file.exists():
+        # 加载NPZ数据
+        data = np.load(npz_file)
+        images = data['images']  # shape: (num_samples, 28, 28)，多通道数据为 (num_samples, C, H, W)
+        labels = data['labels']  # shape: (num_samples,)
+        indices = data['indices']  # 原始MNIST索引
+    elif (test_data_dir / INDEX_FILENAME).exists():
+        images, labels, indices = load_mnist_test_data_mmap(test_data_dir)
+    else:
+        print("❌ 找不到MNIST测试数据，请先运行 data_loader.py")
         return None, None, None
     
-    # 加载NPZ数据
-    data = np.load(npz_file)
-    images = data['images']  # shape: (num_samples, 28, 28)
-    labels = data['labels']  # shape: (num_samples,)
-    indices = data['indices']  # 原始MNIST索引
-    
     print(f"🔍 加载 {len(images)} 个MNIST测试样本")
     print(f"数据形状: {images.shape}")
     print(f"标签分布: {np.bincount(labels)}")
     
     return images, labels, indices
 
-def test_python_inference_mnist():
-    """使用真实MNIST数据进行Python推理测试"""
+def test_python_inference_mnist(trace_path=None, ort_profile_prefix=None,
+                                output_level='predictions', prob_dtype='float32', static_batches=None,
+                                cache_dir=None, test_data_dir="../test_data",
+                                model_path='../models/mnist_model.onnx'):
+    """
+    使用真实MNIST数据进行Python推理测试
+    
+    Args:
+        trace_path: 导出 Chrome trace JSON 的路径，None 表示不追踪
+        ort_profile_prefix: 启用ORT性能分析的输出文件前缀
+        output_level: 结果输出粒度 (none / summary / predictions / logits)
+        prob_dtype: logits粒度下概率与logits的存储类型 (float16 / float32)
+        static_batches: 加载的固定批大小模型（逐样本推理时使用批大小1的模型）
+        cache_dir: 优化模型缓存目录，None 表示不缓存
+        test_data_dir: 测试数据目录
+        model_path: ONNX模型路径（如 FP16 / BF16 / INT8 / _top1 变体，描述文件取同名 .json）
+    """
     print("=== Python ONNX推理测试 (真实MNIST数据) ===")
     
     # 加载模型
-    model_path = '../models/mnist_model.onnx'
     if not os.path.exists(model_path):
         print(f"❌ 模型文件不存在: {model_path}")
         return None
     
-    inference_engine = PythonONNXInferenceMNIST(model_path)
+    tracer = ChromeTracer('python') if trace_path else None
+    inference_engine = PythonONNXInferenceMNIST(model_path, tracer=tracer,
+                                                ort_profile_prefix=ort_profile_prefix,
+                                                static_batches=static_batches,
+                                                cache_dir=cache_dir)
     
     # 加载MNIST测试数据
-    images, labels, indices = load_mnist_test_data()
+    with maybe_span(tracer, 'io'):
+        images, labels, indices = load_mnist_test_data(test_data_dir)
     if images is None:
         return None
     
     print(f"\n开始推理 {len(images)} 个样本...")
     
-    # 执行推理
-    results = []
+    # 逐样本结果按列存放在预分配数组中
+    num_samples = len(images)
+    predicted = np.empty(num_samples, dtype=np.int32)
+    confidences = np.empty(num_samples, dtype=np.float32)
+    times_ms = np.empty(num_samples, dtype=np.float64)
+    keep_logits = output_level == 'logits'
+    num_classes = inference_engine.num_classes
+    logits = np.empty((num_samples, num_classes), dtype=np.float32) if keep_logits else None
+    probabilities = np.empty((num_samples, num_classes), dtype=np.float32) if keep_logits else None
     correct_predictions = 0
-    total_time = 0
+    progress_every = max(10, num_samples // 10)   # 每10个样本，样本数多时约每10%
     
-    for i, (image_data, true_label, original_idx) in enumerate(zip(images, labels, indices)):
+    for i, (image_data, true_label) in enumerate(zip(images, labels)):
         # 执行推理
-        result = inference_engine.inference(image_data)
-        
-        # 检查准确性
-        is_correct = result['predicted_class'] == true_label
-        if is_correct:
-            correct_predictions += 1
+        result = inference_engine.inference(image_data, sample_id=i)
         
         # 记录结果
-        sample_result = {
-            'sample_id': i,
-            'original_mnist_index': int(original_idx),
-            'true_label': int(true_label),
-            'predicted_class': result['predicted_class'],
-            'confidence': result['confidence'],
-            'inference_time_ms': result['inference_time_ms'],
-            'is_correct': bool(is_correct),
-            'probabilities': result['probabilities']
-        }
+        predicted[i] = result['predicted_class']
+        confidences[i] = result['confidence']
+        times_ms[i] = result['inference_time_ms']
+        if keep_logits:
+            logits[i] = result['raw_logits']
+            probabilities[i] = result['probabilities']
         
-        results.append(sample_result)
-        total_time += result['inference_time_ms']
+        # 检查准确性
+        if result['predicted_class'] == true_label:
+            correct_predictions += 1
         
-        # 显示进度（每10个样本）
-        if (i + 1) % 10 == 0:
-            print(f"完成 {i+1:3d}/{len(images)} 样本，当前准确率: {correct_predictions/(i+1)*100:.1f}%")
+        # 显示进度
+        if (i + 1) % progress_every == 0:
+            print(f"完成 {i+1:3d}/{num_samples} 样本，当前准确率: {correct_predictions/(i+1)*100:.1f}%")
+    
+    labels = np.asarray(labels, dtype=np.int32)
+    is_correct = predicted == labels
     
     # 计算统计信息
-    accuracy = correct_predictions / len(results)
-    avg_time = total_time / len(results)
-    std_time = np.std([r['inference_time_ms'] for r in results])
+    accuracy = correct_predictions / num_samples
+    avg_time = float(times_ms.mean())
+    std_time = float(times_ms.std())
     
     print(f"\n=== 推理结果统计 ===")
-    print(f"总样本数: {len(results)}")
+    print(f"总样本数: {num_samples}")
     print(f"正确预测: {correct_predictions}")
     print(f"准确率: {accuracy:.2%}")
     print(f"平均推理时间: {avg_time:.2f} ms")
@@ -172,45 +334,78 @@ def test_python_inference_mnist():
     print(f"推理速度: {1000/avg_time:.1f} FPS")
     
     # 显示错误样本
-    wrong_samples = [r for r in results if not r['is_correct']]
-    if wrong_samples:
+    wrong_samples = np.flatnonzero(~is_correct)
+    if len(wrong_samples):
         print(f"\n❌ 错误预测样本 ({len(wrong_samples)} 个):")
-        for sample in wrong_samples[:5]:  # 只显示前5个
-            print(f"  样本 {sample['sample_id']:3d}: 真实={sample['true_label']}, "
-                  f"预测={sample['predicted_class']}, 置信度={sample['confidence']:.3f}")
+        for i in wrong_samples[:5]:  # 只显示前5个
+            print(f"  样本 {i:3d}: 真实={labels[i]}, "
+                  f"预测={predicted[i]}, 置信度={confidences[i]:.3f}")
         if len(wrong_samples) > 5:
             print(f"  ... 还有 {len(wrong_samples)-5} 个错误样本")
     
-    # 保存结果
+    # 保存结果：汇总写JSON，逐样本结果按列写 .npz
     summary_result = {
         'platform': 'Python',
         'framework': 'ONNX Runtime Python API',
         'test_type': 'real_mnist_data',
         'data_source': 'MNIST test set subset',
-        'results': results,
         'summary': {
             'accuracy': accuracy,
             'average_inference_time_ms': avg_time,
             'std_inference_time_ms': std_time,
             'fps': 1000/avg_time,
-            'total_samples': len(results),
+            'total_samples': num_samples,
             'correct_predictions': correct_predictions,
-            'wrong_predictions': len(wrong_samples)
+            'wrong_predictions': int(len(wrong_samples))
         }
     }
+    columns = {
+        'sample_id': np.arange(num_samples, dtype=np.int32),
+        'original_mnist_index': np.asarray(indices, dtype=np.int32),
+        'true_label': labels,
+        'predicted_class': predicted,
+        'confidence': confidences,
+        'inference_time_ms': times_ms,
+        'is_correct': is_correct,
+    }
     
-    # 确保results目录存在
-    os.makedirs('../results', exist_ok=True)
+    with maybe_span(tracer, 'io'):
+        written = save_results('../results/python_inference_results', summary_result, columns,
+                               logits=logits, probabilities=probabilities,
+                               level=output_level, prob_dtype=prob_dtype)
     
-    with open('../results/python_inference_results.json', 'w', encoding='utf-8') as f:
-        json.dump(summary_result, f, indent=2, ensure_ascii=False)
+    if written:
+        print(f"结果已保存到: {', '.join(written)}")
     
-    print("结果已保存到: ../results/python_inference_results.json")
+    inference_engine.end_profiling()
+    if tracer is not None:
+        tracer.save(trace_path)
     
     return summary_result
 
 if __name__ == "__main__":
-    results = test_python_inference_mnist()
+    parser = argparse.ArgumentParser(description="Python ONNX推理测试")
+    parser.add_argument('--model', default='../models/mnist_model.onnx',
+                        help='ONNX模型路径（如 ../models/mnist_model_fp16.onnx）')
+    parser.add_argument('--trace', help='导出加载/预处理/推理/后处理/IO区间为 Chrome trace JSON')
+    parser.add_argument('--ort-profile', help='启用ONNX Runtime算子级性能分析，指定输出文件前缀')
+    parser.add_argument('--output-level', choices=OUTPUT_LEVELS, default='predictions',
+                        help='结果输出粒度: none / summary / predictions / logits')
+    parser.add_argument('--prob-dtype', choices=sorted(PROBABILITY_DTYPES), default='float32',
+                        help='logits粒度下概率与logits的存储类型')
+    parser.add_argument('--static-batches', default='',
+                        help='加载固定批大小模型，逗号分隔（如 1,8,32,128，需先用 export_onnx.py --static-batches 导出）')
+    parser.add_argument('--model-cache', nargs='?', const=DEFAULT_CACHE_DIR,
+                        help=f'启用ORT优化模型缓存，可指定缓存目录（默认: {DEFAULT_CACHE_DIR}）')
+    parser.add_argument('--test-data', default='../test_data',
+                        help='测试数据目录（data_loader.py 生成，--synthetic 可生成大规模数据）')
+    args = parser.parse_args()
+    static_batches = [int(b) for b in args.static_batches.split(',') if b.strip()]
+    
+    results = test_python_inference_mnist(trace_path=args.trace, ort_profile_prefix=args.ort_profile,
+                                          output_level=args.output_level, prob_dtype=args.prob_dtype,
+                                          static_batches=static_batches, cache_dir=args.model_cache,
+                                          test_data_dir=args.test_data, model_path=args.model)
     
     if results:
         print("\n✅ Python推理测试完成")
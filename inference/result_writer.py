@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+推理结果读写
+逐样本结果按列保存为 .npz（每列一个连续数组，概率可选 float16/float32），
+汇总信息单独保存为小体积JSON，避免把每个样本的概率向量写成缩进JSON
+
+输出粒度:
+    none        不写结果文件
+    summary     只写汇总JSON
+    predictions 汇总 + 逐样本预测列（样本ID、标签、预测、置信度、耗时）
+    logits      在 predictions 基础上再保存完整 logits 与概率 [N, 10]
+
+C/C++ 程序以 --results-format npy 输出的结构化 .npy 也可用 load_results 读取
+"""
+
+import json
+import os
+
+import numpy as np
+
+OUTPUT_LEVELS = ['none', 'summary', 'predictions', 'logits']
+PROBABILITY_DTYPES = {'float16': np.float16, 'float32': np.float32}
+
+
+def save_results(output_prefix, summary, columns=None, logits=None, probabilities=None,
+                 level='predictions', prob_dtype='float32'):
+    """
+    按输出粒度保存结果
+
+    Args:
+        output_prefix: 输出路径前缀，生成 <prefix>.json 与 <prefix>.npz
+        summary: 汇总信息字典（写入JSON）
+        columns: {列名: 一维数组}，逐样本结果
+        logits / probabilities: [N, 10] 数组，仅 level='logits' 时保存
+    Returns:
+        写入的文件路径列表
+    """
+    if level not in OUTPUT_LEVELS:
+        raise ValueError(f"未知输出粒度: {level}（可选 {', '.join(OUTPUT_LEVELS)}）")
+    if level == 'none':
+        return []
+
+    os.makedirs(os.path.dirname(output_prefix) or '.', exist_ok=True)
+    json_path = f"{output_prefix}.json"
+    written = [json_path]
+    document = dict(summary)
+    document['output_level'] = level
+
+    if level in ('predictions', 'logits') and columns:
+        arrays = {name: np.asarray(values) for name, values in columns.items()}
+        if level == 'logits':
+            dtype = PROBABILITY_DTYPES[prob_dtype]
+            if logits is not None:
+                arrays['logits'] = np.asarray(logits, dtype=dtype)
+            if probabilities is not None:
+                arrays['probabilities'] = np.asarray(probabilities, dtype=dtype)
+        npz_path = f"{output_prefix}.npz"
+        np.savez(npz_path, **arrays)   # 不压缩，按列连续写入
+        document['results_file'] = os.path.basename(npz_path)
+        written.append(npz_path)
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return written
+
+
+def load_results(path):
+    """读取逐样本结果，返回 {列名: 数组}；支持 .npz（Python）与结构化 .npy（C/C++）"""
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    records = np.load(path, mmap_mode='r')
+    if records.dtype.names is None:
+        raise ValueError(f"{path} 不是结构化结果数组")
+    # C结构体的填充字段在 dtype 中以空名称出现，跳过
+    return {name: np.asarray(records[name]) for name in records.dtype.names if name}
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+推理引擎启动时间基准测试：ORT优化模型缓存 冷启动 vs 热启动
+对每个引擎重复创建会话，分别测量三种情况下的会话创建时间和首次推理时间:
+  - none: 不使用缓存（每次都做图优化）
+  - cold: 启用缓存但缓存目录为空（图优化 + 写入缓存）
+  - warm: 缓存已存在（直接加载优化后的模型，跳过图优化）
+
+用法:
+    python startup_benchmark.py                        # Python引擎
+    python startup_benchmark.py --engines python,c_lib --runs 30
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import onnxruntime as ort
+
+from model_cache import create_session
+from python_inference import load_model_descriptor, model_descriptor_path
+
+MODES = ['none', 'cold', 'warm']
+
+
+@contextlib.contextmanager
+def suppress_stdout():
+    """屏蔽C库在创建/销毁引擎时的打印（直接写文件描述符1，sys.stdout 重定向无效）"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def python_startup(model_path, sample, cache_dir):
+    """创建与 PythonONNXInferenceMNIST 相同配置的会话，返回 (创建耗时ms, 首次推理耗时ms)"""
+    start = time.perf_counter()
+    session, _ = create_session(model_path, ort.SessionOptions(), ['CPUExecutionProvider'], cache_dir)
+    created = time.perf_counter()
+    session.run(None, {session.get_inputs()[0].name: sample})
+    finished = time.perf_counter()
+    return (created - start) * 1000.0, (finished - created) * 1000.0
+
+
+def c_lib_startup(library_path, descriptor_path, cache_dir):
+    """创建并销毁C库引擎（嵌入式模型），返回 (创建耗时ms, 首次推理耗时ms)"""
+    from c_inference_binding import CInferenceMNIST
+
+    with suppress_stdout():
+        start = time.perf_counter()
+        engine = CInferenceMNIST(library_path, descriptor_path, cache_dir=cache_dir)
+        created = time.perf_counter()
+        engine.run_logits(np.zeros(engine.image_size, dtype=np.float32))
+        finished = time.perf_counter()
+        engine.close()
+    return (created - start) * 1000.0, (finished - created) * 1000.0
+
+
+def measure(startup, runs):
+    """按 none / cold / warm 三种情况各执行 runs 次 startup(cache_dir)"""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='ort_cache_') as root:
+        cache_dir = os.path.join(root, 'cache')
+        for mode in MODES:
+            create_ms, first_run_ms = [], []
+            for _ in range(runs):
+                if mode == 'cold':
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+                elif mode == 'warm' and not os.path.isdir(cache_dir):
+                    startup(cache_dir)
+                create, first_run = startup(None if mode == 'none' else cache_dir)
+                create_ms.append(create)
+                first_run_ms.append(first_run)
+            results[mode] = {
+                'create_median_ms': float(np.median(create_ms)),
+                'create_p90_ms': float(np.percentile(create_ms, 90)),
+                'first_run_median_ms': float(np.median(first_run_ms)),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ORT优化模型缓存 冷/热启动基准测试")
+    parser.add_argument('--model', default='../models/mnist_model.onnx', help='ONNX模型路径（Python引擎）')
+    parser.add_argument('--engines', default='python', help='测试的引擎，逗号分隔: python,c_lib')
+    parser.add_argument('--library', default='./libc_inference.so', help='C推理共享库路径')
+    parser.add_argument('--runs', type=int, default=20, help='每种情况的启动次数')
+    parser.add_argument('--output', default='../results/startup_benchmark.json', help='结果JSON路径')
+    args = parser.parse_args()
+
+    engines = [e.strip() for e in args.engines.split(',') if e.strip()]
+    descriptor = load_model_descriptor(args.model)
+    sample = np.zeros((1, *descriptor['input_shape'][1:]), dtype=np.float32)
+    startups = {
+        'python': lambda cache_dir: python_startup(args.model, sample, cache_dir),
+        'c_lib': lambda cache_dir: c_lib_startup(args.library, model_descriptor_path(args.model), cache_dir),
+    }
+    unknown = [e for e in engines if e not in startups]
+    if unknown:
+        print(f"❌ 未知引擎: {', '.join(unknown)}")
+        return 1
+
+    # 预热：导入与一次性初始化（ORT环境、共享库加载）不计入
+    for engine in engines:
+        startups[engine](None)
+
+    print(f"\n{'引擎':>8} {'模式':>6} {'创建 中位数(ms)':>16} {'创建 p90(ms)':>13} {'首次推理(ms)':>13} {'相对none':>9}")
+    print("-" * 74)
+
+    report = {'model': args.model, 'ort_version': ort.__version__, 'runs': args.runs, 'engines': {}}
+    for engine in engines:
+        results = measure(startups[engine], args.runs)
+        report['engines'][engine] = results
+        baseline = results['none']['create_median_ms']
+        for mode in MODES:
+            r = results[mode]
+            print(f"{engine:>8} {mode:>6} {r['create_median_ms']:>16.2f} {r['create_p90_ms']:>13.2f} "
+                  f"{r['first_run_median_ms']:>13.3f} {r['create_median_ms'] / baseline:>8.2f}x")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+固定批大小模型 vs 动态批模型 基准测试
+对每个请求大小分别用动态批模型和固定批大小模型（export_onnx.py --static-batches 导出）执行 Run，
+比较单次 Run 延迟与单样本耗时；请求大小不等于任何固定批大小时，按推理引擎的选择规则补零到最近的固定批大小
+
+用法:
+    python static_batch_benchmark.py                               # 批大小 1,8,32,128
+    python static_batch_benchmark.py --static-batches 1,8,32,128 --request-sizes 1,8,20,32,100,128
+    python static_batch_benchmark.py --runs 500 --warmup 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from python_inference import PythonONNXInferenceMNIST, load_mnist_test_data_mmap
+
+DEFAULT_BATCHES = '1,8,32,128'
+
+
+def time_runs(runners, batch, runs, warmup):
+    """
+    交替执行各 run(batch)，返回每个 runner 每次的耗时（毫秒）[len(runners), runs]
+    交替执行使CPU频率、缓存状态等漂移对各配置的影响相同
+    """
+    for _ in range(warmup):
+        for run in runners:
+            run(batch)
+    times = np.empty((len(runners), runs))
+    for i in range(runs):
+        for k, run in enumerate(runners):
+            start = time.perf_counter()
+            run(batch)
+            times[k, i] = time.perf_counter() - start
+    return times * 1000.0
+
+
+def latency_summary(times_ms, request_size):
+    return {
+        'median_ms': float(np.median(times_ms)),
+        'p90_ms': float(np.percentile(times_ms, 90)),
+        'mean_ms': float(times_ms.mean()),
+        'us_per_sample': float(np.median(times_ms) * 1000.0 / request_size),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="固定批大小模型 vs 动态批模型 基准测试")
+    parser.add_argument('--model', default='../models/mnist_model.onnx', help='动态批ONNX模型路径')
+    parser.add_argument('--test-data', default='../test_data', help='测试数据目录')
+    parser.add_argument('--static-batches', default=DEFAULT_BATCHES, help='加载的固定批大小模型，逗号分隔')
+    parser.add_argument('--request-sizes', help='测试的请求大小，逗号分隔（默认与固定批大小相同）')
+    parser.add_argument('--runs', type=int, default=200, help='每个配置的计时运行次数')
+    parser.add_argument('--warmup', type=int, default=20, help='每个配置的预热运行次数')
+    parser.add_argument('--output', default='../results/static_batch_benchmark.json', help='结果JSON路径')
+    args = parser.parse_args()
+
+    static_batches = sorted({int(b) for b in args.static_batches.split(',') if b.strip()})
+    request_sizes = [int(b) for b in (args.request_sizes or args.static_batches).split(',') if b.strip()]
+
+    engine = PythonONNXInferenceMNIST(args.model, static_batches=static_batches)
+    if not engine.static_sessions:
+        print("❌ 没有可用的固定批大小模型，请先运行 python export_onnx.py --static-batches "
+              f"{args.static_batches}")
+        return 1
+
+    images, _, _ = load_mnist_test_data_mmap(args.test_data)
+
+    def run_dynamic(batch):
+        return engine.session.run([engine.output_name], {engine.input_name: batch})[0]
+
+    print(f"\n{'请求大小':>8} {'固定批':>6} {'动态 中位数(ms)':>15} {'固定 中位数(ms)':>15} "
+          f"{'动态 us/样本':>12} {'固定 us/样本':>12} {'加速比':>7}")
+    print("-" * 86)
+
+    levels = []
+    for request_size in request_sizes:
+        indices = np.arange(request_size) % len(images)
+        raw = np.asarray(images[indices], dtype=np.float32).reshape(-1, *engine.image_shape)
+        batch = ((raw - engine.mean) / engine.std).astype(np.float32)
+        _, run_size = engine.select_session(request_size)
+
+        # 两种模型的输出应逐元素一致
+        max_diff = float(np.abs(engine.run_batch(batch) - run_dynamic(batch)).max())
+
+        dynamic_ms, static_ms = time_runs([run_dynamic, engine.run_batch], batch, args.runs, args.warmup)
+        dynamic = latency_summary(dynamic_ms, request_size)
+        static = latency_summary(static_ms, request_size)
+        speedup = dynamic['median_ms'] / static['median_ms']
+        levels.append({
+            'request_size': request_size,
+            'static_batch': run_size if run_size in engine.static_sessions else None,
+            'padding': run_size - request_size,
+            'max_abs_diff': max_diff,
+            'dynamic': dynamic,
+            'static': static,
+            'speedup': speedup,
+        })
+
+        static_label = str(run_size) if run_size in engine.static_sessions else '动态'
+        print(f"{request_size:>8} {static_label:>6} {dynamic['median_ms']:>15.4f} {static['median_ms']:>15.4f} "
+              f"{dynamic['us_per_sample']:>12.2f} {static['us_per_sample']:>12.2f} {speedup:>6.2f}x")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'model': args.model,
+            'static_batches': sorted(engine.static_sessions),
+            'runs': args.runs,
+            'warmup': args.warmup,
+            'levels': levels,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
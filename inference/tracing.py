@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+推理追踪工具
+以 Chrome trace / Perfetto JSON 格式记录推理各阶段区间（load / preprocess / run / postprocess / io），
+并把ONNX Runtime自带的算子级性能分析结果合并到同一时间轴上
+
+C/C++ 程序通过 --trace / --ort-profile 导出的追踪文件可用本脚本合并ORT分析结果:
+    python tracing.py merge trace.json -o merged.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+ENGINE_PID = 1
+ORT_PID = 2
+
+
+def now_us():
+    """单调时钟微秒（Linux上与C/C++引擎使用的 CLOCK_MONOTONIC / steady_clock 一致）"""
+    return time.perf_counter_ns() / 1000.0
+
+
+def load_ort_events(profile_path, start_us):
+    """读取ORT性能分析文件，将相对分析起点的时间戳平移到单调时钟时间轴"""
+    with open(profile_path, 'r', encoding='utf-8') as f:
+        events = json.load(f)
+
+    shifted = []
+    for event in events:
+        if 'ts' not in event:
+            continue
+        event = dict(event)
+        event['ts'] = event['ts'] + start_us
+        event['pid'] = ORT_PID
+        shifted.append(event)
+    shifted.append({'name': 'process_name', 'ph': 'M', 'pid': ORT_PID,
+                    'args': {'name': 'ONNX Runtime'}})
+    return shifted
+
+
+class ChromeTracer:
+    """
+    收集区间事件并导出为 Chrome trace JSON
+    record() 即引擎钩子：任何实现 record(name, start_us, duration_us, **args) 的对象都可以传给引擎
+    """
+
+    def __init__(self, engine='python'):
+        self.engine = engine
+        self.events = [{'name': 'process_name', 'ph': 'M', 'pid': ENGINE_PID,
+                        'args': {'name': engine}}]
+        self.other_data = {'engine': engine}
+
+    def record(self, name, start_us, duration_us, **args):
+        self.events.append({
+            'name': name, 'cat': self.engine, 'ph': 'X',
+            'ts': start_us, 'dur': duration_us,
+            'pid': ENGINE_PID, 'tid': 1, 'args': args,
+        })
+
+    def span(self, name, **args):
+        return maybe_span(self, name, **args)
+
+    def add_ort_profile(self, profile_path, start_us):
+        """合并ORT性能分析结果（start_us 为创建会话前记录的单调时钟时间）"""
+        self.events.extend(load_ort_events(profile_path, start_us))
+        self.other_data['ort_profile'] = profile_path
+        self.other_data['ort_profile_start_us'] = start_us
+
+    def save(self, output_path):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms',
+                       'otherData': self.other_data}, f)
+        print(f"✓ 已导出 {len(self.events)} 个追踪事件到: {output_path}")
+
+
+# 未启用追踪时所有区间共用的空上下文（nullcontext 可重复进入），热路径上不创建生成器
+_NULL_SPAN = nullcontext()
+
+
+@contextmanager
+def _span(tracer, name, **args):
+    start = now_us()
+    try:
+        yield
+    finally:
+        tracer.record(name, start, now_us() - start, **args)
+
+
+def maybe_span(tracer, name, **args):
+    """tracer 为 None 时不计时的区间，供引擎热路径使用"""
+    if tracer is None:
+        return _NULL_SPAN
+    return _span(tracer, name, **args)
+
+
+def merge_ort_profile(trace_path, output_path=None):
+    """把C/C++追踪文件 otherData 中记录的ORT性能分析合并进来"""
+    with open(trace_path, 'r', encoding='utf-8') as f:
+        trace = json.load(f)
+
+    other = trace.get('otherData', {})
+    profile_path = other.get('ort_profile')
+    if not profile_path:
+        print(f"⚠️ {trace_path} 未记录ORT性能分析文件（运行时使用 --ort-profile 启用）")
+        return False
+
+    trace['traceEvents'].append({'name': 'process_name', 'ph': 'M', 'pid': ENGINE_PID,
+                                 'args': {'name': other.get('engine', 'engine')}})
+    trace['traceEvents'].extend(load_ort_events(profile_path, other.get('ort_profile_start_us', 0.0)))
+
+    output_path = output_path or trace_path
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(trace, f)
+    print(f"✓ 已合并ORT性能分析 {profile_path} -> {output_path}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理追踪工具")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    merge = subparsers.add_parser('merge', help='合并C/C++追踪文件与ORT性能分析结果')
+    merge.add_argument('trace', help='--trace 导出的追踪文件')
+    merge.add_argument('-o', '--output', help='输出路径（默认覆盖输入文件）')
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        return 0 if merge_ort_profile(args.trace, args.output) else 1
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
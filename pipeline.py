@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+流水线阶段缓存
+按内容哈希每个阶段的输入（源码、模型、数据、参数），跳过输入未变化的阶段，
+并在 models/ 和 results/ 下为每个阶段保存产物缓存，便于切换回旧配置时直接恢复
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+CACHE_DIR_NAME = ".cache"
+MANIFEST_NAME = "manifest.json"
+HASH_MEMO_NAME = "file_hashes.json"
+
+# 阶段状态
+STAGE_UP_TO_DATE = "up_to_date"   # 输入未变化，产物与缓存一致
+STAGE_RESTORED = "restored"       # 输入与某个历史缓存一致，产物已从缓存恢复
+STAGE_STALE = "stale"             # 需要重新执行
+
+# 执行结果
+RUN_SUCCESS = "success"
+RUN_FAILED = "failed"
+RUN_CACHED = "cached"
+RUN_SKIPPED = "skipped"           # 依赖阶段失败，未执行
+
+# 忽略的目录（不参与输入哈希）
+IGNORED_DIRS = {CACHE_DIR_NAME, "__pycache__", ".git"}
+
+
+class PipelineStage:
+    """流水线阶段：命令、工作目录、输入、输出和依赖"""
+
+    def __init__(self, name, command, cwd=".", inputs=(), outputs=(), deps=(),
+                 flags=None, cache_root="results", description=""):
+        self.name = name
+        self.command = list(command)
+        self.cwd = cwd
+        self.inputs = list(inputs)          # 相对项目根目录的文件或目录
+        self.outputs = list(outputs)        # 相对项目根目录的文件或目录
+        self.deps = list(deps)              # 依赖的阶段名称
+        self.flags = dict(flags or {})      # 影响产物的参数（平台、环境变量等）
+        self.cache_root = cache_root        # 产物缓存所在目录: models 或 results
+        self.description = description
+
+    def __repr__(self):
+        return f"PipelineStage({self.name!r})"
+
+
+class PipelineCache:
+    """内容寻址的阶段产物缓存"""
+
+    def __init__(self, project_root, max_entries=5):
+        self.project_root = Path(project_root)
+        self.max_entries = max_entries
+        self._memo_path = self.project_root / "results" / CACHE_DIR_NAME / HASH_MEMO_NAME
+        self._memo = self._load_memo()
+
+    def _load_memo(self):
+        """加载文件哈希备忘录（按 大小+修改时间 复用已计算的哈希）"""
+        try:
+            with open(self._memo_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_memo(self):
+        """保存文件哈希备忘录"""
+        self._memo_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._memo_path, 'w', encoding='utf-8') as f:
+            json.dump(self._memo, f)
+
+    def _iter_files(self, rel_path):
+        """展开文件或目录为排序后的相对路径列表"""
+        path = self.project_root / rel_path
+        if path.is_file():
+            return [Path(rel_path)]
+        if not path.is_dir():
+            return []
+
+        files = []
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+            for name in sorted(names):
+                files.append((Path(root) / name).relative_to(self.project_root))
+        return files
+
+    def hash_file(self, rel_file):
+        """计算单个文件的SHA-256，文件未变化时直接复用备忘录"""
+        path = self.project_root / rel_file
+        stat = path.stat()
+        key = rel_file.as_posix()
+
+        cached = self._memo.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+
+        self._memo[key] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def hash_paths(self, rel_paths):
+        """计算一组文件或目录的内容摘要 {相对路径: 哈希}"""
+        digests = {}
+        for rel_path in rel_paths:
+            for rel_file in self._iter_files(rel_path):
+                digests[rel_file.as_posix()] = self.hash_file(rel_file)
+        return digests
+
+    def stage_key(self, stage):
+        """阶段缓存键: 阶段名称 + 命令 + 参数 + 所有输入文件的内容哈希"""
+        h = hashlib.sha256()
+        h.update(stage.name.encode())
+        h.update(json.dumps(stage.command).encode())
+        h.update(json.dumps(stage.flags, sort_keys=True).encode())
+
+        for rel_path in stage.inputs:
+            files = self._iter_files(rel_path)
+            if not files:
+                h.update(f"{rel_path}:<missing>".encode())
+            for rel_file in files:
+                h.update(rel_file.as_posix().encode())
+                h.update(self.hash_file(rel_file).encode())
+
+        return h.hexdigest()
+
+    def entry_dir(self, stage, key):
+        """阶段缓存条目目录"""
+        return self.project_root / stage.cache_root / CACHE_DIR_NAME / stage.name / key
+
+    def check(self, stage):
+        """检查阶段状态，必要时从缓存恢复产物，返回 (缓存键, 状态)"""
+        key = self.stage_key(stage)
+        manifest_path = self.entry_dir(stage, key) / MANIFEST_NAME
+
+        if not manifest_path.exists():
+            return key, STAGE_STALE
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if self.hash_paths(stage.outputs) == manifest['outputs']:
+            return key, STAGE_UP_TO_DATE
+
+        self._restore(stage, key, manifest)
+        return key, STAGE_RESTORED
+
+    def _restore(self, stage, key, manifest):
+        """把缓存的产物复制回原位置"""
+        artifacts_dir = self.entry_dir(stage, key) / "artifacts"
+        for rel_file in manifest['outputs']:
+            target = self.project_root / rel_file
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(artifacts_dir / rel_file, target)
+
+    def record(self, stage, key=None):
+        """阶段执行成功后保存产物和清单"""
+        key = key or self.stage_key(stage)
+        entry = self.entry_dir(stage, key)
+        artifacts_dir = entry / "artifacts"
+
+        if entry.exists():
+            shutil.rmtree(entry)
+        artifacts_dir.mkdir(parents=True)
+
+        outputs = self.hash_paths(stage.outputs)
+        for rel_file in outputs:
+            target = artifacts_dir / rel_file
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(self.project_root / rel_file, target)
+
+        manifest = {
+            'stage': stage.name,
+            'key': key,
+            'command': stage.command,
+            'flags': stage.flags,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'outputs': outputs
+        }
+        with open(entry / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        self._prune(stage)
+        self.save_memo()
+        return key
+
+    def _prune(self, stage):
+        """每个阶段只保留最近的 max_entries 个缓存条目"""
+        stage_dir = self.project_root / stage.cache_root / CACHE_DIR_NAME / stage.name
+        entries = sorted((p for p in stage_dir.iterdir() if p.is_dir()),
+                         key=lambda p: p.stat().st_mtime, reverse=True)
+        for old_entry in entries[self.max_entries:]:
+            shutil.rmtree(old_entry, ignore_errors=True)
+
+
+class PipelineExecutor:
+    """无交互的并行流水线执行器：依赖满足的阶段并行运行，输出写入日志文件"""
+
+    def __init__(self, project_root, stages, cache=None, max_workers=None, log_dir="results/logs"):
+        self.project_root = Path(project_root)
+        self.stages = stages
+        self.cache = cache
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.log_dir = self.project_root / log_dir
+        self.records = {}
+
+    def resolve(self, targets, exclude=()):
+        """
+        展开目标阶段及其所有依赖，按拓扑顺序返回阶段名称
+        exclude 中的阶段视为已完成（产物已存在），既不执行也不展开其依赖
+        """
+        ordered = []
+        visiting = set()
+
+        def visit(name):
+            if name in ordered or name in exclude:
+                return
+            if name not in self.stages:
+                raise KeyError(f"未知阶段: {name}")
+            if name in visiting:
+                raise ValueError(f"阶段依赖存在环: {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for target in targets:
+            visit(target)
+        return ordered
+
+    def _run_stage(self, stage):
+        """在工作线程中执行阶段命令，返回 (退出码, 耗时秒)"""
+        log_path = self.log_dir / f"{stage.name}.log"
+        start = time.perf_counter()
+        try:
+            with open(log_path, 'w', encoding='utf-8') as log_file:
+                process = subprocess.run(stage.command, cwd=self.project_root / stage.cwd,
+                                         stdout=log_file, stderr=subprocess.STDOUT,
+                                         stdin=subprocess.DEVNULL)
+            return_code = process.returncode
+        except OSError as e:
+            with open(log_path, 'a', encoding='utf-8') as log_file:
+                log_file.write(f"无法启动命令 {stage.command}: {e}\n")
+            return_code = -1
+        return return_code, time.perf_counter() - start
+
+    def _finish(self, name, status, wall_time, started, cache_key=None, return_code=None):
+        self.records[name] = {
+            'status': status,
+            'wall_time_s': round(wall_time, 3),
+            'start_offset_s': round(started, 3),
+            'return_code': return_code,
+            'cache_key': cache_key,
+            'log': str((self.log_dir / f"{name}.log").relative_to(self.project_root))
+        }
+        icon = {RUN_SUCCESS: "✅", RUN_CACHED: "⚡", RUN_FAILED: "❌", RUN_SKIPPED: "⏭️ "}[status]
+        print(f"{icon} {name:<18} {status:<8} {wall_time:8.2f} s")
+
+    def run(self, targets, exclude=()):
+        """执行目标阶段，返回是否全部成功；exclude 见 resolve"""
+        order = self.resolve(targets, exclude)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.records = {}
+
+        pending = list(order)
+        running = {}
+        run_start = time.perf_counter()
+
+        print(f"🚀 执行 {len(order)} 个阶段 (并行度 {self.max_workers}): {', '.join(order)}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                # 提交所有依赖已完成的阶段
+                for name in list(pending):
+                    stage = self.stages[name]
+                    dep_status = [self.records.get(dep, {}).get('status') for dep in stage.deps
+                                  if dep not in exclude]
+                    if any(st in (RUN_FAILED, RUN_SKIPPED) for st in dep_status):
+                        pending.remove(name)
+                        self._finish(name, RUN_SKIPPED, 0.0, time.perf_counter() - run_start)
+                        continue
+                    if not all(st in (RUN_SUCCESS, RUN_CACHED) for st in dep_status):
+                        continue
+
+                    pending.remove(name)
+                    started = time.perf_counter() - run_start
+                    cache_key = None
+                    if self.cache:
+                        check_start = time.perf_counter()
+                        cache_key, state = self.cache.check(stage)
+                        if state != STAGE_STALE:
+                            self._finish(name, RUN_CACHED, time.perf_counter() - check_start,
+                                         started, cache_key)
+                            continue
+                    future = pool.submit(self._run_stage, stage)
+                    running[future] = (name, started, cache_key)
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, started, cache_key = running.pop(future)
+                    return_code, wall_time = future.result()
+                    if return_code == 0:
+                        if self.cache:
+                            self.cache.record(self.stages[name], cache_key)
+                        self._finish(name, RUN_SUCCESS, wall_time, started, cache_key, return_code)
+                    else:
+                        self._finish(name, RUN_FAILED, wall_time, started, cache_key, return_code)
+                        self._print_log_tail(name)
+
+        self.total_wall_time = time.perf_counter() - run_start
+        return all(r['status'] in (RUN_SUCCESS, RUN_CACHED) for r in self.records.values())
+
+    def _print_log_tail(self, name, lines=20):
+        """阶段失败时打印日志末尾"""
+        log_path = self.log_dir / f"{name}.log"
+        try:
+            with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+                tail = f.readlines()[-lines:]
+        except OSError:
+            return
+        print(f"--- {log_path} (最后 {len(tail)} 行) ---")
+        for line in tail:
+            print(f"    {line.rstrip()}")
+
+    def write_report(self, path):
+        """保存各阶段状态和耗时"""
+        report = {
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'max_workers': self.max_workers,
+            'total_wall_time_s': round(self.total_wall_time, 3),
+            'success': all(r['status'] in (RUN_SUCCESS, RUN_CACHED) for r in self.records.values()),
+            'stages': self.records
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+
+def mnist_pipeline_stages(python=sys.executable):
+    """MNIST部署流水线的阶段定义（路径均相对项目根目录）"""
+    model_sources = ["train/train_model.py"]
+    mnist_raw = "data/MNIST/raw"
+
+    stages = [
+        # 只有本阶段下载MNIST；读取 data/MNIST/raw 的阶段都依赖它，避免并发下载或读到不完整的数据
+        # 无产物：原始数据缺失时 mnist_raw 的哈希变化，缓存键随之变化而重新下载
+        PipelineStage(
+            "download", [python, "train_model.py", "--download-only"], cwd="train",
+            inputs=["train/train_model.py", mnist_raw],
+            cache_root="results", description="下载MNIST数据集"),
+        PipelineStage(
+            "train", [python, "train_model.py"], cwd="train",
+            inputs=model_sources + [mnist_raw],
+            outputs=["models/mnist_model.pth", "models/mnist_model_full.pth"],
+            deps=["download"], cache_root="models", description="训练MNIST模型"),
+        PipelineStage(
+            "quantize", [python, "quantize_model.py"], cwd="train",
+            inputs=model_sources + ["train/quantize_model.py", "train/evaluate.py",
+                                    "models/mnist_model.pth", mnist_raw],
+            outputs=["models/mnist_quantized.pth", "models/mnist_quantized_full.pth"],
+            deps=["train"], cache_root="models", description="模型量化"),
+        PipelineStage(
+            "export", [python, "export_onnx.py"], cwd="train",
+            inputs=model_sources + ["train/export_onnx.py", "train/evaluate.py",
+                                    "models/mnist_model.pth", mnist_raw],
+            outputs=["models/mnist_model.onnx", "models/mnist_model_int8.onnx",
+                     "models/mnist_model_fp16.onnx", "models/mnist_model_bf16.onnx",
+                     "models/mnist_model.json", "models/mnist_model_int8.json",
+                     "models/mnist_model_fp16.json", "models/mnist_model_bf16.json",
+                     "results/model_evaluation.json"],
+            deps=["train"], cache_root="models", description="导出ONNX模型"),
+        PipelineStage(
+            "train_tiny", [python, "train_model.py", "--arch", "tiny"], cwd="train",
+            inputs=model_sources + [mnist_raw],
+            outputs=["models/mnist_tiny_model.pth", "models/mnist_tiny_model_full.pth"],
+            deps=["download"], cache_root="models", description="训练级联推理第一级小模型"),
+        PipelineStage(
+            "export_tiny", [python, "export_onnx.py", "--arch", "tiny", "--top1-head"], cwd="train",
+            inputs=model_sources + ["train/export_onnx.py", "models/mnist_tiny_model.pth"],
+            outputs=["models/mnist_tiny_model.onnx", "models/mnist_tiny_model.json",
+                     "models/mnist_tiny_model_top1.onnx", "models/mnist_tiny_model_top1.json"],
+            deps=["train_tiny"], cache_root="models", description="导出级联推理小模型"),
+        PipelineStage(
+            "train_qat", [python, "train_model.py", "--qat"], cwd="train",
+            inputs=model_sources + ["models/mnist_model.pth", mnist_raw],
+            outputs=["models/mnist_model_qat.pth"],
+            deps=["train"], cache_root="models", description="量化感知训练（从FP32模型微调）"),
+        PipelineStage(
+            "export_qat", [python, "export_onnx.py", "--qat"], cwd="train",
+            inputs=model_sources + ["train/export_onnx.py", "train/evaluate.py",
+                                    "models/mnist_model_qat.pth", "models/mnist_model.pth", mnist_raw],
+            outputs=["models/mnist_model_qat_int8.onnx", "models/mnist_model_qat_int8.json"],
+            deps=["train_qat"], cache_root="models", description="导出QAT INT8模型"),
+        PipelineStage(
+            "sweep", [python, "sweep.py"], cwd="train",
+            inputs=model_sources + ["train/sweep.py", mnist_raw],
+            outputs=["results/sweep_results.json"],
+            deps=["download"], cache_root="results", description="超参数/模型结构并行扫描（帕累托前沿）"),
+        PipelineStage(
+            "ddp_scaling", [python, "train_distributed.py", "--scaling", "1,2,4", "--epochs", "1",
+                            "--train-samples", "20000"], cwd="train",
+            inputs=model_sources + ["train/train_distributed.py", mnist_raw],
+            outputs=["results/ddp_scaling.json"],
+            deps=["download"], cache_root="results", description="数据并行训练扩展效率（gloo 1/2/4 进程）"),
+        PipelineStage(
+            "data", [python, "data_loader.py"], cwd=".",
+            inputs=["data_loader.py", mnist_raw],
+            outputs=["test_data"],
+            deps=["download"], cache_root="results", description="生成测试数据"),
+        PipelineStage(
+            "python_inference", [python, "python_inference.py"], cwd="inference",
+            inputs=["inference/python_inference.py", "inference/result_writer.py", "inference/mnist_data.py",
+                    "inference/model_cache.py", "models/mnist_model.onnx", "models/mnist_model.json", "test_data"],
+            outputs=["results/python_inference_results.json", "results/python_inference_results.npz"],
+            deps=["export", "data"], cache_root="results", description="Python推理测试"),
+        PipelineStage(
+            "compile_macos", ["./build.sh", "macos"], cwd=".",
+            inputs=["build.sh", "build/CMakeLists.txt", "inference/cpp_inference.cpp",
+                    "inference/c_inference.c", "inference/mnist_index.h", "inference/model_descriptor.h"],
+            outputs=["inference/cpp_inference", "inference/c_inference"],
+            flags={'platform': 'macos'}, cache_root="results", description="编译本地C/C++推理程序"),
+        PipelineStage(
+            "test_macos_cpp", ["./cpp_inference"], cwd="inference",
+            inputs=["inference/cpp_inference", "models/mnist_model.onnx", "models/mnist_model.json",
+                    "test_data"],
+            outputs=["results/macos_cpp_results.txt"],
+            deps=["compile_macos", "export", "data"], cache_root="results",
+            description="本地C++推理测试"),
+        PipelineStage(
+            "test_macos_c", ["./c_inference"], cwd="inference",
+            inputs=["inference/c_inference", "models/mnist_model.onnx", "models/mnist_model.json",
+                    "test_data"],
+            outputs=["results/macos_c_results.txt"],
+            deps=["compile_macos", "export", "data"], cache_root="results",
+            description="本地C推理测试"),
+        PipelineStage(
+            "parity", [python, "parity_check.py", "--engines", "python,numpy,cpp"], cwd="inference",
+            inputs=["inference/parity_check.py", "inference/python_inference.py",
+                    "inference/numpy_inference.py", "inference/mnist_data.py",
+                    "inference/cpp_inference", "models/mnist_model.onnx", "models/mnist_model.json",
+                    "test_data"],
+            outputs=["results/parity_report.json"],
+            deps=["compile_macos", "export", "data"], cache_root="results",
+            description="Python/NumPy/C++引擎数值一致性检查"),
+        PipelineStage(
+            "cascade", [python, "cascade_inference.py"], cwd="inference",
+            inputs=["inference/cascade_inference.py", "inference/python_inference.py",
+                    "inference/mnist_data.py", "models/mnist_model.onnx", "models/mnist_model.json",
+                    "models/mnist_tiny_model.onnx", "models/mnist_tiny_model.json",
+                    "models/mnist_tiny_model_top1.onnx", "models/mnist_tiny_model_top1.json", "test_data"],
+            outputs=["results/cascade_benchmark.json"],
+            deps=["export", "export_tiny", "data"], cache_root="results",
+            description="级联推理（小模型 + 完整模型）阈值扫描"),
+        PipelineStage(
+            "benchmark_linux", [python, "benchmark.py"], cwd=".",
+            inputs=["benchmark.py", "inference/cpp_inference.cpp", "inference/c_inference.c",
+                    "inference/c_inference_lib.c", "inference/c_inference_main.c",
+                    "inference/c_inference_lib.h", "inference/mnist_index.h", "inference/model_descriptor.h",
+                    "models/mnist_model.onnx", "models/mnist_model.json", "test_data"],
+            outputs=["results/benchmark_linux.json"],
+            deps=["export", "data"], flags={'platform': 'linux'}, cache_root="results",
+            description="Linux本地编译并基准测试C/C++推理程序"),
+        PipelineStage(
+            "benchmark_gate", [python, "benchmark_compare.py", "compare"], cwd=".",
+            inputs=["benchmark.py", "benchmark_compare.py", "results/benchmark_baseline.json",
+                    "inference/cpp_inference.cpp", "inference/c_inference.c",
+                    "inference/c_inference_lib.c", "inference/c_inference_main.c",
+                    "inference/c_inference_lib.h", "inference/mnist_index.h", "inference/model_descriptor.h",
+                    "models/mnist_model.onnx", "models/mnist_model.json", "test_data"],
+            outputs=["results/benchmark_compare.json"],
+            deps=["export", "data"], flags={'platform': 'linux'}, cache_root="results",
+            description="与基线比较，检查推理性能回归"),
+        PipelineStage(
+            "compile_android", ["./build.sh", "android"], cwd=".",
+            inputs=["build.sh", "build/CMakeLists.txt", "inference/cpp_inference.cpp",
+                    "inference/c_inference.c", "inference/mnist_index.h", "inference/model_descriptor.h"],
+            outputs=["android_executables/arm64-v8a/cpp_inference",
+                     "android_executables/arm64-v8a/c_inference"],
+            flags={'platform': 'android'}, cache_root="results",
+            description="交叉编译Android推理程序"),
+    ]
+
+    return {stage.name: stage for stage in stages}
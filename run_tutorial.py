@@ -10,14 +10,58 @@ import sys
 import subprocess
 import time
 import json
+import argparse
+import re
+import importlib.metadata
+import importlib.util
 from pathlib import Path
 
+from pipeline import (PipelineCache, PipelineExecutor, mnist_pipeline_stages,
+                      STAGE_UP_TO_DATE, STAGE_RESTORED)
+
+# 无交互模式默认执行的目标阶段（依赖阶段自动加入）
+HEADLESS_DEFAULT_STAGES = ["quantize", "python_inference", "test_macos_cpp", "test_macos_c"]
+
+# 只做推理时执行的阶段；产生模型的阶段视为已完成，直接使用 models/ 下已有的模型，不加载torch
+INFERENCE_ONLY_STAGES = ["python_inference", "test_macos_cpp", "test_macos_c"]
+MODEL_STAGES = ["download", "train", "quantize", "export", "train_tiny", "export_tiny", "train_qat",
+                "export_qat", "sweep", "ddp_scaling"]
+
+# 各阶段在编排进程之外（阶段子进程中）需要的Python包，按分发名列出
+STAGE_REQUIREMENTS = {
+    'download': ['torch', 'torchvision'],
+    'train': ['torch', 'torchvision', 'numpy'],
+    'train_tiny': ['torch', 'torchvision', 'numpy'],
+    'quantize': ['torch', 'numpy'],
+    'export': ['torch', 'onnx', 'onnxruntime', 'numpy'],
+    'export_tiny': ['torch', 'onnx', 'onnxruntime', 'numpy'],
+    'train_qat': ['torch', 'torchvision', 'numpy'],
+    'export_qat': ['torch', 'onnx', 'onnxruntime', 'numpy'],
+    'sweep': ['torch', 'torchvision', 'onnx', 'onnxruntime', 'numpy'],
+    'ddp_scaling': ['torch', 'torchvision', 'numpy'],
+    'data': ['numpy'],
+    'python_inference': ['onnxruntime', 'numpy'],
+    'parity': ['onnxruntime', 'numpy'],
+    'cascade': ['onnxruntime', 'numpy'],
+    'benchmark_linux': ['numpy'],
+    'benchmark_gate': ['numpy'],
+}
+# 只用于绘图等可选功能，缺失时只提示
+OPTIONAL_PACKAGES = ['matplotlib', 'Pillow']
+# 分发名与导入名不同的包
+IMPORT_NAMES = {'Pillow': 'PIL'}
+
 class MNISTTutorial:
-    def __init__(self):
+    def __init__(self, use_cache=True):
         self.project_root = Path.cwd()
         self.steps_completed = []
         self.platforms_available = self.check_platform_support()
         
+        # 阶段缓存：输入未变化的阶段直接跳过
+        self.use_cache = use_cache
+        self.stages = mnist_pipeline_stages(sys.executable)
+        self.cache = PipelineCache(self.project_root)
+        
     def check_platform_support(self):
         """检查平台支持情况"""
         platforms = {
@@ -56,45 +100,117 @@ class MNISTTutorial:
         """等待用户确认"""
         input(f"{message}")
         
-    def check_dependencies(self):
-        """检查Python依赖"""
-        required_packages = [
-            'torch', 'torchvision', 'onnx', 'onnxruntime', 
-            'numpy', 'matplotlib', 'Pillow'
-        ]
+    def stage_is_cached(self, stage_name):
+        """检查阶段输入是否变化，未变化时跳过（必要时从缓存恢复产物）"""
+        if not self.use_cache:
+            return False
+        
+        key, state = self.cache.check(self.stages[stage_name])
+        if state == STAGE_UP_TO_DATE:
+            print(f"⚡ {stage_name}: 输入未变化，跳过 (缓存键 {key[:12]})")
+            return True
+        if state == STAGE_RESTORED:
+            print(f"♻️  {stage_name}: 从缓存恢复产物 (缓存键 {key[:12]})")
+            return True
+        return False
+    
+    def record_stage(self, stage_name):
+        """阶段成功后记录输入哈希和产物"""
+        if self.use_cache:
+            self.cache.record(self.stages[stage_name])
+        
+    @staticmethod
+    def probe_package(package):
+        """
+        不导入包，只通过模块查找和安装元数据检查包是否可用
+        返回 (版本, 问题描述)，问题描述为 None 表示可用；torch等包导入一次需要数秒和数百MB内存
+        """
+        import_name = IMPORT_NAMES.get(package, package)
+        try:
+            spec = importlib.util.find_spec(import_name)
+        except (ImportError, ValueError) as e:
+            return None, f"查找失败: {e}"
+        if spec is None:
+            return None, "缺失"
+        try:
+            return importlib.metadata.version(package), None
+        except importlib.metadata.PackageNotFoundError:
+            return "unknown", None   # 可导入但没有安装元数据（如源码目录）
+    
+    @staticmethod
+    def pinned_conflicts(packages, versions):
+        """
+        根据安装元数据中的精确版本约束（如 torchvision 要求 torch==2.4.0）检查已安装版本是否匹配
+        这类不匹配以前只有在导入时才会暴露
+        """
+        conflicts = []
+        for package in packages:
+            try:
+                requirements = importlib.metadata.requires(package) or []
+            except importlib.metadata.PackageNotFoundError:
+                continue
+            for requirement in requirements:
+                # 只检查无条件的精确版本约束，如 "torch==2.4.0" 或 "torch (==2.4.0)"
+                match = re.fullmatch(r'([A-Za-z0-9_.\-]+)(\[[^\]]*\])?\s*\(?\s*==\s*([^,;()\s]+)\s*\)?', requirement)
+                if not match:
+                    continue
+                name, pinned = match.group(1), match.group(3)
+                installed = versions.get(name)
+                if installed and installed != "unknown" and installed.split('+')[0] != pinned.split('+')[0]:
+                    conflicts.append(f"{package} 要求 {name}=={pinned}，已安装 {installed}")
+        return conflicts
+    
+    def check_dependencies(self, stages=None):
+        """
+        检查Python依赖（只探测不导入，编排进程不加载torch等重量级包）
+        
+        Args:
+            stages: 将要执行的阶段名称，只检查这些阶段需要的包；None 表示完整教程的全部阶段
+        """
+        stages = list(self.stages) if stages is None else list(stages)
+        required_packages = []
+        for stage in stages:
+            for package in STAGE_REQUIREMENTS.get(stage, []):
+                if package not in required_packages:
+                    required_packages.append(package)
         
         print("检查Python依赖包...")
         missing_packages = []
-        failed_packages = []
+        versions = {}
         
         for package in required_packages:
-            try:
-                if package == 'Pillow':
-                    __import__('PIL')  # Pillow的导入名是PIL
-                else:
-                    __import__(package)
-                print(f"✓ {package}")
-            except ImportError as e:
-                print(f"✗ {package} (缺失)")
+            version, problem = self.probe_package(package)
+            if problem:
+                print(f"✗ {package} ({problem})")
                 missing_packages.append(package)
-            except Exception as e:
-                print(f"⚠️ {package} (导入错误: {str(e)[:50]}...)")
-                failed_packages.append(package)
+            else:
+                versions[package] = version
+                print(f"✓ {package} {version}")
+        
+        for package in OPTIONAL_PACKAGES:
+            version, problem = self.probe_package(package)
+            if problem:
+                print(f"⚠️ {package} (可选，{problem}，部分图表不可用)")
         
         if missing_packages:
             print(f"\n缺失的包: {', '.join(missing_packages)}")
             print("请安装缺失的包:")
             print(f"pip install {' '.join(missing_packages)}")
             return False
-            
-        if failed_packages:
-            print(f"\n导入失败的包: {', '.join(failed_packages)}")
-            print("这些包已安装但导入失败，可能是版本兼容性问题。")
+        
+        conflicts = self.pinned_conflicts(required_packages, versions)
+        if conflicts:
+            print(f"\n版本不匹配的包:")
+            for conflict in conflicts:
+                print(f"  - {conflict}")
+            print("这些包已安装但版本不兼容，导入时可能失败。")
             print("建议的解决方案:")
-            if 'torchvision' in failed_packages:
+            if any(c.startswith('torchvision') for c in conflicts):
                 print("1. pip install torch==2.4.0 torchvision==0.19.0 torchaudio==2.4.0")
             print("2. 创建新的conda环境: conda create -n mnist_deploy python=3.9")
             
+            if not sys.stdin.isatty():
+                return False
             choice = input("是否继续运行教程？(y/n): ").strip().lower()
             return choice in ['y', 'yes']
         
@@ -108,6 +224,10 @@ class MNISTTutorial:
                        "这个模型包含2个卷积层和2个全连接层。\n"
                        "训练将使用MNIST数据集，包含60000个训练样本。")
         
+        if self.stage_is_cached("train"):
+            self.steps_completed.append("train")
+            return True
+        
         # 检查模型是否已存在
         model_path = self.project_root / "models" / "mnist_model.pth"
         if model_path.exists():
@@ -149,6 +269,7 @@ class MNISTTutorial:
             model_path = self.project_root / "models" / "mnist_model.pth"
             if model_path.exists():
                 print(f"✓ 模型已保存: {model_path}")
+                self.record_stage("train")
                 self.steps_completed.append("train")
                 return True
             else:
@@ -167,6 +288,10 @@ class MNISTTutorial:
                        "量化可以减少模型大小并提高推理速度。\n"
                        "我们将使用PyTorch的动态量化功能。")
         
+        if self.stage_is_cached("quantize"):
+            self.steps_completed.append("quantize")
+            return True
+        
         self.wait_for_user("准备开始量化...")
         
         os.chdir(self.project_root / "train")
@@ -209,6 +334,7 @@ class MNISTTutorial:
             quantized_path = self.project_root / "models" / "mnist_quantized.pth"
             if quantized_path.exists():
                 print(f"✓ 量化模型已保存: {quantized_path}")
+                self.record_stage("quantize")
                 self.steps_completed.append("quantize")
                 return True
             else:
@@ -227,6 +353,10 @@ class MNISTTutorial:
                        "ONNX是一个开放的神经网络交换格式，\n"
                        "它允许我们在不同的推理引擎之间使用同一个模型。")
         
+        if self.stage_is_cached("export"):
+            self.steps_completed.append("onnx")
+            return True
+        
         self.wait_for_user("准备导出ONNX模型...")
         
         os.chdir(self.project_root / "train")
@@ -259,6 +389,7 @@ class MNISTTutorial:
             if onnx_path.exists():
                 print(f"✓ ONNX模型已保存: {onnx_path}")
                 print(f"模型大小: {onnx_path.stat().st_size / 1024:.1f} KB")
+                self.record_stage("export")
                 self.steps_completed.append("onnx")
                 return True
             else:
@@ -277,6 +408,11 @@ class MNISTTutorial:
                        "现在我们使用ONNX Runtime Python API来测试推理性能。\n"
                        "这将为我们提供准确率和性能基准。")
         
+        if self.stage_is_cached("python_inference"):
+            self.show_inference_results("python")
+            self.steps_completed.append("python_inference")
+            return True
+        
         self.wait_for_user("准备开始Python推理测试...")
         
         os.chdir(self.project_root / "inference")
@@ -316,6 +452,7 @@ class MNISTTutorial:
                 print(f"平均推理时间: {summary['average_inference_time_ms']:.2f} ms")
                 print(f"推理速度: {summary['fps']:.1f} FPS")
                 
+                self.record_stage("python_inference")
                 self.steps_completed.append("python_inference")
                 return True
             else:
@@ -396,6 +533,10 @@ class MNISTTutorial:
         success_count = 0
         for platform in platforms_to_build:
             print(f"\n🔨 编译 {platform} 版本...")
+            if self.stage_is_cached(f"compile_{platform}"):
+                success_count += 1
+                continue
+            
             self.wait_for_user(f"准备编译 {platform} 版本...")
             
             try:
@@ -416,6 +557,7 @@ class MNISTTutorial:
                 return_code = process.poll()
                 if return_code == 0:
                     print(f"✅ {platform} 版本编译成功!")
+                    self.record_stage(f"compile_{platform}")
                     success_count += 1
                     
                     # 检查生成的可执行文件
@@ -484,14 +626,18 @@ class MNISTTutorial:
         try:
             # 测试C++版本
             print("🔬 测试 C++ 版本...")
-            result = subprocess.run(["./cpp_inference"], 
-                                  capture_output=True, text=True, check=True)
+            if not self.stage_is_cached("test_macos_cpp"):
+                result = subprocess.run(["./cpp_inference"], 
+                                      capture_output=True, text=True, check=True)
+                self.record_stage("test_macos_cpp")
             print("C++ 推理完成")
             
             # 测试C版本
             print("🔬 测试 C 版本...")
-            result = subprocess.run(["./c_inference"], 
-                                  capture_output=True, text=True, check=True)
+            if not self.stage_is_cached("test_macos_c"):
+                result = subprocess.run(["./c_inference"], 
+                                      capture_output=True, text=True, check=True)
+                self.record_stage("test_macos_c")
             print("C 推理完成")
             
             # 显示结果文件
@@ -582,7 +728,9 @@ class MNISTTutorial:
         
         # 根据平台类型显示对应结果
         result_files = []
-        if platform_type == "macos":
+        if platform_type == "python":
+            result_files = ["python_inference_results.json"]
+        elif platform_type == "macos":
             result_files = ["macos_cpp_results.txt", "macos_c_results.txt"]
         elif platform_type == "android":
             result_files = ["android_cpp_results.txt", "android_c_results.txt"]
@@ -710,7 +858,24 @@ class MNISTTutorial:
             time_str = f"{data['time_ms']:.2f}" if data['time_ms'] else "N/A"
             fps_str = f"{data['fps']:.1f}" if data['fps'] else "N/A"
             print(f"{platform:<15} {acc_str:<10} {time_str:<10} {fps_str:<12}")
-        
+
+        # Linux本地基准测试的进程资源占用（benchmark.py 生成）
+        linux_benchmark = results_dir / "benchmark_linux.json"
+        if linux_benchmark.exists():
+            with open(linux_benchmark, 'r', encoding='utf-8') as f:
+                configs = json.load(f)['configs']
+            print(f"\n💾 Linux本地资源占用 ({linux_benchmark.name}):")
+            print(f"{'引擎':<8} {'批大小':<6} {'时间(ms)':<10} {'峰值RSS(MB)':<12} {'CPU ms/样本':<12} {'指令/样本':<10}")
+            print("-" * 64)
+            for config in configs:
+                s = config['summary']
+                if 'peak_rss_mb' not in s:
+                    continue   # 旧版本结果文件没有资源指标
+                perf = config.get('perf') or {}
+                instructions = f"{perf['instructions_per_sample']:.3g}" if 'instructions_per_sample' in perf else "N/A"
+                print(f"{config['engine']:<8} {config['batch_size']:<6} {s['mean_ms']['mean']:<10.4f} "
+                      f"{s['peak_rss_mb']['mean']:<12.1f} {s['cpu_ms_per_sample']['mean']:<12.4f} {instructions:<10}")
+
         # 性能洞察分析
         print("\n🔍 性能洞察:")
         if len(performance_data) >= 2:
@@ -757,6 +922,53 @@ class MNISTTutorial:
         self.steps_completed.append("performance_analysis")
         return True
     
+    def run_headless(self, targets=None, jobs=None, inference_only=False):
+        """
+        无交互模式：按阶段依赖图并行执行，记录每个阶段耗时
+        inference_only 时只执行推理阶段，训练/量化/导出阶段视为已完成，直接使用已有模型
+        """
+        print("🤖 MNIST部署流水线 - 无交互模式")
+        print("=" * 50)
+        
+        targets = targets or (INFERENCE_ONLY_STAGES if inference_only else HEADLESS_DEFAULT_STAGES)
+        exclude = MODEL_STAGES if inference_only else ()
+        executor = PipelineExecutor(self.project_root, self.stages,
+                                    cache=self.cache if self.use_cache else None,
+                                    max_workers=jobs)
+        try:
+            order = executor.resolve(targets, exclude)
+        except (KeyError, ValueError) as e:
+            print(f"❌ 阶段配置错误: {e}")
+            print(f"可用阶段: {', '.join(self.stages)}")
+            return False
+        
+        if inference_only and not self.check_model_artifacts(order):
+            return False
+        if not self.check_dependencies(order):
+            return False
+        
+        success = executor.run(targets, exclude)
+        
+        report_path = self.project_root / "results" / "pipeline_report.json"
+        report = executor.write_report(report_path)
+        
+        print("-" * 50)
+        print(f"总耗时: {report['total_wall_time_s']:.2f} s")
+        print(f"阶段报告: {report_path}")
+        print("🎉 流水线执行成功" if success else "❌ 流水线执行失败")
+        return success
+    
+    def check_model_artifacts(self, order):
+        """只做推理时检查将要执行的阶段所需、由模型阶段产生的文件是否已存在"""
+        needed = {path for name in order for path in self.stages[name].inputs}
+        missing = [path for name in MODEL_STAGES for path in self.stages[name].outputs
+                   if path in needed and not (self.project_root / path).exists()]
+        if missing:
+            print(f"❌ 缺少模型文件: {', '.join(missing)}")
+            print("请先完整运行一次流水线（或 cd train && python export_onnx.py）生成模型")
+            return False
+        return True
+    
     def run_tutorial(self):
         """运行完整教程"""
         print("🎓 MNIST模型部署教程 - 统一版本跨平台")
@@ -829,5 +1041,29 @@ class MNISTTutorial:
         return True
 
 if __name__ == "__main__":
-    tutorial = MNISTTutorial()
+    parser = argparse.ArgumentParser(description="MNIST模型部署教学脚本")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="忽略阶段缓存，强制重新执行所有步骤")
+    parser.add_argument("--headless", action="store_true",
+                        help="无交互模式：并行执行阶段依赖图，失败时返回非零退出码")
+    parser.add_argument("--stages", nargs="+", metavar="STAGE",
+                        help=f"无交互模式的目标阶段 (默认: {' '.join(HEADLESS_DEFAULT_STAGES)})")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="无交互模式的最大并行阶段数 (默认: CPU核数)")
+    parser.add_argument("--inference-only", action="store_true",
+                        help=f"无交互模式只执行推理阶段 ({' '.join(INFERENCE_ONLY_STAGES)})，"
+                             "使用已有模型，不需要torch")
+    parser.add_argument("--check-deps", action="store_true",
+                        help="只检查Python依赖后退出（配合 --inference-only 只检查推理阶段的依赖）")
+    args = parser.parse_args()
+    
+    tutorial = MNISTTutorial(use_cache=not args.no_cache)
+    if args.check_deps:
+        stages = None
+        if args.inference_only:
+            executor = PipelineExecutor(tutorial.project_root, tutorial.stages)
+            stages = executor.resolve(args.stages or INFERENCE_ONLY_STAGES, MODEL_STAGES)
+        sys.exit(0 if tutorial.check_dependencies(stages) else 1)
+    if args.headless or args.inference_only:
+        sys.exit(0 if tutorial.run_headless(args.stages, args.jobs, args.inference_only) else 1)
     tutorial.run_tutorial() 
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+批量评估引擎
+一次性加载完整的MNIST测试集（10000个样本），以大批量运行 PyTorch / ONNX Runtime 模型，
+统计准确率、与参考模型的logit偏差和预测不一致数量，作为模型发布前的质量门禁
+"""
+
+import struct
+import time
+import numpy as np
+
+MNIST_MEAN = 0.1307
+MNIST_STD = 0.3081
+DEFAULT_BATCH_SIZE = 1000
+
+
+def load_mnist_test_set(raw_dir='../data/MNIST/raw'):
+    """直接读取MNIST原始测试集，返回标准化后的 (images[N,1,28,28], labels[N])"""
+    with open(f"{raw_dir}/t10k-images-idx3-ubyte", 'rb') as f:
+        magic, num_images, rows, cols = struct.unpack('>IIII', f.read(16))
+        if magic != 2051:
+            raise ValueError(f"Invalid magic number: {magic}")
+        pixels = np.frombuffer(f.read(), dtype=np.uint8)
+
+    with open(f"{raw_dir}/t10k-labels-idx1-ubyte", 'rb') as f:
+        magic, num_labels = struct.unpack('>II', f.read(8))
+        if magic != 2049:
+            raise ValueError(f"Invalid magic number: {magic}")
+        labels = np.frombuffer(f.read(), dtype=np.uint8).astype(np.int64)
+
+    # 与 transforms.ToTensor + Normalize 等价的向量化预处理
+    images = pixels.reshape(num_images, 1, rows, cols).astype(np.float32)
+    images *= 1.0 / 255.0
+    images -= MNIST_MEAN
+    images /= MNIST_STD
+
+    return images, labels
+
+
+def run_pytorch(model, images, batch_size=DEFAULT_BATCH_SIZE):
+    """批量运行PyTorch模型，返回logits [N, 10]"""
+    import torch
+
+    model.eval()
+    outputs = []
+    with torch.inference_mode():
+        for start in range(0, len(images), batch_size):
+            batch = torch.from_numpy(images[start:start + batch_size])
+            outputs.append(model(batch).numpy())
+    return np.concatenate(outputs)
+
+
+def run_onnx(session, images, batch_size=DEFAULT_BATCH_SIZE):
+    """批量运行ONNX Runtime会话，返回logits [N, 10]（要求模型batch维为动态）"""
+    input_name = session.get_inputs()[0].name
+    output_name = session.get_outputs()[0].name
+    outputs = []
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        outputs.append(session.run([output_name], {input_name: batch})[0])
+    return np.concatenate(outputs)
+
+
+def compare_logits(logits, labels, reference=None):
+    """计算准确率，以及相对参考logits的最大/平均偏差和预测不一致数量"""
+    predictions = logits.argmax(axis=1)
+    report = {
+        'samples': int(len(labels)),
+        'accuracy': float((predictions == labels).mean()),
+        'correct': int((predictions == labels).sum()),
+    }
+
+    if reference is not None:
+        diff = np.abs(logits - reference)
+        report['max_logit_diff'] = float(diff.max())
+        report['mean_logit_diff'] = float(diff.mean())
+        report['disagreements'] = int((predictions != reference.argmax(axis=1)).sum())
+
+    return report
+
+
+def evaluate_models(runners, images, labels, reference_name=None):
+    """
+    依次运行多个模型并与参考模型比较
+
+    Args:
+        runners: {模型名称: 函数(images) -> logits}，按插入顺序执行
+        reference_name: 参考模型名称，默认取第一个
+    Returns:
+        {模型名称: 评估报告}
+    """
+    reference_name = reference_name or next(iter(runners))
+    logits_by_model = {}
+    reports = {}
+
+    for name, runner in runners.items():
+        start = time.perf_counter()
+        logits_by_model[name] = runner(images)
+        elapsed = time.perf_counter() - start
+
+        reference = logits_by_model.get(reference_name) if name != reference_name else None
+        report = compare_logits(logits_by_model[name], labels, reference)
+        report['eval_time_s'] = elapsed
+        report['throughput_fps'] = len(images) / elapsed if elapsed > 0 else float('inf')
+        reports[name] = report
+
+    return reports
+
+
+def print_evaluation(reports, reference_name=None):
+    """打印评估结果表"""
+    reference_name = reference_name or next(iter(reports))
+    print(f"\n=== 批量评估结果 (参考模型: {reference_name}) ===")
+    print(f"{'模型':<14} {'样本数':>7} {'准确率':>8} {'最大偏差':>10} {'平均偏差':>10} {'不一致':>6} {'耗时(s)':>8} {'FPS':>9}")
+    print("-" * 80)
+    for name, r in reports.items():
+        max_diff = f"{r['max_logit_diff']:.2e}" if 'max_logit_diff' in r else "-"
+        mean_diff = f"{r['mean_logit_diff']:.2e}" if 'mean_logit_diff' in r else "-"
+        disagree = str(r['disagreements']) if 'disagreements' in r else "-"
+        print(f"{name:<14} {r['samples']:>7} {r['accuracy']:>8.2%} {max_diff:>10} {mean_diff:>10} "
+              f"{disagree:>6} {r['eval_time_s']:>8.2f} {r['throughput_fps']:>9.0f}")
+
+
+def check_gate(reports, names=None, min_accuracy=None, max_accuracy_drop=None,
+               max_disagreements=None, max_logit_diff=None, reference_name=None):
+    """
+    发布门禁：names 中任何模型不满足阈值时返回失败原因列表（空列表表示通过）
+    """
+    reference_name = reference_name or next(iter(reports))
+    reference_accuracy = reports[reference_name]['accuracy']
+    failures = []
+
+    for name in names or reports:
+        if name not in reports:
+            continue
+        r = reports[name]
+        if min_accuracy is not None and r['accuracy'] < min_accuracy:
+            failures.append(f"{name}: 准确率 {r['accuracy']:.2%} 低于 {min_accuracy:.2%}")
+        if max_accuracy_drop is not None and reference_accuracy - r['accuracy'] > max_accuracy_drop:
+            failures.append(f"{name}: 准确率下降 {reference_accuracy - r['accuracy']:.2%} 超过 {max_accuracy_drop:.2%}")
+        if max_disagreements is not None and r.get('disagreements', 0) > max_disagreements:
+            failures.append(f"{name}: 预测不一致 {r['disagreements']} 个，超过 {max_disagreements}")
+        if max_logit_diff is not None and r.get('max_logit_diff', 0.0) > max_logit_diff:
+            failures.append(f"{name}: 最大logit偏差 {r['max_logit_diff']:.2e} 超过 {max_logit_diff:.2e}")
+
+    return failures
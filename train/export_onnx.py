@@ -1,15 +1,182 @@
 import torch
+import torch.nn as nn
 import torch.onnx
 import onnx
+from onnx import numpy_helper, TensorProto
 import onnxruntime
 import numpy as np
 import os
-from train_model import MNISTNet
-import torchvision.transforms as transforms
-import torchvision
+import sys
+import json
+import argparse
+import tempfile
+from train_model import MNISTNet, TinyMNISTNet, QATMNISTNet, QAT_ACTIVATIONS, weight_scale
+from evaluate import (load_mnist_test_set, run_pytorch, run_onnx, evaluate_models,
+                      print_evaluation, check_gate, MNIST_MEAN, MNIST_STD)
 
-def export_to_onnx():
-    """将PyTorch模型导出为ONNX格式"""
+# 发布门禁阈值
+FP32_MAX_LOGIT_DIFF = 1e-3       # ORT FP32 与 PyTorch 的最大logit偏差
+FP32_MAX_DISAGREEMENTS = 1       # ORT FP32 与 PyTorch 预测不一致的最大样本数
+INT8_MAX_ACCURACY_DROP = 0.01    # ORT INT8 相对 PyTorch 的最大准确率下降
+HALF_MAX_ACCURACY_DROP = 0.002   # FP16 / BF16 权重存储模型相对 PyTorch 的最大准确率下降
+QAT_MAX_ACCURACY_DROP = 0.01     # QAT INT8 模型相对 FP32 PyTorch 的最大准确率下降
+
+# 模型描述文件格式版本（与 inference/model_descriptor.h 的 MODEL_DESCRIPTOR_VERSION 一致）
+MODEL_DESCRIPTOR_VERSION = 1
+
+# 图内 top-1 输出名称（export_onnx.py --top1-head），写入描述文件的 class_output_name / confidence_output_name
+TOP1_CLASS_OUTPUT = 'class'
+TOP1_CONFIDENCE_OUTPUT = 'confidence'
+
+class Top1Head(nn.Module):
+    """
+    在图内追加 top-1 后处理：模型输出已是 log_softmax，ArgMax 得到类别，exp(最大值) 即softmax置信度
+    保留原始logits输出（数值一致性检查用），引擎只取 (class, confidence) 时跳过主机端的softmax与argmax
+    """
+    def __init__(self, model):
+        super(Top1Head, self).__init__()
+        self.model = model
+        
+    def forward(self, x):
+        log_probs = self.model(x)
+        log_confidence, predicted = torch.max(log_probs, dim=1)
+        return log_probs, predicted.to(torch.int32), torch.exp(log_confidence)
+
+def model_descriptor_path(onnx_path):
+    """模型描述文件路径：与模型同名的 .json"""
+    return os.path.splitext(onnx_path)[0] + '.json'
+
+def write_model_descriptor(onnx_path, mean, std, dataset='mnist', weight_dtype=None):
+    """
+    根据ONNX图的输入输出形状生成模型描述文件，供各推理引擎确定输入形状、类别数和标准化参数
+    动态维度（如batch_size）记为 -1；mean/std 按通道给出；weight_dtype 记录权重存储精度（可选）
+    """
+    model = onnx.load(onnx_path)
+    graph_input = model.graph.input[0]
+    graph_output = model.graph.output[0]
+    
+    def shape_of(value_info):
+        return [d.dim_value if d.HasField('dim_value') else -1
+                for d in value_info.type.tensor_type.shape.dim]
+    
+    input_shape = shape_of(graph_input)
+    output_shape = shape_of(graph_output)
+    if len(input_shape) != 4 or min(input_shape[1:]) < 1 or output_shape[-1] < 1:
+        raise ValueError(f"不支持的模型形状: 输入 {input_shape}, 输出 {output_shape}（需要 NCHW 输入与固定类别数）")
+    
+    channels = input_shape[1]
+    mean = [float(m) for m in np.broadcast_to(mean, channels)]
+    std = [float(s) for s in np.broadcast_to(std, channels)]
+    input_dtype = onnx.helper.tensor_dtype_to_np_dtype(graph_input.type.tensor_type.elem_type)
+    
+    descriptor = {
+        'format_version': MODEL_DESCRIPTOR_VERSION,
+        'model': os.path.basename(onnx_path),
+        'dataset': dataset,
+        'input_name': graph_input.name,
+        'output_name': graph_output.name,
+        'input_shape': input_shape,
+        'input_dtype': np.dtype(input_dtype).name,
+        'num_classes': output_shape[-1],
+        'mean': mean,
+        'std': std,
+    }
+    if weight_dtype:
+        descriptor['weight_dtype'] = weight_dtype
+    output_names = [output.name for output in model.graph.output]
+    if TOP1_CLASS_OUTPUT in output_names and TOP1_CONFIDENCE_OUTPUT in output_names:
+        descriptor['class_output_name'] = TOP1_CLASS_OUTPUT
+        descriptor['confidence_output_name'] = TOP1_CONFIDENCE_OUTPUT
+    path = model_descriptor_path(onnx_path)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(descriptor, f, indent=2, ensure_ascii=False)
+    print(f"✓ 模型描述文件: {path} (输入 {input_shape}, {descriptor['num_classes']} 类)")
+    return path
+
+def static_model_path(onnx_path, batch_size):
+    """固定批大小模型路径：mnist_model.onnx -> mnist_model_b8.onnx"""
+    stem, ext = os.path.splitext(onnx_path)
+    return f"{stem}_b{batch_size}{ext}"
+
+def export_static_batches(model, onnx_path, batch_sizes, sample_shape):
+    """
+    导出固定批大小的模型（输入输出形状全部为常量），与动态批模型共用同一个描述文件
+    静态形状下ORT可以预先规划内存、省去每次Run的形状推断；推理引擎按请求大小选择最匹配的会话
+    """
+    reference = onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    paths = []
+    for batch_size in batch_sizes:
+        path = static_model_path(onnx_path, batch_size)
+        dummy_input = torch.randn(batch_size, *sample_shape)
+        torch.onnx.export(
+            model, dummy_input, path,
+            export_params=True,
+            opset_version=11,
+            do_constant_folding=True,
+            input_names=['input'],
+            output_names=['output'],
+        )
+        onnx.checker.check_model(onnx.load(path))
+        
+        # 与动态批模型逐元素比较
+        session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+        test_input = dummy_input.numpy()
+        expected = reference.run(None, {'input': test_input})[0]
+        actual = session.run(None, {'input': test_input})[0]
+        np.testing.assert_allclose(actual, expected, rtol=1e-5, atol=1e-6)
+        print(f"✓ 固定批大小模型: {path} (批大小 {batch_size})")
+        paths.append(path)
+    return paths
+
+def top1_model_path(onnx_path):
+    """图内 top-1 输出模型路径：mnist_model.onnx -> mnist_model_top1.onnx"""
+    stem, ext = os.path.splitext(onnx_path)
+    return f"{stem}_top1{ext}"
+
+def export_top1_model(model, onnx_path, sample_shape):
+    """
+    导出带图内 top-1 输出的模型（输出 output / class / confidence），并与动态批模型比较:
+    logits逐元素一致，类别等于logits的argmax，置信度等于softmax最大概率
+    """
+    path = top1_model_path(onnx_path)
+    dummy_input = torch.randn(16, *sample_shape)
+    torch.onnx.export(
+        Top1Head(model).eval(), dummy_input, path,
+        export_params=True,
+        opset_version=11,
+        do_constant_folding=True,
+        input_names=['input'],
+        output_names=['output', TOP1_CLASS_OUTPUT, TOP1_CONFIDENCE_OUTPUT],
+        dynamic_axes={
+            'input': {0: 'batch_size'},
+            'output': {0: 'batch_size'},
+            TOP1_CLASS_OUTPUT: {0: 'batch_size'},
+            TOP1_CONFIDENCE_OUTPUT: {0: 'batch_size'},
+        }
+    )
+    onnx.checker.check_model(onnx.load(path))
+    
+    reference = onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+    test_input = dummy_input.numpy()
+    expected = reference.run(None, {'input': test_input})[0]
+    logits, classes, confidences = session.run(None, {'input': test_input})
+    probabilities = np.exp(expected - expected.max(axis=1, keepdims=True))
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    np.testing.assert_allclose(logits, expected, rtol=1e-5, atol=1e-6)
+    np.testing.assert_array_equal(classes, expected.argmax(axis=1))
+    np.testing.assert_allclose(confidences, probabilities.max(axis=1), rtol=1e-5, atol=1e-6)
+    print(f"✓ 图内 top-1 输出模型: {path} (输出 {TOP1_CLASS_OUTPUT} int32, {TOP1_CONFIDENCE_OUTPUT} float32)")
+    return path
+
+def export_to_onnx(static_batches=(), top1_head=False):
+    """
+    将PyTorch模型导出为ONNX格式
+    
+    Args:
+        static_batches: 额外导出的固定批大小列表（如 [1, 8, 32, 128]），为空时只导出动态批模型
+        top1_head: 额外导出图内计算 (类别, 置信度) 的模型 <模型>_top1.onnx
+    """
     print("开始导出ONNX模型...")
     
     # 加载训练好的模型
@@ -51,6 +218,9 @@ def export_to_onnx():
         print(f"✗ ONNX模型验证失败: {e}")
         return None
     
+    # 生成模型描述文件（输入形状、类别数、标准化参数）
+    write_model_descriptor(onnx_path, MNIST_MEAN, MNIST_STD)
+    
     # 显示模型信息
     print("\n=== ONNX模型信息 ===")
     print(f"ONNX版本: {onnx.version.version}")
@@ -89,58 +259,387 @@ def export_to_onnx():
         print(f"✗ 推理结果不一致: {e}")
         return None
     
-    # 使用真实MNIST数据测试
-    print("\n使用真实MNIST数据测试...")
-    test_with_real_data(model, ort_session)
+    # 固定批大小模型
+    if static_batches:
+        print("\n导出固定批大小模型...")
+        try:
+            export_static_batches(model, onnx_path, static_batches, dummy_input.shape[1:])
+        except AssertionError as e:
+            print(f"✗ 固定批大小模型与动态批模型结果不一致: {e}")
+            return None
+    
+    # 图内 top-1 输出模型
+    if top1_head:
+        print("\n导出图内 top-1 输出模型...")
+        try:
+            write_model_descriptor(export_top1_model(model, onnx_path, dummy_input.shape[1:]),
+                                   MNIST_MEAN, MNIST_STD)
+        except AssertionError as e:
+            print(f"✗ 图内 top-1 输出与动态批模型结果不一致: {e}")
+            return None
+    
+    # 生成INT8模型
+    int8_path = quantize_onnx_int8(onnx_path, '../models/mnist_model_int8.onnx')
+    if int8_path:
+        write_model_descriptor(int8_path, MNIST_MEAN, MNIST_STD)
+    int8_session = onnxruntime.InferenceSession(int8_path) if int8_path else None
+    
+    # FP16 / BF16 权重存储模型
+    half_sessions = {}
+    for suffix, (_, weight_dtype) in WEIGHT_STORAGE_VARIANTS.items():
+        path = export_weight_storage_variant(onnx_path, suffix)
+        write_model_descriptor(path, MNIST_MEAN, MNIST_STD, weight_dtype=weight_dtype)
+        half_sessions[suffix] = onnxruntime.InferenceSession(path)
+    
+    # 使用完整MNIST测试集批量验证
+    print("\n使用完整MNIST测试集批量验证...")
+    reports, failures = test_with_real_data(model, ort_session, int8_session, half_sessions)
+    if failures:
+        print("✗ 发布门禁未通过:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return None
+    print("✓ 发布门禁通过")
     
     print(f"\n✓ ONNX模型导出成功: {onnx_path}")
     return onnx_path
 
-def test_with_real_data(pytorch_model, onnx_session):
-    """使用真实MNIST数据测试两个模型的一致性"""
+# 权重存储精度变体：文件后缀 -> (ONNX数据类型, 描述文件中的 weight_dtype)
+WEIGHT_STORAGE_VARIANTS = {
+    'fp16': (TensorProto.FLOAT16, 'float16'),
+    'bf16': (TensorProto.BFLOAT16, 'bfloat16'),
+}
+
+def weight_storage_model_path(onnx_path, suffix):
+    """权重存储精度变体路径：mnist_model.onnx -> mnist_model_fp16.onnx"""
+    stem, ext = os.path.splitext(onnx_path)
+    return f"{stem}_{suffix}{ext}"
+
+def float_to_bfloat16_bits(array):
+    """float32 -> bfloat16 位模式（uint16），舍入到最近偶数"""
+    bits = np.ascontiguousarray(array, dtype=np.float32).view(np.uint32)
+    return ((bits + 0x7FFF + ((bits >> 16) & 1)) >> 16).astype(np.uint16)
+
+def export_weight_storage_variant(onnx_path, suffix):
+    """
+    导出以 FP16 / BF16 存储权重的模型：float32 初始化器转为低精度（名称不变），后接 Cast(to=FLOAT)，
+    计算仍为FP32（CPU EP 没有低精度的卷积/GEMM内核）
+    ORT 加载时会把常量 Cast 折叠回 float32，运行时与FP32模型相同；
+    onnx_to_c_kernels.py 生成的内核则直接读取低精度的全连接层权重，权重字节减半
+    """
+    data_type, _ = WEIGHT_STORAGE_VARIANTS[suffix]
+    model = onnx.load(onnx_path)
+    opset = next(o.version for o in model.opset_import if o.domain in ('', 'ai.onnx'))
+    if data_type == TensorProto.BFLOAT16 and opset < 13:
+        model = onnx.version_converter.convert_version(model, 13)   # bfloat16 的 Cast 需要 opset 13
+    graph = model.graph
     
-    # 加载测试数据
-    transform = transforms.Compose([
-        transforms.ToTensor(),
-        transforms.Normalize((0.1307,), (0.3081,))
-    ])
+    casts = {}
+    for initializer in graph.initializer:
+        if initializer.data_type != TensorProto.FLOAT:
+            continue
+        name = initializer.name
+        array = numpy_helper.to_array(initializer)
+        if data_type == TensorProto.FLOAT16:
+            converted = numpy_helper.from_array(array.astype(np.float16), name)
+        else:
+            converted = onnx.helper.make_tensor(name, TensorProto.BFLOAT16, array.shape,
+                                                float_to_bfloat16_bits(array).tobytes(), raw=True)
+        initializer.CopyFrom(converted)
+        casts[name] = onnx.helper.make_node('Cast', [name], [f"{name}_float"], to=TensorProto.FLOAT,
+                                            name=f"{name}_cast")
+    for node in graph.node:
+        for i, input_name in enumerate(node.input):
+            if input_name in casts:
+                node.input[i] = casts[input_name].output[0]
+    nodes = list(casts.values()) + list(graph.node)
+    del graph.node[:]
+    graph.node.extend(nodes)
     
-    test_dataset = torchvision.datasets.MNIST(
-        root='../data', train=False, download=False, transform=transform
+    onnx.checker.check_model(model)
+    path = weight_storage_model_path(onnx_path, suffix)
+    onnx.save(model, path)
+    print(f"✓ {suffix.upper()} 权重存储模型: {path} ({os.path.getsize(path) / 1024:.1f} KB)")
+    return path
+
+def export_tiny_model(top1_head=False):
+    """
+    导出级联推理第一级的小模型（train_model.py --arch tiny）
+    与完整模型使用相同的输入格式和标准化参数，只检查 PyTorch 与 ORT 结果一致，不生成INT8和固定批大小模型
+    top1_head: 额外导出图内计算 (类别, 置信度) 的 mnist_tiny_model_top1.onnx（cascade_inference.py 优先使用）
+    """
+    print("开始导出级联推理小模型...")
+    model = TinyMNISTNet()
+    model.load_state_dict(torch.load('../models/mnist_tiny_model.pth', map_location='cpu', weights_only=True))
+    model.eval()
+    
+    dummy_input = torch.randn(8, 1, 28, 28)
+    onnx_path = '../models/mnist_tiny_model.onnx'
+    print(f"导出ONNX模型到: {onnx_path}")
+    torch.onnx.export(
+        model, dummy_input, onnx_path,
+        export_params=True,
+        opset_version=11,
+        do_constant_folding=True,
+        input_names=['input'],
+        output_names=['output'],
+        dynamic_axes={'input': {0: 'batch_size'}, 'output': {0: 'batch_size'}}
     )
+    onnx.checker.check_model(onnx.load(onnx_path))
+    write_model_descriptor(onnx_path, MNIST_MEAN, MNIST_STD)
     
-    # 测试5个样本
-    print("测试样本:")
-    for i in range(5):
-        image, true_label = test_dataset[i]
-        input_batch = image.unsqueeze(0)  # 添加batch维度
-        
-        # PyTorch推理
-        with torch.no_grad():
-            pytorch_output = pytorch_model(input_batch)
-            pytorch_pred = pytorch_output.argmax(dim=1).item()
-            pytorch_prob = torch.exp(pytorch_output).max().item()
-        
-        # ONNX推理
-        ort_inputs = {onnx_session.get_inputs()[0].name: input_batch.numpy()}
-        ort_output = onnx_session.run(None, ort_inputs)
-        onnx_logits = ort_output[0]
-        onnx_probs = np.exp(onnx_logits) / np.sum(np.exp(onnx_logits))
-        onnx_pred = np.argmax(onnx_probs)
-        onnx_prob = np.max(onnx_probs)
+    session = onnxruntime.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    with torch.no_grad():
+        pytorch_output = model(dummy_input).numpy()
+    try:
+        np.testing.assert_allclose(session.run(None, {'input': dummy_input.numpy()})[0], pytorch_output,
+                                   rtol=1e-03, atol=1e-05)
+    except AssertionError as e:
+        print(f"✗ 推理结果不一致: {e}")
+        return None
+    print("✓ PyTorch和ONNX Runtime推理结果一致")
+    
+    if top1_head:
+        print("\n导出图内 top-1 输出模型...")
+        try:
+            write_model_descriptor(export_top1_model(model, onnx_path, dummy_input.shape[1:]),
+                                   MNIST_MEAN, MNIST_STD)
+        except AssertionError as e:
+            print(f"✗ 图内 top-1 输出与动态批模型结果不一致: {e}")
+            return None
+    return onnx_path
+
+def activation_qparams(min_val, max_val):
+    """uint8 非对称量化参数，与 FakeQuantObserver.qparams 相同"""
+    min_val, max_val = min(min_val, 0.0), max(max_val, 0.0)
+    scale = max((max_val - min_val) / 255.0, 1e-8)
+    return np.float32(scale), np.uint8(np.clip(np.round(-min_val / scale), 0, 255))
+
+def insert_qdq_nodes(model, activation_ranges, weight_bits):
+    """
+    按QAT学到的量化参数把FP32图改写为QDQ格式（ORT加载时融合为 QLinearConv / QGemm 等INT8内核）:
+      - Conv/Gemm 权重按输出通道量化为int8，偏置量化为int32（缩放 = 输入缩放 x 权重缩放），各接 DequantizeLinear
+      - 模型输入和各ReLU输出（QAT_ACTIVATIONS 的顺序）插入 QuantizeLinear -> DequantizeLinear，
+        经 MaxPool / Reshape / Flatten 后的张量沿用同一量化参数
+    """
+    graph = model.graph
+    initializers = {t.name: t for t in graph.initializer}
+    relus = [node for node in graph.node if node.op_type == 'Relu']
+    if len(relus) + 1 != len(QAT_ACTIVATIONS):
+        raise ValueError(f"图中有 {len(relus)} 个Relu，与QAT激活位置 {QAT_ACTIVATIONS} 不对应")
+    
+    # 需要量化的激活张量 -> (scale, zero_point)
+    qparams = {graph.input[0].name: activation_qparams(*activation_ranges['input'])}
+    for node, name in zip(relus, QAT_ACTIVATIONS[1:]):
+        qparams[node.output[0]] = activation_qparams(*activation_ranges[name])
+    for node in graph.node:
+        if node.op_type in ('MaxPool', 'Reshape', 'Flatten', 'Dropout', 'Identity') and node.input[0] in qparams:
+            qparams[node.output[0]] = qparams[node.input[0]]
+    
+    def add_initializer(name, array):
+        graph.initializer.append(numpy_helper.from_array(np.asarray(array), name))
+    
+    # 权重与偏置：替换为量化后的初始化器 + DequantizeLinear（输出沿用原名称，消费节点不变）
+    qmax = 2 ** (weight_bits - 1) - 1
+    weight_nodes = []
+    for node in graph.node:
+        if node.op_type not in ('Conv', 'Gemm'):
+            continue
+        axis = 0
+        if node.op_type == 'Gemm' and not next((a.i for a in node.attribute if a.name == 'transB'), 0):
+            axis = 1
+        weight_name = node.input[1]
+        weight = numpy_helper.to_array(initializers[weight_name])
+        scale = weight_scale(torch.from_numpy(np.moveaxis(weight, axis, 0).copy()), weight_bits).numpy()
+        shape = [-1 if d == axis else 1 for d in range(weight.ndim)]
+        quantized = np.clip(np.round(weight / scale.reshape(shape)), -qmax, qmax).astype(np.int8)
+        graph.initializer.remove(initializers[weight_name])
+        add_initializer(f"{weight_name}_quantized", quantized)
+        add_initializer(f"{weight_name}_scale", scale.astype(np.float32))
+        add_initializer(f"{weight_name}_zero_point", np.zeros(len(scale), dtype=np.int8))
+        weight_nodes.append(onnx.helper.make_node(
+            'DequantizeLinear', [f"{weight_name}_quantized", f"{weight_name}_scale", f"{weight_name}_zero_point"],
+            [weight_name], axis=axis, name=f"{weight_name}_dequantize"))
         
-        # 比较结果
-        match = "✓" if pytorch_pred == onnx_pred else "✗"
-        print(f"  样本{i}: 真实={true_label}, PyTorch={pytorch_pred}({pytorch_prob:.3f}), "
-              f"ONNX={onnx_pred}({onnx_prob:.3f}) {match}")
+        if len(node.input) > 2 and node.input[2] in initializers:
+            bias_name = node.input[2]
+            bias = numpy_helper.to_array(initializers[bias_name])
+            bias_scale = (qparams[node.input[0]][0] * scale).astype(np.float32)
+            graph.initializer.remove(initializers[bias_name])
+            add_initializer(f"{bias_name}_quantized", np.round(bias / bias_scale).astype(np.int32))
+            add_initializer(f"{bias_name}_scale", bias_scale)
+            add_initializer(f"{bias_name}_zero_point", np.zeros(len(bias_scale), dtype=np.int32))
+            weight_nodes.append(onnx.helper.make_node(
+                'DequantizeLinear', [f"{bias_name}_quantized", f"{bias_name}_scale", f"{bias_name}_zero_point"],
+                [bias_name], axis=0, name=f"{bias_name}_dequantize"))
+    
+    # 激活：在产生张量的节点之后插入 Q -> DQ，并把所有消费节点改为读取反量化后的张量
+    def qdq_nodes(name):
+        scale, zero_point = qparams[name]
+        add_initializer(f"{name}_scale", scale)
+        add_initializer(f"{name}_zero_point", zero_point)
+        return [
+            onnx.helper.make_node('QuantizeLinear', [name, f"{name}_scale", f"{name}_zero_point"],
+                                  [f"{name}_quantized"], name=f"{name}_quantize"),
+            onnx.helper.make_node('DequantizeLinear', [f"{name}_quantized", f"{name}_scale", f"{name}_zero_point"],
+                                  [f"{name}_dequantized"], name=f"{name}_dequantize"),
+        ]
+    
+    nodes = weight_nodes + qdq_nodes(graph.input[0].name)
+    for node in graph.node:
+        node.input[:] = [f"{name}_dequantized" if name in qparams else name for name in node.input]
+        nodes.append(node)
+        for output in node.output:
+            if output in qparams:
+                nodes.extend(qdq_nodes(output))
+    del graph.node[:]
+    graph.node.extend(nodes)
+    return model
+
+def export_qat_model(qat_path='../models/mnist_model_qat.pth', int8_path='../models/mnist_model_qat_int8.onnx'):
+    """
+    导出量化感知训练（train_model.py --qat）的INT8模型：先导出微调后的FP32图，再按学到的量化参数改写为QDQ格式
+    用完整测试集比较 FP32 PyTorch / QAT 伪量化 PyTorch / ORT QAT INT8（以及已有的动态量化INT8模型），并做准确率门禁
+    """
+    print("开始导出QAT INT8模型...")
+    checkpoint = torch.load(qat_path, map_location='cpu', weights_only=True)
+    weight_bits = checkpoint['weight_bits']
+    model = MNISTNet()
+    model.load_state_dict(checkpoint['model'])
+    model.eval()
+    qat_model = QATMNISTNet(model, weight_bits).eval()
+    for name, (min_val, max_val) in checkpoint['activation_ranges'].items():
+        qat_model.observers[name].min_val.fill_(min_val)
+        qat_model.observers[name].max_val.fill_(max_val)
+    
+    dummy_input = torch.randn(8, 1, 28, 28)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fp32_path = os.path.join(tmp_dir, 'mnist_model_qat_fp32.onnx')
+        torch.onnx.export(
+            model, dummy_input, fp32_path,
+            export_params=True,
+            opset_version=13,               # 按通道 DequantizeLinear 需要 opset 13
+            do_constant_folding=True,
+            input_names=['input'],
+            output_names=['output'],
+            dynamic_axes={'input': {0: 'batch_size'}, 'output': {0: 'batch_size'}}
+        )
+        onnx_model = onnx.load(fp32_path)
+    opset = next(o.version for o in onnx_model.opset_import if o.domain in ('', 'ai.onnx'))
+    if opset < 13:
+        onnx_model = onnx.version_converter.convert_version(onnx_model, 13)
+    try:
+        onnx_model = insert_qdq_nodes(onnx_model, checkpoint['activation_ranges'], weight_bits)
+        onnx.checker.check_model(onnx_model)
+    except (ValueError, KeyError, onnx.checker.ValidationError) as e:
+        print(f"✗ QDQ模型生成失败: {e}")
+        return None
+    onnx.save(onnx_model, int8_path)
+    write_model_descriptor(int8_path, MNIST_MEAN, MNIST_STD, weight_dtype=f'int{weight_bits}')
+    print(f"✓ QAT INT8模型: {int8_path} ({os.path.getsize(int8_path) / 1024:.1f} KB, 权重 {weight_bits}-bit)")
+    
+    print("\n使用完整MNIST测试集批量验证...")
+    images, labels = load_mnist_test_set('../data/MNIST/raw')
+    fp32_model = MNISTNet()
+    fp32_model.load_state_dict(torch.load('../models/mnist_model.pth', map_location='cpu', weights_only=True))
+    fp32_model.eval()
+    session = onnxruntime.InferenceSession(int8_path, providers=['CPUExecutionProvider'])
+    runners = {
+        'pytorch': lambda x: run_pytorch(fp32_model, x),
+        'pytorch_qat': lambda x: run_pytorch(qat_model, x),
+        'ort_qat_int8': lambda x: run_onnx(session, x),
+    }
+    if os.path.exists('../models/mnist_model_int8.onnx'):
+        ptq_session = onnxruntime.InferenceSession('../models/mnist_model_int8.onnx', providers=['CPUExecutionProvider'])
+        runners['ort_int8'] = lambda x: run_onnx(ptq_session, x)
+    reports = evaluate_models(runners, images, labels)
+    print_evaluation(reports)
+    failures = check_gate(reports, names=['ort_qat_int8'], max_accuracy_drop=QAT_MAX_ACCURACY_DROP)
+    if failures:
+        print("✗ 发布门禁未通过:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return None
+    print("✓ 发布门禁通过")
+    return int8_path
+
+def quantize_onnx_int8(onnx_path, int8_path):
+    """使用ONNX Runtime动态量化生成INT8模型，量化工具不可用时返回None"""
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError:
+        print("⚠️ onnxruntime.quantization 不可用，跳过INT8模型")
+        return None
+    
+    print(f"生成INT8模型: {int8_path}")
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    print(f"INT8模型大小: {os.path.getsize(int8_path) / 1024:.1f} KB "
+          f"(FP32: {os.path.getsize(onnx_path) / 1024:.1f} KB)")
+    return int8_path
+
+def test_with_real_data(pytorch_model, onnx_session, int8_session=None, half_sessions=None):
+    """
+    使用完整MNIST测试集批量比较 PyTorch / ORT FP32 / ORT INT8 / FP16·BF16 权重存储模型，
+    返回 (报告, 门禁失败原因)；half_sessions 为 {后缀: 会话}
+    """
+    images, labels = load_mnist_test_set('../data/MNIST/raw')
+    
+    runners = {
+        'pytorch': lambda x: run_pytorch(pytorch_model, x),
+        'ort_fp32': lambda x: run_onnx(onnx_session, x),
+    }
+    if int8_session is not None:
+        runners['ort_int8'] = lambda x: run_onnx(int8_session, x)
+    for suffix, session in (half_sessions or {}).items():
+        runners[f'ort_{suffix}'] = lambda x, session=session: run_onnx(session, x)
+    
+    reports = evaluate_models(runners, images, labels)
+    print_evaluation(reports)
+    
+    failures = check_gate(reports, names=['ort_fp32'],
+                          max_logit_diff=FP32_MAX_LOGIT_DIFF,
+                          max_disagreements=FP32_MAX_DISAGREEMENTS)
+    failures += check_gate(reports, names=['ort_int8'],
+                           max_accuracy_drop=INT8_MAX_ACCURACY_DROP)
+    failures += check_gate(reports, names=[f'ort_{suffix}' for suffix in WEIGHT_STORAGE_VARIANTS],
+                           max_accuracy_drop=HALF_MAX_ACCURACY_DROP)
+    
+    # 保存评估报告
+    os.makedirs('../results', exist_ok=True)
+    with open('../results/model_evaluation.json', 'w', encoding='utf-8') as f:
+        json.dump({'models': reports, 'gate_failures': failures}, f, indent=2, ensure_ascii=False)
+    print("评估报告已保存到: ../results/model_evaluation.json")
+    
+    return reports, failures
 
 
 
 if __name__ == "__main__":
-    onnx_path = export_to_onnx()
+    parser = argparse.ArgumentParser(description="导出ONNX模型")
+    parser.add_argument('--static-batches', default='',
+                        help='额外导出的固定批大小模型，逗号分隔（如 1,8,32,128）')
+    parser.add_argument('--arch', choices=['mnistnet', 'tiny'], default='mnistnet',
+                        help='导出的模型: mnistnet（完整模型）或 tiny（级联推理第一级小模型）')
+    parser.add_argument('--top1-head', action='store_true',
+                        help='额外导出图内计算 (类别, 置信度) 的模型 <模型>_top1.onnx（mnistnet 与 tiny）')
+    parser.add_argument('--qat', action='store_true',
+                        help='导出量化感知训练模型（train_model.py --qat）为 mnist_model_qat_int8.onnx')
+    args = parser.parse_args()
+    if args.qat and args.top1_head:
+        parser.error('--top1-head 不支持 --qat 模型')
+    static_batches = sorted({int(b) for b in args.static_batches.split(',') if b.strip()})
+    
+    if args.qat:
+        onnx_path = export_qat_model()
+    elif args.arch == 'tiny':
+        onnx_path = export_tiny_model(args.top1_head)
+    else:
+        onnx_path = export_to_onnx(static_batches, args.top1_head)
     
     if onnx_path:
         print(f"\n✅ ONNX模型导出成功!")
         print(f"📁 模型文件: {onnx_path}")
         print(f"📊 可以使用Netron等工具外部查看模型结构")
-        print(f"\n🎉 导出完成，可以继续下一步Python推理测试！") 
\ No newline at end of file
+        print(f"\n🎉 导出完成，可以继续下一步Python推理测试！")
+    else:
+        sys.exit(1) 
\ No newline at end of file
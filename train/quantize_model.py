@@ -1,11 +1,9 @@
 import torch
 import torch.nn as nn
-import torchvision.transforms as transforms
-from torch.utils.data import DataLoader
-import torchvision
 import os
 import numpy as np
 from train_model import MNISTNet
+from evaluate import load_mnist_test_set, run_pytorch, evaluate_models, print_evaluation
 
 def simulate_quantization(model, bits=8):
     """
@@ -53,21 +51,6 @@ def get_model_size(model):
     size_mb = (param_size + buffer_size) / 1024 / 1024
     return size_mb
 
-def test_model_accuracy(model, data_loader):
-    """测试模型精度"""
-    model.eval()
-    correct = 0
-    total = 0
-    
-    with torch.no_grad():
-        for data, target in data_loader:
-            outputs = model(data)
-            _, predicted = torch.max(outputs.data, 1)
-            total += target.size(0)
-            correct += (predicted == target).sum().item()
-    
-    return 100 * correct / total
-
 def quantize_model():
     """执行模拟量化"""
     print("开始模型量化（兼容性版本）...")
@@ -78,32 +61,25 @@ def quantize_model():
     model.load_state_dict(torch.load('../models/mnist_model.pth', map_location='cpu', weights_only=True))
     model.eval()
     
-    # 准备测试数据
+    # 准备测试数据（完整测试集）
     print("准备测试数据...")
-    transform = transforms.Compose([
-        transforms.ToTensor(),
-        transforms.Normalize((0.1307,), (0.3081,))
-    ])
-    
-    test_dataset = torchvision.datasets.MNIST(
-        root='../data', train=False, download=False, transform=transform
-    )
-    
-    # 使用少量数据进行测试
-    test_subset = torch.utils.data.Subset(test_dataset, range(1000))
-    test_loader = DataLoader(test_subset, batch_size=100, shuffle=False)
-    
-    # 测试原始模型
-    print("测试原始模型精度...")
-    original_accuracy = test_model_accuracy(model, test_loader)
+    images, labels = load_mnist_test_set('../data/MNIST/raw')
+    print(f"测试样本数: {len(images)}")
     
     # 执行模拟量化
     print("执行模拟量化...")
     quantized_model = simulate_quantization(model, bits=8)
     
-    # 测试量化模型
-    print("测试量化模型精度...")
-    quantized_accuracy = test_model_accuracy(quantized_model, test_loader)
+    # 批量评估原始模型和量化模型
+    print("批量评估原始模型和量化模型...")
+    reports = evaluate_models({
+        'original': lambda x: run_pytorch(model, x),
+        'quantized': lambda x: run_pytorch(quantized_model, x),
+    }, images, labels)
+    print_evaluation(reports)
+    
+    original_accuracy = 100 * reports['original']['accuracy']
+    quantized_accuracy = 100 * reports['quantized']['accuracy']
     
     # 计算模型大小
     original_size = get_model_size(model)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+超参数 / 模型结构并行扫描
+以进程池并行运行多个短训练任务（学习率、批大小、卷积通道数、fc1宽度的笛卡尔积），
+每个工作进程绑定到一组独占的CPU核并限制torch线程数；每个配置训练后在测试集上评估准确率并导出ONNX模型。
+全部训练结束后，由主进程在单个核上交替测量各模型的ORT单样本延迟（避免与训练任务争用CPU），
+输出 准确率 / 延迟 / 模型大小 的帕累托前沿，按部署成本选择模型
+
+用法:
+    python sweep.py                                       # 默认网格，工作进程数 = 可用核数 / 每进程线程数
+    python sweep.py --lrs 1e-3 --conv1 8,16,32 --fc1 32,64,128 --epochs 1 --train-samples 20000
+    python sweep.py --threads-per-worker 2 --workers 4
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+SWEEP_DIR = '../models/sweep'
+LOG_DIR = '../results/sweep_logs'
+
+# 各工作进程初始化时从队列中取一组CPU核（进程池内每个进程取一次）
+_worker_cpus = None
+
+
+def parse_list(text, convert):
+    return [convert(v) for v in text.split(',') if v.strip()]
+
+
+def config_id(config):
+    return (f"lr{config['lr']:g}_bs{config['batch_size']}_c{config['conv1_channels']}-{config['conv2_channels']}"
+            f"_fc{config['fc1_units']}")
+
+
+def init_worker(cpu_queue, threads):
+    """绑定到独占的CPU核并限制torch线程数（intra-op 与 inter-op）"""
+    global _worker_cpus
+    _worker_cpus = cpu_queue.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, _worker_cpus)
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+
+def run_config(config, epochs, train_samples, seed):
+    """训练一个配置并导出ONNX模型，训练日志写入 LOG_DIR/<配置>.log，返回结果字典"""
+    import torch
+    import onnx
+    from train_model import MNISTNet, create_data_loaders, train_epochs, evaluate_accuracy
+
+    name = config_id(config)
+    onnx_path = os.path.join(SWEEP_DIR, f"{name}.onnx")
+    with open(os.path.join(LOG_DIR, f"{name}.log"), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        torch.manual_seed(seed)
+        train_loader, test_loader = create_data_loaders(config['batch_size'], train_samples)
+        device = torch.device('cpu')
+        model = MNISTNet(config['conv1_channels'], config['conv2_channels'], config['fc1_units'])
+
+        start = time.perf_counter()
+        train_epochs(model, train_loader, device, epochs=epochs, lr=config['lr'])
+        train_seconds = time.perf_counter() - start
+        accuracy = evaluate_accuracy(model, test_loader, device)
+
+        model.eval()
+        torch.onnx.export(
+            model, torch.randn(1, 1, 28, 28), onnx_path,
+            export_params=True,
+            opset_version=11,
+            do_constant_folding=True,
+            input_names=['input'],
+            output_names=['output'],
+            dynamic_axes={'input': {0: 'batch_size'}, 'output': {0: 'batch_size'}}
+        )
+        onnx.checker.check_model(onnx.load(onnx_path))
+
+    return {
+        'id': name,
+        **config,
+        'cpus': sorted(_worker_cpus) if _worker_cpus else None,
+        'parameters': sum(p.numel() for p in model.parameters()),
+        'accuracy': accuracy / 100.0,
+        'train_seconds': train_seconds,
+        'train_samples_per_s': len(train_loader.dataset) * epochs / train_seconds,
+        'onnx_path': onnx_path,
+        'size_bytes': sum(os.path.getsize(p) for p in (onnx_path, f"{onnx_path}.data") if os.path.exists(p)),
+    }
+
+
+def measure_latencies(onnx_paths, runs, warmup):
+    """
+    单线程ORT会话的 batch=1 延迟中位数（毫秒），与 onnx_paths 一一对应
+    各模型交替运行，CPU频率和缓存状态的漂移对各模型的影响相同
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    options.inter_op_num_threads = 1
+    sessions = [ort.InferenceSession(path, options, providers=['CPUExecutionProvider']) for path in onnx_paths]
+    sample = np.random.rand(1, 1, 28, 28).astype(np.float32)
+    feeds = [{session.get_inputs()[0].name: sample} for session in sessions]
+    for _ in range(warmup):
+        for session, feed in zip(sessions, feeds):
+            session.run(None, feed)
+    times = np.empty((len(sessions), runs))
+    for i in range(runs):
+        for k, (session, feed) in enumerate(zip(sessions, feeds)):
+            start = time.perf_counter()
+            session.run(None, feed)
+            times[k, i] = time.perf_counter() - start
+    return [float(t) for t in np.median(times, axis=1) * 1000.0]
+
+
+def pareto_frontier(results, maximize=('accuracy',), minimize=('latency_ms', 'size_bytes')):
+    """返回不被任何其他结果支配的结果（各目标都不差且至少一个更好即为支配）"""
+    def dominates(a, b):
+        no_worse = (all(a[k] >= b[k] for k in maximize) and all(a[k] <= b[k] for k in minimize))
+        better = (any(a[k] > b[k] for k in maximize) or any(a[k] < b[k] for k in minimize))
+        return no_worse and better
+    return [r for r in results if not any(dominates(other, r) for other in results if other is not r)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="超参数 / 模型结构并行扫描（准确率-延迟-大小 帕累托前沿）")
+    parser.add_argument('--lrs', default='1e-3,3e-3', help='学习率，逗号分隔')
+    parser.add_argument('--batch-sizes', default='64,128', help='训练批大小，逗号分隔')
+    parser.add_argument('--conv1', default='16,32', help='conv1 输出通道数，逗号分隔')
+    parser.add_argument('--conv2', default='32,64', help='conv2 输出通道数，逗号分隔')
+    parser.add_argument('--fc1', default='64,128', help='fc1 宽度，逗号分隔')
+    parser.add_argument('--epochs', type=int, default=1, help='每个配置的训练轮数')
+    parser.add_argument('--train-samples', type=int, default=20000, help='每个配置使用的训练样本数（0 表示全部）')
+    parser.add_argument('--threads-per-worker', type=int, default=1, help='每个工作进程的核数 / torch线程数')
+    parser.add_argument('--workers', type=int, default=0, help='工作进程数（默认 可用核数 / 每进程核数）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（各配置相同）')
+    parser.add_argument('--latency-runs', type=int, default=200, help='延迟测量的运行次数')
+    parser.add_argument('--output', default='../results/sweep_results.json', help='结果JSON路径')
+    args = parser.parse_args()
+
+    configs = [
+        {'lr': lr, 'batch_size': bs, 'conv1_channels': c1, 'conv2_channels': c2, 'fc1_units': fc}
+        for lr, bs, c1, c2, fc in itertools.product(
+            parse_list(args.lrs, float), parse_list(args.batch_sizes, int), parse_list(args.conv1, int),
+            parse_list(args.conv2, int), parse_list(args.fc1, int))
+    ]
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+    threads = max(1, min(args.threads_per_worker, len(cpus)))
+    workers = args.workers or max(1, len(cpus) // threads)
+    workers = min(workers, len(configs))
+    # 每个工作进程一组独占的核；核数不足时各组循环复用
+    cpu_sets = [{cpus[(w * threads + t) % len(cpus)] for t in range(threads)} for w in range(workers)]
+
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    os.makedirs(LOG_DIR, exist_ok=True)
+    print(f"🔍 {len(configs)} 个配置，{workers} 个工作进程 x {threads} 线程，"
+          f"每个配置 {args.epochs} 轮 / {args.train_samples or '全部'} 个训练样本")
+
+    # 先在主进程中加载（必要时下载）一次数据集，避免多个工作进程同时下载并解压到 ../data
+    from train_model import load_mnist_datasets
+    load_mnist_datasets()
+
+    # spawn: 子进程不继承父进程的torch线程池状态
+    context = multiprocessing.get_context('spawn')
+    cpu_queue = context.Queue()
+    for cpu_set in cpu_sets:
+        cpu_queue.put(cpu_set)
+
+    results, failures = [], []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, initargs=(cpu_queue, threads)) as pool:
+        futures = {pool.submit(run_config, config, args.epochs, args.train_samples, args.seed): config
+                   for config in configs}
+        for future in as_completed(futures):
+            name = config_id(futures[future])
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ {name}: {e}（日志: {LOG_DIR}/{name}.log）")
+                failures.append({'id': name, 'error': str(e)})
+                continue
+            results.append(result)
+            print(f"✓ [{len(results) + len(failures)}/{len(configs)}] {name}: 准确率 {result['accuracy']:.2%}，"
+                  f"训练 {result['train_seconds']:.1f}s")
+    sweep_seconds = time.perf_counter() - start
+
+    if not results:
+        print("❌ 没有成功的配置")
+        return 1
+
+    # 训练全部结束后在单个核上逐个测量延迟，各模型的测量条件相同
+    print(f"\n⏱️  测量ORT单样本延迟（CPU {cpus[0]}，单线程）...")
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpus[0]})
+    latencies = measure_latencies([r['onnx_path'] for r in results], args.latency_runs, warmup=20)
+    for result, latency in zip(results, latencies):
+        result['latency_ms'] = latency
+    frontier = {r['id'] for r in pareto_frontier(results)}
+
+    results.sort(key=lambda r: (r['latency_ms'], -r['accuracy']))
+    print(f"\n{'配置':<28} {'参数量':>10} {'大小(KB)':>9} {'延迟(ms)':>9} {'准确率':>8} {'训练(样本/s)':>12}  前沿")
+    print("-" * 90)
+    for r in results:
+        print(f"{r['id']:<28} {r['parameters']:>10,} {r['size_bytes'] / 1024:>9.0f} {r['latency_ms']:>9.4f} "
+              f"{r['accuracy']:>8.2%} {r['train_samples_per_s']:>12.0f}  {'★' if r['id'] in frontier else ''}")
+    print(f"\n帕累托前沿（准确率↑ 延迟↓ 大小↓）: {len(frontier)}/{len(results)} 个配置，"
+          f"扫描耗时 {sweep_seconds:.1f}s")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'epochs': args.epochs,
+            'train_samples': args.train_samples,
+            'workers': workers,
+            'threads_per_worker': threads,
+            'sweep_seconds': sweep_seconds,
+            'results': results,
+            'pareto_frontier': [r['id'] for r in results if r['id'] in frontier],
+            'failures': failures,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"结果已保存到: {args.output}")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+多进程数据并行训练（CPU，torch.distributed gloo 后端）
+在本机启动 N 个进程，每个进程绑定到一组独占的CPU核（--threads-per-process，默认1）；
+DistributedSampler 按 rank 把训练集切成互不重叠的分片，
+DistributedDataParallel 在反向传播时对梯度做 all-reduce（求平均），各进程的参数始终保持一致；
+只由 rank 0 评估测试集并保存 ../models/<模型名>.pth / <模型名>_full.pth（与 train_model.py 相同的文件）
+
+每个进程的批大小为 --batch-size，全局批大小为 --batch-size x 进程数；
+进程数增加时每轮的优化步数相应减少，需要时可按进程数放大学习率（--lr）
+
+--scaling 模式依次以不同进程数训练（不保存模型），报告训练吞吐（样本/s）与扩展效率
+（N 进程吞吐 / (N x 单进程吞吐)），结果写入 ../results/ddp_scaling.json；
+每个进程的核数固定，不随进程数变化，扩展效率才反映数据并行本身的开销
+
+用法:
+    python train_distributed.py --processes 4                        # 4 进程训练并保存模型
+    python train_distributed.py --processes 8 --arch tiny --epochs 5
+    python train_distributed.py --processes 2 --threads-per-process 4
+    python train_distributed.py --scaling 1,2,4,8 --train-samples 20000
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
+
+from train_model import ARCHITECTURES, load_mnist_datasets, train_epochs, evaluate_accuracy
+
+
+def available_cpus():
+    return sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+
+
+def free_port():
+    """由系统分配一个空闲的本地端口，作为 rank 0 的 rendezvous 地址"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def cpu_slices(cpus, world_size, threads):
+    """每个进程 threads 个核（与 sweep.py 相同的切分方式）；核不够分时循环复用"""
+    return [{cpus[(rank * threads + t) % len(cpus)] for t in range(threads)} for rank in range(world_size)]
+
+
+def worker(rank, world_size, port, cpu_sets, config, result_queue):
+    """单个训练进程：加入进程组，训练自己的数据分片，rank 0 评估、保存并通过队列返回统计"""
+    os.environ['MASTER_ADDR'] = '127.0.0.1'
+    os.environ['MASTER_PORT'] = str(port)
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpu_sets[rank])
+    torch.set_num_threads(len(cpu_sets[rank]))
+    torch.set_num_interop_threads(1)
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+
+    # 只有 rank 0 打印训练进度
+    log = contextlib.nullcontext() if rank == 0 else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with log:
+        try:
+            torch.manual_seed(config['seed'])   # 各进程初始参数相同（DDP 构造时也会从 rank 0 广播）
+            train_dataset, test_dataset = load_mnist_datasets(config['train_samples'])
+            sampler = DistributedSampler(train_dataset, num_replicas=world_size, rank=rank,
+                                         shuffle=True, seed=config['seed'])
+            train_loader = DataLoader(train_dataset, batch_size=config['batch_size'], sampler=sampler)
+
+            model_class, model_name = ARCHITECTURES[config['arch']]
+            device = torch.device('cpu')
+            model = DistributedDataParallel(model_class())
+
+            dist.barrier()
+            start = time.perf_counter()
+            train_epochs(model, train_loader, device, epochs=config['epochs'], lr=config['lr'],
+                         sampler=sampler, verbose=rank == 0)
+            dist.barrier()
+            train_seconds = time.perf_counter() - start
+
+            if rank == 0:
+                model = model.module
+                test_loader = DataLoader(test_dataset, batch_size=1000, shuffle=False)
+                accuracy = evaluate_accuracy(model, test_loader, device)
+                if config['save']:
+                    os.makedirs('../models', exist_ok=True)
+                    torch.save(model.state_dict(), f'../models/{model_name}.pth')
+                    torch.save(model, f'../models/{model_name}_full.pth')
+                    print(f"模型已保存到 ../models/{model_name}.pth")
+                # 各进程分片大小相同（DistributedSampler 会补齐），实际处理的样本数 = 分片大小 x 进程数 x 轮数
+                samples = len(sampler) * world_size * config['epochs']
+                result_queue.put({
+                    'processes': world_size,
+                    'threads_per_process': len(cpu_sets[rank]),
+                    'global_batch_size': config['batch_size'] * world_size,
+                    'steps_per_epoch': len(train_loader),
+                    'train_seconds': train_seconds,
+                    'samples_per_s': samples / train_seconds,
+                    'accuracy': accuracy / 100.0,
+                })
+        finally:
+            dist.destroy_process_group()
+
+
+def train_distributed(world_size, arch='mnistnet', epochs=5, lr=0.001, batch_size=64, train_samples=None,
+                      seed=0, save=True, threads_per_process=1):
+    """
+    以 world_size 个本地进程数据并行训练，每个进程 threads_per_process 个核，返回 rank 0 的统计字典
+    （processes / threads_per_process / global_batch_size / train_seconds / samples_per_s / accuracy 等）
+    """
+    cpus = available_cpus()
+    threads = max(1, min(threads_per_process, len(cpus)))
+    if world_size * threads > len(cpus):
+        print(f"⚠️  {world_size} 个进程 x {threads} 线程超过可用核数 {len(cpus)}，多个进程将共享核，扩展效率会下降")
+    # 先在主进程中加载（必要时下载）一次数据集，避免多个进程同时下载
+    load_mnist_datasets(train_samples)
+
+    config = {'arch': arch, 'epochs': epochs, 'lr': lr, 'batch_size': batch_size,
+              'train_samples': train_samples, 'seed': seed, 'save': save}
+    result_queue = multiprocessing.get_context('spawn').SimpleQueue()
+    mp.spawn(worker, args=(world_size, free_port(), cpu_slices(cpus, world_size, threads), config, result_queue),
+             nprocs=world_size, join=True)
+    return result_queue.get()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程数据并行训练（torch.distributed gloo）")
+    parser.add_argument('--processes', type=int, default=0,
+                        help='训练进程数（默认 可用核数 / --threads-per-process）')
+    parser.add_argument('--threads-per-process', type=int, default=1, help='每个进程的核数 / torch线程数')
+    parser.add_argument('--arch', choices=sorted(ARCHITECTURES), default='mnistnet', help='模型结构')
+    parser.add_argument('--epochs', type=int, default=5, help='训练轮数')
+    parser.add_argument('--lr', type=float, default=0.001, help='学习率')
+    parser.add_argument('--batch-size', type=int, default=64, help='每个进程的批大小')
+    parser.add_argument('--train-samples', type=int, default=0, help='训练样本数（0 表示全部）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--scaling', default=None,
+                        help='扩展效率测试：逐个测试的进程数，逗号分隔（如 1,2,4,8），不保存模型')
+    parser.add_argument('--output', default='../results/ddp_scaling.json', help='扩展效率结果JSON路径')
+    args = parser.parse_args()
+
+    train_samples = args.train_samples or None
+    if not args.scaling:
+        processes = args.processes or max(1, len(available_cpus()) // args.threads_per_process)
+        print(f"开始数据并行训练 ({processes} 个进程 x {args.threads_per_process} 线程, gloo)...")
+        result = train_distributed(processes, args.arch, args.epochs, args.lr, args.batch_size,
+                                   train_samples, args.seed, threads_per_process=args.threads_per_process)
+        print(f"✓ 训练耗时 {result['train_seconds']:.1f}s，{result['samples_per_s']:.0f} 样本/s，"
+              f"全局批大小 {result['global_batch_size']}")
+        return 0
+
+    counts = [int(n) for n in args.scaling.split(',') if n.strip()]
+    results = []
+    for processes in counts:
+        print(f"\n▶ {processes} 个进程")
+        results.append(train_distributed(processes, args.arch, args.epochs, args.lr, args.batch_size,
+                                         train_samples, args.seed, save=False,
+                                         threads_per_process=args.threads_per_process))
+    # 以进程数最少的一次作为基准（通常为 1 个进程）；各次每进程核数相同，效率 = 吞吐 / (进程数 x 单进程吞吐)
+    base = results[0]
+    base_per_process = base['samples_per_s'] / base['processes']
+    for r in results:
+        r['speedup'] = r['samples_per_s'] / base['samples_per_s']
+        r['efficiency'] = r['samples_per_s'] / (r['processes'] * base_per_process)
+
+    print(f"\n{'进程数':>6} {'线程/进程':>9} {'全局批大小':>10} {'训练(s)':>9} {'样本/s':>9} {'加速比':>7} "
+          f"{'扩展效率':>8} {'准确率':>8}")
+    print("-" * 76)
+    for r in results:
+        print(f"{r['processes']:>6} {r['threads_per_process']:>9} {r['global_batch_size']:>10} "
+              f"{r['train_seconds']:>9.1f} {r['samples_per_s']:>9.0f} {r['speedup']:>6.2f}x "
+              f"{r['efficiency']:>8.1%} {r['accuracy']:>8.2%}")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'arch': args.arch,
+            'epochs': args.epochs,
+            'lr': args.lr,
+            'batch_size_per_process': args.batch_size,
+            'threads_per_process': args.threads_per_process,
+            'train_samples': args.train_samples,
+            'available_cpus': len(available_cpus()),
+            'results': results,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,24 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 import torchvision
 import torchvision.transforms as transforms
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Subset
 import os
+import sys
+import argparse
 
 class MNISTNet(nn.Module):
-    """简单的CNN模型用于MNIST分类"""
-    def __init__(self):
+    """简单的CNN模型用于MNIST分类（通道数和fc1宽度可配置，默认值即部署的模型结构）"""
+    def __init__(self, conv1_channels=32, conv2_channels=64, fc1_units=128):
         super(MNISTNet, self).__init__()
-        self.conv1 = nn.Conv2d(1, 32, 3, 1)
-        self.conv2 = nn.Conv2d(32, 64, 3, 1)
+        self.conv1 = nn.Conv2d(1, conv1_channels, 3, 1)
+        self.conv2 = nn.Conv2d(conv1_channels, conv2_channels, 3, 1)
         self.dropout1 = nn.Dropout(0.25)
         self.dropout2 = nn.Dropout(0.5)
-        self.fc1 = nn.Linear(9216, 128)
-        self.fc2 = nn.Linear(128, 10)
+        self.fc1 = nn.Linear(conv2_channels * 12 * 12, fc1_units)   # 28 -> 26 -> 24 -> 池化 12
+        self.fc2 = nn.Linear(fc1_units, 10)
         
     def forward(self, x):
         x = self.conv1(x)
@@ -31,17 +34,107 @@ class MNISTNet(nn.Module):
         x = self.fc2(x)
         return torch.log_softmax(x, dim=1)
 
-def train_model():
-    """训练MNIST模型"""
-    print("开始训练MNIST模型...")
+class TinyMNISTNet(nn.Module):
+    """级联推理第一级的小模型：两层步长2卷积 + 一个全连接层，计算量约为MNISTNet的0.5%"""
+    def __init__(self):
+        super(TinyMNISTNet, self).__init__()
+        self.conv1 = nn.Conv2d(1, 8, 3, 2)    # 28x28 -> 13x13
+        self.conv2 = nn.Conv2d(8, 16, 3, 2)   # 13x13 -> 6x6
+        self.fc = nn.Linear(576, 10)
+        
+    def forward(self, x):
+        x = torch.relu(self.conv1(x))
+        x = torch.relu(self.conv2(x))
+        x = torch.flatten(x, 1)
+        x = self.fc(x)
+        return torch.log_softmax(x, dim=1)
+
+# 模型结构 -> (模型类, 保存文件名前缀)
+ARCHITECTURES = {
+    'mnistnet': (MNISTNet, 'mnist_model'),
+    'tiny': (TinyMNISTNet, 'mnist_tiny_model'),
+}
+
+# 量化感知训练（QAT）：伪量化的激活位置，依次为模型输入和各层ReLU的输出
+# （与 export_onnx.py 插入 QuantizeLinear/DequantizeLinear 的位置一一对应）
+QAT_ACTIVATIONS = ['input', 'conv1', 'conv2', 'fc1']
+
+def weight_scale(weight, bits):
+    """权重按输出通道（第0维）的对称量化缩放，量化范围 [-(2^(bits-1)-1), 2^(bits-1)-1]，零点为0"""
+    qmax = 2 ** (bits - 1) - 1
+    return torch.clamp(weight.detach().abs().flatten(1).amax(dim=1) / qmax, min=1e-8)
+
+def fake_quantize_weight(weight, bits):
+    """权重按通道伪量化（前向取整，反向直通）"""
+    qmax = 2 ** (bits - 1) - 1
+    scale = weight_scale(weight, bits)
+    zero_point = torch.zeros_like(scale, dtype=torch.int32)
+    return torch.fake_quantize_per_channel_affine(weight, scale, zero_point, 0, -qmax, qmax)
+
+class FakeQuantObserver(nn.Module):
+    """
+    激活伪量化：训练时以指数滑动平均跟踪 min/max，按 uint8 非对称量化参数伪量化（反向直通）
+    eval 模式下范围固定，即导出INT8模型时使用的量化参数
+    """
+    def __init__(self, momentum=0.01):
+        super(FakeQuantObserver, self).__init__()
+        self.momentum = momentum
+        self.register_buffer('min_val', torch.tensor(float('inf')))
+        self.register_buffer('max_val', torch.tensor(float('-inf')))
     
-    # 数据预处理
+    def qparams(self):
+        """(scale, zero_point)：范围扩展到包含0，使0可被精确表示（ReLU输出的零点为0）"""
+        min_val = torch.clamp(self.min_val, max=0.0)
+        max_val = torch.clamp(self.max_val, min=0.0)
+        scale = torch.clamp((max_val - min_val) / 255.0, min=1e-8)
+        zero_point = torch.clamp(torch.round(-min_val / scale), 0, 255).to(torch.int32)
+        return scale, zero_point
+    
+    def forward(self, x):
+        if self.training:
+            with torch.no_grad():
+                low, high = x.min(), x.max()
+                if torch.isinf(self.min_val):
+                    self.min_val.copy_(low)
+                    self.max_val.copy_(high)
+                else:
+                    self.min_val.lerp_(low, self.momentum)
+                    self.max_val.lerp_(high, self.momentum)
+        scale, zero_point = self.qparams()
+        return torch.fake_quantize_per_tensor_affine(x, scale, zero_point, 0, 255)
+
+class QATMNISTNet(nn.Module):
+    """MNISTNet 的量化感知训练包装：Conv/Linear 权重按通道伪量化到 weight_bits 位，QAT_ACTIVATIONS 处的激活伪量化到 uint8"""
+    def __init__(self, model, weight_bits=8):
+        super(QATMNISTNet, self).__init__()
+        self.model = model
+        self.weight_bits = weight_bits
+        self.observers = nn.ModuleDict({name: FakeQuantObserver() for name in QAT_ACTIVATIONS})
+    
+    def forward(self, x):
+        m, q, bits = self.model, self.observers, self.weight_bits
+        x = q['input'](x)
+        x = q['conv1'](torch.relu(F.conv2d(x, fake_quantize_weight(m.conv1.weight, bits), m.conv1.bias)))
+        x = q['conv2'](torch.relu(F.conv2d(x, fake_quantize_weight(m.conv2.weight, bits), m.conv2.bias)))
+        x = torch.max_pool2d(x, 2)
+        x = m.dropout1(x)
+        x = torch.flatten(x, 1)
+        x = q['fc1'](torch.relu(F.linear(x, fake_quantize_weight(m.fc1.weight, bits), m.fc1.bias)))
+        x = m.dropout2(x)
+        x = F.linear(x, fake_quantize_weight(m.fc2.weight, bits), m.fc2.bias)
+        return torch.log_softmax(x, dim=1)
+    
+    def activation_ranges(self):
+        """各激活位置的 (min, max)，供导出INT8模型"""
+        return {name: (float(o.min_val), float(o.max_val)) for name, o in self.observers.items()}
+
+def load_mnist_datasets(train_samples=None):
+    """MNIST训练集 / 测试集（标准化参数与推理引擎一致），train_samples 只取训练集前N个样本"""
     transform = transforms.Compose([
         transforms.ToTensor(),
         transforms.Normalize((0.1307,), (0.3081,))
     ])
     
-    # 加载数据
     print("加载MNIST数据集...")
     train_dataset = torchvision.datasets.MNIST(
         root='../data', train=True, download=True, transform=transform
@@ -50,11 +143,20 @@ def train_model():
         root='../data', train=False, download=True, transform=transform
     )
     
-    train_loader = DataLoader(train_dataset, batch_size=64, shuffle=True)
+    if train_samples:
+        train_dataset = Subset(train_dataset, range(min(train_samples, len(train_dataset))))
+    return train_dataset, test_dataset
+
+def create_data_loaders(batch_size=64, train_samples=None):
+    """MNIST训练集 / 测试集的 DataLoader"""
+    train_dataset, test_dataset = load_mnist_datasets(train_samples)
+    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
     test_loader = DataLoader(test_dataset, batch_size=1000, shuffle=False)
-    
-    # 初始化模型 - 优先使用GPU加速
-    if torch.backends.mps.is_available():
+    return train_loader, test_loader
+
+def select_device(allow_mps=True):
+    """优先使用GPU加速（MPS / CUDA），否则使用CPU"""
+    if allow_mps and torch.backends.mps.is_available():
         device = torch.device("mps")
         print(f"使用设备: {device} (Apple Silicon GPU)")
     elif torch.cuda.is_available():
@@ -63,17 +165,22 @@ def train_model():
     else:
         device = torch.device("cpu")
         print(f"使用设备: {device} (CPU)")
-    
-    print(f"🚀 GPU加速训练，可以显著提升训练速度！")
-    
-    model = MNISTNet().to(device)
-    optimizer = optim.Adam(model.parameters(), lr=0.001)
+    return device
+
+def train_epochs(model, train_loader, device, epochs, lr, sampler=None, verbose=True):
+    """
+    Adam + NLLLoss 训练 epochs 轮
+    sampler 为 DistributedSampler 时每轮调用 set_epoch 使各进程的打乱顺序一致；verbose=False 时不打印进度
+    """
+    optimizer = optim.Adam(model.parameters(), lr=lr)
     criterion = nn.NLLLoss()
     
-    # 训练循环
-    print("开始训练...")
+    if verbose:
+        print("开始训练...")
     model.train()
-    for epoch in range(5):  # 快速训练5个epoch用于演示
+    for epoch in range(epochs):
+        if sampler is not None:
+            sampler.set_epoch(epoch)
         epoch_loss = 0
         for batch_idx, (data, target) in enumerate(train_loader):
             data, target = data.to(device), target.to(device)
@@ -84,17 +191,18 @@ def train_model():
             optimizer.step()
             epoch_loss += loss.item()
             
-            if batch_idx % 200 == 0:
-                print(f'Epoch {epoch+1}/5, Batch {batch_idx}, Loss: {loss.item():.6f}')
-                import sys
+            if verbose and batch_idx % 200 == 0:
+                print(f'Epoch {epoch+1}/{epochs}, Batch {batch_idx}, Loss: {loss.item():.6f}')
                 sys.stdout.flush()  # 确保实时输出
         
-        print(f'Epoch {epoch+1}/5 完成，平均Loss: {epoch_loss/len(train_loader):.6f}')
-        import sys
-        sys.stdout.flush()  # 确保实时输出
-    
-    # 测试模型
+        if verbose:
+            print(f'Epoch {epoch+1}/{epochs} 完成，平均Loss: {epoch_loss/len(train_loader):.6f}')
+            sys.stdout.flush()  # 确保实时输出
+
+def evaluate_accuracy(model, test_loader, device):
+    """测试集准确率（%），同时打印平均损失"""
     print("测试模型性能...")
+    criterion = nn.NLLLoss()
     model.eval()
     test_loss = 0
     correct = 0
@@ -109,15 +217,90 @@ def train_model():
     accuracy = 100. * correct / len(test_loader.dataset)
     print(f'测试准确率: {accuracy:.2f}%')
     print(f'测试损失: {test_loss/len(test_loader):.6f}')
+    return accuracy
+
+def train_model(arch='mnistnet'):
+    """训练MNIST模型（arch 见 ARCHITECTURES）"""
+    model_class, model_name = ARCHITECTURES[arch]
+    print(f"开始训练MNIST模型 ({model_class.__name__})...")
+    
+    train_loader, test_loader = create_data_loaders()
+    device = select_device()
+    print(f"🚀 GPU加速训练，可以显著提升训练速度！")
+    
+    model = model_class().to(device)
+    train_epochs(model, train_loader, device, epochs=5, lr=0.001)  # 快速训练5个epoch用于演示
+    evaluate_accuracy(model, test_loader, device)
     
     # 保存模型
     os.makedirs('../models', exist_ok=True)
-    torch.save(model.state_dict(), '../models/mnist_model.pth')
-    torch.save(model, '../models/mnist_model_full.pth')
-    print("模型已保存到 ../models/mnist_model.pth")
+    torch.save(model.state_dict(), f'../models/{model_name}.pth')
+    torch.save(model, f'../models/{model_name}_full.pth')
+    print(f"模型已保存到 ../models/{model_name}.pth")
     
     return model
 
+def train_qat(weight_bits=8, epochs=1, lr=1e-4):
+    """
+    量化感知训练：从FP32模型 ../models/mnist_model.pth 出发，插入伪量化后以较小学习率微调，
+    保存 ../models/mnist_model_qat.pth（权重 + 各激活范围 + 权重位数），由 export_onnx.py --qat 导出INT8 ONNX模型
+    """
+    print(f"开始量化感知训练 (权重 {weight_bits}-bit, 激活 8-bit)...")
+    train_loader, test_loader = create_data_loaders()
+    device = select_device(allow_mps=False)   # 伪量化算子在MPS上不一定可用
+    
+    model = MNISTNet()
+    model.load_state_dict(torch.load('../models/mnist_model.pth', map_location='cpu', weights_only=True))
+    qat_model = QATMNISTNet(model, weight_bits).to(device)
+    
+    # 微调前先估计一次激活范围，报告训练后量化（PTQ）的准确率作为对照
+    qat_model.train()
+    with torch.no_grad():
+        for batch_idx, (data, _) in enumerate(train_loader):
+            qat_model(data.to(device))
+            if batch_idx == 50:
+                break
+    print("微调前（相当于训练后量化）:")
+    ptq_accuracy = evaluate_accuracy(qat_model, test_loader, device)
+    
+    train_epochs(qat_model, train_loader, device, epochs=epochs, lr=lr)
+    print("微调后:")
+    qat_accuracy = evaluate_accuracy(qat_model, test_loader, device)
+    
+    os.makedirs('../models', exist_ok=True)
+    torch.save({
+        'model': {k: v.cpu() for k, v in model.state_dict().items()},
+        'activation_ranges': qat_model.activation_ranges(),
+        'weight_bits': weight_bits,
+        'ptq_accuracy': ptq_accuracy,
+        'qat_accuracy': qat_accuracy,
+    }, '../models/mnist_model_qat.pth')
+    print(f"QAT模型已保存到 ../models/mnist_model_qat.pth（准确率 {ptq_accuracy:.2f}% -> {qat_accuracy:.2f}%）")
+    return qat_model
+
 if __name__ == "__main__":
-    trained_model = train_model()
-    print("训练完成！") 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="训练MNIST模型")
+    parser.add_argument('--arch', choices=sorted(ARCHITECTURES), default='mnistnet',
+                        help='模型结构: mnistnet（完整模型）或 tiny（级联推理第一级小模型）')
+    parser.add_argument('--qat', action='store_true',
+                        help='量化感知训练：从 mnist_model.pth 微调，保存 mnist_model_qat.pth')
+    parser.add_argument('--weight-bits', type=int, choices=range(2, 9), default=8, metavar='{2..8}',
+                        help='QAT权重位数（4 即 INT4 取值范围，仍以int8存放）')
+    parser.add_argument('--epochs', type=int, default=1, help='QAT微调轮数')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='数据并行训练进程数（>1 时使用 torch.distributed gloo，见 train_distributed.py）')
+    parser.add_argument('--download-only', action='store_true',
+                        help='只下载MNIST数据集到 ../data/MNIST/raw，不训练（流水线 download 阶段）')
+    args = parser.parse_args()
+    if args.download_only:
+        load_mnist_datasets()
+        print("MNIST数据集已就绪")
+        sys.exit(0)
+    if args.qat:
+        train_qat(args.weight_bits, args.epochs)
+    elif args.processes > 1:
+        from train_distributed import train_distributed
+        train_distributed(args.processes, args.arch)
+    else:
+        trained_model = train_model(args.arch)
+    print("训练完成！")